@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Suíte de benchmarks (ver benchmarks/run.py). Não faz parte do pacote instalado.
@@ -0,0 +1,76 @@
+# benchmarks/compare.py
+"""
+Compara dois resultados de benchmarks.run e aponta regressões.
+
+    python -m benchmarks.compare atual.json baseline.json [--threshold 0.15] [--min-seconds 0.001]
+
+Compara o tempo mínimo de cada caso (o menos sujeito a ruído). Casos com baseline abaixo de
+--min-seconds são ignorados, porque ali o ruído domina. O código de saída é 1 se houver regressões.
+"""
+
+import argparse
+import json
+import sys
+
+DEFAULT_MIN_SECONDS = 0.001
+
+
+def compare_results(current: dict, baseline: dict, threshold: float = 0.15,
+                    min_seconds: float = DEFAULT_MIN_SECONDS) -> dict:
+    """Retorna {"cases": [...], "regressions": [...], "improvements": [...], "missing": [...], "new": [...]}."""
+    current_cases, baseline_cases = current.get("results", {}), baseline.get("results", {})
+    cases, regressions, improvements = [], [], []
+    for key in sorted(set(current_cases) & set(baseline_cases)):
+        before, after = baseline_cases[key]["min"], current_cases[key]["min"]
+        ratio = after / before if before else float("inf")
+        entry = {"case": key, "baseline": before, "current": after, "ratio": round(ratio, 4), "status": "ok"}
+        if max(before, after) < min_seconds:
+            entry["status"] = "noise"
+        elif ratio > 1 + threshold:
+            entry["status"] = "regression"
+            regressions.append(entry)
+        elif ratio < 1 - threshold:
+            entry["status"] = "improvement"
+            improvements.append(entry)
+        cases.append(entry)
+    return {"cases": cases, "regressions": regressions, "improvements": improvements,
+            "missing": sorted(set(baseline_cases) - set(current_cases)),
+            "new": sorted(set(current_cases) - set(baseline_cases))}
+
+
+def print_comparison(comparison: dict, threshold: float):
+    for entry in comparison["cases"]:
+        marker = {"regression": "REGRESSÃO", "improvement": "melhora", "noise": "(ruído)"}.get(entry["status"], "")
+        print(f"  {entry['case']:<50} {entry['baseline'] * 1000:10.2f} ms -> {entry['current'] * 1000:10.2f} ms "
+              f"({entry['ratio']:.2f}x) {marker}")
+    for key in comparison["missing"]:
+        print(f"  {key:<50} ausente no resultado atual")
+    if comparison["regressions"]:
+        print(f"{len(comparison['regressions'])} caso(s) mais lento(s) que o baseline além de {threshold:.0%}.")
+    else:
+        print(f"Nenhuma regressão acima de {threshold:.0%}.")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compara resultados de benchmarks com um baseline.")
+    parser.add_argument("current")
+    parser.add_argument("baseline")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument("--min-seconds", type=float, default=DEFAULT_MIN_SECONDS)
+    parser.add_argument("--json", action="store_true", help="Imprime a comparação em JSON.")
+    args = parser.parse_args(argv)
+
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    comparison = compare_results(current, baseline, args.threshold, args.min_seconds)
+    if args.json:
+        print(json.dumps(comparison, indent=2))
+    else:
+        print_comparison(comparison, args.threshold)
+    return 1 if comparison["regressions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+# benchmarks/fake_nmap.py
+"""
+Emulador determinístico do executável do Nmap, para testes de carga sem rede e sem root.
+
+Responde a 'nmap -V' e a 'nmap -oX - <alvos> -p <portas> <opções>' (a linha de comando que o
+python-nmap monta) com XML realista gerado por benchmarks.fixtures: cada endereço tem sempre
+os mesmos serviços (semente + endereço), as portas fora de '-p' são descartadas, a saída NSE
+aparece com --script/-A/-sC e o tempo de resposta segue o agendamento de um scan real
+(host_latency segundos por grupo de `hostgroup` hosts escaneados em paralelo).
+
+    with fake_nmap({"host_latency": 0.05, "max_ports": 4}):
+        NmapGuardian("10.1.0.0/24").run_scan(...)   # nmap.PortScanner() encontra o emulador no PATH
+
+O perfil fica em fake_nmap.json, ao lado do executável instalado (ver install_fake_nmap).
+"""
+
+import contextlib
+import ipaddress
+import json
+import os
+import random
+import stat
+import sys
+import tempfile
+import time
+
+VERSION_BANNER = "Nmap version 7.94 ( https://nmap.org )"
+PROFILE_FILENAME = "fake_nmap.json"
+DEFAULT_PROFILE = {
+    "seed": 1337,
+    "down_ratio": 0.05,   # Fração dos endereços que não respondem
+    "max_ports": 8,       # Densidade: cada host ativo tem de 1 a max_ports serviços
+    "scripts": None,      # Saída NSE: None = só com --script/-A/-sC, como o Nmap
+    "host_latency": 0.0,  # Segundos por grupo de hosts
+    "startup_latency": 0.0, # Segundos antes do scan, mesmo sem endereços (ex: alvos que são hostnames)
+    "hostgroup": 64,      # Hosts escaneados em paralelo (--max-hostgroup sobrepõe)
+    "max_hosts": 65536,   # Proteção contra alvos enormes por engano (ex: /8)
+    "error": None,        # Mensagem para simular uma falha do Nmap (stderr + código 1)
+}
+# Opções do Nmap que consomem o argumento seguinte (não são alvos)
+OPTIONS_WITH_VALUE = {
+    "-p", "-oX", "-oN", "-oG", "-oA", "-iL", "-e", "-S", "-g", "-D", "--exclude", "--excludefile",
+    "--script", "--script-args", "--max-retries", "--host-timeout", "--min-rate", "--max-rate",
+    "--min-hostgroup", "--max-hostgroup", "--min-parallelism", "--max-parallelism", "--scan-delay",
+    "--max-scan-delay", "--source-port", "--data-length", "--ttl", "--dns-servers", "--top-ports",
+    "--version-intensity",
+}
+
+_WRAPPER = """#!{python}
+import os
+import sys
+sys.path.insert(0, {root!r})
+from benchmarks.fake_nmap import main
+sys.exit(main(sys.argv[1:], os.path.join(os.path.dirname(os.path.abspath(__file__)), {profile!r})))
+"""
+
+
+def parse_ports(spec: str) -> set[int] | None:
+    """Interpreta a lista de portas do '-p' ('22,80,1-1000', 'T:80', '-'); None = todas."""
+    if spec in (None, "-"):
+        return None
+    ports = set()
+    for part in spec.split(","):
+        part = part.split(":", 1)[-1].strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            ports.update(range(int(start or 1), int(end or 65535) + 1))
+        else:
+            ports.add(int(part))
+    return ports
+
+
+def expand_targets(tokens: list[str], exclude: list[str] = (), max_hosts: int = DEFAULT_PROFILE["max_hosts"]) -> list[str]:
+    """
+    Expande alvos IPv4 (endereço, CIDR ou intervalo no último octeto, '10.0.0.1-20'), sem
+    repetições e na ordem da linha de comando. Hostnames são ignorados: o emulador não resolve
+    nomes (o NmapGuardian os repassa ao Nmap sem trocar por endereços).
+    """
+    excluded = [ipaddress.ip_network(item, strict=False) for item in exclude]
+    addresses = {}
+    for token in tokens:
+        try:
+            if "/" in token:
+                network = ipaddress.IPv4Network(token, strict=False)
+                candidates = network.hosts() if network.prefixlen < 31 else iter(network)
+            elif token.count(".") == 3 and "-" in token.rsplit(".", 1)[1]:
+                prefix, last = token.rsplit(".", 1)
+                start, end = last.split("-", 1)
+                candidates = (ipaddress.IPv4Address(f"{prefix}.{octet}") for octet in range(int(start), int(end) + 1))
+            else:
+                candidates = [ipaddress.IPv4Address(token)]
+        except ValueError:
+            continue
+        for address in candidates:
+            if any(address in network for network in excluded):
+                continue
+            addresses[str(address)] = None
+            if len(addresses) > max_hosts:
+                raise ValueError(f"Alvos demais para o emulador ({len(addresses)} > max_hosts={max_hosts}).")
+    return list(addresses)
+
+
+def parse_command_line(argv: list[str]) -> dict:
+    """Separa alvos, portas e opções relevantes da linha de comando do Nmap."""
+    parsed = {"targets": [], "ports": None, "exclude": [], "scripts": False, "hostgroup": None}
+    index = 0
+    while index < len(argv):
+        token = argv[index]
+        value = argv[index + 1] if index + 1 < len(argv) else None
+        if token in OPTIONS_WITH_VALUE:
+            if token == "-p":
+                parsed["ports"] = value
+            elif token == "--exclude":
+                parsed["exclude"] += [item for item in value.split(",") if item]
+            elif token == "--max-hostgroup":
+                parsed["hostgroup"] = int(value)
+            elif token == "--script":
+                parsed["scripts"] = True
+            index += 2
+            continue
+        if token.startswith("--script") or token in ("-A", "-sC"):
+            parsed["scripts"] = True
+        elif token.startswith("-p") and len(token) > 2:
+            parsed["ports"] = token[2:]
+        elif not token.startswith("-"):
+            parsed["targets"].append(token)
+        index += 1
+    return parsed
+
+
+def run_scan(argv: list[str], profile: dict, out=None, sleep=time.sleep) -> int:
+    """Executa o 'scan' descrito por argv, escrevendo o XML em out (stdout por padrão)."""
+    from benchmarks.fixtures import _host_xml, nmap_xml_document # Só aqui: 'nmap -V' precisa ser rápido
+
+    out = out or sys.stdout
+    profile = {**DEFAULT_PROFILE, **(profile or {})}
+    if profile["error"]:
+        sys.stderr.write(f"{profile['error']}\n")
+        return 1
+    command = parse_command_line(argv)
+    started = time.time()
+    if profile["startup_latency"]:
+        sleep(profile["startup_latency"])
+    addresses = expand_targets(command["targets"], command["exclude"], profile["max_hosts"])
+    allowed_ports = parse_ports(command["ports"])
+    scripts = command["scripts"] if profile["scripts"] is None else profile["scripts"]
+    hostgroup = max(1, command["hostgroup"] or profile["hostgroup"])
+
+    hosts, up = [], 0
+    for group_start in range(0, len(addresses), hostgroup):
+        if profile["host_latency"]:
+            sleep(profile["host_latency"])
+        for address in addresses[group_start:group_start + hostgroup]:
+            rng = random.Random(f"{profile['seed']}:{address}")
+            host = _host_xml(rng, address, int(ipaddress.IPv4Address(address)) & 0xFFFFFF, profile["down_ratio"],
+                             profile["max_ports"], scripts, allowed_ports)
+            up += host.startswith('<host><status state="up"')
+            hosts.append(host)
+    out.write(nmap_xml_document(hosts, args=" ".join(["nmap"] + argv), start=int(started),
+                                elapsed=time.time() - started, up=up))
+    out.flush()
+    return 0
+
+
+def load_profile(path: str = None) -> dict:
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def main(argv=None, profile_path: str = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if "-V" in argv or "--version" in argv:
+        print(VERSION_BANNER)
+        print("Platform: x86_64-pc-linux-gnu (emulador do Shamann)")
+        return 0
+    try:
+        return run_scan(argv, load_profile(profile_path))
+    except ValueError as e:
+        sys.stderr.write(f"{e}\n")
+        return 1
+
+
+def install_fake_nmap(directory: str, profile: dict = None) -> str:
+    """Instala o executável 'nmap' (e o perfil) em directory e retorna o caminho do executável."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "nmap")
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(_WRAPPER.format(python=sys.executable, root=root, profile=PROFILE_FILENAME))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    with open(os.path.join(directory, PROFILE_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(profile or {}, f)
+    return path
+
+
+@contextlib.contextmanager
+def fake_nmap(profile: dict = None):
+    """Coloca o emulador no início do PATH enquanto o bloco executa; produz o caminho do executável."""
+    with tempfile.TemporaryDirectory(prefix="shamann_fake_nmap_") as directory:
+        path = install_fake_nmap(directory, profile)
+        previous = os.environ.get("PATH", "")
+        os.environ["PATH"] = directory + os.pathsep + previous
+        try:
+            yield path
+        finally:
+            os.environ["PATH"] = previous
+
+
+if __name__ == "__main__":
+    sys.exit(main())
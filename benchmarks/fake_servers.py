@@ -0,0 +1,191 @@
+# benchmarks/fake_servers.py
+"""
+Servidores HTTP e DNS substitutos, locais e determinísticos, para exercitar os guardiões
+de ponta a ponta sem rede externa (testes de carga e testes automatizados).
+
+    with FakeHTTPServer(paths={"admin", "login"}, latency=0.005) as http:
+        DirFuzzGuardian.scan(http.url, "-w palavras.txt -t 20")
+
+    with FakeDNSServer(domain="lab.test") as dns:
+        DNSGuardian.run_bulk(["host1.lab.test"], nameservers=["127.0.0.1"], port=dns.port, use_cache=False)
+
+Ambos rodam em uma thread própria, escutam em 127.0.0.1 (porta 0 = escolhida pelo sistema)
+e contam as requisições recebidas.
+"""
+
+import asyncio
+import ipaddress
+import re
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from shamann.modules.recon.dns import QTYPE_NAMES, _decode_name, build_response
+
+
+class FakeHTTPServer:
+    """
+    Servidor HTTP/1.1 (keep-alive) que responde 200 para os caminhos conhecidos e 404 para o resto.
+
+    :param paths: Caminhos existentes, sem a barra inicial (ex: {"admin", "backup/db.sql"}).
+    :param latency: Atraso (s) antes de cada resposta, simulando a rede e o servidor.
+    """
+
+    def __init__(self, paths=(), latency: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        self.paths = {path.strip("/") for path in paths}
+        self.latency = latency
+        self.requests = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def url(self) -> str:
+        return f"http://{self._server.server_address[0]}:{self.port}"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                found = self.path.split("?", 1)[0].strip("/") in server.paths
+                with server._lock:
+                    server.requests += 1
+                    server.hits += found
+                body = b"<html><body>ok</body></html>" if found else b"not found"
+                self.send_response(200 if found else 404)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_HEAD = do_GET
+
+            def log_message(self, format, *args):
+                pass # Milhares de requisições por teste: sem log de acesso
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-http", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class _DNSProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server: "FakeDNSServer"):
+        self.server = server
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.server.queries += 1
+        response = self.server.answer(data)
+        if response is None:
+            return
+        if self.server.latency:
+            asyncio.get_running_loop().call_later(self.server.latency, self.transport.sendto, response, addr)
+        else:
+            self.transport.sendto(response, addr)
+
+
+class FakeDNSServer:
+    """
+    Servidor DNS (UDP) com uma zona sintética: 'host<N>.<domain>' tem o registro A 10.x.y.z
+    correspondente a N (host1 -> 10.0.0.1); os demais nomes do domínio dão NXDOMAIN.
+    `records` acrescenta registros fixos: {(nome, tipo): [registros no formato de parse_response]}.
+
+    :param latency: Atraso (s) de cada resposta.
+    :param drop_ratio: Fração determinística de consultas descartadas (exercita as retentativas).
+    """
+
+    def __init__(self, domain: str = "lab.test", records: dict = None, latency: float = 0.0,
+                 drop_ratio: float = 0.0, ttl: int = 300, host: str = "127.0.0.1", port: int = 0):
+        self.domain = domain.strip(".").lower()
+        self.records = {(name.lower(), qtype.upper()): answers for (name, qtype), answers in (records or {}).items()}
+        self.latency = latency
+        self.drop_ratio = drop_ratio
+        self.ttl = ttl
+        self.queries = 0
+        self._address = (host, port)
+        self._pattern = re.compile(rf"host(\d+)\.{re.escape(self.domain)}")
+        self._loop = None
+        self._transport = None
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._transport.get_extra_info("sockname")[1]
+
+    def answer(self, query: bytes) -> bytes | None:
+        """Resposta para a consulta (None = descartada)."""
+        if self.drop_ratio and (self.queries * 7919) % 1000 < self.drop_ratio * 1000:
+            return None
+        name, offset = _decode_name(query, 12)
+        name = name.lower()
+        qtype = QTYPE_NAMES.get(struct.unpack_from("!H", query, offset)[0], "A")
+        if (name, qtype) in self.records:
+            return build_response(query, self.records[(name, qtype)])
+        match = self._pattern.fullmatch(name)
+        if match and int(match.group(1)) < 2 ** 24:
+            if qtype != "A":
+                return build_response(query) # Nome existe, mas sem registros do tipo pedido
+            address = str(ipaddress.IPv4Address((10 << 24) + int(match.group(1))))
+            return build_response(query, [{"name": name, "type": "A", "ttl": self.ttl, "data": address}])
+        return build_response(query, rcode="NXDOMAIN")
+
+    def start(self):
+        ready = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._transport, _ = self._loop.run_until_complete(
+                self._loop.create_datagram_endpoint(lambda: _DNSProtocol(self), local_addr=self._address))
+            ready.set()
+            self._loop.run_forever()
+            self._transport.close()
+            self._loop.run_until_complete(asyncio.sleep(0))
+            self._loop.close()
+
+        self._thread = threading.Thread(target=serve, name="fake-dns", daemon=True)
+        self._thread.start()
+        ready.wait(timeout=5)
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
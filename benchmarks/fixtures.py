@@ -0,0 +1,180 @@
+# benchmarks/fixtures.py
+"""
+Fixtures sintéticas e reprodutíveis para os benchmarks: XML no formato do Nmap, o resultado
+analisado (formato de NmapGuardian._parse_nmap_results) e conjuntos de regras de alerta.
+Mesma semente -> mesmos dados.
+
+Para gravar as fixtures em disco (ex: para inspecionar ou reutilizar em outra ferramenta):
+    python -m benchmarks.fixtures --sizes 100,10000 --output-dir benchmarks/data
+"""
+
+import argparse
+import ipaddress
+import json
+import os
+import random
+from xml.sax.saxutils import quoteattr
+
+import nmap
+
+from shamann.modules.nmap_guardian import NmapGuardian
+
+DEFAULT_SEED = 1337
+
+# (porta, serviço, produto, versão, extrainfo, cpe) — mistura de casos comuns e dos que as regras procuram
+SERVICES = [
+    (22, "ssh", "OpenSSH", "8.9p1", "Ubuntu Linux; protocol 2.0", "cpe:/a:openbsd:openssh:8.9p1"),
+    (22, "ssh", "OpenSSH", "7.4", "protocol 2.0", "cpe:/a:openbsd:openssh:7.4"),
+    (23, "telnet", "BusyBox telnetd", "", "", "cpe:/a:busybox:busybox"),
+    (21, "ftp", "vsftpd", "3.0.3", "Anonymous FTP login allowed", "cpe:/a:vsftpd:vsftpd:3.0.3"),
+    (80, "http", "nginx", "1.18.0", "", "cpe:/a:igor_sysoev:nginx:1.18.0"),
+    (80, "http", "Hikvision IP Camera httpd", "", "webcam", "cpe:/h:hikvision:ipcam"),
+    (443, "https", "Apache httpd", "2.4.52", "", "cpe:/a:apache:http_server:2.4.52"),
+    (445, "microsoft-ds", "Samba smbd", "4.15.13", "workgroup: WORKGROUP", "cpe:/a:samba:samba"),
+    (1883, "mqtt", "Mosquitto", "2.0.11", "", "cpe:/a:eclipse:mosquitto:2.0.11"),
+    (3306, "mysql", "MySQL", "5.7.40", "", "cpe:/a:mysql:mysql:5.7.40"),
+    (3389, "ms-wbt-server", "Microsoft Terminal Services", "", "", "cpe:/o:microsoft:windows"),
+    (5432, "postgresql", "PostgreSQL DB", "14.5", "", "cpe:/a:postgresql:postgresql:14.5"),
+    (8080, "http-proxy", "", "", "", ""),
+    (9999, "unknown", "", "", "", ""),
+]
+OS_MATCHES = [("Linux 5.0 - 5.14", "95"), ("Microsoft Windows 10 1909", "92"), ("OpenWrt 21.02", "88"), (None, None)]
+VENDORS = ["Raspberry Pi Foundation", "Intel Corporate", "TP-LINK TECHNOLOGIES", "Espressif"]
+
+
+# Saída de scripts NSE (--script=default) por serviço, no formato do elemento <script> do Nmap
+NSE_OUTPUT = {
+    "ssh": ("ssh-hostkey", "\n  3072 aa:bb:cc:dd:ee:ff:00:11:22:33:44:55:66:77:88:99 (RSA)\n  256 11:22:33:44:55:66:77:88:99:aa:bb:cc:dd:ee:ff:00 (ED25519)"),
+    "ftp": ("ftp-anon", "Anonymous FTP login allowed (FTP code 230)"),
+    "http": ("http-title", "Index of /"),
+    "https": ("ssl-cert", "Subject: commonName=lab.local\nNot valid after:  2030-01-01T00:00:00"),
+    "microsoft-ds": ("smb-security-mode", "account_used: guest\n  message_signing: disabled (dangerous, but default)"),
+    "mysql": ("mysql-info", "\n  Protocol: 10\n  Version: 5.7.40"),
+}
+
+
+def _host_xml(rng: random.Random, address: str, index: int, down_ratio: float = 0.05, max_ports: int = 8,
+              scripts: bool = False, allowed_ports=None) -> str:
+    """
+    Um elemento <host>. down_ratio e max_ports controlam a densidade; scripts inclui saída NSE;
+    allowed_ports (conjunto) descarta portas fora do intervalo escaneado, como o Nmap faria.
+    """
+    if rng.random() < down_ratio:
+        return (f'<host><status state="down" reason="no-response" reason_ttl="0"/>'
+                f'<address addr="{address}" addrtype="ipv4"/></host>')
+    parts = [f'<host><status state="up" reason="syn-ack" reason_ttl="64"/><address addr="{address}" addrtype="ipv4"/>']
+    if rng.random() < 0.5:
+        mac = ":".join(f"{rng.randrange(256):02X}" for _ in range(6))
+        parts.append(f'<address addr="{mac}" addrtype="mac" vendor={quoteattr(rng.choice(VENDORS))}/>')
+    parts.append(f'<hostnames><hostname name="host{index}.lab.local" type="PTR"/></hostnames><ports>')
+    used = set()
+    for port, name, product, version, extrainfo, cpe in rng.sample(SERVICES, rng.randint(1, min(max_ports, len(SERVICES)))):
+        if port in used or (allowed_ports is not None and port not in allowed_ports):
+            continue
+        used.add(port)
+        cpe_xml = f"<cpe>{cpe}</cpe>" if cpe else ""
+        script_xml = ""
+        if scripts and name in NSE_OUTPUT:
+            script_id, output = NSE_OUTPUT[name]
+            script_xml = f"<script id={quoteattr(script_id)} output={quoteattr(output)}/>"
+        parts.append(f'<port protocol="tcp" portid="{port}"><state state="open" reason="syn-ack" reason_ttl="64"/>'
+                     f'<service name="{name}" product={quoteattr(product)} version={quoteattr(version)} '
+                     f'extrainfo={quoteattr(extrainfo)} method="probed" conf="10">{cpe_xml}</service>{script_xml}</port>')
+    parts.append("</ports>")
+    os_name, accuracy = rng.choice(OS_MATCHES)
+    if os_name:
+        parts.append(f'<os><osmatch name={quoteattr(os_name)} accuracy="{accuracy}" line="1">'
+                     f'<osclass type="general purpose" vendor="x" osfamily="x" osgen="x" accuracy="{accuracy}"/>'
+                     f'</osmatch></os>')
+    parts.append("</host>")
+    return "".join(parts)
+
+
+def nmap_xml_document(host_elements: list[str], args: str = "nmap -sV -O -oX - 10.0.0.0/8",
+                      start: int = 1700000000, elapsed: float = 100.0, up: int = None) -> str:
+    """Envolve elementos <host> no documento completo do 'nmap -oX' (nmaprun, scaninfo, runstats)."""
+    total = len(host_elements)
+    up = total if up is None else up
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<nmaprun scanner="nmap" args={quoteattr(args)} start="{start}" version="7.94" '
+            'xmloutputversion="1.05"><scaninfo type="syn" protocol="tcp" numservices="1000" services="1-1000"/>'
+            + "".join(host_elements) +
+            f'<runstats><finished time="{start + int(elapsed)}" timestr="Tue Nov 14 22:15:00 2023" elapsed="{elapsed:.2f}" '
+            f'exit="success"/><hosts up="{up}" down="{total - up}" total="{total}"/></runstats></nmaprun>')
+
+
+def generate_nmap_xml(hosts: int, seed: int = DEFAULT_SEED) -> str:
+    """XML no formato do 'nmap -oX' com `hosts` hosts (5% down) a partir de 10.0.0.0."""
+    rng = random.Random(seed)
+    base = int(ipaddress.IPv4Address("10.0.0.0"))
+    body = [_host_xml(rng, str(ipaddress.IPv4Address(base + i + 1)), i) for i in range(hosts)]
+    return nmap_xml_document(body)
+
+
+class OfflinePortScanner(nmap.PortScanner):
+    """PortScanner alimentado por um XML já gerado: não procura nem executa o binário do Nmap."""
+
+    def __init__(self, xml: str = None):
+        self._nmap_path = ""
+        self._scan_result = {}
+        self._nmap_version_number = 0
+        self._nmap_subversion_number = 0
+        self._nmap_last_output = ""
+        self._PortScanner__process = None
+        if xml is not None:
+            self.load(xml)
+
+    def load(self, xml: str):
+        self._nmap_last_output = xml
+        self.analyse_nmap_xml_scan(nmap_xml_output=xml)
+
+
+def parsed_results(xml: str) -> dict:
+    """Resultado analisado (formato de NmapGuardian._parse_nmap_results) para o XML dado."""
+    return NmapGuardian("10.0.0.0/8", scanner=OfflinePortScanner(xml))._parse_nmap_results()
+
+
+def synthetic_rules(count: int, seed: int = DEFAULT_SEED) -> list[dict]:
+    """`count` regras no formato de alert_rules, variando porta/serviço/produto (poucas CRITICAL, como na prática)."""
+    rng = random.Random(seed)
+    templates = [
+        ("port_id == {port} and state == 'open'", "MEDIUM"),
+        ("service_name == '{name}' and state == 'open'", "LOW"),
+        ("'{word}' in product_lower or '{word}' in cpe_lower", "HIGH"),
+        ("port_id in ({port}, {port2}) and '{word}' in extrainfo_lower", "MEDIUM"),
+        ("os_lower.startswith('{os}') and port_id == {port}", "INFO"),
+    ]
+    rules = []
+    for i in range(count):
+        port, name, product, _version, _extra, _cpe = rng.choice(SERVICES)
+        template, level = templates[i % len(templates)]
+        condition = template.format(port=port, port2=rng.choice(SERVICES)[0], name=name,
+                                    word=(product.split() or ["x"])[0].lower(), os=rng.choice(["linux", "microsoft", "openwrt"]))
+        rules.append({"level": "CRITICAL" if i % 25 == 0 else level, "type": f"Regra sintética {i}",
+                      "condition": condition, "description": f"Regra sintética {i}.", "recommendation": "N/A"})
+    return rules
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera as fixtures sintéticas dos benchmarks.")
+    parser.add_argument("--sizes", default="100,10000", help="Quantidades de hosts, separadas por vírgula.")
+    parser.add_argument("--rules", default="10,100", help="Quantidades de regras, separadas por vírgula.")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output-dir", default="benchmarks/data")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for size in (int(value) for value in args.sizes.split(",")):
+        xml = generate_nmap_xml(size, args.seed)
+        with open(os.path.join(args.output_dir, f"nmap_{size}.xml"), "w", encoding="utf-8") as f:
+            f.write(xml)
+        with open(os.path.join(args.output_dir, f"parsed_{size}.json"), "w", encoding="utf-8") as f:
+            json.dump(parsed_results(xml), f)
+    for count in (int(value) for value in args.rules.split(",")):
+        with open(os.path.join(args.output_dir, f"rules_{count}.json"), "w", encoding="utf-8") as f:
+            json.dump(synthetic_rules(count, args.seed), f, indent=2, ensure_ascii=False)
+    print(f"Fixtures gravadas em {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+# benchmarks/load.py
+"""
+Testes de carga de ponta a ponta com o emulador do Nmap (benchmarks.fake_nmap) e os
+servidores HTTP/DNS substitutos (benchmarks.fake_servers): sem rede externa e sem root.
+
+Cenários, por tamanho:
+    nmap_guardian   NmapGuardian.scan sobre uma rede emulada (processo 'nmap' + XML + análise)
+    orchestrator    run_shamann_orchestrator completo (scan, classificação com as regras padrão, relatórios)
+    dirfuzz         DirFuzzGuardian contra o servidor HTTP local (uma requisição por palavra)
+    dns             DNSGuardian.run_bulk contra o servidor DNS local (sem cache)
+    honeypot        inundação de conexões (SSH/HTTP/Telnet/SMB) contra o honeypot local, com gravação em lote
+    ids             detector de intrusões sobre um auth.log sintético (assinaturas padrão + sintéticas), uma passada
+    targets         expansão de 10.0.0.0/8 menos N redes /24 e uma fatia da ordem aleatória (core.targets)
+
+    python -m benchmarks.load                                   # preset "default"
+    python -m benchmarks.load --preset quick --host-latency 0.02 --hostgroup 256
+    python -m benchmarks.load --output carga.json --baseline benchmarks/load_baseline.json
+    python -m benchmarks.load --scenarios honeypot --connections 20000 --flood-concurrency 2000
+    python -m benchmarks.load --scenarios ids --log-lines 2000000
+    python -m benchmarks.load --scenarios targets --target-exclusions 100,10000 --target-shards 16
+
+Cada caso registra o tempo (mínimo/mediana/média de `repeat` execuções), a vazão (itens/s) e o
+pico de memória Python (tracemalloc, numa execução extra, fora da medição de tempo). O JSON
+segue o formato de benchmarks.run, então benchmarks.compare funciona com os dois.
+"""
+
+import argparse
+import asyncio
+import gc
+import ipaddress
+import json
+import logging
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.compare import compare_results, print_comparison
+from benchmarks.fake_nmap import fake_nmap
+from benchmarks.fake_servers import FakeDNSServer, FakeHTTPServer
+from benchmarks.run import _metadata
+from shamann.core import metrics
+from shamann.core.targets import TargetSet
+from shamann.main import load_config, run_shamann_orchestrator
+from shamann.modules.dirfuzz_guardian import DirFuzzGuardian
+from shamann.modules.dns_guardian import DNSGuardian
+from shamann.modules.honeypot import HoneypotService
+from shamann.modules.intrusion_detection import DEFAULT_SIGNATURES, IntrusionDetector, SignatureSet
+from shamann.modules.nmap_guardian import NmapGuardian
+
+SCHEMA_VERSION = 1
+SCENARIOS = ("nmap_guardian", "orchestrator", "dirfuzz", "dns", "honeypot", "ids", "targets")
+PRESETS = {
+    "quick": {"hosts": [256], "words": [500], "names": [1000], "connections": [2000], "log_lines": [100000],
+              "target_exclusions": [1000]},
+    "default": {"hosts": [1024, 4096], "words": [2000], "names": [10000], "connections": [10000],
+                "log_lines": [500000], "target_exclusions": [1000, 30000]},
+    "full": {"hosts": [4096, 65536], "words": [2000, 20000], "names": [10000, 100000], "connections": [10000, 50000],
+             "log_lines": [500000, 5000000], "target_exclusions": [1000, 30000]},
+}
+# Assinaturas sintéticas somadas às padrão no cenário 'ids': metade indexada por palavra, metade por trecho
+SYNTHETIC_SIGNATURES = [{"id": f"sintetica_{i}", "program": "sshd",
+                         "pattern": rf"^Probe{i} from (?P<ip>\S+)" if i % 2 else rf"token{i}=(?P<value>\S+)"}
+                        for i in range(2000)]
+FLOOD_PAYLOADS = {
+    "ssh": b"SSH-2.0-Flood_1.0\r\n\x00\x00\x00\x2c\x06\x14" + bytes(16), # Banner e o início do KEXINIT
+    "http": b"GET /wp-login.php HTTP/1.1\r\nHost: alvo\r\nUser-Agent: flood\r\n\r\n",
+    "telnet": b"root\r\nadmin\r\n",
+    "smb": b"\x00\x00\x00\x08\xfeSMB\x40\x00\x00\x00",
+}
+HIT_EVERY = 50 # No dirfuzz, 1 palavra a cada HIT_EVERY existe no servidor
+DEFAULT_CONFIG = os.path.join(os.path.dirname(__file__), "..", "shamann", "config", "scan_config.json")
+
+
+def _network_for(hosts: int) -> str:
+    """Menor rede 10.x que contém `hosts` endereços utilizáveis."""
+    prefix = 32 - max(2, (hosts + 1).bit_length())
+    return str(ipaddress.IPv4Network((f"10.{hosts % 200}.0.0", prefix), strict=False))
+
+
+def _measure(func, repeat: int, items: int, memory: bool = True) -> dict:
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    best = min(timings)
+    return {"repeat": repeat, "min": best, "median": statistics.median(timings), "mean": statistics.fmean(timings),
+            "items": items, "per_item_us": round(best / items * 1e6, 3) if items else None,
+            "throughput_per_s": round(items / best, 1) if best else None, "peak_memory_bytes": peak}
+
+
+def _case(results: dict, name: str, params: dict, measured: dict):
+    key = "/".join([name] + [f"{k}={v}" for k, v in params.items()])
+    results[key] = {"name": name, "params": params, **measured}
+    memory = f"{measured['peak_memory_bytes'] / 2 ** 20:8.1f} MiB" if measured["peak_memory_bytes"] is not None else ""
+    print(f"  {key:<40} min {measured['min'] * 1000:10.2f} ms  {measured['throughput_per_s'] or 0:12.1f}/s  {memory}",
+          flush=True)
+
+
+def _check(result: dict, scenario: str):
+    """Um cenário que falhou mediria só o caminho de erro: melhor abortar."""
+    if not result or result.get("status") == "error":
+        raise RuntimeError(f"Cenário '{scenario}' falhou: {(result or {}).get('error_message', result)}")
+
+
+def run_load_suite(scenarios=SCENARIOS, hosts=(256,), words=(500,), names=(1000,), repeat: int = 3,
+                   host_latency: float = 0.0, hostgroup: int = 64, http_latency: float = 0.0,
+                   dns_latency: float = 0.0, threads: int = 20, memory: bool = True, workdir: str = None,
+                   connections=(2000,), flood_concurrency: int = 500, log_lines=(100000,),
+                   target_exclusions=(1000,), target_shards: int = 64) -> dict:
+    """Executa os cenários pedidos e retorna {chave do caso: medições}."""
+    results = {}
+    workdir = workdir or tempfile.mkdtemp(prefix="shamann_load_")
+    profile = {"host_latency": host_latency, "hostgroup": hostgroup}
+    try:
+        if {"nmap_guardian", "orchestrator"} & set(scenarios):
+            with fake_nmap(profile):
+                for size in hosts:
+                    print(f"[{size} hosts emulados]", flush=True)
+                    network = _network_for(size)
+                    if "nmap_guardian" in scenarios:
+                        def scan():
+                            result = NmapGuardian.scan(network, "-sV -p 1-1000")
+                            _check(result, "nmap_guardian")
+                        _case(results, "nmap_guardian", {"hosts": size}, _measure(scan, repeat, size, memory))
+                    if "orchestrator" in scenarios:
+                        config = {**load_config(DEFAULT_CONFIG), "output_settings": {
+                            "output_directory": os.path.join(workdir, "reports"), "report_format": ["json", "csv"]}}
+                        config["scan_profile"] = dict(config["scan_profile"], target=network, ports="1-1000")
+                        config.pop("tracing", None)
+                        config.pop("metrics", None)
+
+                        def pipeline():
+                            if run_shamann_orchestrator(config=config) is None:
+                                raise RuntimeError("Cenário 'orchestrator' não produziu resultados.")
+                        _case(results, "orchestrator", {"hosts": size}, _measure(pipeline, repeat, size, memory))
+
+        if "dirfuzz" in scenarios:
+            for count in words:
+                print(f"[{count} palavras]", flush=True)
+                wordlist = [f"caminho{i}" for i in range(count)]
+                wordlist_path = os.path.join(workdir, f"wordlist_{count}.txt")
+                with open(wordlist_path, "w", encoding="utf-8") as f:
+                    f.write("\n".join(wordlist))
+                with FakeHTTPServer(paths=wordlist[::HIT_EVERY], latency=http_latency) as http:
+                    def fuzz():
+                        result = DirFuzzGuardian.scan(http.url, f"-w {wordlist_path} -t {threads}")
+                        _check(result, "dirfuzz")
+                    _case(results, "dirfuzz", {"words": count, "threads": threads},
+                          _measure(fuzz, repeat, count, memory))
+
+        if "dns" in scenarios:
+            for count in names:
+                print(f"[{count} nomes]", flush=True)
+                with FakeDNSServer(latency=dns_latency) as dns:
+                    batch = [f"host{i + 1}.lab.test" for i in range(count)]
+
+                    def resolve():
+                        results_dns = DNSGuardian.run_bulk(batch, "A", nameservers=["127.0.0.1"], port=dns.port,
+                                                           use_cache=False, timeout=1.0)
+                        failed = sum(result["status"] != "success" for result in results_dns)
+                        if failed:
+                            raise RuntimeError(f"Cenário 'dns': {failed} consultas falharam.")
+                    _case(results, "dns", {"names": count}, _measure(resolve, repeat, count, memory))
+
+        if "ids" in scenarios:
+            signatures = SignatureSet(DEFAULT_SIGNATURES + SYNTHETIC_SIGNATURES)
+            for count in log_lines:
+                print(f"[{count} linhas de log, {len(signatures)} assinaturas]", flush=True)
+                path = _synthetic_auth_log(os.path.join(workdir, f"auth_{count}.log"), count)
+                settings = {"sources": [path], "state_path": None, "from_start": True,
+                            "db_path": os.path.join(workdir, "ids.db")}
+
+                def detect():
+                    detector = IntrusionDetector(settings, signatures=signatures)
+                    detector.poll()
+                    detector.stop()
+                    if detector.counters["lines"] != count:
+                        raise RuntimeError(f"Cenário 'ids': {detector.counters['lines']}/{count} linhas lidas.")
+                _case(results, "ids", {"lines": count, "signatures": len(signatures)},
+                      _measure(detect, repeat, count, memory))
+
+        if "targets" in scenarios:
+            for count in target_exclusions:
+                print(f"[10.0.0.0/8 menos {count} redes /24, 1/{target_shards} da ordem aleatória]", flush=True)
+                exclude = _synthetic_exclusions(count)
+                expected = (2 ** 24 - len(set(exclude)) * 256) // target_shards
+
+                def expand():
+                    targets = TargetSet.parse("10.0.0.0/8", exclude=exclude)
+                    produced = sum(1 for _ in targets.addresses("random", seed=1, shard=(0, target_shards)))
+                    if produced != expected:
+                        raise RuntimeError(f"Cenário 'targets': {produced}/{expected} endereços gerados.")
+                _case(results, "targets", {"exclusions": count, "shards": target_shards},
+                      _measure(expand, repeat, expected, memory))
+
+        if "honeypot" in scenarios:
+            settings = {"ports": [[0, protocol] for protocol in FLOOD_PAYLOADS], "host": "127.0.0.1",
+                        "db_path": os.path.join(workdir, "honeypot.db"), "max_connections": flood_concurrency * 2}
+            with HoneypotService(settings) as honeypot:
+                for count in connections:
+                    print(f"[{count} conexões, {flood_concurrency} simultâneas]", flush=True)
+
+                    def flood_once():
+                        before = honeypot.counters["handled"]
+                        outcome = asyncio.run(flood(honeypot.bound, count, flood_concurrency))
+                        handled = honeypot.counters["handled"] - before
+                        if outcome["errors"] or handled < count:
+                            raise RuntimeError(f"Cenário 'honeypot': {outcome['errors']} erros no cliente, "
+                                               f"{handled}/{count} conexões atendidas.")
+                    _case(results, "honeypot", {"connections": count, "concurrency": flood_concurrency},
+                          _measure(flood_once, repeat, count, memory))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def _synthetic_auth_log(path: str, lines: int) -> str:
+    """auth.log/syslog misturados: 1 linha em 5 é falha de SSH (origens variadas), o resto é rotina."""
+    templates = (
+        "Oct 19 18:{m:02d}:{s:02d} kali sshd[{i}]: Failed password for invalid user admin from {ip} port {port} ssh2",
+        "Oct 19 18:{m:02d}:{s:02d} kali sshd[{i}]: Accepted publickey for deploy from {ip} port {port} ssh2: RSA SHA256:x",
+        "Oct 19 18:{m:02d}:{s:02d} kali CRON[{i}]: pam_unix(cron:session): session opened for user root(uid=0) by (uid=0)",
+        "Oct 19 18:{m:02d}:{s:02d} kali systemd[1]: Started session-{i}.scope - Session {i} of User deploy.",
+        "Oct 19 18:{m:02d}:{s:02d} kali kernel: [{i}.512] [UFW BLOCK] IN=eth0 OUT= SRC={ip} DST=10.0.0.1 PROTO=TCP DPT={port}",
+    )
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(lines):
+            f.write(templates[i % len(templates)].format(
+                m=i // 60000 % 60, s=i // 1000 % 60, i=i, ip=f"203.0.{i // 7 % 256}.{i % 250}", port=1024 + i % 60000))
+            f.write("\n")
+    return path
+
+
+def _synthetic_exclusions(count: int) -> list[str]:
+    """count redes /24 espalhadas por 10.0.0.0/8, como uma lista de exclusão real (não contígua)."""
+    step = max(1, 2 ** 16 // count)
+    return [f"10.{(block >> 8) & 255}.{block & 255}.0/24" for block in range(0, step * count, step)][:2 ** 16]
+
+
+async def flood(ports: dict, connections: int, concurrency: int, host: str = "127.0.0.1", timeout: float = 10.0) -> dict:
+    """
+    Abre `connections` conexões (no máximo `concurrency` ao mesmo tempo) alternando entre as portas
+    {porta: protocolo}; cada uma envia a carga do protocolo e lê até o servidor fechar.
+    Retorna {"completed": ..., "errors": ...}.
+    """
+    targets = list(ports.items())
+    semaphore = asyncio.Semaphore(concurrency)
+    outcome = {"completed": 0, "errors": 0}
+
+    async def one(index: int):
+        port, protocol = targets[index % len(targets)]
+        async with semaphore:
+            writer = None
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+                writer.write(FLOOD_PAYLOADS[protocol])
+                while await asyncio.wait_for(reader.read(65536), timeout):
+                    pass
+                outcome["completed"] += 1
+            except (OSError, TimeoutError):
+                outcome["errors"] += 1
+            finally:
+                if writer is not None:
+                    writer.close()
+
+    await asyncio.gather(*(one(index) for index in range(connections)))
+    return outcome
+
+
+def _int_list(text: str) -> list[int]:
+    return [int(value) for value in text.split(",") if value.strip()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Testes de carga do Shamann com Nmap, HTTP e DNS emulados.")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="default")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Subconjunto de: {','.join(SCENARIOS)}")
+    parser.add_argument("--hosts", type=_int_list, default=None, help="Hosts por rede emulada (sobrepõe o preset).")
+    parser.add_argument("--words", type=_int_list, default=None, help="Palavras do dirfuzz (sobrepõe o preset).")
+    parser.add_argument("--names", type=_int_list, default=None, help="Nomes consultados no DNS (sobrepõe o preset).")
+    parser.add_argument("--connections", type=_int_list, default=None,
+                        help="Conexões da inundação do honeypot (sobrepõe o preset).")
+    parser.add_argument("--flood-concurrency", type=int, default=500, help="Conexões simultâneas na inundação.")
+    parser.add_argument("--log-lines", type=_int_list, default=None,
+                        help="Linhas do auth.log sintético do cenário ids (sobrepõe o preset).")
+    parser.add_argument("--target-exclusions", type=_int_list, default=None,
+                        help="Redes /24 excluídas de 10.0.0.0/8 no cenário targets (sobrepõe o preset).")
+    parser.add_argument("--target-shards", type=int, default=64,
+                        help="No cenário targets, só a primeira de N fatias da ordem aleatória é percorrida.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--host-latency", type=float, default=0.0, help="Segundos por grupo de hosts no Nmap emulado.")
+    parser.add_argument("--hostgroup", type=int, default=64, help="Hosts escaneados em paralelo pelo Nmap emulado.")
+    parser.add_argument("--http-latency", type=float, default=0.0)
+    parser.add_argument("--dns-latency", type=float, default=0.0)
+    parser.add_argument("--threads", type=int, default=20, help="Threads do dirfuzz.")
+    parser.add_argument("--no-memory", action="store_true", help="Não mede o pico de memória (tracemalloc).")
+    parser.add_argument("--output", default="benchmarks/results/load.json")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--threshold", type=float, default=0.15)
+    args = parser.parse_args(argv)
+    scenarios = [item for item in args.scenarios.split(",") if item]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Cenários desconhecidos: {', '.join(sorted(unknown))}")
+    preset = PRESETS[args.preset]
+    args.hosts, args.words, args.names = (args.hosts or preset["hosts"], args.words or preset["words"],
+                                          args.names or preset["names"])
+    args.connections = args.connections or preset["connections"]
+    args.log_lines = args.log_lines or preset["log_lines"]
+    args.target_exclusions = args.target_exclusions or preset["target_exclusions"]
+
+    # Os guardiões registram INFO/WARNING a cada scan e um ERROR por regra que falha em cada porta;
+    # as falhas de regra continuam contadas em meta.rule_errors
+    logging.disable(logging.ERROR)
+    rule_errors = metrics.RULE_ERRORS.value()
+    results = run_load_suite(scenarios, args.hosts, args.words, args.names, args.repeat, args.host_latency,
+                             args.hostgroup, args.http_latency, args.dns_latency, args.threads, not args.no_memory,
+                             connections=args.connections, flood_concurrency=args.flood_concurrency,
+                             log_lines=args.log_lines, target_exclusions=args.target_exclusions,
+                             target_shards=args.target_shards)
+    args.seed, args.sizes, args.rules = None, args.hosts, [] # Campos esperados por benchmarks.run._metadata
+    meta = dict(_metadata(args), scenarios=scenarios, words=args.words, names=args.names,
+                connections=args.connections, flood_concurrency=args.flood_concurrency, log_lines=args.log_lines,
+                target_exclusions=args.target_exclusions, target_shards=args.target_shards,
+                host_latency=args.host_latency, hostgroup=args.hostgroup, http_latency=args.http_latency,
+                dns_latency=args.dns_latency, threads=args.threads,
+                max_rss_kib=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                rule_errors=metrics.RULE_ERRORS.value() - rule_errors)
+    report = {"schema": SCHEMA_VERSION, "meta": meta, "results": results}
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados gravados em {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        comparison = compare_results(report, baseline, args.threshold)
+        print_comparison(comparison, args.threshold)
+        return 1 if comparison["regressions"] else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
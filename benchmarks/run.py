@@ -0,0 +1,182 @@
+# benchmarks/run.py
+"""
+Suíte de benchmarks do Shamann sobre fixtures sintéticas (benchmarks.fixtures).
+
+Mede, para cada tamanho de rede: NmapGuardian._parse_nmap_results, classify_alerts_with_rules
+(com várias quantidades de regras), generate_reports (JSON + CSV), DBManager.insert_scan_results
+e as consultas de leitura do DBManager.
+
+    python -m benchmarks.run                               # preset "default": 100 e 10k hosts
+    python -m benchmarks.run --preset full                 # 100, 10k e 100k hosts
+    python -m benchmarks.run --output atual.json --baseline benchmarks/baseline.json --threshold 0.15
+    python -m benchmarks.compare atual.json benchmarks/baseline.json
+
+O resultado é um JSON (tempos mínimo/mediana/média de `repeat` repetições por caso). Com
+--baseline, os casos mais lentos que o baseline além do limiar são listados e o código de saída é 1.
+Use o mesmo host e a mesma semente para comparar execuções.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, UTC
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.compare import compare_results, print_comparison
+from benchmarks.fixtures import DEFAULT_SEED, OfflinePortScanner, generate_nmap_xml, synthetic_rules
+from shamann.main import generate_reports
+from shamann.modules.nmap_guardian import NmapGuardian
+from shamann.persistence.db_manager import DBManager, normalize_scan_result
+
+SCHEMA_VERSION = 1
+PRESETS = {
+    "quick": {"sizes": [100, 1000], "rules": [10, 50]},
+    "default": {"sizes": [100, 10000], "rules": [10, 100]},
+    "full": {"sizes": [100, 10000, 100000], "rules": [10, 100]},
+}
+DEFAULT_MAX_EVALUATIONS = 1_000_000 # Teto de avaliações de regra (portas x regras) por caso de classificação
+READ_SAMPLE_HOSTS = 100 # Hosts consultados em get_ports_by_host_id
+
+
+def _time(func, repeat: int, setup=None) -> list[float]:
+    """Executa func `repeat` vezes (setup() antes de cada uma, fora da medição) e retorna os tempos."""
+    timings = []
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        gc.collect()
+        started = time.perf_counter()
+        func(state) if setup is not None else func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def _case(results: dict, name: str, params: dict, timings: list[float], items: int):
+    key = "/".join([name] + [f"{k}={v}" for k, v in params.items()])
+    best = min(timings)
+    results[key] = {"name": name, "params": params, "repeat": len(timings), "min": best,
+                    "median": statistics.median(timings), "mean": statistics.fmean(timings), "items": items,
+                    "per_item_us": round(best / items * 1e6, 3) if items else None}
+    print(f"  {key:<50} min {best * 1000:10.2f} ms   mediana {statistics.median(timings) * 1000:10.2f} ms", flush=True)
+
+
+def _metadata(args) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {"timestamp_utc": datetime.now(UTC).isoformat(), "git_commit": commit, "python": platform.python_version(),
+            "implementation": platform.python_implementation(), "platform": platform.platform(),
+            "machine": platform.machine(), "cpu_count": os.cpu_count(), "sqlite": sqlite3.sqlite_version,
+            "seed": args.seed, "repeat": args.repeat, "sizes": args.sizes, "rules": args.rules}
+
+
+def run_suite(sizes: list[int], rule_counts: list[int], repeat: int = 5, seed: int = DEFAULT_SEED,
+              max_evaluations: int = DEFAULT_MAX_EVALUATIONS, workdir: str = None) -> dict:
+    """Executa todos os casos e retorna {chave do caso: medições}."""
+    results = {}
+    workdir = workdir or tempfile.mkdtemp(prefix="shamann_bench_")
+    try:
+        for size in sizes:
+            print(f"[{size} hosts]", flush=True)
+            xml = generate_nmap_xml(size, seed)
+            guardian = NmapGuardian("10.0.0.0/8", scanner=OfflinePortScanner(xml))
+
+            _case(results, "parse_nmap_results", {"hosts": size}, _time(guardian._parse_nmap_results, repeat), size)
+            parsed = guardian._parse_nmap_results()
+            ports = sum(len(host["ports"]) for host in parsed["hosts"])
+
+            classified = None
+            for rule_count in rule_counts:
+                if ports * rule_count > max_evaluations:
+                    print(f"  classify_alerts/hosts={size}/rules={rule_count}: ignorado "
+                          f"({ports * rule_count:,} avaliações > --max-evaluations)", flush=True)
+                    continue
+                rules = synthetic_rules(rule_count, seed)
+                timings = _time(lambda: guardian.classify_alerts_with_rules(parsed, rules), repeat)
+                _case(results, "classify_alerts", {"hosts": size, "rules": rule_count}, timings, ports * rule_count)
+                classified = parsed
+            if classified is None:
+                classified = guardian.classify_alerts_with_rules(parsed, [])
+
+            reports_dir = os.path.join(workdir, f"reports_{size}")
+            output_settings = {"output_directory": reports_dir, "report_format": ["json", "csv"]}
+            _case(results, "generate_reports", {"hosts": size},
+                  _time(lambda: generate_reports(classified, output_settings), repeat), size)
+            shutil.rmtree(reports_dir, ignore_errors=True)
+
+            normalized = normalize_scan_result("nmap", {"status": "success", "scan_results": classified})
+            counter = iter(range(1_000_000))
+
+            def fresh_db():
+                return DBManager(os.path.join(workdir, f"insert_{size}_{next(counter)}.db"))
+
+            _case(results, "db_insert_scan_results", {"hosts": size},
+                  _time(lambda db: db.insert_scan_results("nmap", "10.0.0.0/8", normalized), repeat, fresh_db), size)
+
+            db = fresh_db()
+            scan_id = db.insert_scan_results("nmap", "10.0.0.0/8", normalized)
+            hosts = db.get_hosts_by_scan_id(scan_id)
+            sample = [host["id"] for host in hosts[::max(1, len(hosts) // READ_SAMPLE_HOSTS)]][:READ_SAMPLE_HOSTS]
+            _case(results, "db_get_scan_by_id", {"hosts": size}, _time(lambda: db.get_scan_by_id(scan_id), repeat), 1)
+            _case(results, "db_get_hosts_by_scan_id", {"hosts": size},
+                  _time(lambda: db.get_hosts_by_scan_id(scan_id), repeat), len(hosts))
+            _case(results, "db_get_alerts_by_scan_id", {"hosts": size},
+                  _time(lambda: db.get_alerts_by_scan_id(scan_id), repeat), size)
+            _case(results, "db_get_ports_by_host_id", {"hosts": size, "sample": len(sample)},
+                  _time(lambda: [db.get_ports_by_host_id(host_id) for host_id in sample], repeat), len(sample))
+            _case(results, "db_list_scans", {"hosts": size}, _time(lambda: db.list_scans(limit=50), repeat), 1)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def _int_list(text: str) -> list[int]:
+    return [int(value) for value in text.split(",") if value.strip()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks do Shamann sobre fixtures sintéticas.")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="default")
+    parser.add_argument("--sizes", type=_int_list, default=None, help="Hosts por fixture (sobrepõe o preset). Ex: 100,10000")
+    parser.add_argument("--rules", type=_int_list, default=None, help="Quantidades de regras (sobrepõe o preset). Ex: 10,100")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--max-evaluations", type=int, default=DEFAULT_MAX_EVALUATIONS)
+    parser.add_argument("--output", default="benchmarks/results/latest.json")
+    parser.add_argument("--baseline", default=None, help="Resultado anterior para comparar (ver benchmarks.compare).")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Regressão = mais lento que o baseline além desta fração.")
+    args = parser.parse_args(argv)
+    args.sizes = args.sizes or PRESETS[args.preset]["sizes"]
+    args.rules = args.rules or PRESETS[args.preset]["rules"]
+
+    logging.disable(logging.INFO) # Os módulos medidos registram INFO a cada chamada
+    results = run_suite(args.sizes, args.rules, args.repeat, args.seed, args.max_evaluations)
+    report = {"schema": SCHEMA_VERSION, "meta": _metadata(args), "results": results}
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Resultados gravados em {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        comparison = compare_results(report, baseline, args.threshold)
+        print_comparison(comparison, args.threshold)
+        return 1 if comparison["regressions"] else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
 # core/__init__.py
-from .logger import setup_logging
+from .logging_config import setup_logging
 
 __all__ = ['setup_logging']
\ No newline at end of file
@@ -1,2 +1,9 @@
 # shamann/__init__.py
-from .modules.whois_guardian import WhoisGuardian
+# WhoisGuardian é importado sob demanda: importar o pacote não deve carregar o python-whois
+
+
+def __getattr__(name):
+    if name == "WhoisGuardian":
+        from .modules.whois_guardian import WhoisGuardian
+        return WhoisGuardian
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
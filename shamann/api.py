@@ -0,0 +1,474 @@
+# shamann/api.py
+"""
+API HTTP local do Shamann (asyncio puro, sem dependências externas).
+
+Roda dentro do daemon (ShamannDaemon) e compartilha com ele os jobs, o executor e o banco; o loop
+asyncio só atende conexões, então centenas de clientes (inclusive streams abertos) não bloqueiam
+os scans, e as consultas ao SQLite vão para threads.
+
+Rotas (JSON):
+  GET    /health
+  POST   /scans                    {guardian, target, options?, timeout?, profile?}  -> 202 {job}
+  GET    /scans                    jobs do daemon (em memória)
+  GET    /scans/{id}[?result=1]    estado do job
+  DELETE /scans/{id}               cancela
+  GET    /scans/{id}/events        stream dos hosts/progresso: NDJSON, ou SSE com
+                                   "Accept: text/event-stream" (ou ?format=sse)
+  GET    /history?limit=&offset=&guardian=&target=&status=   scans gravados no banco
+  GET    /history/{scan_id}        scan gravado com hosts, portas e alertas
+  GET    /metrics                  métricas no formato texto do Prometheus (core.metrics)
+  GET    /telemetry[?seconds=&samples=1]   telemetria do host (core.telemetry), se habilitada
+Fila dos workers (persistence.job_queue), para workers de outros hosts (worker.RemoteJobQueue):
+  POST   /queue                    {guardian, targets, options?, timeout?, priority?, exclude?} -> {batch}
+  GET    /queue[?batch=]           contagem por status
+  POST   /queue/claim              {worker_id, lease_seconds?, guardians?}  -> {job} (null com a fila vazia)
+  POST   /queue/{id}/heartbeat     {worker_id, lease_seconds?}              -> {ok}
+  POST   /queue/{id}/complete      {worker_id, result_status, scan_id?, error_message?}  -> {ok}
+  POST   /queue/{id}/fail          {worker_id, error_message, retry?}       -> {status}
+  POST   /queue/results            {guardian, target, result}  -> {scan_id} (grava no banco do daemon)
+Toda rota exige "Authorization: Bearer <token>" com o "api.token" da configuração: sem token a API
+não sobe. Como a API executa guardiões (inclusive manutenção do sistema), ela também recusa o que
+vem de navegadores: requisições com Origin, Host que não seja o endereço de escuta (DNS rebinding;
+nomes extras em "api.allowed_hosts") e corpos que não sejam Content-Type: application/json
+(formulários e text/plain entre origens não passam por preflight).
+"""
+
+import asyncio
+import hmac
+import ipaddress
+import json
+import logging
+import threading
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from shamann.core.metrics import REGISTRY
+from shamann.persistence.job_queue import DEFAULT_LEASE_SECONDS, JobQueueError
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1024 * 1024
+MAX_HEADERS = 100
+MAX_PAGE_SIZE = 500
+IDLE_TIMEOUT = 30.0 # Segundos esperando a próxima requisição de uma conexão keep-alive
+STREAM_KEEPALIVE = 15.0 # Comentário/linha vazia enviado em streams ociosos
+STREAM_QUEUE_SIZE = 10000 # Eventos pendentes por cliente; acima disso o cliente é considerado lento
+LOOPBACK_NAMES = frozenset({"localhost", "127.0.0.1", "::1"})
+WILDCARD_HOSTS = frozenset({"", "0.0.0.0", "::"})
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str = None):
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+
+
+def _encode(payload) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+
+
+def _response(status: int, payload=None, keep_alive: bool = True) -> bytes:
+    if isinstance(payload, str): # Texto puro (exposição de métricas)
+        body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+    else:
+        body, content_type = (_encode(payload) if payload is not None else b""), "application/json; charset=utf-8"
+    head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+class Request:
+    def __init__(self, method: str, target: str, headers: dict, body: bytes):
+        self.method = method
+        parts = urlsplit(target)
+        self.path = [segment for segment in parts.path.split("/") if segment]
+        self.query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> dict:
+        content_type = self.headers.get("content-type", "").partition(";")[0].strip().lower()
+        if content_type != "application/json":
+            raise HttpError(415, "O corpo deve ser enviado com Content-Type: application/json.")
+        try:
+            data = json.loads(self.body or b"{}")
+        except json.JSONDecodeError as e:
+            raise HttpError(400, f"JSON inválido: {e}")
+        if not isinstance(data, dict):
+            raise HttpError(400, "O corpo deve ser um objeto JSON.")
+        return data
+
+    def int_param(self, name: str, default: int, maximum: int = None) -> int:
+        try:
+            value = int(self.query.get(name, default))
+        except ValueError:
+            raise HttpError(400, f"Parâmetro '{name}' deve ser inteiro.")
+        if value < 0:
+            raise HttpError(400, f"Parâmetro '{name}' não pode ser negativo.")
+        return min(value, maximum) if maximum is not None else value
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Request | None:
+    line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+    if not line:
+        return None
+    try:
+        method, target, _version = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "Linha de requisição inválida.")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise HttpError(431)
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HttpError(400, "Content-Length inválido.")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413)
+    body = await reader.readexactly(length) if length else b""
+    return Request(method.upper(), target, headers, body)
+
+
+class ApiServer:
+    """
+    Servidor HTTP em uma thread própria com seu event loop.
+    :param daemon: ShamannDaemon cujos jobs, eventos e banco são expostos.
+    :param port: 0 escolhe uma porta livre (ver self.port após start()).
+    :param token: Exigido em "Authorization: Bearer <token>"; obrigatório (ValueError sem ele).
+    :param allowed_hosts: Nomes aceitos no cabeçalho Host além do endereço de escuta.
+    """
+
+    def __init__(self, daemon, host: str = "127.0.0.1", port: int = 8765, token: str = None,
+                 allowed_hosts=()):
+        if not token:
+            raise ValueError("A API HTTP exige api.token: sem ele, qualquer página aberta no navegador "
+                             "poderia enviar jobs ao daemon.")
+        self.daemon = daemon
+        self.host = host
+        self.port = port
+        self.token = token
+        self.allowed_hosts = {host.strip("[]").lower()} | {name.lower() for name in allowed_hosts or ()}
+        try:
+            if ipaddress.ip_address(self.host.strip("[]")).is_loopback:
+                self.allowed_hosts |= LOOPBACK_NAMES
+        except ValueError:
+            pass
+        self._loop = None
+        self._thread = None
+        self._stop = None
+        self._ready = threading.Event()
+        self._startup_error = None
+        self._writers = set()
+
+    # --- Ciclo de vida ---
+
+    def start(self):
+        """Inicia o servidor e espera ele estar escutando (levanta OSError se a porta não abrir)."""
+        self._thread = threading.Thread(target=self._run, name="shamann-api", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._startup_error is not None:
+            raise self._startup_error
+        logger.info(f"API HTTP do Shamann em http://{self.host}:{self.port}")
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._serve())
+        finally:
+            self._loop.close()
+
+    async def _serve(self):
+        self._stop = asyncio.Event()
+        try:
+            server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        except OSError as e:
+            self._startup_error = e
+            self._ready.set()
+            return
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with server:
+            await self._stop.wait()
+            server.close()
+            for writer in list(self._writers): # Streams abertos impediriam o wait_closed
+                writer.close()
+            await server.wait_closed()
+
+    def stop(self):
+        if self._loop is not None and self._stop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._stop.set)
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+
+    # --- Conexões ---
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._writers.add(writer)
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except HttpError as e:
+                    writer.write(_response(e.status, {"error": str(e)}, keep_alive=False))
+                    break
+                if request is None:
+                    break
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                try:
+                    self._authorize(request)
+                    if len(request.path) == 3 and request.path[0] == "scans" and request.path[2] == "events" \
+                            and request.method == "GET":
+                        await self._stream_events(request, writer)
+                        break # Streams terminam fechando a conexão
+                    status, payload = await self._dispatch(request)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    logger.error(f"Erro na API ao tratar {request.method} /{'/'.join(request.path)}: {e}", exc_info=True)
+                    status, payload, keep_alive = 500, {"error": "Erro interno."}, False
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    def _authorize(self, request: Request):
+        if "origin" in request.headers:
+            raise HttpError(403, "Requisições de navegador (com Origin) não são aceitas.")
+        self._check_host(request.headers.get("host"))
+        supplied = request.headers.get("authorization", "")
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {self.token}".encode()):
+            raise HttpError(401)
+
+    def _check_host(self, host: str | None):
+        """Host precisa ser o endereço de escuta (ou um nome permitido): barra DNS rebinding."""
+        if host is None: # HTTP/1.0 sem Host: navegadores sempre o enviam
+            return
+        name, port = host.lower(), None
+        if name.startswith("["): # [::1]:8765
+            name, _, rest = name[1:].partition("]")
+            port = rest[1:] or None
+        elif name.count(":") == 1:
+            name, port = name.split(":")
+        if port is not None and port != str(self.port):
+            raise HttpError(403, f"Host não aceito: {host}")
+        if name in self.allowed_hosts:
+            return
+        if self.host in WILDCARD_HOSTS: # Escutando em todas as interfaces: qualquer IP literal serve
+            try:
+                ipaddress.ip_address(name)
+                return
+            except ValueError:
+                pass
+        raise HttpError(403, f"Host não aceito: {host}")
+
+    # --- Rotas ---
+
+    async def _dispatch(self, request: Request) -> tuple[int, dict | str]:
+        method, path = request.method, request.path
+        if path == ["health"] and method == "GET":
+            return 200, {"ok": True, "jobs": len(self.daemon.jobs)}
+        if path == ["metrics"] and method == "GET":
+            return 200, REGISTRY.render()
+        if path == ["scans"]:
+            if method == "POST":
+                spec = request.json()
+                try:
+                    record = self.daemon.submit(spec, source="api")
+                except ValueError as e:
+                    raise HttpError(400, str(e))
+                return 202, {"job": self.daemon.public_job(record["id"])}
+            if method == "GET":
+                return 200, {"jobs": self.daemon.list_jobs()}
+        if len(path) == 2 and path[0] == "scans":
+            if method == "GET":
+                job = self.daemon.public_job(path[1], request.query.get("result") in ("1", "true"))
+                if job is None:
+                    raise HttpError(404, f"Job não encontrado: {path[1]}")
+                return 200, {"job": job}
+            if method == "DELETE":
+                if self.daemon.public_job(path[1]) is None:
+                    raise HttpError(404, f"Job não encontrado: {path[1]}")
+                return 200, {"cancelled": self.daemon.cancel(path[1])}
+        if path and path[0] == "history" and method == "GET":
+            return await self._history(request)
+        if path == ["telemetry"] and method == "GET":
+            telemetry = self.daemon.telemetry
+            if telemetry is None:
+                raise HttpError(503, "Telemetria desabilitada (telemetry.enabled).")
+            try:
+                seconds = float(request.query["seconds"]) if request.query.get("seconds") else None
+            except ValueError:
+                raise HttpError(400, "seconds deve ser um número.")
+            body = {**telemetry.info(), **telemetry.summary(seconds)}
+            if request.query.get("samples") in ("1", "true"):
+                body["samples"] = telemetry.history(seconds)
+            return 200, body
+        if path and path[0] == "queue":
+            try:
+                return await self._queue(request)
+            except JobQueueError as e: # Banco da fila em sistema de arquivos de rede
+                raise HttpError(503, str(e))
+        if path and path[0] in ("health", "metrics", "scans", "history", "telemetry"):
+            raise HttpError(405)
+        raise HttpError(404)
+
+    async def _history(self, request: Request) -> tuple[int, dict]:
+        db = self.daemon.db
+        if db is None:
+            raise HttpError(503, "O daemon foi iniciado sem banco (daemon.db_path).")
+        if len(request.path) == 1:
+            limit = request.int_param("limit", 50, MAX_PAGE_SIZE)
+            offset = request.int_param("offset", 0)
+            page = await asyncio.to_thread(db.list_scans, limit, offset, request.query.get("guardian"),
+                                           request.query.get("target"), request.query.get("status"))
+            next_offset = offset + len(page["items"])
+            page.update(limit=limit, offset=offset, next_offset=next_offset if next_offset < page["total"] else None)
+            return 200, page
+        if len(request.path) != 2 or not request.path[1].isdigit():
+            raise HttpError(404)
+        scan = await asyncio.to_thread(self._scan_details, db, int(request.path[1]))
+        if scan is None:
+            raise HttpError(404, f"Scan não encontrado: {request.path[1]}")
+        return 200, {"scan": scan}
+
+    async def _queue(self, request: Request) -> tuple[int, dict]:
+        """Rotas da fila: o SQLite fica só no host do daemon, os workers remotos falam HTTP."""
+        method, path = request.method, request.path
+        if path == ["queue"]:
+            if method == "GET":
+                queue = await asyncio.to_thread(self.daemon.job_queue)
+                return 200, {"stats": await asyncio.to_thread(queue.stats, request.query.get("batch"))}
+            if method == "POST":
+                spec = request.json()
+                try:
+                    return 200, {"batch": await asyncio.to_thread(self.daemon.enqueue, spec)}
+                except ValueError as e:
+                    raise HttpError(400, str(e))
+            raise HttpError(405)
+        if method != "POST":
+            raise HttpError(405)
+        body = request.json()
+        if path == ["queue", "results"]:
+            return await self._save_result(body)
+        worker_id = body.get("worker_id")
+        if not isinstance(worker_id, str) or not worker_id:
+            raise HttpError(400, "'worker_id' é obrigatório.")
+        lease_seconds = body.get("lease_seconds",
+                                 self.daemon.config.get("job_queue", {}).get("lease_seconds", DEFAULT_LEASE_SECONDS))
+        if not isinstance(lease_seconds, (int, float)) or lease_seconds <= 0:
+            raise HttpError(400, "'lease_seconds' deve ser um número positivo.")
+        queue = await asyncio.to_thread(self.daemon.job_queue)
+        if path == ["queue", "claim"]:
+            guardians = body.get("guardians")
+            if guardians is not None and not (isinstance(guardians, list) and all(isinstance(g, str) for g in guardians)):
+                raise HttpError(400, "'guardians' deve ser uma lista de nomes.")
+            return 200, {"job": await asyncio.to_thread(queue.claim, worker_id, lease_seconds, guardians)}
+        if len(path) != 3 or not path[1].isdigit():
+            raise HttpError(404)
+        job_id = int(path[1])
+        if path[2] == "heartbeat":
+            return 200, {"ok": await asyncio.to_thread(queue.heartbeat, job_id, worker_id, lease_seconds)}
+        if path[2] == "complete":
+            ok = await asyncio.to_thread(queue.complete, job_id, worker_id, str(body.get("result_status", "error")),
+                                         body.get("scan_id"), body.get("error_message"))
+            return 200, {"ok": ok}
+        if path[2] == "fail":
+            status = await asyncio.to_thread(queue.fail, job_id, worker_id, str(body.get("error_message", "")),
+                                             bool(body.get("retry", True)))
+            return 200, {"status": status}
+        raise HttpError(404)
+
+    async def _save_result(self, body: dict) -> tuple[int, dict]:
+        db = self.daemon.db
+        if db is None:
+            raise HttpError(503, "O daemon foi iniciado sem banco (daemon.db_path).")
+        if not body.get("guardian") or not body.get("target") or not isinstance(body.get("result"), dict):
+            raise HttpError(400, "'guardian', 'target' e 'result' são obrigatórios.")
+        scan_id = await asyncio.to_thread(db.save_guardian_result, body["guardian"], body["target"], body["result"])
+        return 200, {"scan_id": scan_id}
+
+    @staticmethod
+    def _scan_details(db, scan_id: int) -> dict | None:
+        scan = db.get_scan_by_id(scan_id)
+        if scan is None:
+            return None
+        scan["hosts"] = db.get_hosts_by_scan_id(scan_id)
+        for host in scan["hosts"]:
+            host["ports"] = db.get_ports_by_host_id(host["id"])
+        scan["alerts"] = db.get_alerts_by_scan_id(scan_id)
+        return scan
+
+    # --- Streaming ---
+
+    async def _stream_events(self, request: Request, writer: asyncio.StreamWriter):
+        job_id = request.path[1]
+        sse = request.query.get("format") == "sse" or "text/event-stream" in request.headers.get("accept", "")
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        lagged = []
+
+        def push(event):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                lagged.append(True)
+
+        def listener(event):
+            # Chamado na thread do job
+            try:
+                loop.call_soon_threadsafe(push, event)
+            except RuntimeError:
+                pass # Loop encerrado (API parando)
+
+        subscription = self.daemon.subscribe(job_id, listener)
+        if subscription is None:
+            writer.write(_response(404, {"error": f"Job não encontrado: {job_id}"}, keep_alive=False))
+            return
+        backlog, finished = subscription
+        content_type = "text/event-stream" if sse else "application/x-ndjson"
+        writer.write((f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}; charset=utf-8\r\n"
+                      f"Cache-Control: no-cache\r\nConnection: close\r\n\r\n").encode("latin-1"))
+
+        def frame(event) -> bytes:
+            data = _encode(event)
+            return b"event: " + event["event"].encode() + b"\ndata: " + data + b"\n\n" if sse else data + b"\n"
+
+        try:
+            for event in backlog:
+                writer.write(frame(event))
+            if finished:
+                writer.write(frame({"event": "finished", "job": self.daemon.public_job(job_id)}))
+                await writer.drain()
+                return
+            await writer.drain()
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    writer.write(b": ping\n\n" if sse else b"\n")
+                    await writer.drain()
+                    continue
+                writer.write(frame(event))
+                await writer.drain()
+                if event["event"] == "finished":
+                    return
+                if lagged:
+                    writer.write(frame({"event": "error", "error": "Cliente lento: eventos descartados."}))
+                    await writer.drain()
+                    return
+        finally:
+            self.daemon.unsubscribe(job_id, listener)
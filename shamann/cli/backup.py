@@ -0,0 +1,86 @@
+# shamann/cli/backup.py
+"""
+CLI dos backups incrementais (persistence.backup_store):
+  python -m shamann.cli.backup snapshot [-p /etc -p /home] [--exclude '*.log'] [--keep 14]
+  python -m shamann.cli.backup list
+  python -m shamann.cli.backup restore DESTINO [--snapshot ID] [-p /etc/hosts]
+  python -m shamann.cli.backup prune [--keep 14]
+Repositório, caminhos e demais padrões vêm da seção "backup" da configuração.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shamann: backups incrementais e deduplicados.")
+    parser.add_argument("-c", "--config", type=str, default="shamann/config/scan_config.json")
+    parser.add_argument("--repository", type=str, default=None, help="Sobrepõe backup.repository da configuração.")
+    parser.add_argument("--workers", type=int, default=None, help="Threads de leitura e de compressão. Padrão: CPUs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    snapshot = subparsers.add_parser("snapshot", help="Cria um snapshot (só o que mudou é lido).")
+    snapshot.add_argument("-p", "--path", action="append", default=None, help="Caminho a incluir (repetível).")
+    snapshot.add_argument("--exclude", action="append", default=None, help="Padrão fnmatch a excluir (repetível).")
+    snapshot.add_argument("--keep", type=int, default=None, help="Depois do snapshot, mantém só os N mais recentes.")
+
+    subparsers.add_parser("list", help="Lista os snapshots.")
+
+    restore = subparsers.add_parser("restore", help="Restaura arquivos de um snapshot.")
+    restore.add_argument("destination", help="Diretório de destino (os caminhos originais viram subdiretórios).")
+    restore.add_argument("--snapshot", default=None, help="Id do snapshot. Padrão: o mais recente")
+    restore.add_argument("-p", "--path", action="append", default=None,
+                         help="Arquivo, diretório ou padrão fnmatch a restaurar (repetível). Padrão: tudo")
+
+    prune = subparsers.add_parser("prune", help="Remove snapshots antigos e os chunks sem uso.")
+    prune.add_argument("--keep", type=int, default=None)
+
+    args = parser.parse_args(argv)
+
+    from shamann.core.logging_config import setup_logging
+    from shamann.persistence.backup_store import (BackupError, BackupRepository, DEFAULT_EXCLUDE, DEFAULT_KEEP,
+                                                  DEFAULT_PATHS)
+    settings = backup_settings(args.config)
+    setup_logging(settings.get("logging"))
+    settings = settings.get("backup", {})
+    if args.repository:
+        settings["repository"] = args.repository
+    if args.workers:
+        settings["workers"] = args.workers
+    keep = args.keep if getattr(args, "keep", None) is not None else settings.get("keep", DEFAULT_KEEP)
+    try:
+        repository = BackupRepository.from_settings(settings)
+        if args.command == "snapshot":
+            response = repository.snapshot(args.path or settings.get("paths") or DEFAULT_PATHS,
+                                           args.exclude or settings.get("exclude", DEFAULT_EXCLUDE))
+            response["pruned"] = repository.prune(keep)
+        elif args.command == "list":
+            response = [{"id": snapshot_id, **{key: value for key, value in repository.load_manifest(snapshot_id).items()
+                                               if key in ("created", "paths", "parent")}}
+                        for snapshot_id in repository.list_snapshots()]
+        elif args.command == "restore":
+            response = repository.restore(args.destination, args.snapshot, args.path)
+        else:
+            response = repository.prune(keep)
+    except (OSError, BackupError) as e:
+        print(e, file=sys.stderr)
+        return 2
+    print(json.dumps(response, indent=2, ensure_ascii=False))
+    return 1 if isinstance(response, dict) and response.get("errors") else 0
+
+
+def backup_settings(config_path: str) -> dict:
+    """Configuração crua (só as seções 'backup' e 'logging' são usadas), sem importar o orquestrador."""
+    try:
+        with open(config_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+# shamann/cli/daemon.py
+"""
+CLI do modo daemon:
+  python -m shamann.cli.daemon start [-c config] [--socket caminho] [--http 127.0.0.1:8765]
+  python -m shamann.cli.daemon submit -g dns -t exemplo.com [--options "MX"] [--timeout 60] [--profile [ETAPAS]]
+  python -m shamann.cli.daemon enqueue -g nmap -t 10.0.0.0/22 [--options "-p 80"]   (fila dos workers)
+  python -m shamann.cli.daemon status ID [--result] | jobs | cancel ID | schedule | config | reload | ping | stop
+  python -m shamann.cli.daemon telemetry [--seconds 600] [--samples]
+  python -m shamann.cli.daemon honeypot [--limit 20]
+  python -m shamann.cli.daemon ids [--limit 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shamann: modo daemon (agendador + jobs via socket local).")
+    parser.add_argument("--socket", type=str, default=None,
+                        help="Socket Unix de controle. Padrão: daemon.socket_path da configuração ou /tmp/shamann.sock")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    start = subparsers.add_parser("start", help="Inicia o daemon em primeiro plano.")
+    start.add_argument("-c", "--config", type=str, default="shamann/config/scan_config.json")
+    start.add_argument("--http", type=str, default=None, metavar="HOST:PORTA",
+                       help="Também serve a API HTTP neste endereço (sobrepõe a seção 'api' da configuração).")
+    start.add_argument("--log-level", type=str, default=None, help="Sobrepõe logging.level da configuração.")
+    start.add_argument("--log-file", type=str, default=None, help="Sobrepõe logging.file da configuração.")
+
+    submit = subparsers.add_parser("submit", help="Envia um job avulso.")
+    submit.add_argument("-g", "--guardian", required=True, help="Guardião (ou 'pipeline' para o fluxo completo).")
+    submit.add_argument("-t", "--target", required=True)
+    submit.add_argument("--options", default="")
+    submit.add_argument("--timeout", type=float, default=None)
+    submit.add_argument("--profile", nargs="?", const="", default=None, metavar="ETAPAS",
+                        help="Perfila o job no daemon; com valor, só as etapas que casam com os padrões (vírgula).")
+    submit.add_argument("--profile-memory", type=int, default=None, metavar="N",
+                        help="Com --profile, mostra as N linhas que mais alocaram por etapa.")
+
+    enqueue = subparsers.add_parser("enqueue", help="Enfileira alvos na fila compartilhada dos workers.")
+    enqueue.add_argument("-g", "--guardian", required=True)
+    enqueue.add_argument("-t", "--targets", required=True)
+    enqueue.add_argument("--options", default="")
+    enqueue.add_argument("--timeout", type=float, default=None)
+    enqueue.add_argument("--priority", type=int, default=0)
+    enqueue.add_argument("--exclude", default=None, help="Alvos a excluir (mesmas formas de -t, inclusive arquivo).")
+
+    status = subparsers.add_parser("status", help="Mostra o estado de um job.")
+    status.add_argument("id")
+    status.add_argument("--result", action="store_true", help="Inclui o resultado completo.")
+
+    cancel = subparsers.add_parser("cancel", help="Cancela um job.")
+    cancel.add_argument("id")
+
+    telemetry = subparsers.add_parser("telemetry", help="Mostra a telemetria do host coletada pelo daemon.")
+    telemetry.add_argument("--seconds", type=float, default=None, help="Só as amostras dos últimos N segundos.")
+    telemetry.add_argument("--samples", action="store_true", help="Inclui as amostras, não só o resumo.")
+
+    honeypot = subparsers.add_parser("honeypot", help="Mostra contadores, origens e eventos do honeypot do daemon.")
+    honeypot.add_argument("--limit", type=int, default=20)
+
+    ids = subparsers.add_parser("ids", help="Mostra contadores, offsets e alertas do detector de intrusões do daemon.")
+    ids.add_argument("--limit", type=int, default=20)
+
+    for name, help_text in (("jobs", "Lista os jobs."), ("schedule", "Lista os jobs agendados."),
+                            ("config", "Mostra a versão da configuração em uso."),
+                            ("reload", "Recarrega a configuração agora, se o arquivo mudou."),
+                            ("ping", "Verifica se o daemon está ativo."), ("stop", "Encerra o daemon.")):
+        subparsers.add_parser(name, help=help_text)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "start":
+        from shamann.core.config import ConfigError, ConfigStore
+        from shamann.core.logging_config import setup_logging
+        from shamann.daemon import ShamannDaemon
+        store = ConfigStore(args.config)
+        try:
+            config = store.current
+        except ConfigError as e:
+            print(f"Configuração inválida: {e}", file=sys.stderr)
+            return 2
+        setup_logging(config.get("logging"), level=args.log_level, file=args.log_file)
+        api_address = None
+        if args.http:
+            host, _, port = args.http.rpartition(":")
+            api_address = (host or "127.0.0.1", int(port))
+        try:
+            daemon = ShamannDaemon(args.config, socket_path=args.socket, api_address=api_address, config_store=store)
+        except ValueError as e: # Ex: API sem api.token
+            print(e, file=sys.stderr)
+            return 2
+        daemon.serve_forever()
+        return 0
+
+    from shamann.daemon import DEFAULT_SOCKET_PATH, DaemonClient, DaemonError
+    client = DaemonClient(args.socket or DEFAULT_SOCKET_PATH)
+    requests = {
+        "submit": lambda: client.request("submit", guardian=args.guardian, target=args.target,
+                                         options=args.options, timeout=args.timeout, profile=_profile_spec(args)),
+        "enqueue": lambda: client.request("enqueue", guardian=args.guardian, targets=args.targets,
+                                          options=args.options, timeout=args.timeout, priority=args.priority,
+                                          exclude=args.exclude),
+        "status": lambda: client.request("status", id=args.id, include_result=args.result),
+        "cancel": lambda: client.request("cancel", id=args.id),
+        "jobs": lambda: client.request("jobs"),
+        "schedule": lambda: client.request("schedule"),
+        "config": lambda: client.request("config"),
+        "reload": lambda: client.request("reload"),
+        "telemetry": lambda: client.request("telemetry", seconds=args.seconds, samples=args.samples),
+        "honeypot": lambda: client.request("honeypot", limit=args.limit),
+        "ids": lambda: client.request("ids", limit=args.limit),
+        "ping": lambda: client.request("ping"),
+        "stop": lambda: client.request("shutdown"),
+    }
+    try:
+        response = requests[args.command]()
+    except DaemonError as e:
+        print(e, file=sys.stderr)
+        return 2
+    print(json.dumps(response, indent=2, ensure_ascii=False, default=str))
+    return 0 if response.get("ok") else 1
+
+
+def _profile_spec(args) -> dict | None:
+    if args.profile is None:
+        return None
+    return {"stages": args.profile or None, "memory_top": args.profile_memory}
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+# shamann/cli/honeypot.py
+"""
+CLI do honeypot (modules.honeypot):
+  python -m shamann.cli.honeypot run [-p 2222:ssh -p 8080:http] [--db agent_ia.db]   (primeiro plano, Ctrl+C encerra)
+  python -m shamann.cli.honeypot events [--limit 50] [--source 203.0.113.7]
+  python -m shamann.cli.honeypot sources [--limit 20]
+Sem -p, as portas vêm da seção "honeypot" da configuração.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shamann: honeypot de baixa interação.")
+    parser.add_argument("-c", "--config", type=str, default="shamann/config/scan_config.json")
+    parser.add_argument("--db", type=str, default=None, help="Banco dos eventos e alertas. Padrão: honeypot.db_path")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="Abre as portas e registra as conexões até Ctrl+C.")
+    run.add_argument("-p", "--port", action="append", default=None, metavar="PORTA:PROTOCOLO",
+                     help="Porta e protocolo (ssh, http, telnet, smb); repetível.")
+    run.add_argument("--host", type=str, default=None)
+    run.add_argument("--log-level", type=str, default=None)
+
+    events = subparsers.add_parser("events", help="Últimos eventos gravados.")
+    events.add_argument("--limit", type=int, default=50)
+    events.add_argument("--source", type=str, default=None)
+
+    sources = subparsers.add_parser("sources", help="Origens com mais conexões.")
+    sources.add_argument("--limit", type=int, default=20)
+
+    args = parser.parse_args(argv)
+
+    from shamann.cli.backup import backup_settings
+    config = backup_settings(args.config) # Configuração crua, sem importar o orquestrador
+    settings = dict(config.get("honeypot", {}))
+    if args.db:
+        settings["db_path"] = args.db
+
+    if args.command == "run":
+        import threading
+        from shamann.core.logging_config import setup_logging
+        from shamann.modules.honeypot import HoneypotService
+        setup_logging(config.get("logging"), level=args.log_level)
+        if args.port:
+            settings["ports"] = [port.split(":", 1) for port in args.port]
+        if args.host:
+            settings["host"] = args.host
+        try:
+            honeypot = HoneypotService(settings).start()
+        except (OSError, ValueError) as e:
+            print(f"Não foi possível iniciar o honeypot: {e}", file=sys.stderr)
+            return 2
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            honeypot.stop()
+        print(json.dumps(honeypot.stats(), indent=2, ensure_ascii=False))
+        return 0
+
+    from shamann.persistence.honeypot_store import DEFAULT_DB_PATH, HoneypotStore
+    store = HoneypotStore(settings.get("db_path", DEFAULT_DB_PATH))
+    try:
+        if args.command == "events":
+            response = store.recent_events(args.limit, args.source)
+        else:
+            response = store.top_sources(args.limit)
+    finally:
+        store.close()
+    print(json.dumps(response, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# shamann/cli/ids.py
+"""
+CLI do detector de intrusões sobre logs (modules.intrusion_detection):
+  python -m shamann.cli.ids watch [-s /var/log/auth.log] [--journal export.json]   (primeiro plano, Ctrl+C encerra)
+  python -m shamann.cli.ids once                                                  (uma passada: o que há de novo)
+  python -m shamann.cli.ids check ARQUIVO [--format journal]                      (arquivo inteiro, sem estado)
+  python -m shamann.cli.ids signatures                                            (assinaturas e como são indexadas)
+Fontes, arquivo de estado e assinaturas extras vêm da seção "ids" da configuração.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shamann: detecção de intrusões nos logs do sistema.")
+    parser.add_argument("-c", "--config", type=str, default="shamann/config/scan_config.json")
+    parser.add_argument("--signatures", action="append", default=None, metavar="ARQUIVO",
+                        help="Arquivo JSON de assinaturas extras (repetível; soma-se a ids.signature_files).")
+    parser.add_argument("--db", type=str, default=None, help="Banco dos alertas. Padrão: ids.db_path")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("watch", "Acompanha os logs e alerta até Ctrl+C."),
+                            ("once", "Lê o que os logs ganharam desde a última execução e sai.")):
+        command = subparsers.add_parser(name, help=help_text)
+        command.add_argument("-s", "--source", action="append", default=None, help="Arquivo syslog (repetível).")
+        command.add_argument("--journal", action="append", default=None,
+                             help="Exportação do journald em JSON, de `journalctl -o json` (repetível).")
+        command.add_argument("--state", type=str, default=None, help="Arquivo de offsets. Padrão: ids.state_path")
+        command.add_argument("--from-start", action="store_true", help="Arquivos sem offset gravado são lidos do início.")
+    watch = subparsers.choices["watch"]
+    watch.add_argument("--log-level", type=str, default=None)
+
+    check = subparsers.add_parser("check", help="Aplica as assinaturas a um arquivo inteiro, sem gravar estado nem alertas.")
+    check.add_argument("path")
+    check.add_argument("--format", choices=("syslog", "journal"), default="syslog")
+
+    subparsers.add_parser("signatures", help="Lista as assinaturas carregadas e o índice de cada uma.")
+
+    args = parser.parse_args(argv)
+
+    from shamann.cli.backup import backup_settings
+    from shamann.modules.intrusion_detection import IntrusionDetector, SignatureSet
+    config = backup_settings(args.config) # Configuração crua, sem importar o orquestrador
+    settings = dict(config.get("ids", {}))
+    settings["signature_files"] = list(settings.get("signature_files") or []) + (args.signatures or [])
+    if args.db:
+        settings["db_path"] = args.db
+    try:
+        signatures = SignatureSet.from_settings(settings)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Assinaturas inválidas: {e}", file=sys.stderr)
+        return 2
+
+    if args.command == "signatures":
+        print(json.dumps([{"id": signature.id, "level": signature.level, "programs": sorted(signature.programs or []),
+                           "keyword": signature.keyword, "literal": None if signature.keyword else signature.literal,
+                           "aggregate": {"by": signature.by, "threshold": signature.threshold, "window": signature.window}
+                           if signature.by is not None else None}
+                          for signature in signatures.signatures], indent=2, ensure_ascii=False))
+        return 0
+
+    if args.command == "check":
+        alerts = []
+        detector = IntrusionDetector({**settings, "sources": [{"path": args.path, "format": args.format}],
+                                      "state_path": None, "from_start": True},
+                                     signatures=signatures, db=_NoDatabase())
+        detector.on_alert.append(alerts.append)
+        detector.poll()
+        detector.stop()
+        stats = detector.stats()
+        print(json.dumps({"lines": stats.get("lines", 0), "matches": stats.get("matches", 0), "alerts": alerts},
+                         indent=2, ensure_ascii=False))
+        return 1 if alerts else 0
+
+    sources = [{"path": path, "format": "syslog"} for path in args.source or []]
+    sources += [{"path": path, "format": "journal"} for path in args.journal or []]
+    if sources:
+        settings["sources"] = sources
+    if args.state:
+        settings["state_path"] = args.state
+    if args.from_start:
+        settings["from_start"] = True
+    try:
+        detector = IntrusionDetector(settings, signatures=signatures)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if args.command == "once":
+        alerts = detector.poll()
+        detector.stop()
+        print(json.dumps({**detector.stats(), "new_alerts": alerts}, indent=2, ensure_ascii=False))
+        return 1 if alerts else 0
+
+    from shamann.core.logging_config import setup_logging
+    setup_logging(config.get("logging"), level=args.log_level) # Os alertas também saem no log (WARNING)
+    import threading
+    detector.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        detector.stop()
+    print(json.dumps(detector.stats(), indent=2, ensure_ascii=False))
+    return 0
+
+
+class _NoDatabase:
+    """'check' é só leitura: os alertas vão para a saída, não para o banco."""
+
+    def save_guardian_result(self, guardian_name: str, target: str, result: dict):
+        return None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
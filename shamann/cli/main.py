@@ -8,9 +8,9 @@ import os
 # Isso é crucial para que 'python -m shamann.cli.main' funcione de qualquer lugar na raiz do projeto
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from shamann.main import run_shamann_orchestrator # Importa a função principal do Shamann
+# Imports pesados (orquestrador, guardiões) ficam dentro de main(): '--help' não deve pagar por eles
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(
         description="Shamann: Agente de Segurança e Pentest Modular.",
         formatter_class=argparse.RawTextHelpFormatter
@@ -21,9 +21,15 @@ def main():
         type=str,
         help="""Define o alvo para o scan Nmap. Pode ser:
   - Um IP único (ex: 192.168.1.1)
-  - Um range de IPs (ex: 192.168.1.0/24)
+  - Um range de IPs (ex: 192.168.1.0/24, 192.168.1.10-20 ou 192.168.1.10-192.168.2.5)
   - Múltiplos alvos separados por vírgula (ex: 192.168.1.1,192.168.1.10/30)
   - Caminho para um arquivo contendo alvos (um por linha)"""
+    )
+    parser.add_argument(
+        "-x", "--exclude",
+        type=str,
+        help="""Alvos a excluir do scan, nas mesmas formas de -t (IP, CIDR, range, lista ou arquivo).
+  Se não especificado, usa scan_profile.exclude do arquivo JSON."""
     )
     parser.add_argument(
         "-c", "--config",
@@ -45,18 +51,148 @@ def main():
         type=str,
         help="Diretório para salvar os relatórios de saída. Se não especificado, usa a configuração do arquivo JSON ou './output'."
     )
+    parser.add_argument(
+        "-g", "--guardian",
+        type=str,
+        help="Executa um único guardião pelo nome (ex: dns, whois, subdomain) sobre o alvo e imprime o resultado em JSON."
+    )
+    parser.add_argument(
+        "--guardian-options",
+        type=str,
+        default="",
+        help="Opções repassadas ao guardião escolhido com -g/--guardian."
+    )
+    parser.add_argument(
+        "--list-guardians",
+        action="store_true",
+        help="Lista os guardiões registrados (embutidos e plugins) sem carregá-los."
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Registra o tempo de cada etapa (spans) e salva o trace em JSON/Chrome trace (ver 'tracing' na configuração)."
+    )
+    parser.add_argument(
+        "--metrics-file",
+        type=str,
+        help="Grava as métricas da execução (formato texto do Prometheus) neste arquivo ao final, para o textfile collector."
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="ETAPAS",
+        help="""Perfila a execução (cProfile) e imprime os hotspots ao final. Sem valor, perfila tudo;
+com valor, só as etapas (spans) que casam com os padrões, separados por vírgula
+(ex: 'nmap.*,classify_alerts' ou 'guardian.dns' com -g). Grava .pstats e .collapsed por etapa."""
+    )
+    parser.add_argument(
+        "--profile-memory",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Com --profile, amostra as alocações (tracemalloc) e mostra as N linhas que mais alocaram por etapa."
+    )
+    parser.add_argument(
+        "--profile-dir",
+        type=str,
+        default=None,
+        help="Diretório dos perfis. Padrão: profiling.output_directory da configuração ou './output/profiles'."
+    )
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        default=None,
+        help="Nível de log (DEBUG, INFO, WARNING...). Padrão: logging.level da configuração ou INFO."
+    )
+    parser.add_argument(
+        "--log-file",
+        type=str,
+        default=None,
+        help="Também grava o log neste arquivo, com rotação (ver 'logging' na configuração)."
+    )
     # Adicionar outros argumentos conforme necessário (ex: --full-scan, --no-db, etc.)
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+
+    if args.list_guardians:
+        from shamann.modules.guardian_registry import list_guardians
+        for info in list_guardians():
+            status = "ativo" if info["active"] else "inativo"
+            print(f"{info['name']:<12} {status:<8} {info['source']:<8} {info['description']}")
+        return
+
+    from shamann.core.logging_config import setup_logging
+    setup_logging(logging_settings(args.config), level=args.log_level, file=args.log_file)
+
+    if args.guardian:
+        run_single_guardian(parser, args)
+        return
+
+    from shamann.main import run_shamann_orchestrator # Importa a função principal do Shamann
 
     # Chama a função principal do Shamann (que será ajustada)
     # Passamos os argumentos da CLI para ela
     run_shamann_orchestrator(
         cli_target=args.target,
+        cli_exclude=args.exclude,
         config_path=args.config,
         cli_ports=args.ports,
-        cli_output_dir=args.output_dir
+        cli_output_dir=args.output_dir,
+        trace=args.trace,
+        metrics_file=args.metrics_file,
+        profile=profile_options(args)
     )
 
+def logging_settings(config_path: str) -> dict:
+    """Seção 'logging' da configuração, lida sem importar o orquestrador (o caminho de -g fica leve)."""
+    import json
+    try:
+        with open(config_path, encoding="utf-8") as f:
+            return json.load(f).get("logging", {})
+    except (OSError, ValueError):
+        return {} # load_config avisa depois, já com o logging configurado
+
+def profile_options(args: argparse.Namespace) -> dict | None:
+    """Opções de --profile* no formato de core.profiling.profiler_from_settings (None = sem perfil)."""
+    if args.profile is None:
+        return None
+    return {"stages": [stage.strip() for stage in args.profile.split(",") if stage.strip()] or None,
+            "memory_top": args.profile_memory, "output_directory": args.profile_dir}
+
+def run_single_guardian(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """
+    Carrega só o guardião pedido (e as dependências dele) e o executa sobre o alvo pelo protocolo de
+    streaming (BaseGuardian.scan): vale para guardiões de instância como o Nmap e para os legados.
+    """
+    import contextlib
+    import json
+    from shamann.core.profiling import stage as guardian_stage
+    from shamann.modules.base_guardian import adapt_guardian
+    from shamann.modules.guardian_registry import GuardianLoadError, get_guardian_by_name
+
+    if not args.target:
+        parser.error("-g/--guardian exige um alvo (-t/--target).")
+    try:
+        guardian_cls = get_guardian_by_name(args.guardian)
+    except GuardianLoadError as e:
+        parser.exit(1, f"{e}\n")
+    if guardian_cls is None:
+        parser.error(f"Guardião desconhecido ou inativo: '{args.guardian}'. Use --list-guardians.")
+    profiler = None
+    if args.profile is not None:
+        from shamann.core.profiling import profiler_from_settings
+        from shamann.main import load_config
+        profiler = profiler_from_settings(load_config(args.config).get("profiling", {}),
+                                          label=f"guardian_{args.guardian}", **profile_options(args))
+    with profiler or contextlib.nullcontext(), guardian_stage(f"guardian.{args.guardian}"):
+        result = adapt_guardian(guardian_cls).scan(args.target, args.guardian_options)
+    print(json.dumps(result, indent=2, ensure_ascii=False, default=str))
+    if profiler is not None:
+        print(profiler.report(), file=sys.stderr)
+    if result.get("status") == "error":
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,65 @@
+# shamann/cli/targets.py
+"""
+CLI da expansão de alvos (core.targets), útil para conferir um alvo antes de escanear:
+  python -m shamann.cli.targets count -t 10.0.0.0/8 -x excluidos.txt            (endereços, intervalos, hostnames)
+  python -m shamann.cli.targets list -t alvos.txt --order random --seed 7 --shard 2/8   (um endereço por linha)
+  python -m shamann.cli.targets nmap -t 10.0.0.1-200,10.0.0.50 [--shards 4]      (menor lista de CIDRs por fatia)
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from shamann.core.targets import ORDERS, TargetSet
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shamann: expansão de alvos com exclusões.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("count", "Resume o conjunto de alvos."),
+                            ("list", "Lista os endereços, sem materializar o conjunto."),
+                            ("nmap", "Imprime os alvos como o Nmap os recebe.")):
+        command = subparsers.add_parser(name, help=help_text)
+        command.add_argument("-t", "--target", action="append", required=True,
+                             help="IP, CIDR, range, lista separada por vírgula ou arquivo (repetível).")
+        command.add_argument("-x", "--exclude", action="append", default=None, help="Alvos a excluir (repetível).")
+    listing = subparsers.choices["list"]
+    listing.add_argument("--order", choices=ORDERS, default="sequential")
+    listing.add_argument("--seed", type=int, default=None, help="Seed da ordem aleatória (sem ela, uma é sorteada).")
+    listing.add_argument("--shard", type=str, default=None, metavar="I/N", help="Só a fatia I (0..N-1) de N.")
+    listing.add_argument("--limit", type=int, default=None)
+    subparsers.choices["nmap"].add_argument("--shards", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    try:
+        targets = TargetSet.parse(args.target, exclude=args.exclude)
+        if args.command == "count":
+            print(json.dumps(targets.summary(), indent=2))
+        elif args.command == "nmap":
+            for shard in targets.shards(args.shards):
+                print(" ".join(shard.to_nmap()))
+        else:
+            shard = tuple(int(part) for part in args.shard.split("/", 1)) if args.shard else None
+            if args.order == "random" and args.seed is None:
+                args.seed = random.SystemRandom().getrandbits(32)
+                print(f"seed: {args.seed}", file=sys.stderr) # Para repetir a ordem (ou fatiá-la) depois
+            for count, address in enumerate(targets.addresses(args.order, args.seed, shard)):
+                if args.limit is not None and count >= args.limit:
+                    break
+                print(address)
+            if targets.names and shard is None and args.limit is None:
+                print("\n".join(targets.names))
+    except ValueError as e: # TargetError e --shard inválido
+        print(f"Alvos inválidos: {e}", file=sys.stderr)
+        return 2
+    except BrokenPipeError: # list | head
+        return 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# shamann/cli/worker.py
+"""
+CLI da fila de jobs:
+  python -m shamann.cli.worker enqueue -g nmap -t 10.0.0.0/22 [--exclude 10.0.1.0/24] [--shard-size 16] [--options "-p 22,80"]
+  python -m shamann.cli.worker run [--processes 4] [--concurrency 2] [-g nmap] [--exit-when-empty] [--profile [ETAPAS]]
+  python -m shamann.cli.worker status [--batch ID]
+Com --db, os workers são do mesmo host: o banco precisa estar em disco local (o SQLite não coordena
+hosts diferentes, e um --db em NFS/SMB é recusado). Para workers em vários hosts, o daemon serve a fila
+pela API HTTP e cada host usa --server http://daemon:8765 (token em --token ou SHAMANN_API_TOKEN).
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shamann: fila de jobs compartilhada entre workers.")
+    parser.add_argument("--db", type=str, default="agent_ia.db", help="Banco SQLite da fila. Padrão: agent_ia.db")
+    parser.add_argument("--server", type=str, default=None, metavar="URL",
+                        help="Usa a fila servida pela API do daemon (http://host:porta) em vez de --db.")
+    parser.add_argument("--token", type=str, default=os.environ.get("SHAMANN_API_TOKEN"),
+                        help="api.token do daemon para --server. Padrão: $SHAMANN_API_TOKEN")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = subparsers.add_parser("enqueue", help="Fatia os alvos e enfileira as unidades.")
+    enqueue.add_argument("-g", "--guardian", required=True)
+    enqueue.add_argument("-t", "--targets", required=True, help="Alvos separados por vírgula ou espaço (IPs, CIDRs, domínios).")
+    enqueue.add_argument("--exclude", default=None, help="Alvos a excluir (mesmas formas de -t, inclusive arquivo).")
+    enqueue.add_argument("--options", default="")
+    enqueue.add_argument("--timeout", type=float, default=None, help="Timeout de cada unidade, em segundos.")
+    enqueue.add_argument("--priority", type=int, default=0)
+    enqueue.add_argument("--shard-size", type=int, default=16, help="Máximo de endereços por unidade (hostnames: alvos por unidade). Padrão: 16")
+    enqueue.add_argument("--max-attempts", type=int, default=3)
+
+    run = subparsers.add_parser("run", help="Consome a fila.")
+    run.add_argument("--processes", type=int, default=1)
+    run.add_argument("--concurrency", type=int, default=1, help="Threads por processo.")
+    run.add_argument("-g", "--guardian", action="append", default=None, help="Aceita só estes guardiões (repetível).")
+    run.add_argument("--lease", type=float, default=60, help="Duração do aluguel de cada unidade, em segundos.")
+    run.add_argument("--results-db", type=str, default=None,
+                     help="Banco dos resultados. Padrão: o mesmo da fila (com --server, o banco do daemon).")
+    run.add_argument("--max-jobs", type=int, default=None, help="Encerra após N unidades (por processo).")
+    run.add_argument("--exit-when-empty", action="store_true")
+    run.add_argument("--profile", nargs="?", const="", default=None, metavar="ETAPAS",
+                     help="Perfila cada processo worker (arquivos worker_<pid>.*); com valor, só as etapas que "
+                          "casam com os padrões (ex: 'guardian.nmap,nmap.parse').")
+    run.add_argument("--profile-memory", type=int, default=None, metavar="N",
+                     help="Com --profile, mostra as N linhas que mais alocaram por etapa.")
+    run.add_argument("--profile-dir", type=str, default=None, help="Diretório dos perfis. Padrão: ./output/profiles")
+    run.add_argument("--log-level", type=str, default="INFO")
+    run.add_argument("--log-file", type=str, default=None,
+                     help="Também grava o log neste arquivo (com rotação); os processos filhos compartilham o arquivo.")
+
+    status = subparsers.add_parser("status", help="Contagem de unidades por status.")
+    status.add_argument("--batch", default=None)
+
+    args = parser.parse_args(argv)
+
+    from shamann.persistence.job_queue import JobQueueError, check_local_database
+    server = None
+    if args.server:
+        from shamann.worker import RemoteJobQueue
+        try:
+            RemoteJobQueue(args.server, args.token) # Valida URL e token antes de iniciar processos
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+        server = (args.server, args.token)
+    else:
+        try:
+            check_local_database(args.db)
+        except JobQueueError as e:
+            print(e, file=sys.stderr)
+            return 2
+
+    if args.command == "run":
+        from shamann.core.logging_config import setup_logging
+        from shamann.worker import run_workers
+        setup_logging(level=args.log_level, file=args.log_file)
+        profile = None
+        if args.profile is not None:
+            profile = {"stages": [stage.strip() for stage in args.profile.split(",") if stage.strip()],
+                       "memory_top": args.profile_memory, "output_directory": args.profile_dir}
+        results_db = args.results_db if server else args.results_db or args.db
+        run_workers(args.db, results_db, args.processes, args.concurrency, args.lease,
+                    args.guardian, args.max_jobs, args.exit_when_empty, profile, server)
+        return 0
+
+    from shamann.persistence.job_queue import JobQueue
+    from shamann.worker import RemoteQueueError
+    queue = RemoteJobQueue(*server) if server else JobQueue(args.db)
+    try:
+        if args.command == "enqueue":
+            response = queue.enqueue(args.guardian, args.targets, args.options, args.timeout, args.priority,
+                                     args.shard_size, args.max_attempts, exclude=args.exclude)
+        else:
+            response = queue.stats(args.batch)
+    except (ValueError, RemoteQueueError, OSError) as e: # Alvo inválido (core.targets) ou servidor indisponível
+        print(e, file=sys.stderr)
+        return 2
+    finally:
+        queue.close()
+    print(json.dumps(response, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
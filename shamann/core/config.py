@@ -0,0 +1,407 @@
+# shamann/core/config.py
+"""
+Configuração compilada do Shamann e recarga a quente.
+
+compile_config(dict) valida o scan_config.json e devolve um CompiledConfig: perfil de scan e
+saída tipados e as regras de alerta já compiladas (bytecode, nomes verificados na carga), então
+uma regra inválida é rejeitada ao carregar e não a cada porta, dentro do eval. A verificação
+reduz o que uma condição alcança, mas o eval NÃO é um sandbox: quem pode escrever no
+scan_config.json executa código no processo (inclusive no daemon, pela recarga a quente), então
+o arquivo precisa das mesmas permissões do próprio código do Shamann. O CompiledConfig
+também se comporta como o dict original (config.get("tracing", {})): as demais seções não mudam.
+
+ConfigStore(caminho) guarda a versão atual. refresh() recompila só quando o arquivo muda
+(mtime/tamanho/inode) e start() faz isso periodicamente numa thread. A troca é uma atribuição de
+referência: scans em andamento seguem com a versão que já pegaram, e uma recarga com erro
+(JSON quebrado, regra inválida) mantém a versão anterior.
+"""
+
+import ast
+import builtins
+import copy
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections.abc import Mapping
+from datetime import datetime, UTC
+
+from shamann.core import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = "shamann/config/scan_config.json"
+DEFAULT_POLL_INTERVAL = 2.0
+ALERT_LEVELS = ("CRITICAL", "HIGH", "MEDIUM", "LOW", "INFO", "UNKNOWN")
+REPORT_FORMATS = ("json", "csv")
+# Variáveis disponíveis nas condições (ver NmapGuardian.classify_alerts_with_rules)
+RULE_VARIABLES = frozenset({
+    "ip", "hostname", "status", "os_match", "os_accuracy", "vendor", "port_id", "protocol", "state",
+    "service_name", "service_product", "service_version", "extrainfo", "cpe", "scripts_output",
+    "service_lower", "product_lower", "version_lower", "extrainfo_lower", "cpe_lower", "vendor_lower", "os_lower", "re",
+})
+# Atributos liberados sobre as variáveis (métodos de str e dict) e sobre 're' (ver RULE_REGEX)
+RULE_METHODS = frozenset({
+    "startswith", "endswith", "lower", "upper", "casefold", "strip", "lstrip", "rstrip", "split", "find", "count",
+    "replace", "isdigit", "get", "keys", "values", "items",
+})
+RULE_REGEX_ATTRIBUTES = frozenset({"search", "match", "fullmatch", "findall", "IGNORECASE", "I"})
+# Builtins liberados nas condições: sem open/__import__/eval/getattr
+RULE_BUILTINS = {name: getattr(builtins, name) for name in (
+    "abs", "all", "any", "bool", "dict", "float", "int", "isinstance", "len", "list", "max", "min", "set",
+    "sorted", "str", "sum", "tuple",
+)}
+
+CONFIG_RELOADS = metrics.REGISTRY.counter("shamann_config_reloads_total",
+                                          "Recargas da configuração, por resultado (success, error).", ("result",))
+
+
+class ConfigError(ValueError):
+    """Configuração inválida; `errors` lista cada problema encontrado."""
+
+    def __init__(self, errors):
+        self.errors = [errors] if isinstance(errors, str) else list(errors)
+        super().__init__("; ".join(self.errors))
+
+
+class _RuleRegex:
+    """
+    O 're' das condições: só as funções de busca. O módulo re em si não é exposto, porque seus
+    atributos levam a sys e os (ex: re.enum.sys.modules['os']).
+    """
+    __slots__ = ()
+    search = staticmethod(re.search)
+    match = staticmethod(re.match)
+    fullmatch = staticmethod(re.fullmatch)
+    findall = staticmethod(re.findall)
+    IGNORECASE = I = re.IGNORECASE
+
+
+RULE_REGEX = _RuleRegex()
+
+
+def _rule_names(tree: ast.AST) -> tuple[set[str], set[str]]:
+    """(nomes lidos pela condição, nomes ligados por compreensões, ex: 'k' em 'any(k in x for k in ...)')."""
+    loaded, bound = set(), set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            (loaded if isinstance(node.ctx, ast.Load) else bound).add(node.id)
+    return loaded - bound, bound
+
+
+def _check_attribute(node: ast.Attribute, bound: set[str]) -> str | None:
+    """
+    Atributos só valem diretamente sobre uma variável da regra (métodos de RULE_METHODS) ou sobre
+    're' (RULE_REGEX_ATTRIBUTES): nunca sobre o resultado de uma chamada, subscrição ou literal,
+    o caminho para sair dos objetos liberados.
+    """
+    if node.attr.startswith("_"):
+        return f"atributo privado '{node.attr}' não é permitido"
+    base = node.value
+    if not isinstance(base, ast.Name) or (base.id not in RULE_VARIABLES and base.id not in bound):
+        return f"atributo '.{node.attr}' só é permitido diretamente sobre uma variável da regra"
+    allowed = RULE_REGEX_ATTRIBUTES if base.id == "re" else RULE_METHODS
+    if node.attr not in allowed:
+        return f"atributo '{base.id}.{node.attr}' não é permitido"
+    return None
+
+
+def _check_condition(tree: ast.AST) -> list[str]:
+    problems = []
+    loaded, bound = _rule_names(tree)
+    unknown = loaded - RULE_VARIABLES - RULE_BUILTINS.keys()
+    if unknown:
+        problems.append(f"nomes desconhecidos: {', '.join(sorted(unknown))}")
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute):
+            problem = _check_attribute(node, bound)
+            if problem:
+                problems.append(problem)
+        elif isinstance(node, (ast.NamedExpr, ast.Lambda, ast.Await, ast.Yield, ast.YieldFrom)):
+            problems.append(f"'{type(node).__name__}' não é permitido")
+    return problems
+
+
+class AlertRule:
+    """Uma regra de alerta validada, com a condição já compilada para o eval."""
+    __slots__ = ("index", "level", "type", "description", "recommendation", "condition", "code")
+
+    def __init__(self, rule: dict, index: int = 0):
+        if not isinstance(rule, dict):
+            raise ConfigError(f"regra #{index}: esperado um objeto, recebido {type(rule).__name__}")
+        self.index = index
+        self.level = rule.get("level", "UNKNOWN")
+        self.type = rule.get("type", "Alerta Personalizado")
+        self.description = rule.get("description", "Alerta acionado por regra personalizada.")
+        self.recommendation = rule.get("recommendation", "Verificar a regra de alerta.")
+        self.condition = rule.get("condition")
+        label = f"regra #{index} ({self.type!r})"
+        if self.level not in ALERT_LEVELS:
+            raise ConfigError(f"{label}: nível '{self.level}' inválido (use {', '.join(ALERT_LEVELS)})")
+        if not isinstance(self.condition, str) or not self.condition.strip():
+            raise ConfigError(f"{label}: 'condition' deve ser uma expressão não vazia")
+        try:
+            tree = ast.parse(self.condition.strip(), mode="eval")
+        except SyntaxError as e:
+            raise ConfigError(f"{label}: condição com erro de sintaxe: {e.msg}") from None
+        problems = _check_condition(tree)
+        if problems:
+            raise ConfigError(f"{label}: {'; '.join(problems)}")
+        self.code = compile(tree, f"<{label}>", "eval")
+
+    @property
+    def critical(self) -> bool:
+        return self.level == "CRITICAL"
+
+    def alert(self, details: dict) -> dict:
+        return {"level": self.level, "type": self.type, "description": self.description,
+                "recommendation": self.recommendation, "details": details}
+
+    def to_dict(self) -> dict:
+        return {"level": self.level, "type": self.type, "condition": self.condition,
+                "description": self.description, "recommendation": self.recommendation}
+
+
+def compile_rules(rules) -> tuple[AlertRule, ...]:
+    """Compila uma lista de regras (dicts); regras já compiladas passam direto. Reúne todos os erros."""
+    compiled, errors = [], []
+    for index, rule in enumerate(rules or ()):
+        if isinstance(rule, AlertRule):
+            compiled.append(rule)
+            continue
+        try:
+            compiled.append(AlertRule(rule, index))
+        except ConfigError as e:
+            errors.extend(e.errors)
+    if errors:
+        raise ConfigError(errors)
+    return tuple(compiled)
+
+
+def _typed(section: str, values: dict, key: str, expected, default, errors: list):
+    value = values.get(key, default)
+    if value is not None and not isinstance(value, expected):
+        names = " ou ".join(t.__name__ for t in (expected if isinstance(expected, tuple) else (expected,)))
+        errors.append(f"{section}.{key}: esperado {names}, recebido {type(value).__name__}")
+        return default
+    return value
+
+
+class ScanProfile:
+    """Seção "scan_profile"."""
+    __slots__ = ("target", "exclude", "ports", "nmap_options", "include_default_scripts", "custom_scripts")
+
+    def __init__(self, section: dict, errors: list):
+        self.target = _typed("scan_profile", section, "target", str, None, errors)
+        self.exclude = _typed("scan_profile", section, "exclude", (list, str), None, errors) # Ver core.targets
+        self.ports = _typed("scan_profile", section, "ports", str, "1-1000", errors) or "1-1000"
+        self.nmap_options = _typed("scan_profile", section, "nmap_options", str, "-sS -sV -O -A -T4", errors)
+        self.include_default_scripts = _typed("scan_profile", section, "include_default_scripts", bool, True, errors)
+        scripts = _typed("scan_profile", section, "custom_scripts", list, [], errors) or []
+        if not all(isinstance(script, str) for script in scripts):
+            errors.append("scan_profile.custom_scripts: esperada uma lista de nomes de scripts")
+            scripts = []
+        self.custom_scripts = tuple(scripts)
+
+
+class OutputSettings:
+    """Seção "output_settings"."""
+    __slots__ = ("output_directory", "report_format", "csv_filename_prefix", "json_filename_prefix")
+
+    def __init__(self, section: dict, errors: list):
+        self.output_directory = _typed("output_settings", section, "output_directory", str, "./output", errors)
+        formats = _typed("output_settings", section, "report_format", (list, str), ["json"], errors)
+        formats = [formats] if isinstance(formats, str) else formats
+        unknown = [fmt for fmt in formats if fmt not in REPORT_FORMATS]
+        if unknown:
+            errors.append(f"output_settings.report_format: formatos desconhecidos {unknown} (use {', '.join(REPORT_FORMATS)})")
+        self.report_format = tuple(fmt for fmt in formats if fmt in REPORT_FORMATS)
+        self.csv_filename_prefix = _typed("output_settings", section, "csv_filename_prefix", str,
+                                          "shamann_alert_report", errors)
+        self.json_filename_prefix = _typed("output_settings", section, "json_filename_prefix", str,
+                                           "shamann_scan_details", errors)
+
+    def as_dict(self, **overrides) -> dict:
+        """Formato aceito por generate_reports; overrides None são ignorados (ex: -o ausente)."""
+        settings = {name: getattr(self, name) for name in self.__slots__}
+        settings["report_format"] = list(self.report_format)
+        settings.update({key: value for key, value in overrides.items() if value is not None})
+        return settings
+
+
+class CompiledConfig(Mapping):
+    """
+    Configuração validada e imutável. As seções tipadas ficam em scan_profile, rules e
+    output_settings; as demais são lidas como no dict (config["daemon"], config.get("api", {})).
+    """
+
+    def __init__(self, raw: dict, path: str = None, version: int = 0):
+        if not isinstance(raw, dict):
+            raise ConfigError(f"a configuração deve ser um objeto JSON, recebido {type(raw).__name__}")
+        errors = []
+        self._raw = copy.deepcopy(raw) # Quem editar o dict original não altera esta versão
+        self.scan_profile = ScanProfile(self._section("scan_profile", errors), errors)
+        self.output_settings = OutputSettings(self._section("output_settings", errors), errors)
+        try:
+            self.rules = compile_rules(self._raw.get("alert_rules") or [])
+        except ConfigError as e:
+            errors.extend(e.errors)
+        if errors:
+            raise ConfigError(errors)
+        self.path = path
+        self.version = version
+        self.loaded_at = datetime.now(UTC).isoformat()
+
+    def _section(self, name: str, errors: list) -> dict:
+        section = self._raw.get(name) or {}
+        if not isinstance(section, dict):
+            errors.append(f"{name}: esperado um objeto")
+            return {}
+        return section
+
+    def __getitem__(self, key):
+        return self._raw[key]
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __len__(self):
+        return len(self._raw)
+
+    def info(self) -> dict:
+        return {"path": self.path, "version": self.version, "loaded_at": self.loaded_at, "rules": len(self.rules)}
+
+
+def compile_config(raw, path: str = None, version: int = 0) -> CompiledConfig:
+    """Valida e compila a configuração; um CompiledConfig é devolvido como está."""
+    return raw if isinstance(raw, CompiledConfig) else CompiledConfig(raw, path, version)
+
+
+class ConfigStore:
+    """
+    Versão atual de um arquivo de configuração, recompilada quando o arquivo muda.
+
+    :param path: Arquivo JSON. Ausente na primeira carga = configuração vazia (com aviso), como load_config.
+    :param poll_interval: Intervalo (s) da verificação feita pela thread de start().
+    """
+
+    def __init__(self, path: str = DEFAULT_CONFIG_PATH, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.path = os.path.abspath(path)
+        self.poll_interval = poll_interval
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+        self._current = None
+        self._signature = None
+        self._lock = threading.Lock() # Serializa as recargas; a leitura de `current` não trava
+        self._listeners = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def current(self) -> CompiledConfig:
+        """Versão atual (carrega na primeira leitura)."""
+        return self._current if self._current is not None else self.refresh()
+
+    def _stat(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def refresh(self) -> CompiledConfig:
+        """Recompila se o arquivo mudou desde a última carga e retorna a versão atual."""
+        try:
+            signature = self._stat()
+        except FileNotFoundError:
+            signature = None
+        if self._current is not None and signature == self._signature:
+            return self._current
+        with self._lock:
+            if self._current is not None and signature == self._signature:
+                return self._current
+            previous = self._current
+            version = previous.version + 1 if previous is not None else 1
+            try:
+                if signature is None:
+                    if previous is not None:
+                        raise ConfigError(f"arquivo '{self.path}' não encontrado")
+                    logger.warning(f"Arquivo de configuração não encontrado em '{self.path}'. Usando configurações padrão ou CLI.")
+                    raw = {}
+                else:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        raw = json.load(f)
+                started = time.perf_counter()
+                compiled = CompiledConfig(raw, self.path, version)
+            except (OSError, ValueError) as e: # JSONDecodeError e ConfigError são ValueError
+                self._signature = signature # O mesmo conteúdo quebrado não é relido a cada verificação
+                self.failures += 1
+                self.last_error = str(e)
+                CONFIG_RELOADS.inc(result="error")
+                if previous is None:
+                    raise e if isinstance(e, ConfigError) else ConfigError(f"'{self.path}': {e}") from e
+                logger.error(f"Recarga de '{self.path}' falhou; mantendo a versão {previous.version}: {e}")
+                return previous
+            self._current, self._signature = compiled, signature
+            self.reloads += previous is not None
+            self.last_error = None
+            CONFIG_RELOADS.inc(result="success")
+            logger.info(f"Configuração carregada de '{self.path}' (versão {version}, {len(compiled.rules)} regras "
+                        f"compiladas em {(time.perf_counter() - started) * 1000:.1f} ms).")
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(compiled, previous)
+            except Exception as e:
+                logger.error(f"Erro ao notificar a recarga da configuração: {e}", exc_info=True)
+        return compiled
+
+    def subscribe(self, listener):
+        """listener(nova, anterior) é chamado após cada carga bem-sucedida."""
+        self._listeners.append(listener)
+
+    def info(self) -> dict:
+        return {**(self._current.info() if self._current is not None else {"path": self.path}),
+                "reloads": self.reloads, "failures": self.failures, "last_error": self.last_error,
+                "watching": self._thread is not None}
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Erro ao verificar a configuração '{self.path}': {e}", exc_info=True)
+
+    def start(self):
+        """Carrega (se preciso) e passa a verificar o arquivo a cada poll_interval segundos."""
+        self.refresh()
+        if self._thread is None and self.poll_interval and self.poll_interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="shamann-config-watch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def config_store(path: str = DEFAULT_CONFIG_PATH) -> ConfigStore:
+    """ConfigStore compartilhado por caminho: execuções repetidas no mesmo processo só recompilam se o arquivo mudar."""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = ConfigStore(key)
+        return _stores[key]
@@ -0,0 +1,236 @@
+# shamann/core/logging_config.py
+"""
+Backend de logging do Shamann: os registros entram numa fila em memória e uma única thread
+(QueueListener) formata e grava no console e no arquivo. As threads de scan só pagam o
+enfileiramento; formatação, I/O, rotação e compressão acontecem fora delas.
+
+    setup_logging(config.get("logging"), level="DEBUG")   # idempotente: chamar de novo não duplica handlers
+
+Configuração (seção "logging" do scan_config.json):
+    level         nível do logger raiz (ex: "INFO", "DEBUG")
+    console       registra em stderr; o rich (se instalado) só é usado quando stderr é um TTY
+    file          caminho do arquivo de log (null = sem arquivo)
+    format        "text" ou "json" (um objeto JSON por linha) para o arquivo
+    max_bytes     rotação por tamanho (0 = sem rotação por tamanho)
+    when          rotação por tempo ("midnight", "H", "D", ...; sobrepõe max_bytes) e interval
+    backup_count  arquivos rotacionados mantidos
+    compress      comprime os arquivos rotacionados com gzip (.gz)
+    caller_info   registra arquivo/linha de quem chamou (findCaller, o passo mais caro de cada registro)
+
+Após um fork (workers multiprocessados), o filho recria a fila e o listener com as mesmas configurações.
+"""
+
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import threading
+from datetime import datetime, UTC
+
+DEFAULT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+DEFAULT_SETTINGS = {
+    "level": "INFO",
+    "console": True,
+    "file": None,
+    "format": "text",
+    "max_bytes": 10 * 2 ** 20,
+    "when": None,
+    "interval": 1,
+    "backup_count": 5,
+    "compress": False,
+    "caller_info": False,
+}
+# Atributos próprios de todo LogRecord: o resto veio de extra={...} e vai para o JSON
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_SRCFILE = logging._srcfile # None desliga o findCaller (otimização documentada no HOWTO do logging)
+
+_lock = threading.Lock()
+_state = {"handler": None, "listener": None, "settings": None, "stream": None}
+
+
+class JsonFormatter(logging.Formatter):
+    """Um objeto JSON por linha: ts, level, logger, message, thread, source, os campos de extra e a exceção."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, UTC).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if record.lineno:
+            entry["source"] = f"{record.module}:{record.lineno}"
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    A fila é do próprio processo, então o registro segue inteiro (exc_info incluso, para o traceback
+    do rich) sem a cópia e a formatação que o QueueHandler padrão faz na thread que registrou.
+    Só a mensagem é resolvida aqui, porque os args podem mudar antes de o listener formatar.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+def _gzip_rotator(source: str, dest: str):
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def _file_handler(settings: dict) -> logging.Handler:
+    path = settings["file"]
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    if settings.get("when"):
+        handler = logging.handlers.TimedRotatingFileHandler(path, when=settings["when"],
+                                                            interval=settings.get("interval") or 1,
+                                                            backupCount=settings["backup_count"], encoding="utf-8")
+    elif settings.get("max_bytes"):
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=settings["max_bytes"],
+                                                       backupCount=settings["backup_count"], encoding="utf-8")
+    else:
+        handler = logging.FileHandler(path, encoding="utf-8")
+    if settings.get("compress") and isinstance(handler, logging.handlers.BaseRotatingHandler):
+        handler.namer = lambda name: name + ".gz"
+        handler.rotator = _gzip_rotator
+    if settings.get("format") == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(DEFAULT_FORMAT))
+    return handler
+
+
+def _console_handler(stream, caller_info: bool = False) -> logging.Handler:
+    isatty = getattr(stream, "isatty", None)
+    if isatty is not None and isatty():
+        try:
+            from rich.console import Console
+            from rich.logging import RichHandler
+        except ImportError:
+            pass # Sem rich: mesmo formato de texto do arquivo
+        else:
+            handler = RichHandler(console=Console(file=stream), rich_tracebacks=True,
+                                  tracebacks_show_locals=False, show_path=caller_info)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            return handler
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(DEFAULT_FORMAT))
+    return handler
+
+
+def _build_handlers(settings: dict, stream) -> list[logging.Handler]:
+    handlers = []
+    if settings.get("console"):
+        handlers.append(_console_handler(stream, settings.get("caller_info")))
+    if settings.get("file"):
+        handlers.append(_file_handler(settings))
+    return handlers
+
+
+def _start_listener(settings: dict, stream) -> tuple[queue.SimpleQueue, logging.handlers.QueueListener]:
+    records = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, *_build_handlers(settings, stream), respect_handler_level=True)
+    listener.start()
+    return records, listener
+
+
+def _stop_listener(listener: logging.handlers.QueueListener):
+    listener.stop() # Esvazia a fila antes de retornar
+    for handler in listener.handlers:
+        handler.close()
+
+
+def setup_logging(settings: dict = None, stream=None, **overrides) -> logging.handlers.QueueListener:
+    """
+    Instala (ou reconfigura) o backend em fila no logger raiz e retorna o listener ativo.
+    Chamadas repetidas com as mesmas configurações não fazem nada; com configurações diferentes,
+    o listener anterior é esvaziado e substituído. Overrides None são ignorados (ex: --log-level ausente).
+    """
+    merged = dict(DEFAULT_SETTINGS)
+    merged.update(settings or {})
+    merged.update({key: value for key, value in overrides.items() if value is not None})
+    merged["level"] = str(merged["level"]).upper()
+    stream = stream or sys.stderr
+    root = logging.getLogger()
+    with _lock:
+        if _state["handler"] is not None:
+            if _state["settings"] == merged and _state["stream"] is stream:
+                return _state["listener"]
+            root.removeHandler(_state["handler"])
+            _stop_listener(_state["listener"])
+        else:
+            atexit.register(shutdown_logging)
+        records, listener = _start_listener(merged, stream)
+        handler = _QueueHandler(records)
+        root.addHandler(handler)
+        root.setLevel(merged["level"])
+        # Campos que nenhum formato usa ficam fora do LogRecord: menos custo na thread que registra
+        logging._srcfile = _SRCFILE if merged["caller_info"] else None
+        logging.logMultiprocessing = logging.logAsyncioTasks = False
+        _state.update(handler=handler, listener=listener, settings=merged, stream=stream)
+    return listener
+
+
+def ensure_logging() -> logging.handlers.QueueListener:
+    """Listener ativo; instala o backend com as configurações padrão só se nenhum estiver instalado."""
+    with _lock:
+        listener = _state["listener"]
+    return listener if listener is not None else setup_logging()
+
+
+def shutdown_logging():
+    """Remove o handler da fila e grava os registros pendentes (chamado também no atexit)."""
+    with _lock:
+        if _state["handler"] is None:
+            return
+        logging.getLogger().removeHandler(_state["handler"])
+        _stop_listener(_state["listener"])
+        logging._srcfile = _SRCFILE
+        logging.logMultiprocessing = logging.logAsyncioTasks = True
+        _state.update(handler=None, listener=None, settings=None, stream=None)
+
+
+def _after_fork_in_child():
+    # A thread do listener não existe no filho: nova fila e novo listener, mesmo handler no logger raiz.
+    # Registros que ficaram na fila copiada são do pai, que os grava.
+    global _lock
+    _lock = threading.Lock()
+    if _state["handler"] is not None:
+        for handler in _state["listener"].handlers:
+            handler.close()
+        records, listener = _start_listener(_state["settings"], _state["stream"])
+        _state["handler"].queue = records
+        _state["listener"] = listener
+        # Filhos do multiprocessing saem com os._exit (sem atexit) e limpam os finalizadores ao iniciar:
+        # o que esvazia a fila é registrado depois dessa limpeza
+        util = sys.modules.get("multiprocessing.util")
+        if util is not None:
+            util.register_after_fork(_state["handler"], _register_exit_finalizer)
+
+
+def _register_exit_finalizer(_handler):
+    from multiprocessing import util
+    util.Finalize(None, shutdown_logging, exitpriority=-100)
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,322 @@
+# shamann/core/metrics.py
+"""
+Métricas no formato de exposição de texto do Prometheus (contadores, gauges e histogramas).
+
+Contadores e histogramas ficam em caminhos quentes (avaliação de regras, requisições do fuzzer),
+então cada thread escreve só na sua própria célula (threading.local) e a leitura soma as células:
+o incremento não usa lock. Gauges (valores "atuais") usam um lock simples.
+
+Exposição:
+  - modo daemon: GET /metrics na API HTTP (shamann.api) e o comando "metrics" do socket;
+  - CLI: REGISTRY.write_textfile(caminho) ao final da execução ("metrics.textfile_path" ou
+    --metrics-file), para o textfile collector do node_exporter.
+"""
+
+import bisect
+import math
+import os
+import re
+import tempfile
+import threading
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+COUNT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000)
+_NAME_RE = re.compile(r"^[a-zA-Z_:][a-zA-Z0-9_:]*$")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: tuple = ()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    TYPE = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        if not _NAME_RE.match(name):
+            raise ValueError(f"Nome de métrica inválido: '{name}'.")
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"'{self.name}' espera os rótulos {self.labelnames}, recebeu {tuple(labels)}.")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.TYPE}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class _ThreadCells:
+    """
+    Uma célula (dict) por thread; só a thread dona escreve nela. A célula de uma thread encerrada
+    é somada a uma célula base com merge(base, célula) e descartada, então o número de células
+    acompanha as threads vivas, não todas as que já incrementaram a métrica.
+    """
+
+    def __init__(self, merge):
+        self._merge = merge # Deve reatribuir as chaves da base, sem alterar valores no lugar
+        self._local = threading.local()
+        self._cells = [] # (thread, célula)
+        self._base = {}
+        self._lock = threading.Lock() # Só no primeiro uso de cada thread e na leitura
+
+    def cell(self) -> dict:
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = self._local.cell = {}
+            with self._lock:
+                self._fold_finished()
+                self._cells.append((threading.current_thread(), cell))
+            return cell
+
+    def _fold_finished(self):
+        """Com o lock: uma thread encerrada não escreve mais, então sua célula pode ir para a base."""
+        alive = []
+        for thread, cell in self._cells:
+            if thread.is_alive():
+                alive.append((thread, cell))
+            else:
+                self._merge(self._base, cell)
+        self._cells = alive
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._cells)
+
+    def snapshots(self) -> list[dict]:
+        with self._lock:
+            self._fold_finished()
+            cells = [cell for _, cell in self._cells]
+            base = dict(self._base)
+        return [base] + [dict(cell) for cell in cells] # dict(cell) copia de uma vez, sob o GIL
+
+
+def _add_values(base: dict, cell: dict):
+    for key, value in cell.items():
+        base[key] = base.get(key, 0) + value
+
+
+def _add_states(base: dict, cell: dict):
+    for key, state in cell.items():
+        previous = base.get(key)
+        base[key] = list(state) if previous is None else [a + b for a, b in zip(previous, state)]
+
+
+class Counter(_Metric):
+    TYPE = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._cells = _ThreadCells(_add_values)
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Contadores só aumentam.")
+        key = self._key(labels)
+        cell = self._cells.cell()
+        cell[key] = cell.get(key, 0) + amount
+
+    def values(self) -> dict:
+        totals = {}
+        for snapshot in self._cells.snapshots():
+            for key, value in snapshot.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def value(self, **labels) -> float:
+        return self.values().get(self._key(labels), 0)
+
+    def _samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self.values().items())]
+
+
+class Histogram(_Metric):
+    TYPE = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._cells = _ThreadCells(_add_states)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        cell = self._cells.cell()
+        state = cell.get(key)
+        if state is None:
+            # [contagem por faixa..., +Inf, soma]; as faixas são acumuladas só na leitura
+            state = cell[key] = [0] * (len(self.buckets) + 2)
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def values(self) -> dict:
+        """rótulos -> (contagens por faixa não acumuladas incluindo +Inf, soma)."""
+        totals = {}
+        for snapshot in self._cells.snapshots():
+            for key, state in snapshot.items():
+                state = list(state)
+                if key in totals:
+                    totals[key] = [a + b for a, b in zip(totals[key], state)]
+                else:
+                    totals[key] = state
+        return {key: (state[:-1], state[-1]) for key, state in totals.items()}
+
+    def _samples(self) -> list[str]:
+        lines = []
+        for key, (counts, total) in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, (("le", _format_value(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    TYPE = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self._functions = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, func, **labels):
+        """O valor é lido de func() a cada exposição (ex: tamanho de uma fila)."""
+        with self._lock:
+            self._functions[self._key(labels)] = func
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        with self._lock:
+            func = self._functions.get(key)
+            return func() if func is not None else self._values.get(key, 0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, func in functions.items():
+            try:
+                values[key] = func()
+            except Exception:
+                continue # Uma função com erro não derruba a exposição inteira
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: tuple, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, tuple(labelnames), **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Métrica '{name}' já registrada com outro tipo ou rótulos.")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Exposição em texto (text/plain; version=0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        """Grava a exposição atomicamente (arquivo temporário + rename), como o textfile collector exige."""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".shamann_metrics_", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+
+REGISTRY = MetricsRegistry()
+
+# --- Métricas do Shamann ---
+SCANS_STARTED = REGISTRY.counter("shamann_scans_started_total", "Execuções de guardiões iniciadas.", ("guardian",))
+SCANS_FINISHED = REGISTRY.counter("shamann_scans_finished_total", "Execuções de guardiões terminadas, por status.",
+                                  ("guardian", "status"))
+SCAN_DURATION = REGISTRY.histogram("shamann_scan_duration_seconds", "Duração das execuções de guardiões.", ("guardian",))
+SCAN_HOSTS = REGISTRY.histogram("shamann_scan_hosts", "Hosts encontrados por scan.", ("guardian",), COUNT_BUCKETS)
+SCAN_PORTS = REGISTRY.histogram("shamann_scan_ports", "Portas encontradas por scan.", ("guardian",), COUNT_BUCKETS)
+SCAN_ALERTS = REGISTRY.histogram("shamann_scan_alerts", "Alertas gerados por scan.", ("guardian",), COUNT_BUCKETS)
+RULE_EVALUATIONS = REGISTRY.counter("shamann_rule_evaluations_total", "Avaliações de regras de alerta.")
+RULE_ERRORS = REGISTRY.counter("shamann_rule_errors_total", "Regras de alerta que falharam ao avaliar.")
+DB_COMMIT_SECONDS = REGISTRY.histogram("shamann_db_commit_seconds", "Latência dos commits no SQLite.", ("operation",),
+                                       (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+HTTP_REQUESTS = REGISTRY.counter("shamann_http_requests_total",
+                                 "Requisições HTTP dos guardiões de fuzzing, por resultado (hit, miss, error).",
+                                 ("guardian", "outcome"))
+
+
+def record_scan_result(guardian: str, status: str, duration: float, result: dict = None):
+    """Registra o término de uma execução: status, duração e hosts/portas/alertas do resultado (se houver)."""
+    SCANS_FINISHED.inc(guardian=guardian, status=status)
+    SCAN_DURATION.observe(duration, guardian=guardian)
+    scan_results = (result or {}).get("scan_results", result or {})
+    hosts = scan_results.get("hosts") if isinstance(scan_results, dict) else None
+    if isinstance(hosts, list):
+        SCAN_HOSTS.observe(len(hosts), guardian=guardian)
+        SCAN_PORTS.observe(sum(len(host.get("ports", [])) for host in hosts if isinstance(host, dict)), guardian=guardian)
+        SCAN_ALERTS.observe(sum(len(host.get("alerts", [])) for host in hosts if isinstance(host, dict)), guardian=guardian)
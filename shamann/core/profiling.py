@@ -0,0 +1,331 @@
+# shamann/core/profiling.py
+"""
+Perfilamento sob demanda (cProfile e, opcionalmente, tracemalloc) da execução inteira ou de etapas.
+
+Uso:
+    with Profiler("output/profiles", stages=["nmap.*", "classify_alerts"], memory_top=10) as profiler:
+        ...
+    print(profiler.report())
+
+Sem `stages`, o bloco inteiro é uma etapa "run". Com `stages` (padrões fnmatch), é perfilado cada
+span (core.tracing) ou stage() cujo nome casa com um padrão. Se não houver Tracer ativo, o Profiler
+abre um interno (não exportado) para que os spans existam. Para cada etapa são gravados:
+  <rótulo>.<etapa>.pstats     estatísticas do cProfile (pstats, snakeviz)
+  <rótulo>.<etapa>.collapsed  pilhas colapsadas (flamegraph.pl, speedscope); são reconstruídas do
+                              grafo de chamadas do cProfile, então os tempos por pilha são aproximados
+  <rótulo>.<etapa>.memory.txt com memory_top: linhas que mais alocaram durante a etapa
+e <rótulo>.summary.json com as etapas e os hotspots.
+
+Desde o Python 3.12 só um cProfile fica ativo por processo, e ele observa todas as threads. Uma
+etapa que começa enquanto outra está sendo perfilada (aninhada ou em outra thread) já está coberta
+pela primeira e só é contada em "skipped". Cada processo worker perfila o próprio trabalho
+(rótulo com o pid); merge_profiles() junta os arquivos.
+"""
+
+import cProfile
+import contextlib
+import contextvars
+import fnmatch
+import json
+import linecache
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+
+from shamann.core import tracing
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT_DIRECTORY = "./output/profiles"
+DEFAULT_TOP = 20
+MEMORY_FRAMES = 1 # Quadros guardados por alocação (1 = só a linha que alocou, o mais barato)
+COLLAPSED_MAX_DEPTH = 64
+COLLAPSED_MIN_SECONDS = 1e-6 # Ramos menores que isso não são expandidos nas pilhas colapsadas
+
+_current_profiler = contextvars.ContextVar("shamann_current_profiler", default=None)
+
+
+def _function_label(func: tuple) -> str:
+    filename, line, name = func
+    if filename == "~": # Funções embutidas: o nome já diz tudo ("<built-in method time.sleep>")
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def collapsed_stacks(stats: pstats.Stats) -> dict:
+    """
+    Pilhas colapsadas {"raiz;...;função": segundos} a partir do grafo de chamadas do cProfile.
+    O tempo de cada função é repartido entre os chamadores na proporção das chamadas registradas em
+    cada aresta; recursões são cortadas na primeira repetição.
+    """
+    callees = {}
+    for func, (_cc, _nc, _tt, _ct, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[2], edge[3]))
+    stacks = {}
+
+    def walk(func, path, on_stack, self_time, total_time):
+        path = path + (_function_label(func),)
+        key = ";".join(path)
+        stacks[key] = stacks.get(key, 0.0) + self_time
+        func_total = stats.stats[func][3]
+        if len(path) >= COLLAPSED_MAX_DEPTH or not func_total or total_time < COLLAPSED_MIN_SECONDS:
+            return
+        scale = total_time / func_total
+        for callee, edge_tt, edge_ct in callees.get(func, ()):
+            if callee not in on_stack:
+                walk(callee, path, on_stack | {callee}, edge_tt * scale, edge_ct * scale)
+
+    for func, (_cc, _nc, tt, ct, callers) in stats.stats.items():
+        if not callers:
+            walk(func, (), {func}, tt, ct)
+    return {stack: seconds for stack, seconds in stacks.items() if seconds > 0}
+
+
+def hotspots(stats_by_stage: dict, top: int = DEFAULT_TOP) -> list[dict]:
+    """Funções com mais tempo próprio (tottime) entre todas as etapas {etapa: pstats.Stats}."""
+    rows = []
+    for stage, stats in stats_by_stage.items():
+        for func, (_cc, nc, tt, ct, _callers) in stats.stats.items():
+            rows.append({"stage": stage, "function": _function_label(func), "calls": nc,
+                         "tottime": round(tt, 6), "cumtime": round(ct, 6)})
+    rows.sort(key=lambda row: row["tottime"], reverse=True)
+    return rows[:top]
+
+
+def format_hotspots(rows: list[dict], title: str = "Hotspots (tempo próprio)") -> str:
+    lines = [title, f"  {'#':>3} {'próprio (s)':>12} {'acumulado (s)':>14} {'chamadas':>10}  {'etapa':<20} função"]
+    for position, row in enumerate(rows, 1):
+        lines.append(f"  {position:>3} {row['tottime']:>12.4f} {row['cumtime']:>14.4f} {row['calls']:>10}  "
+                     f"{row['stage']:<20} {row['function']}")
+    return "\n".join(lines)
+
+
+def merge_profiles(paths: list[str]) -> pstats.Stats | None:
+    """Junta arquivos .pstats (ex: um por processo worker) em um único pstats.Stats."""
+    paths = [path for path in paths if os.path.exists(path)]
+    if not paths:
+        return None
+    return pstats.Stats(*paths)
+
+
+def _safe_filename(name: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", name).strip("._") or "stage"
+
+
+def _memory_snapshot() -> tracemalloc.Snapshot:
+    """Snapshot sem as alocações do próprio perfilador (tracemalloc, cProfile, pstats)."""
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, cProfile.__file__),
+        tracemalloc.Filter(False, pstats.__file__), tracemalloc.Filter(False, __file__)])
+
+
+def current_profiler():
+    """Profiler ativo neste contexto, ou None."""
+    return _current_profiler.get()
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """Marca uma etapa que não é um span (ex: a execução de um guardião); sem Profiler ativo, não faz nada."""
+    profiler = _current_profiler.get()
+    if profiler is None or not profiler.matches(name):
+        yield
+        return
+    owner = object()
+    began = profiler._begin(owner, name)
+    try:
+        yield
+    finally:
+        if began:
+            profiler._end(owner)
+
+
+class Profiler:
+    """
+    :param output_directory: Onde gravar os arquivos de cada etapa (criado ao final).
+    :param stages: Padrões fnmatch das etapas a perfilar; vazio = o bloco inteiro.
+    :param memory_top: Se > 0, amostra as alocações (tracemalloc) e guarda as N linhas que mais alocaram.
+    :param top: Linhas do resumo de hotspots.
+    :param label: Prefixo dos arquivos (ex: "worker_1234", "job_abc").
+    """
+
+    def __init__(self, output_directory: str = DEFAULT_OUTPUT_DIRECTORY, stages: list = None, memory_top: int = 0,
+                 top: int = DEFAULT_TOP, label: str = "shamann"):
+        self.output_directory = output_directory
+        self.stages = list(stages or [])
+        self.memory_top = memory_top
+        self.top = top
+        self.label = label
+        self.results = {} # etapa -> {"calls", "seconds", "stats", "memory"}
+        self.skipped = {} # etapa -> vezes em que não pôde ser perfilada separadamente
+        self.files = []
+        self._active = None # (dono, etapa, cProfile, início, snapshot)
+        self._lock = threading.Lock()
+        self._tokens = []
+        self._tracer = None
+        self._owns_tracemalloc = False
+
+    def matches(self, name: str) -> bool:
+        return any(fnmatch.fnmatchcase(name, pattern) for pattern in self.stages)
+
+    # --- Observador de spans (core.tracing) ---
+
+    def span_started(self, span):
+        if self.stages and self.matches(span.name):
+            self._begin(span, span.name)
+
+    def span_finished(self, span):
+        self._end(span)
+
+    # --- Etapas ---
+
+    def _begin(self, owner, name: str) -> bool:
+        with self._lock:
+            if self._active is not None:
+                self.skipped[name] = self.skipped.get(name, 0) + 1
+                return False
+            snapshot = _memory_snapshot() if self.memory_top and tracemalloc.is_tracing() else None
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as e:
+                # Outro perfilador (outro job, um depurador, coverage) já está ativo neste processo
+                logger.warning(f"Etapa '{name}' não será perfilada: {e}.")
+                self.skipped[name] = self.skipped.get(name, 0) + 1
+                return False
+            self._active = (owner, name, profile, time.perf_counter(), snapshot)
+            return True
+
+    def _end(self, owner):
+        with self._lock:
+            if self._active is None or self._active[0] is not owner:
+                return
+            _owner, name, profile, started, snapshot = self._active
+            profile.disable()
+            self._active = None
+            elapsed = time.perf_counter() - started
+            finished = _memory_snapshot() if snapshot is not None else None
+            result = self.results.setdefault(name, {"calls": 0, "seconds": 0.0, "stats": None, "memory": {}})
+            result["calls"] += 1
+            result["seconds"] += elapsed
+            if result["stats"] is None:
+                result["stats"] = pstats.Stats(profile)
+            else:
+                result["stats"].add(profile)
+            if snapshot is not None:
+                for diff in finished.compare_to(snapshot, "lineno"):
+                    if diff.size_diff > 0:
+                        frame = diff.traceback[0]
+                        location = f"{frame.filename}:{frame.lineno}"
+                        size, count = result["memory"].get(location, (0, 0))
+                        result["memory"][location] = (size + diff.size_diff, count + diff.count_diff)
+
+    def __enter__(self):
+        if self.memory_top and not tracemalloc.is_tracing():
+            tracemalloc.start(MEMORY_FRAMES)
+            self._owns_tracemalloc = True
+        self._tokens.append(_current_profiler.set(self))
+        if self.stages:
+            if tracing._current_span.get() is None:
+                self._tracer = tracing.Tracer(f"profile.{self.label}")
+                self._tracer.__enter__()
+            self._tokens.append(tracing._span_observer.set(self))
+        else:
+            self._begin(self, "run")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.stages:
+            self._end(self)
+        else:
+            tracing._span_observer.reset(self._tokens.pop())
+            if self._active is not None: # Etapa interrompida por exceção
+                self._end(self._active[0])
+            if self._tracer is not None:
+                self._tracer.__exit__(exc_type, exc, tb)
+                self._tracer = None
+        _current_profiler.reset(self._tokens.pop())
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+        try:
+            self.write()
+        except OSError as e:
+            logger.warning(f"Não foi possível gravar os perfis em '{self.output_directory}': {e}")
+        return False
+
+    # --- Saída ---
+
+    def hotspots(self, top: int = None) -> list[dict]:
+        return hotspots({name: result["stats"] for name, result in self.results.items()}, top or self.top)
+
+    def memory_hotspots(self, name: str, top: int = None) -> list[dict]:
+        memory = self.results[name]["memory"]
+        ranked = sorted(memory.items(), key=lambda item: item[1][0], reverse=True)[:top or self.memory_top]
+        return [{"location": location, "size_bytes": size, "count": count} for location, (size, count) in ranked]
+
+    def summary(self) -> dict:
+        stages = {}
+        for name, result in self.results.items():
+            stages[name] = {"calls": result["calls"], "seconds": round(result["seconds"], 6)}
+            if self.memory_top:
+                stages[name]["memory"] = self.memory_hotspots(name)
+        return {"label": self.label, "output_directory": self.output_directory, "stages": stages,
+                "skipped": dict(self.skipped), "hotspots": self.hotspots(), "files": list(self.files)}
+
+    def write(self):
+        """Grava .pstats, .collapsed e .memory.txt de cada etapa e o resumo em JSON."""
+        if not self.results:
+            return
+        os.makedirs(self.output_directory, exist_ok=True)
+        prefix = os.path.join(self.output_directory, _safe_filename(self.label))
+        for name, result in self.results.items():
+            base = f"{prefix}.{_safe_filename(name)}"
+            result["stats"].dump_stats(f"{base}.pstats")
+            with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+                for stack, seconds in sorted(collapsed_stacks(result["stats"]).items()):
+                    microseconds = round(seconds * 1e6)
+                    if microseconds:
+                        f.write(f"{stack} {microseconds}\n")
+            self.files += [f"{base}.pstats", f"{base}.collapsed"]
+            if self.memory_top:
+                with open(f"{base}.memory.txt", "w", encoding="utf-8") as f:
+                    for row in self.memory_hotspots(name):
+                        filename, _, lineno = row["location"].rpartition(":")
+                        source = linecache.getline(filename, int(lineno)).strip()
+                        f.write(f"{row['size_bytes'] / 1024:10.1f} KiB {row['count']:>8} blocos  {row['location']}  {source}\n")
+                self.files.append(f"{base}.memory.txt")
+        self.files.append(f"{prefix}.summary.json")
+        with open(f"{prefix}.summary.json", "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2, ensure_ascii=False)
+
+    def report(self) -> str:
+        """Resumo legível: tempo por etapa, etapas não isoladas, hotspots e (com memory_top) alocações."""
+        lines = [f"Perfil '{self.label}' gravado em {self.output_directory}"]
+        for name, result in self.results.items():
+            lines.append(f"  etapa {name:<28} {result['calls']:>4} execução(ões) {result['seconds']:>10.3f}s")
+        for name, count in self.skipped.items():
+            lines.append(f"  etapa {name:<28} {count:>4} vez(es) dentro de outra etapa perfilada (sem arquivo próprio)")
+        if not self.results:
+            lines.append("  nenhuma etapa perfilada (verifique os padrões de --profile)")
+            return "\n".join(lines)
+        lines.append(format_hotspots(self.hotspots()))
+        if self.memory_top:
+            for name in self.results:
+                lines.append(f"Alocações em '{name}' (top {self.memory_top}):")
+                lines += [f"  {row['size_bytes'] / 1024:10.1f} KiB  {row['location']}" for row in self.memory_hotspots(name)]
+        return "\n".join(lines)
+
+
+def profiler_from_settings(settings: dict, label: str = "shamann", **overrides) -> Profiler:
+    """Cria um Profiler a partir da seção "profiling" da configuração (overrides têm prioridade)."""
+    options = {"output_directory": settings.get("output_directory", DEFAULT_OUTPUT_DIRECTORY),
+               "stages": settings.get("stages") or [], "memory_top": settings.get("memory_top", 0),
+               "top": settings.get("top", DEFAULT_TOP)}
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    return Profiler(label=label, **options)
@@ -0,0 +1,236 @@
+# shamann/core/scheduler.py
+"""
+Agendador de jobs recorrentes do daemon.
+
+Agendas aceitas:
+  - expressões cron de 5 campos ("min hora dia mês dia-da-semana"), com '*', listas, faixas e passos
+    ("*/15 8-18 * * 1-5");
+  - atalhos @hourly, @daily (@midnight), @weekly, @monthly, @yearly (@annually);
+  - intervalos fixos "@every 90s", "@every 15m", "@every 6h", "@every 1d".
+
+Cada job pode ter um jitter (atraso aleatório de até N segundos) para espalhar scans que venceriam
+juntos, e nunca roda sobreposto a si mesmo: se a execução anterior ainda não terminou quando o job
+vence, a rodada é pulada (e contabilizada).
+"""
+
+import logging
+import random
+import re
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+CRON_ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+_FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)] # minuto, hora, dia, mês, dia da semana (0 e 7 = domingo)
+_INTERVAL_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+class ScheduleError(ValueError):
+    """Expressão de agenda inválida."""
+
+
+def _parse_field(field: str, low: int, high: int) -> set:
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ScheduleError(f"Passo inválido em '{field}'.")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(v) for v in part.split("-", 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ScheduleError(f"Valor fora do intervalo {low}-{high} em '{field}'.")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Agenda cron (ou intervalo fixo com '@every'). next_after(dt) retorna o próximo horário > dt."""
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        self.interval = None
+        match = re.fullmatch(r"@every\s+(\d+)\s*([smhd])", self.expression)
+        if match:
+            self.interval = timedelta(seconds=int(match.group(1)) * _INTERVAL_UNITS[match.group(2)])
+            if not self.interval:
+                raise ScheduleError("Intervalo '@every' deve ser maior que zero.")
+            return
+        fields = CRON_ALIASES.get(self.expression, self.expression).split()
+        if len(fields) != 5:
+            raise ScheduleError(f"Expressão cron deve ter 5 campos: '{expression}'.")
+        try:
+            self.minutes, self.hours, self.days, self.months, weekdays = (
+                _parse_field(field, *_FIELD_RANGES[i]) for i, field in enumerate(fields))
+        except ValueError as e:
+            raise ScheduleError(f"Expressão cron inválida '{expression}': {e}") from e
+        self.weekdays = {day % 7 for day in weekdays}
+        # Semântica do cron: se dia do mês e dia da semana forem restritos, basta um dos dois casar
+        self._day_restricted = fields[2] != "*"
+        self._weekday_restricted = fields[4] != "*"
+
+    def _day_matches(self, dt: datetime) -> bool:
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.weekday() + 1) % 7 in self.weekdays
+        if self._day_restricted and self._weekday_restricted:
+            return day_ok or weekday_ok
+        return day_ok and weekday_ok
+
+    def next_after(self, dt: datetime) -> datetime:
+        if self.interval is not None:
+            return dt + self.interval
+        candidate = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5) # Ex: 30 de fevereiro nunca casa
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = (candidate.year + 1, 1) if candidate.month == 12 else (candidate.year, candidate.month + 1)
+                candidate = candidate.replace(year=year, month=month, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ScheduleError(f"A agenda '{self.expression}' nunca ocorre.")
+
+
+class ScheduledJob:
+    """Um job recorrente: o que executar (spec, repassado ao submit do daemon) e quando."""
+
+    def __init__(self, name: str, schedule: str, spec: dict, jitter_seconds: float = 0.0, run_on_start: bool = False):
+        self.name = name
+        self.schedule = CronSchedule(schedule)
+        self.spec = spec
+        self.jitter_seconds = max(0.0, float(jitter_seconds))
+        self.run_on_start = run_on_start
+        self.next_run = None # datetime (hora local)
+        self.running = False
+        self.runs = 0
+        self.skipped = 0
+        self.last_started = None
+        self.last_finished = None
+        self.last_status = None
+
+    @classmethod
+    def from_config(cls, entry: dict) -> "ScheduledJob":
+        spec = {key: entry[key] for key in ("guardian", "target", "options", "timeout", "ports", "reports") if key in entry}
+        return cls(entry["name"], entry["schedule"], spec, entry.get("jitter_seconds", 0), entry.get("run_on_start", False))
+
+    def plan(self, now: datetime):
+        jitter = timedelta(seconds=random.uniform(0, self.jitter_seconds)) if self.jitter_seconds else timedelta()
+        self.next_run = self.schedule.next_after(now) + jitter
+
+    def info(self) -> dict:
+        return {"name": self.name, "schedule": self.schedule.expression, "spec": self.spec,
+                "next_run": self.next_run.isoformat() if self.next_run else None, "running": self.running,
+                "runs": self.runs, "skipped": self.skipped, "last_status": self.last_status,
+                "last_started": self.last_started, "last_finished": self.last_finished}
+
+
+class Scheduler:
+    """
+    Dispara os jobs vencidos em uma thread própria. submit(spec, on_done) deve iniciar a execução
+    sem bloquear e chamar on_done(status) ao terminar; é o que permite evitar sobreposição.
+    """
+
+    MAX_SLEEP = 30.0 # Reavalia periodicamente (ajustes no relógio, jobs novos)
+
+    def __init__(self, jobs: list, submit):
+        self.jobs = {job.name: job for job in jobs}
+        self.submit = submit
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        now = datetime.now()
+        for job in self.jobs.values():
+            if job.run_on_start:
+                job.next_run = now
+            else:
+                job.plan(now)
+        self._thread = threading.Thread(target=self._loop, name="shamann-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Agendador iniciado com {len(self.jobs)} jobs.")
+
+    def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def add(self, job: ScheduledJob):
+        with self._lock:
+            job.plan(datetime.now())
+            self.jobs[job.name] = job
+        self._wakeup.set()
+
+    def remove(self, name: str) -> bool:
+        with self._lock:
+            removed = self.jobs.pop(name, None) is not None
+        self._wakeup.set()
+        return removed
+
+    def list(self) -> list:
+        with self._lock:
+            return [job.info() for job in self.jobs.values()]
+
+    def run_pending(self, now: datetime = None) -> list:
+        """Dispara os jobs vencidos em `now`. Retorna os nomes disparados (usado pelo loop e pelos testes)."""
+        now = now or datetime.now()
+        fired = []
+        with self._lock:
+            due = [job for job in self.jobs.values() if job.next_run is not None and job.next_run <= now]
+            for job in due:
+                job.plan(now)
+                if job.running:
+                    job.skipped += 1
+                    logger.warning(f"Job '{job.name}' ainda em execução; rodada pulada (próxima: {job.next_run:%Y-%m-%d %H:%M:%S}).")
+                    continue
+                job.running = True
+                job.runs += 1
+                job.last_started = now.isoformat()
+                fired.append(job)
+        for job in fired:
+            try:
+                self.submit(dict(job.spec, scheduled_job=job.name), lambda status, job=job: self._finished(job, status))
+            except Exception as e:
+                logger.error(f"Falha ao disparar o job agendado '{job.name}': {e}", exc_info=True)
+                self._finished(job, "error")
+        return [job.name for job in fired]
+
+    def _finished(self, job: ScheduledJob, status: str):
+        with self._lock:
+            job.running = False
+            job.last_status = status
+            job.last_finished = datetime.now().isoformat()
+
+    def _loop(self):
+        while not self._stopping:
+            self.run_pending()
+            with self._lock:
+                upcoming = [job.next_run for job in self.jobs.values() if job.next_run is not None]
+            delay = self.MAX_SLEEP
+            if upcoming:
+                delay = min(delay, max(0.0, (min(upcoming) - datetime.now()).total_seconds()))
+            self._wakeup.wait(delay)
+            self._wakeup.clear()
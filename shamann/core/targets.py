@@ -0,0 +1,376 @@
+# shamann/core/targets.py
+"""
+Expansão de alvos: IPs, CIDRs, ranges e arquivos viram intervalos de inteiros, sem materializar endereços.
+
+Cada família (IPv4, IPv6) é uma lista ordenada de intervalos fechados [início, fim], já mesclados:
+alvos repetidos ou sobrepostos somem na mesclagem e as exclusões são subtração de intervalos. Um /8
+com milhares de exclusões ocupa alguns milhares de intervalos, não 16 milhões de strings.
+
+Formas aceitas (separadas por vírgula, espaço ou quebra de linha):
+    10.0.0.1             10.0.0.0/24              2001:db8::/120
+    10.0.0.1-20          10.0.0.1-10.0.1.255      10.0.0-3.*   (octetos no estilo do Nmap)
+    alvos.txt            (arquivo existente: um alvo por linha, '#' comenta)
+    scanme.example.org   (hostnames seguem como estão, sem repetição)
+
+    targets = TargetSet.parse("10.0.0.0/8", exclude="10.1.0.0/16,excluidos.txt")
+    targets.size                                      # endereços (hostnames não contam)
+    targets.addresses()                               # gerador, em ordem crescente
+    targets.addresses("random", seed=7)               # permutação pseudoaleatória, sem materializar
+    targets.addresses("random", seed=7, shard=(2, 8)) # terceira de 8 fatias disjuntas da mesma ordem
+    targets.shards(8)                                 # 8 TargetSets contíguos, de tamanhos iguais (±1)
+    targets.to_nmap()                                 # CIDRs mínimos + hostnames, para a linha de comando
+
+A ordem aleatória é uma rede de Feistel sobre o índice (0..size-1) com cycle-walking (ver Permutation):
+cada posição é calculada na hora, então a memória não depende do tamanho e a mesma seed reproduz a
+mesma ordem, o que também permite fatiar a ordem entre workers.
+"""
+
+import bisect
+import ipaddress
+import itertools
+import logging
+import os
+import random
+import re
+
+logger = logging.getLogger(__name__)
+
+ORDERS = ("sequential", "random")
+MAX_OCTET_BLOCKS = 65536 # Blocos /24 gerados por um alvo com ranges nos três primeiros octetos
+_SEPARATORS = re.compile(r"[,\s]+")
+_NUMERIC = re.compile(r"[\d.*-]+") # Parece IPv4 no estilo do Nmap: se não interpretar, é erro, não hostname
+_OCTET = re.compile(r"(\d{1,3})(?:-(\d{1,3}))?")
+_MASK64 = (1 << 64) - 1
+
+
+class TargetError(ValueError):
+    """Alvo ou exclusão que não pode ser interpretado."""
+
+
+class IntervalSet:
+    """
+    Intervalos fechados de inteiros, ordenados e disjuntos (sobrepostos e adjacentes são unidos).
+    offsets[i] é quantos valores existem antes do intervalo i: o valor de um índice sai por busca binária.
+    """
+    __slots__ = ("starts", "ends", "offsets", "size")
+
+    def __init__(self, intervals=()):
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+        self.offsets = []
+        total = 0
+        for start, end in merged:
+            self.offsets.append(total)
+            total += end - start + 1
+        self.size = total
+
+    def __contains__(self, value: int) -> bool:
+        i = bisect.bisect_right(self.starts, value) - 1
+        return i >= 0 and value <= self.ends[i]
+
+    def intervals(self):
+        return zip(self.starts, self.ends)
+
+    def values(self):
+        for start, end in self.intervals():
+            yield from range(start, end + 1)
+
+    def at(self, index: int) -> int:
+        """Valor na posição index da ordem crescente."""
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        i = bisect.bisect_right(self.offsets, index) - 1
+        return self.starts[i] + index - self.offsets[i]
+
+    def slice(self, lo: int, hi: int) -> "IntervalSet":
+        """Valores das posições [lo, hi), ainda como intervalos."""
+        lo, hi = max(lo, 0), min(hi, self.size)
+        if lo >= hi:
+            return IntervalSet()
+        first = bisect.bisect_right(self.offsets, lo) - 1
+        last = bisect.bisect_right(self.offsets, hi - 1) - 1
+        parts = [[self.starts[i], self.ends[i]] for i in range(first, last + 1)]
+        parts[0][0] += lo - self.offsets[first]
+        parts[-1][1] = self.starts[last] + hi - 1 - self.offsets[last]
+        return IntervalSet(parts)
+
+    def subtract(self, other: "IntervalSet") -> "IntervalSet":
+        result = []
+        j = 0
+        for start, end in self.intervals():
+            while j < len(other.ends) and other.ends[j] < start:
+                j += 1
+            k = j
+            while start <= end and k < len(other.starts) and other.starts[k] <= end:
+                if other.starts[k] > start:
+                    result.append((start, other.starts[k] - 1))
+                start = max(start, other.ends[k] + 1)
+                k += 1
+            if start <= end:
+                result.append((start, end))
+        return IntervalSet(result)
+
+
+class Permutation:
+    """
+    Bijeção pseudoaleatória de [0, size) nele mesmo, calculada posição a posição.
+    Feistel balanceada de 4 rodadas sobre o menor número par de bits que cobre size; um valor fora
+    do intervalo é cifrado de novo (cycle-walking) até cair dentro. O domínio da cifra tem menos de
+    4×size valores, então são poucas voltas por posição em média. Sem seed, uma é sorteada e fica
+    em self.seed para a ordem poder ser repetida.
+    """
+    ROUNDS = 4
+
+    def __init__(self, size: int, seed: int = None):
+        self.size = size
+        self.seed = random.SystemRandom().getrandbits(32) if seed is None else seed
+        bits = max(2, (size - 1).bit_length())
+        self.half = (bits + 1) // 2
+        if self.half > 64:
+            raise TargetError("A ordem aleatória é limitada a 2^128 endereços.")
+        self.mask = (1 << self.half) - 1
+        rng = random.Random(self.seed)
+        self.keys = tuple(rng.getrandbits(64) for _ in range(self.ROUNDS))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, position: int) -> int:
+        if not 0 <= position < self.size:
+            raise IndexError(position)
+        value = position
+        while True:
+            value = self._encrypt(value)
+            if value < self.size:
+                return value
+
+    def __iter__(self):
+        return (self[position] for position in range(self.size))
+
+    def _encrypt(self, value: int) -> int:
+        half, mask = self.half, self.mask
+        left, right = value >> half, value & mask
+        for key in self.keys:
+            left, right = right, left ^ (_mix(right ^ key) & mask)
+        return (left << half) | right
+
+
+def _mix(value: int) -> int:
+    """Finalizador do splitmix64: espalha cada bit de entrada por toda a saída."""
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+class TargetSet:
+    """
+    Alvos expandidos: endereços IPv4 e IPv6 como IntervalSet e hostnames na ordem em que apareceram.
+    Os índices dos endereços seguem a ordem crescente, IPv4 antes de IPv6.
+    """
+    __slots__ = ("ipv4", "ipv6", "names")
+
+    def __init__(self, ipv4: IntervalSet = None, ipv6: IntervalSet = None, names=()):
+        self.ipv4 = ipv4 if ipv4 is not None else IntervalSet()
+        self.ipv6 = ipv6 if ipv6 is not None else IntervalSet()
+        self.names = tuple(names)
+
+    @classmethod
+    def parse(cls, targets, exclude=None) -> "TargetSet":
+        """
+        targets e exclude: string (itens separados por vírgula ou espaço) ou lista de strings;
+        um item que é um arquivo existente é lido linha a linha. Levanta TargetError.
+        """
+        included = cls._collect(targets)
+        if not exclude:
+            return included
+        excluded = cls._collect(exclude)
+        result = included.exclude(excluded)
+        logger.debug(f"Alvos: {included.size} endereços, {result.size} depois das exclusões.")
+        return result
+
+    @classmethod
+    def _collect(cls, targets) -> "TargetSet":
+        families = {4: [], 6: []}
+        names = {}
+        for token in _tokens(targets):
+            parsed = _parse_token(token)
+            if parsed is None:
+                names[token] = None
+            else:
+                families[parsed[0]].extend(parsed[1])
+        return cls(IntervalSet(families[4]), IntervalSet(families[6]), names)
+
+    @property
+    def size(self) -> int:
+        return self.ipv4.size + self.ipv6.size
+
+    def __bool__(self) -> bool:
+        return bool(self.size or self.names)
+
+    def __contains__(self, target: str) -> bool:
+        try:
+            address = ipaddress.ip_address(target)
+        except ValueError:
+            return target in self.names
+        return int(address) in (self.ipv4 if address.version == 4 else self.ipv6)
+
+    def exclude(self, other: "TargetSet") -> "TargetSet":
+        removed = set(other.names)
+        return TargetSet(self.ipv4.subtract(other.ipv4), self.ipv6.subtract(other.ipv6),
+                         [name for name in self.names if name not in removed])
+
+    def at(self, index: int) -> str:
+        if index < self.ipv4.size:
+            return _format_ipv4(self.ipv4.at(index))
+        return str(ipaddress.IPv6Address(self.ipv6.at(index - self.ipv4.size)))
+
+    def slice(self, lo: int, hi: int) -> "TargetSet":
+        """Endereços das posições [lo, hi) da ordem crescente (sem hostnames)."""
+        border = self.ipv4.size
+        return TargetSet(self.ipv4.slice(lo, hi), self.ipv6.slice(lo - border, hi - border))
+
+    def addresses(self, order: str = "sequential", seed: int = None, shard: tuple = None):
+        """
+        Gerador dos endereços como strings. shard=(i, n) limita à i-ésima de n fatias de tamanhos
+        iguais (±1) da ordem escolhida; com a mesma seed, as fatias são disjuntas e cobrem tudo.
+        """
+        if order not in ORDERS:
+            raise ValueError(f"Ordem desconhecida: '{order}' (use {', '.join(ORDERS)})")
+        lo, hi = _shard_bounds(self.size, shard)
+        if order == "sequential":
+            part = self.slice(lo, hi)
+            return itertools.chain(map(_format_ipv4, part.ipv4.values()),
+                                   (str(ipaddress.IPv6Address(value)) for value in part.ipv6.values()))
+        permutation = Permutation(self.size, seed)
+        return (self.at(permutation[position]) for position in range(lo, hi))
+
+    def shards(self, count: int) -> list["TargetSet"]:
+        """Divide em count partes contíguas de tamanhos iguais (±1); os hostnames são distribuídos em rodízio."""
+        return [TargetSet(*self.slice(*_shard_bounds(self.size, (i, count)))._families(), self.names[i::count])
+                for i in range(count)]
+
+    def chunks(self, size: int):
+        """Gerador de TargetSets contíguos de até size endereços (sem hostnames)."""
+        if size < 1:
+            raise ValueError("size deve ser positivo")
+        for lo in range(0, self.size, size):
+            yield self.slice(lo, lo + size)
+
+    def to_nmap(self) -> list[str]:
+        """Menor lista de CIDRs que cobre os endereços, seguida dos hostnames. Blocos de 1 ou 2 endereços saem como IPs."""
+        rendered = []
+        for address_cls, intervals in ((ipaddress.IPv4Address, self.ipv4), (ipaddress.IPv6Address, self.ipv6)):
+            for start, end in intervals.intervals():
+                for network in ipaddress.summarize_address_range(address_cls(start), address_cls(end)):
+                    if network.num_addresses <= 2:
+                        rendered.extend(str(address) for address in (network.network_address,
+                                                                     network.broadcast_address)[:network.num_addresses])
+                    else:
+                        rendered.append(str(network))
+        rendered.extend(self.names)
+        return rendered
+
+    def summary(self) -> dict:
+        return {"addresses": self.size, "ipv4": self.ipv4.size, "ipv6": self.ipv6.size, "hostnames": len(self.names),
+                "intervals": len(self.ipv4.starts) + len(self.ipv6.starts)}
+
+    def _families(self) -> tuple:
+        return self.ipv4, self.ipv6
+
+
+def _tokens(targets):
+    """Itens de uma string ou lista; um item que é arquivo vira as linhas do arquivo (sem recursão)."""
+    items = [targets] if isinstance(targets, str) else targets
+    for item in items:
+        for token in _SEPARATORS.split(str(item).strip()):
+            if not token:
+                continue
+            if not _NUMERIC.fullmatch(token) and ":" not in token and os.path.isfile(token):
+                yield from _file_tokens(token)
+            else:
+                yield token
+
+
+def _file_tokens(path: str):
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    yield from (token for token in _SEPARATORS.split(line) if token)
+    except OSError as e:
+        raise TargetError(f"Não foi possível ler o arquivo de alvos '{path}': {e}") from None
+
+
+def _parse_token(token: str):
+    """(família, [(início, fim), ...]) para endereços, ranges e CIDRs; None para hostnames."""
+    if "/" in token:
+        try:
+            network = ipaddress.ip_network(token, strict=False)
+        except ValueError:
+            raise TargetError(f"CIDR inválido: '{token}'") from None
+        return network.version, [(int(network.network_address), int(network.broadcast_address))]
+    try:
+        address = ipaddress.ip_address(token)
+    except ValueError:
+        pass
+    else:
+        return address.version, [(int(address), int(address))]
+    if "-" in token:
+        first, _, last = token.partition("-")
+        try:
+            start, end = ipaddress.ip_address(first), ipaddress.ip_address(last)
+        except ValueError:
+            pass
+        else:
+            if start.version != end.version or start > end:
+                raise TargetError(f"Range inválido: '{token}'")
+            return start.version, [(int(start), int(end))]
+    if _NUMERIC.fullmatch(token):
+        return 4, _octet_ranges(token)
+    if ":" in token and "." not in token:
+        raise TargetError(f"Endereço IPv6 inválido: '{token}'")
+    return None
+
+
+def _octet_ranges(token: str) -> list[tuple[int, int]]:
+    """Ranges por octeto no estilo do Nmap (10.0.0.1-20, 10.0-3.*.1): um intervalo por bloco /24."""
+    parts = token.split(".")
+    if len(parts) != 4:
+        raise TargetError(f"Alvo inválido: '{token}'")
+    ranges = []
+    for part in parts:
+        match = _OCTET.fullmatch(part)
+        if part == "*":
+            ranges.append((0, 255))
+        elif match and int(match[1]) <= int(match[2] or match[1]) <= 255:
+            ranges.append((int(match[1]), int(match[2] or match[1])))
+        else:
+            raise TargetError(f"Octeto inválido em '{token}': '{part}'")
+    blocks = 1
+    for low, high in ranges[:3]:
+        blocks *= high - low + 1
+    if blocks > MAX_OCTET_BLOCKS:
+        raise TargetError(f"'{token}' gera {blocks} blocos /24; use CIDR para redes grandes.")
+    low, high = ranges[3]
+    return [((a << 24) | (b << 16) | (c << 8) | low, (a << 24) | (b << 16) | (c << 8) | high)
+            for a, b, c in itertools.product(*(range(lo, hi + 1) for lo, hi in ranges[:3]))]
+
+
+def _shard_bounds(size: int, shard: tuple = None) -> tuple[int, int]:
+    if shard is None:
+        return 0, size
+    index, count = shard
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Fatia inválida: {index} de {count}")
+    return size * index // count, size * (index + 1) // count
+
+
+def _format_ipv4(value: int) -> str:
+    return f"{value >> 24}.{(value >> 16) & 255}.{(value >> 8) & 255}.{value & 255}"
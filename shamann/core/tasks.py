@@ -0,0 +1,270 @@
+# shamann/core/tasks.py
+"""
+Executor de tarefas de manutenção com dependências (ShamannGuardian, SystemTools).
+
+Cada Task é um comando (subprocesso assíncrono, sem shell) ou uma função Python (executada em
+uma thread), com tempo limite e teto de saída próprios. run_tasks() inicia cada tarefa assim que
+as dependências terminam com sucesso, então tarefas independentes rodam em paralelo e uma
+varredura completa dura o caminho mais longo do grafo, não a soma das tarefas:
+
+    run_tasks([
+        Task("disk", ["df", "-h", "/"], timeout=10),
+        Task("apt_update", ["apt-get", "-y", "update"], timeout=600),
+        Task("apt_upgrade", ["apt-get", "-y", "upgrade"], depends_on=["apt_update"], timeout=3600),
+    ])
+
+O resultado de cada tarefa traz status (success, error, timeout, skipped, cancelled), código de
+saída, início relativo à varredura, duração e stdout/stderr truncados em max_output bytes (o
+total lido fica em *_bytes). Ao estourar o tempo, o grupo de processos inteiro recebe SIGTERM e,
+após alguns segundos, SIGKILL. Funções não podem ser interrompidas: a tarefa é marcada como
+timeout e a thread termina sozinha. Tarefas cujas dependências falharam são puladas.
+"""
+
+import asyncio
+import contextlib
+import graphlib
+import logging
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from shamann.core.tracing import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_MAX_OUTPUT = 64 * 1024 # Bytes guardados de stdout e de stderr, por tarefa
+KILL_GRACE = 3.0 # Segundos entre o SIGTERM e o SIGKILL
+READ_GRACE = 1.0 # Espera pelo fim das saídas depois que o processo termina (netos podem herdar o pipe)
+CANCEL_POLL = 0.1
+
+
+class TaskError(ValueError):
+    """Definição de tarefas inválida (nome repetido, dependência desconhecida ou ciclo)."""
+
+
+class Task:
+    """
+    :param command: argv do subprocesso (lista; sem shell). Exclusivo com func.
+    :param func: Função sem argumentos executada em uma thread; o retorno vai para "output".
+    :param depends_on: Nomes das tarefas que precisam terminar com sucesso antes desta.
+    :param timeout: Segundos até a tarefa ser encerrada (None = sem limite).
+    :param max_output: Bytes de stdout/stderr guardados no resultado.
+    :param ok_returncodes: Códigos de saída considerados sucesso.
+    """
+
+    def __init__(self, name: str, command: list = None, func=None, depends_on=(), timeout: float = DEFAULT_TIMEOUT,
+                 max_output: int = DEFAULT_MAX_OUTPUT, env: dict = None, cwd: str = None, ok_returncodes=(0,)):
+        if (command is None) == (func is None):
+            raise TaskError(f"Tarefa '{name}': informe exatamente um entre command e func.")
+        if command is not None and (isinstance(command, str) or not command):
+            raise TaskError(f"Tarefa '{name}': command deve ser uma lista de argumentos (sem shell).")
+        self.name = name
+        self.command = list(command) if command is not None else None
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.timeout = timeout
+        self.max_output = max_output
+        self.env = env
+        self.cwd = cwd
+        self.ok_returncodes = tuple(ok_returncodes)
+
+
+class _Capture:
+    """Lê um pipe até o fim, guardando só os primeiros `limit` bytes (o resto é lido e descartado)."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.data = bytearray()
+        self.total = 0
+
+    async def drain(self, stream: asyncio.StreamReader):
+        while chunk := await stream.read(65536):
+            self.total += len(chunk)
+            if len(self.data) < self.limit:
+                self.data += chunk[:self.limit - len(self.data)]
+
+    def text(self) -> str:
+        return self.data.decode("utf-8", errors="replace").strip()
+
+
+def _validate(tasks) -> tuple[dict, list]:
+    """Retorna ({nome: Task}, nomes em ordem topológica)."""
+    by_name = {}
+    for task in tasks:
+        if task.name in by_name:
+            raise TaskError(f"Tarefa repetida: '{task.name}'.")
+        by_name[task.name] = task
+    graph = {}
+    for task in by_name.values():
+        unknown = [name for name in task.depends_on if name not in by_name]
+        if unknown:
+            raise TaskError(f"Tarefa '{task.name}' depende de tarefas desconhecidas: {', '.join(unknown)}.")
+        graph[task.name] = task.depends_on
+    try:
+        return by_name, list(graphlib.TopologicalSorter(graph).static_order())
+    except graphlib.CycleError as e:
+        raise TaskError(f"Dependências circulares: {' -> '.join(e.args[1])}.") from None
+
+
+def with_dependencies(tasks, names) -> list:
+    """As tarefas pedidas mais as dependências delas (transitivas), na ordem original."""
+    by_name = {task.name: task for task in tasks}
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise TaskError(f"Tarefas desconhecidas: {', '.join(unknown)}.")
+    wanted, pending = set(), list(names)
+    while pending:
+        name = pending.pop()
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(by_name[name].depends_on)
+    return [task for task in tasks if task.name in wanted]
+
+
+async def _terminate(process: asyncio.subprocess.Process):
+    """SIGTERM no grupo de processos (ex: apt e os dpkg que ele iniciou), SIGKILL se não sair a tempo."""
+    for sig, grace in ((signal.SIGTERM, KILL_GRACE), (signal.SIGKILL, None)):
+        if process.returncode is not None:
+            return
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(process.pid, sig)
+        try:
+            await asyncio.wait_for(process.wait(), grace)
+            return
+        except TimeoutError:
+            continue
+
+
+async def _run_command(task: Task, result: dict):
+    process = await asyncio.create_subprocess_exec(
+        *task.command, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE, env=None if task.env is None else {**os.environ, **task.env},
+        cwd=task.cwd, start_new_session=True)
+    stdout, stderr = _Capture(task.max_output), _Capture(task.max_output)
+    readers = [asyncio.ensure_future(stdout.drain(process.stdout)), asyncio.ensure_future(stderr.drain(process.stderr))]
+    try:
+        await asyncio.wait_for(process.wait(), task.timeout)
+        result["status"] = "success" if process.returncode in task.ok_returncodes else "error"
+    except TimeoutError:
+        result.update(status="timeout", error_message=f"Tempo limite de {task.timeout}s excedido.")
+        await _terminate(process)
+    finally:
+        if process.returncode is None: # Cancelamento
+            await asyncio.shield(_terminate(process))
+        _, pending = await asyncio.wait(readers, timeout=READ_GRACE)
+        for reader in pending:
+            reader.cancel()
+        result.update(returncode=process.returncode, stdout=stdout.text(), stderr=stderr.text(),
+                      stdout_bytes=stdout.total, stderr_bytes=stderr.total,
+                      truncated=stdout.total > task.max_output or stderr.total > task.max_output)
+    if result["status"] == "error":
+        result["error_message"] = f"Código de saída {process.returncode}."
+
+
+def _settle(future: asyncio.Future, value=None, error: Exception = None):
+    if not future.done(): # Já cancelado pelo tempo limite
+        future.set_exception(error) if error is not None else future.set_result(value)
+
+
+async def _run_func(task: Task, result: dict):
+    # Thread daemon em vez do executor padrão: asyncio.run espera o executor ao sair, o que anularia o timeout
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def target():
+        try:
+            value, error = task.func(), None
+        except Exception as e:
+            value, error = None, e
+        with contextlib.suppress(RuntimeError): # Loop já encerrado (tarefa abandonada por timeout)
+            loop.call_soon_threadsafe(_settle, future, value, error)
+
+    threading.Thread(target=target, name=f"shamann-task-{task.name}", daemon=True).start()
+    try:
+        result["output"] = await asyncio.wait_for(future, task.timeout)
+        result["status"] = "success"
+    except TimeoutError:
+        result.update(status="timeout", error_message=f"Tempo limite de {task.timeout}s excedido (a função segue "
+                                                      f"em segundo plano até terminar).")
+    except Exception as e:
+        result.update(status="error", error_message=str(e))
+
+
+async def _execute(task: Task, sweep_started: float) -> dict:
+    started = time.monotonic()
+    result = {"task": task.name, "status": "error", "started": round(started - sweep_started, 3)}
+    try:
+        with span(f"task.{task.name}"):
+            if task.command is not None:
+                await _run_command(task, result)
+            else:
+                await _run_func(task, result)
+    except OSError as e: # Executável inexistente, sem permissão...
+        result.update(status="error", error_message=str(e))
+    finally:
+        result["duration"] = round(time.monotonic() - started, 3)
+    if result["status"] != "success":
+        logger.warning(f"Tarefa '{task.name}' terminou com status {result['status']}: {result.get('error_message')}")
+    return result
+
+
+async def arun_tasks(tasks, max_concurrency: int = None, cancel_event=None) -> dict:
+    """Versão assíncrona de run_tasks()."""
+    by_name, order = _validate(tasks)
+    sweep_started = time.monotonic()
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else contextlib.nullcontext()
+    futures = {}
+
+    async def run(task: Task) -> dict:
+        try:
+            dependencies = await asyncio.gather(*(futures[name] for name in task.depends_on))
+            failed = [dep["task"] for dep in dependencies if dep["status"] != "success"]
+            if failed:
+                return {"task": task.name, "status": "skipped", "started": None, "duration": 0.0,
+                        "error_message": f"Dependências sem sucesso: {', '.join(failed)}."}
+            async with semaphore:
+                return await _execute(task, sweep_started)
+        except asyncio.CancelledError:
+            return {"task": task.name, "status": "cancelled", "started": None, "duration": 0.0,
+                    "error_message": "Execução cancelada."}
+
+    for name in order: # Ordem topológica: as dependências de cada tarefa já têm future
+        futures[name] = asyncio.ensure_future(run(by_name[name]))
+
+    async def watch_cancel():
+        while not cancel_event.is_set():
+            await asyncio.sleep(CANCEL_POLL)
+        for future in futures.values():
+            future.cancel()
+
+    watcher = asyncio.ensure_future(watch_cancel()) if cancel_event is not None else None
+    try:
+        results = await asyncio.gather(*futures.values())
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+    results = {result["task"]: result for result in results}
+    failed = [name for name, result in results.items() if result["status"] != "success"]
+    status = "success" if not failed else "cancelled" if cancel_event is not None and cancel_event.is_set() else "error"
+    return {"status": status, "elapsed": round(time.monotonic() - sweep_started, 3),
+            "busy_seconds": round(sum(result["duration"] for result in results.values()), 3),
+            "failed": failed, "tasks": {name: results[name] for name in order}}
+
+
+def run_tasks(tasks, max_concurrency: int = None, cancel_event=None) -> dict:
+    """
+    Executa as tarefas respeitando as dependências e retorna {status, elapsed, busy_seconds, failed, tasks}.
+    busy_seconds é a soma das durações: comparado a elapsed, mostra o ganho do paralelismo.
+    cancel_event (ex: um ScanContext) cancela as tarefas em andamento e as que ainda não começaram.
+    """
+    coroutine = arun_tasks(tasks, max_concurrency, cancel_event)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    # Chamado de dentro de um loop (ex: API asyncio): asyncio.run precisa de uma thread própria
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="shamann-tasks") as pool:
+        return pool.submit(asyncio.run, coroutine).result()
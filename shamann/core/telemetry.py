@@ -0,0 +1,307 @@
+# shamann/core/telemetry.py
+"""
+Telemetria do host lida direto do kernel, sem subprocessos (substitui df e iftop).
+
+Cada amostra custa algumas leituras de /proc (stat, meminfo, net/dev, com os descritores abertos
+uma vez e relidos com pread) e um os.statvfs por ponto de montagem: dezenas de microssegundos.
+CPU e rede são taxas calculadas entre duas amostras consecutivas; a primeira amostra usa os
+contadores desde o boot.
+
+As amostras ficam em um RingBuffer: uma array('d') pré-alocada por coluna, 8 bytes por valor,
+sem objetos por amostra. Com o padrão (10s, 360 amostras) a última hora de histórico ocupa
+poucas dezenas de KiB. Os valores mais recentes também vão para gauges do core.metrics.
+
+    with TelemetryCollector(interval=5, disks=["/", "/var"]) as collector:
+        ...
+        collector.latest()          # {"timestamp": ..., "cpu_percent": ..., "disk_used_percent:/": ...}
+        collector.summary(600)      # mínimo/média/máximo dos últimos 10 minutos
+
+Configuração ("telemetry"): enabled, interval_seconds, capacity, disks, interfaces (null = todas
+menos lo).
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from array import array
+
+from shamann.core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 10.0
+DEFAULT_CAPACITY = 360
+DEFAULT_DISKS = ("/",)
+BASE_FIELDS = ("timestamp", "cpu_percent", "load1", "mem_total_bytes", "mem_available_bytes", "mem_used_percent",
+               "net_rx_bytes_per_s", "net_tx_bytes_per_s")
+DISK_FIELDS = ("used_percent", "free_bytes", "total_bytes")
+
+HOST_CPU = REGISTRY.gauge("shamann_host_cpu_percent", "Uso de CPU do host entre as duas últimas amostras.")
+HOST_MEMORY = REGISTRY.gauge("shamann_host_memory_used_percent", "Memória em uso (MemTotal - MemAvailable).")
+HOST_DISK = REGISTRY.gauge("shamann_host_disk_used_percent", "Uso do sistema de arquivos (como o df).", ("mount",))
+HOST_NETWORK = REGISTRY.gauge("shamann_host_network_bytes_per_second", "Tráfego de rede do host.", ("direction",))
+
+
+class RingBuffer:
+    """Séries de floats com capacidade fixa; as amostras mais antigas são sobrescritas."""
+
+    def __init__(self, fields, capacity: int = DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("A capacidade do RingBuffer deve ser positiva.")
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self._columns = {field: array("d", bytes(8 * capacity)) for field in self.fields}
+        self._next = 0 # Posição da próxima escrita
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def nbytes(self) -> int:
+        return sum(column.itemsize * len(column) for column in self._columns.values())
+
+    def append(self, sample: dict):
+        """Campos ausentes são gravados como NaN e lidos como None."""
+        with self._lock:
+            for field, column in self._columns.items():
+                value = sample.get(field)
+                column[self._next] = math.nan if value is None else value
+            self._next = (self._next + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def _row(self, index: int) -> dict:
+        row = {}
+        for field, column in self._columns.items():
+            value = column[index]
+            row[field] = None if math.isnan(value) else value
+        return row
+
+    def rows(self, limit: int = None) -> list[dict]:
+        """As amostras da mais antiga para a mais recente (só as últimas `limit`, se informado)."""
+        with self._lock:
+            count = self._count if limit is None else min(limit, self._count)
+            start = (self._next - count) % self.capacity
+            return [self._row((start + i) % self.capacity) for i in range(count)]
+
+    def latest(self) -> dict | None:
+        with self._lock:
+            return self._row((self._next - 1) % self.capacity) if self._count else None
+
+
+def parse_cpu(text: str) -> tuple[float, float]:
+    """(ticks ocupados, ticks totais) da linha agregada "cpu" de /proc/stat."""
+    values = [int(value) for value in text.split("\n", 1)[0].split()[1:]]
+    total = sum(values[:8]) # guest/guest_nice já estão contados em user/nice
+    idle = values[3] + (values[4] if len(values) > 4 else 0) # idle + iowait
+    return total - idle, total
+
+
+def parse_meminfo(text: str) -> dict:
+    """Campos de /proc/meminfo em bytes."""
+    fields = {}
+    for line in text.splitlines():
+        name, _, rest = line.partition(":")
+        parts = rest.split()
+        if parts:
+            fields[name] = int(parts[0]) * (1024 if len(parts) > 1 and parts[1] == "kB" else 1)
+    return fields
+
+
+def parse_net_dev(text: str) -> dict:
+    """{interface: (bytes recebidos, bytes enviados)} de /proc/net/dev."""
+    counters = {}
+    for line in text.splitlines()[2:]:
+        name, _, rest = line.partition(":")
+        values = rest.split()
+        if len(values) >= 9:
+            counters[name.strip()] = (int(values[0]), int(values[8]))
+    return counters
+
+
+def disk_usage(path: str) -> dict:
+    """Uso do sistema de arquivos de path via statvfs, com o mesmo percentual do df (sem os blocos reservados)."""
+    st = os.statvfs(path)
+    total = st.f_blocks * st.f_frsize
+    used = (st.f_blocks - st.f_bfree) * st.f_frsize
+    available = st.f_bavail * st.f_frsize
+    return {"total_bytes": total, "used_bytes": used, "free_bytes": available,
+            "used_percent": round(100.0 * used / (used + available), 2) if used + available else 0.0}
+
+
+class _ProcFile:
+    """Arquivo do /proc aberto uma vez e relido do início a cada leitura."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY)
+
+    def read(self) -> str:
+        chunks, offset = [], 0
+        while chunk := os.pread(self._fd, 65536, offset):
+            chunks.append(chunk)
+            offset += len(chunk)
+        return b"".join(chunks).decode("ascii", errors="replace")
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class TelemetryCollector:
+    """
+    :param interval: Segundos entre amostras da thread de coleta (start()).
+    :param capacity: Amostras guardadas no RingBuffer.
+    :param disks: Pontos de montagem medidos com statvfs.
+    :param interfaces: Interfaces somadas no tráfego de rede (None = todas menos lo).
+    :param proc_root: Raiz do procfs (testes usam um diretório com arquivos falsos).
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, capacity: int = DEFAULT_CAPACITY, disks=DEFAULT_DISKS,
+                 interfaces=None, proc_root: str = "/proc"):
+        self.interval = interval
+        self.disks = tuple(disks)
+        self.interfaces = None if interfaces is None else set(interfaces)
+        self.buffer = RingBuffer(BASE_FIELDS + tuple(f"disk_{field}:{mount}" for mount in self.disks
+                                                     for field in DISK_FIELDS), capacity)
+        self.errors = 0
+        self._files = {}
+        self._proc_root = proc_root
+        self._previous = None # (monotonic, ticks ocupados, ticks totais, rx, tx)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> "TelemetryCollector":
+        return cls(settings.get("interval_seconds", DEFAULT_INTERVAL), settings.get("capacity", DEFAULT_CAPACITY),
+                   settings.get("disks") or DEFAULT_DISKS, settings.get("interfaces"))
+
+    def _read(self, name: str) -> str:
+        proc_file = self._files.get(name)
+        if proc_file is None:
+            proc_file = self._files[name] = _ProcFile(os.path.join(self._proc_root, name))
+        return proc_file.read()
+
+    def sample(self) -> dict:
+        """Lê os contadores, grava a amostra no buffer, atualiza os gauges e a retorna."""
+        with self._lock:
+            now = time.monotonic()
+            busy, total = parse_cpu(self._read("stat"))
+            memory = parse_meminfo(self._read("meminfo"))
+            rx = tx = 0
+            for interface, (received, sent) in parse_net_dev(self._read("net/dev")).items():
+                wanted = interface != "lo" if self.interfaces is None else interface in self.interfaces
+                if wanted:
+                    rx += received
+                    tx += sent
+            previous, self._previous = self._previous, (now, busy, total, rx, tx)
+
+            mem_total, mem_available = memory.get("MemTotal"), memory.get("MemAvailable", memory.get("MemFree"))
+            sample = {"timestamp": time.time(), "load1": os.getloadavg()[0], "mem_total_bytes": mem_total,
+                      "mem_available_bytes": mem_available,
+                      "mem_used_percent": round(100.0 * (mem_total - mem_available) / mem_total, 2)
+                      if mem_total and mem_available is not None else None}
+            if previous is None:
+                sample["cpu_percent"] = round(100.0 * busy / total, 2) if total else None
+            else:
+                elapsed = max(now - previous[0], 1e-6)
+                ticks = total - previous[2]
+                sample["cpu_percent"] = round(100.0 * (busy - previous[1]) / ticks, 2) if ticks > 0 else 0.0
+                # Contadores que voltam (interface recriada) viram 0 em vez de uma taxa negativa
+                sample["net_rx_bytes_per_s"] = round(max(rx - previous[3], 0) / elapsed, 1)
+                sample["net_tx_bytes_per_s"] = round(max(tx - previous[4], 0) / elapsed, 1)
+            for mount in self.disks:
+                try:
+                    usage = disk_usage(mount)
+                except OSError:
+                    continue # Ponto de montagem ausente: a coluna fica vazia nesta amostra
+                for field in DISK_FIELDS:
+                    sample[f"disk_{field}:{mount}"] = usage[field]
+                HOST_DISK.set(usage["used_percent"], mount=mount)
+            self.buffer.append(sample)
+
+        if sample["cpu_percent"] is not None:
+            HOST_CPU.set(sample["cpu_percent"])
+        if sample["mem_used_percent"] is not None:
+            HOST_MEMORY.set(sample["mem_used_percent"])
+        if "net_rx_bytes_per_s" in sample:
+            HOST_NETWORK.set(sample["net_rx_bytes_per_s"], direction="rx")
+            HOST_NETWORK.set(sample["net_tx_bytes_per_s"], direction="tx")
+        return sample
+
+    def latest(self) -> dict | None:
+        return self.buffer.latest()
+
+    def history(self, seconds: float = None) -> list[dict]:
+        """Amostras guardadas (só as dos últimos `seconds` segundos, se informado), da mais antiga à mais recente."""
+        rows = self.buffer.rows()
+        if seconds is None:
+            return rows
+        cutoff = time.time() - seconds
+        return [row for row in rows if row["timestamp"] >= cutoff]
+
+    def summary(self, seconds: float = None) -> dict:
+        """Mínimo, média e máximo de cada campo no período (campos sem valor ficam de fora)."""
+        rows = self.history(seconds)
+        stats = {}
+        for field in self.buffer.fields[1:]:
+            values = [row[field] for row in rows if row[field] is not None]
+            if values:
+                stats[field] = {"min": min(values), "avg": round(sum(values) / len(values), 2), "max": max(values)}
+        return {"samples": len(rows), "interval": self.interval, "latest": rows[-1] if rows else None, "stats": stats}
+
+    def info(self) -> dict:
+        return {"interval": self.interval, "capacity": self.buffer.capacity, "samples": len(self.buffer),
+                "buffer_bytes": self.buffer.nbytes(), "disks": list(self.disks), "errors": self.errors,
+                "running": self._thread is not None}
+
+    def _run(self):
+        while True:
+            try:
+                self.sample()
+            except Exception as e: # /proc indisponível (ex: contêiner restrito) não derruba a thread
+                self.errors += 1
+                logger.warning(f"Falha ao coletar a telemetria do host: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self):
+        """Passa a coletar uma amostra a cada interval segundos em uma thread daemon."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="shamann-telemetry", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            for proc_file in self._files.values():
+                proc_file.close()
+            self._files.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+_collector = None
+_collector_lock = threading.Lock()
+
+
+def telemetry_collector(settings: dict = None) -> TelemetryCollector:
+    """Coletor compartilhado pelo processo (criado com settings na primeira chamada)."""
+    global _collector
+    with _collector_lock:
+        if _collector is None:
+            _collector = TelemetryCollector.from_settings(settings or {})
+        return _collector
@@ -0,0 +1,221 @@
+# shamann/core/tracing.py
+"""
+Rastreamento leve de execução: spans aninhados com tempos monotônicos, contadores e atributos.
+
+Uso:
+    with Tracer("shamann.run", target=alvo) as tracer:
+        with span("nmap.scan") as s:
+            ...
+            s.count("hosts", len(hosts))
+    tracer.export_json("trace.json"); tracer.export_chrome_trace("trace.chrome.json")
+
+O span corrente vive em um ContextVar. Sem Tracer ativo, span()/current_span() devolvem um span
+nulo compartilhado e @traced chama a função direto: o custo desativado é uma leitura de ContextVar.
+Threads novas não herdam o contexto (use contextvars.copy_context() para rastreá-las).
+Um observador (ex: core.profiling.Profiler) pode ser avisado da abertura e do fim de cada span.
+"""
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, UTC
+
+_current_span = contextvars.ContextVar("shamann_current_span", default=None)
+_span_observer = contextvars.ContextVar("shamann_span_observer", default=None) # span_started/span_finished
+
+
+class _NoopSpan:
+    """Span nulo (rastreamento desativado): aceita as mesmas chamadas e não guarda nada."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes):
+        return self
+
+    def count(self, key: str, amount: int = 1):
+        return self
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "span_id", "parent_id", "name", "attributes", "counts", "start", "end", "thread_id", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, parent_id: int = None, attributes: dict = None):
+        self.tracer = tracer
+        self.span_id = tracer._next_id()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes or {}
+        self.counts = {}
+        self.start = None
+        self.end = None
+        self.thread_id = threading.get_ident()
+        self._token = None
+
+    def __enter__(self):
+        observer = _span_observer.get()
+        if observer is not None:
+            observer.span_started(self)
+        self.start = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter()
+        _current_span.reset(self._token)
+        observer = _span_observer.get()
+        if observer is not None:
+            observer.span_finished(self)
+        if exc_type is not None:
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer._finish(self)
+        return False
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+        return self
+
+    def count(self, key: str, amount: int = 1):
+        self.counts[key] = self.counts.get(key, 0) + amount
+        return self
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def to_dict(self, origin: float) -> dict:
+        return {"id": self.span_id, "parent_id": self.parent_id, "name": self.name,
+                "start_seconds": round(self.start - origin, 6), "duration_seconds": round(self.duration, 6),
+                "thread_id": self.thread_id, "attributes": self.attributes, "counts": self.counts}
+
+
+def span(name: str, **attributes):
+    """Abre um span filho do span corrente (ou o span nulo, se não há rastreamento ativo)."""
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(parent.tracer, name, parent.span_id, attributes)
+
+
+def current_span():
+    """Span corrente, para anotar contadores/atributos sem abrir um novo (span nulo se inativo)."""
+    return _current_span.get() or NOOP_SPAN
+
+
+def traced(name: str = None):
+    """Decorador: executa a função dentro de um span (nome padrão: módulo.função)."""
+    def decorator(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Tracer:
+    """
+    Registro de uma execução. Usado como context manager, abre o span raiz e o torna corrente.
+    :param started: perf_counter() do início real, quando o rastreamento é decidido depois de
+        algum trabalho já feito (ver add_span).
+    """
+
+    def __init__(self, name: str, started: float = None, **attributes):
+        self.trace_id = uuid.uuid4().hex
+        self.started_at_utc = datetime.now(UTC).isoformat()
+        self.origin = started if started is not None else time.perf_counter()
+        self.spans = []
+        self._ids = 0
+        self._lock = threading.Lock()
+        self.root = Span(self, name, None, attributes)
+
+    def _next_id(self) -> int:
+        with self._lock:
+            self._ids += 1
+            return self._ids
+
+    def _finish(self, finished: Span):
+        with self._lock:
+            self.spans.append(finished)
+
+    def __enter__(self):
+        self.root.__enter__()
+        self.root.start = self.origin
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self.root.__exit__(exc_type, exc, tb)
+
+    def add_span(self, name: str, start: float, end: float, **attributes) -> Span:
+        """Registra um trecho já medido (perf_counter) como filho do span raiz."""
+        recorded = Span(self, name, self.root.span_id, attributes)
+        recorded.start, recorded.end = start, end
+        self._finish(recorded)
+        return recorded
+
+    @property
+    def duration(self) -> float:
+        return self.root.duration
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        return {"trace_id": self.trace_id, "name": self.root.name, "started_at_utc": self.started_at_utc,
+                "duration_seconds": round(self.duration, 6), "spans": [s.to_dict(self.origin) for s in spans]}
+
+    def summary(self) -> dict:
+        """Agregado por nome de span: execuções, tempo total/máximo e contadores somados."""
+        stages = {}
+        with self._lock:
+            spans = list(self.spans)
+        for s in sorted(spans, key=lambda s: s.start):
+            stage = stages.setdefault(s.name, {"calls": 0, "total_seconds": 0.0, "max_seconds": 0.0, "counts": {}})
+            stage["calls"] += 1
+            stage["total_seconds"] += s.duration
+            stage["max_seconds"] = max(stage["max_seconds"], s.duration)
+            for key, value in s.counts.items():
+                stage["counts"][key] = stage["counts"].get(key, 0) + value
+        for stage in stages.values():
+            stage["total_seconds"] = round(stage["total_seconds"], 6)
+            stage["max_seconds"] = round(stage["max_seconds"], 6)
+        return {"trace_id": self.trace_id, "name": self.root.name, "duration_seconds": round(self.duration, 6),
+                "stages": stages}
+
+    def export_json(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False, default=str)
+
+    def export_chrome_trace(self, path: str):
+        """Formato Trace Event (chrome://tracing, Perfetto): eventos completos 'X' em microssegundos."""
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+        events = [{"name": s.name, "cat": "shamann", "ph": "X", "pid": pid, "tid": s.thread_id,
+                   "ts": round((s.start - self.origin) * 1e6, 3), "dur": round(s.duration * 1e6, 3),
+                   "args": dict(s.attributes, **s.counts)} for s in spans]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                       "otherData": {"trace_id": self.trace_id, "started_at_utc": self.started_at_utc}}, f, default=str)
+
+    def log_summary(self, db):
+        """Grava o resumo em internal_logs (db: DBManager)."""
+        summary = self.summary()
+        db.add_internal_log("INFO", "tracing", f"Execução '{self.root.name}' concluída em {summary['duration_seconds']:.3f}s.",
+                            summary)
@@ -0,0 +1,508 @@
+# shamann/daemon.py
+"""
+Modo daemon do Shamann.
+
+Um processo residente carrega a configuração, o cache DNS, o banco e os guardiões uma única vez
+e então:
+  - executa os jobs recorrentes da seção "daemon.jobs" da configuração (ver core.scheduler);
+  - aceita jobs avulsos por um socket Unix local (JSON, um objeto por linha).
+
+Comandos do socket ({"cmd": ...}):
+  ping | submit {guardian, target, options?, timeout?, profile?} | status {id, include_result?} | jobs |
+  cancel {id} | schedule | enqueue {guardian, targets, options?, timeout?, priority?, exclude?} | metrics |
+  config | reload | telemetry {seconds?, samples?} | honeypot {limit?} | ids {limit?} | shutdown
+O guardião especial "pipeline" executa o fluxo completo do orquestrador (Nmap + enriquecimento +
+classificação + relatórios) com a configuração já carregada; nele, "exclude" (mesmas formas do
+alvo) tira endereços do scan, como -x/--exclude da CLI. "enqueue" não executa nada aqui:
+fatia os alvos, menos exclude, na fila compartilhada (persistence.job_queue) para os workers consumirem.
+Workers de outros hosts não abrem o SQLite da fila: consomem pela API HTTP (rotas /queue, ver
+shamann.api e worker.RemoteJobQueue), e o daemon é o único processo que toca o banco da fila.
+"profile" (true ou {stages?, memory_top?}) perfila o job (core.profiling); os arquivos vão para
+profiling.output_directory e o resumo fica no campo "profile" do job.
+
+A configuração é compilada uma vez (core.config) e recarregada quando o arquivo muda
+(daemon.config_reload_seconds; 0 desliga, "reload" força a verificação). Cada job usa a versão
+vigente ao começar; uma recarga com erro mantém a anterior. daemon.jobs, o socket, a API e o
+cache DNS são lidos só na inicialização.
+
+Com "telemetry.enabled", o daemon amostra CPU, memória, disco e rede do host (core.telemetry) a
+cada telemetry.interval_seconds; "telemetry" devolve o resumo e, com samples, as amostras guardadas.
+Com "honeypot.enabled", o honeypot (modules.honeypot) roda no mesmo processo; "honeypot" devolve os
+contadores, as origens mais frequentes e os últimos eventos. Com "ids.enabled", o detector de
+intrusões (modules.intrusion_detection) acompanha os logs do sistema; "ids" devolve os contadores,
+o offset de cada arquivo e os últimos alertas.
+
+Com a seção "api" habilitada (ou --http na CLI), o mesmo processo também serve a API HTTP
+(shamann.api), que compartilha os jobs, o banco e os eventos de streaming do daemon.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, UTC
+
+from shamann.core.config import DEFAULT_POLL_INTERVAL, ConfigStore
+from shamann.core.metrics import REGISTRY
+from shamann.core.profiling import Profiler, profiler_from_settings, stage
+from shamann.core.scheduler import ScheduledJob, Scheduler
+from shamann.core.telemetry import telemetry_collector
+from shamann.main import run_shamann_orchestrator
+from shamann.modules.base_guardian import GuardianCancelled
+from shamann.modules.guardian_registry import GuardianLoadError, get_streaming_guardian
+from shamann.modules.recon.dns_cache import configure_dns_cache
+from shamann.persistence.db_manager import DBManager
+from shamann.persistence.job_queue import JobQueue, JobQueueError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), "shamann.sock")
+DEFAULT_MAX_WORKERS = 4
+MAX_FINISHED_JOBS = 500 # Jobs terminados mantidos para consulta de status
+MAX_EVENTS_PER_JOB = 10000 # Eventos "partial" guardados por job para quem assinar o stream depois
+DAEMON_JOBS = REGISTRY.gauge("shamann_daemon_jobs", "Jobs do daemon por estado.", ("status",))
+PIPELINE_GUARDIAN = "pipeline"
+
+
+class DaemonError(Exception):
+    """Erro de comunicação com o daemon ou daemon já em execução."""
+
+
+class _CommandHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                response = self.server.shamann_daemon.handle_command(request)
+            except json.JSONDecodeError as e:
+                response = {"ok": False, "error": f"JSON inválido: {e}"}
+            except Exception as e:
+                logger.error(f"Erro ao tratar comando do socket: {e}", exc_info=True)
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write(json.dumps(response, ensure_ascii=False, default=str).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class ShamannDaemon:
+    """
+    :param config_path: Arquivo de configuração (compilado uma vez e recarregado quando muda).
+    :param socket_path: Socket Unix de controle (padrão: daemon.socket_path ou /tmp/shamann.sock).
+    :param config: Configuração fixa já carregada (dispensa config_path; sem recarga).
+    :param api_address: (host, porta) da API HTTP; sobrepõe a seção "api" da configuração.
+    :param config_store: ConfigStore já carregado para config_path (ex: pela CLI, que o usa antes para o logging).
+    """
+
+    def __init__(self, config_path: str = 'shamann/config/scan_config.json', socket_path: str = None,
+                 config: dict = None, api_address: tuple = None, config_store: ConfigStore = None):
+        self.config_store = None
+        self._config = config
+        if config is None:
+            self.config_store = config_store or ConfigStore(config_path)
+            self.config_store.refresh()
+        settings = self.config.get("daemon", {})
+        if self.config_store is not None:
+            self.config_store.poll_interval = settings.get("config_reload_seconds", DEFAULT_POLL_INTERVAL)
+        self.socket_path = socket_path or settings.get("socket_path") or DEFAULT_SOCKET_PATH
+        self.api = None # Validada antes de abrir banco e executor: sem api.token o daemon não sobe
+        api_settings = self.config.get("api", {})
+        if api_address or api_settings.get("enabled"):
+            from shamann.api import ApiServer # Import tardio: o modo só-socket não precisa do asyncio
+            host, port = api_address or (api_settings.get("host", "127.0.0.1"), api_settings.get("port", 8765))
+            self.api = ApiServer(self, host, port, token=api_settings.get("token"),
+                                 allowed_hosts=api_settings.get("allowed_hosts"))
+        self.db = DBManager(settings["db_path"]) if settings.get("db_path") else None
+        self.executor = ThreadPoolExecutor(max_workers=settings.get("max_workers", DEFAULT_MAX_WORKERS),
+                                           thread_name_prefix="shamann-job")
+        self.jobs = OrderedDict() # id -> registro do job
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._server = None
+        self._server_thread = None
+        self._queue = None # JobQueue aberta no primeiro uso (ver job_queue())
+        self._queue_lock = threading.Lock()
+        configure_dns_cache(self.config.get("dns_cache", {}))
+        telemetry_settings = self.config.get("telemetry", {})
+        self.telemetry = telemetry_collector(telemetry_settings) if telemetry_settings.get("enabled") else None
+        self.honeypot = None
+        honeypot_settings = self.config.get("honeypot", {})
+        if honeypot_settings.get("enabled"):
+            from shamann.modules.honeypot import HoneypotService # Import tardio: só quem usa abre o banco de eventos
+            self.honeypot = HoneypotService(honeypot_settings)
+        ids_settings = self.config.get("ids", {})
+        self.ids = None
+        if ids_settings.get("enabled"):
+            from shamann.modules.intrusion_detection import intrusion_detector
+            self.ids = intrusion_detector(ids_settings)
+        for status in ("queued", "running"):
+            DAEMON_JOBS.set_function(lambda status=status: sum(1 for job in list(self.jobs.values()) if job["status"] == status),
+                                     status=status)
+        scheduled = [ScheduledJob.from_config(entry) for entry in settings.get("jobs", []) if entry.get("enabled", True)]
+        self.scheduler = Scheduler(scheduled, lambda spec, on_done: self.submit(spec, source="schedule", on_done=on_done))
+
+    @property
+    def config(self):
+        """Versão vigente da configuração: quem a lê uma vez (ex: um job) segue com ela até o fim."""
+        return self.config_store.current if self.config_store is not None else self._config
+
+    def config_info(self) -> dict:
+        if self.config_store is None:
+            return {"path": None, "static": True}
+        return self.config_store.info()
+
+    # --- Jobs ---
+
+    @staticmethod
+    def _public(record: dict, include_result: bool = False) -> dict:
+        info = {key: value for key, value in record.items() if not key.startswith("_")}
+        if include_result:
+            info["result"] = record.get("_result")
+        return info
+
+    def submit(self, spec: dict, source: str = "socket", on_done=None) -> dict:
+        """Enfileira um job {guardian, target, options?, timeout?}. on_done(status) é chamado ao terminar."""
+        if not spec.get("guardian") or not spec.get("target"):
+            raise ValueError("Um job precisa de 'guardian' e 'target'.")
+        record = {
+            "id": uuid.uuid4().hex[:12],
+            "guardian": spec["guardian"],
+            "target": spec["target"],
+            "options": spec.get("options", ""),
+            "timeout": spec.get("timeout"),
+            "source": source,
+            "scheduled_job": spec.get("scheduled_job"),
+            "status": "queued",
+            "submitted_at": datetime.now(UTC).isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "result_status": None,
+            "scan_id": None,
+            "partials": 0,
+            "progress": None,
+            "error_message": None,
+            "profile": None,
+            "_spec": spec,
+            "_cancel": threading.Event(),
+            "_result": None,
+            "_events": [], # Eventos "partial" (histórico para assinantes tardios)
+            "_listeners": [],
+            "_events_lock": threading.Lock(),
+        }
+        with self._lock:
+            self.jobs[record["id"]] = record
+            finished = [job_id for job_id, job in self.jobs.items() if job["finished_at"]]
+            for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                del self.jobs[job_id]
+        self.executor.submit(self._run, record, on_done)
+        logger.info(f"Job {record['id']} enfileirado ({record['guardian']} -> {record['target']}, origem: {source}).")
+        return record
+
+    def _execute(self, record: dict) -> tuple[str, dict]:
+        """Retorna (nome do guardião para o banco, resultado)."""
+        spec = record["_spec"]
+        if record["guardian"] == PIPELINE_GUARDIAN:
+            try:
+                results = run_shamann_orchestrator(cli_target=record["target"], cli_ports=spec.get("ports"),
+                                                   config=self.config, cli_exclude=spec.get("exclude"),
+                                                   write_reports=spec.get("reports", True), cancel_event=record["_cancel"])
+            except GuardianCancelled:
+                return "nmap", {"target": record["target"], "guardian": "nmap", "status": "cancelled",
+                                "error_message": "Execução cancelada."}
+            # O orquestrador não faz streaming: os hosts (já classificados) são publicados ao final
+            for host in (results or {}).get("hosts", []):
+                self._emit(record, {"event": "partial", "guardian": "nmap", "target": record["target"], "data": host})
+            return "nmap", {"target": record["target"], "guardian": "nmap", "status": "success" if results else "error",
+                            "scan_results": results or {}}
+
+        guardian = get_streaming_guardian(record["guardian"])
+        if guardian is None:
+            raise ValueError(f"Guardião desconhecido ou inativo: '{record['guardian']}'.")
+
+        def on_event(event):
+            if event["event"] == "progress":
+                record["progress"] = {k: event[k] for k in ("done", "total", "elapsed", "message")}
+            if event["event"] != "result": # O resultado final fica em record["_result"]
+                self._emit(record, event)
+
+        with stage(f"guardian.{guardian.name()}"):
+            result = guardian.scan(record["target"], record["options"], timeout=record["timeout"],
+                                   cancel_event=record["_cancel"], on_event=on_event)
+        return guardian.name(), result
+
+    def _profiler_for(self, record: dict) -> Profiler | None:
+        options = record["_spec"].get("profile")
+        if not options:
+            return None
+        options = options if isinstance(options, dict) else {}
+        stages = options.get("stages")
+        if isinstance(stages, str):
+            stages = [item.strip() for item in stages.split(",") if item.strip()]
+        # O diretório vem só da configuração: quem submete pela API não escolhe onde o daemon grava
+        return profiler_from_settings(self.config.get("profiling", {}), label=f"job_{record['id']}",
+                                      stages=stages, memory_top=options.get("memory_top"))
+
+    def _run(self, record: dict, on_done=None):
+        if record["_cancel"].is_set():
+            record.update(status="cancelled", finished_at=datetime.now(UTC).isoformat())
+            if on_done:
+                on_done("cancelled")
+            return
+        record.update(status="running", started_at=datetime.now(UTC).isoformat())
+        profiler = None
+        try:
+            profiler = self._profiler_for(record)
+            with profiler or contextlib.nullcontext():
+                db_guardian, result = self._execute(record)
+            record["_result"] = result
+            record["result_status"] = (result or {}).get("status", "error")
+            record["error_message"] = (result or {}).get("error_message")
+            record["status"] = "cancelled" if record["result_status"] == "cancelled" else "finished"
+            if self.db is not None and result:
+                record["scan_id"] = self.db.save_guardian_result(db_guardian, record["target"], result)
+        except (GuardianLoadError, ValueError) as e:
+            record.update(status="error", result_status="error", error_message=str(e))
+        except Exception as e:
+            logger.error(f"Erro no job {record['id']}: {e}", exc_info=True)
+            record.update(status="error", result_status="error", error_message=str(e))
+        finally:
+            if profiler is not None:
+                record["profile"] = profiler.summary()
+            with record["_events_lock"]:
+                record["finished_at"] = datetime.now(UTC).isoformat()
+                listeners, record["_listeners"] = record["_listeners"], []
+            finished = {"event": "finished", "job": self._public(record)}
+            for listener in listeners:
+                listener(finished)
+            logger.info(f"Job {record['id']} terminado: {record['status']} ({record['result_status']}).")
+            if on_done:
+                on_done(record["result_status"] or record["status"])
+
+    def _emit(self, record: dict, event: dict):
+        with record["_events_lock"]:
+            if event["event"] == "partial":
+                record["partials"] += 1
+                if len(record["_events"]) < MAX_EVENTS_PER_JOB:
+                    record["_events"].append(event)
+            listeners = list(record["_listeners"])
+        for listener in listeners:
+            listener(event)
+
+    def subscribe(self, job_id: str, listener) -> tuple[list, bool] | None:
+        """
+        Assina os eventos de um job: listener(event) é chamado (na thread do job) para cada evento
+        novo, terminando com {"event": "finished"}. Retorna (eventos "partial" já emitidos, terminado?)
+        ou None se o job não existe. Job já terminado não registra o listener.
+        """
+        record = self.jobs.get(job_id)
+        if record is None:
+            return None
+        with record["_events_lock"]:
+            finished = record["finished_at"] is not None
+            if not finished:
+                record["_listeners"].append(listener)
+            return list(record["_events"]), finished
+
+    def unsubscribe(self, job_id: str, listener):
+        record = self.jobs.get(job_id)
+        if record is None:
+            return
+        with record["_events_lock"]:
+            if listener in record["_listeners"]:
+                record["_listeners"].remove(listener)
+
+    def public_job(self, job_id: str, include_result: bool = False) -> dict | None:
+        record = self.jobs.get(job_id)
+        return self._public(record, include_result) if record is not None else None
+
+    def list_jobs(self) -> list:
+        with self._lock:
+            return [self._public(record) for record in self.jobs.values()]
+
+    def cancel(self, job_id: str) -> bool:
+        record = self.jobs.get(job_id)
+        if record is None or record["finished_at"]:
+            return False
+        record["_cancel"].set()
+        return True
+
+    def job_queue(self) -> JobQueue:
+        """Fila compartilhada dos workers (job_queue.db_path), aberta no primeiro uso. Levanta JobQueueError."""
+        with self._queue_lock:
+            if self._queue is None:
+                self._queue = JobQueue(self.config.get("job_queue", {}).get("db_path", "agent_ia.db"))
+            return self._queue
+
+    def enqueue(self, spec: dict) -> dict:
+        """
+        Fatia spec["targets"] (menos spec["exclude"]) na fila dos workers. Retorna {batch_id, jobs}.
+        Levanta ValueError (pedido ou alvo inválido, nada restou após as exclusões) ou JobQueueError.
+        """
+        if not spec.get("guardian") or not spec.get("targets"):
+            raise ValueError("'enqueue' precisa de 'guardian' e 'targets'.")
+        settings = self.config.get("job_queue", {})
+        batch = self.job_queue().enqueue(spec["guardian"], spec["targets"], spec.get("options", ""),
+                                         spec.get("timeout"), spec.get("priority", 0),
+                                         spec.get("shard_size", settings.get("shard_size", 16)),
+                                         spec.get("max_attempts", settings.get("max_attempts", 3)), spec.get("exclude"))
+        if not batch["jobs"]:
+            raise ValueError("Nenhum alvo restou depois das exclusões.")
+        return batch
+
+    # --- Comandos ---
+
+    def handle_command(self, request: dict) -> dict:
+        cmd = request.get("cmd")
+        if cmd == "ping":
+            return {"ok": True, "pid": os.getpid(), "jobs": len(self.jobs)}
+        if cmd == "submit":
+            spec = {k: v for k, v in request.items() if k != "cmd"}
+            return {"ok": True, "job": self._public(self.submit(spec))}
+        if cmd == "status":
+            record = self.jobs.get(request.get("id"))
+            if record is None:
+                return {"ok": False, "error": f"Job não encontrado: {request.get('id')}"}
+            return {"ok": True, "job": self._public(record, bool(request.get("include_result")))}
+        if cmd == "jobs":
+            return {"ok": True, "jobs": self.list_jobs()}
+        if cmd == "cancel":
+            return {"ok": self.cancel(request.get("id"))}
+        if cmd == "schedule":
+            return {"ok": True, "schedule": self.scheduler.list()}
+        if cmd == "metrics":
+            return {"ok": True, "metrics": REGISTRY.render()}
+        if cmd == "config":
+            return {"ok": True, "config": self.config_info()}
+        if cmd == "reload":
+            if self.config_store is not None:
+                self.config_store.refresh()
+            info = self.config_info()
+            return {"ok": not info.get("last_error"), "config": info}
+        if cmd == "telemetry":
+            if self.telemetry is None:
+                return {"ok": False, "error": "Telemetria desabilitada (telemetry.enabled)."}
+            response = {"ok": True, "telemetry": {**self.telemetry.info(), **self.telemetry.summary(request.get("seconds"))}}
+            if request.get("samples"):
+                response["samples"] = self.telemetry.history(request.get("seconds"))
+            return response
+        if cmd == "honeypot":
+            if self.honeypot is None:
+                return {"ok": False, "error": "Honeypot desabilitado (honeypot.enabled)."}
+            limit = request.get("limit", 20)
+            return {"ok": True, "honeypot": self.honeypot.stats(), "top_sources": self.honeypot.store.top_sources(limit),
+                    "events": self.honeypot.store.recent_events(limit)}
+        if cmd == "ids":
+            if self.ids is None:
+                return {"ok": False, "error": "Detector de intrusões desabilitado (ids.enabled)."}
+            return {"ok": True, "ids": self.ids.stats(), "alerts": self.ids.recent_alerts(request.get("limit", 20))}
+        if cmd == "enqueue":
+            try:
+                return {"ok": True, "batch": self.enqueue(request)}
+            except (ValueError, JobQueueError) as e: # Alvo inválido (core.targets) ou banco em rede
+                return {"ok": False, "error": str(e)}
+        if cmd == "shutdown":
+            threading.Thread(target=self.shutdown, name="shamann-shutdown", daemon=True).start()
+            return {"ok": True}
+        return {"ok": False, "error": f"Comando desconhecido: {cmd}"}
+
+    # --- Ciclo de vida ---
+
+    def _prepare_socket(self):
+        if os.path.exists(self.socket_path):
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                    probe.connect(self.socket_path)
+                raise DaemonError(f"Já existe um daemon ativo em '{self.socket_path}'.")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.socket_path) # Socket órfão de uma execução anterior
+
+    def start(self):
+        """Inicia o socket de controle e o agendador (não bloqueia)."""
+        self._prepare_socket()
+        self._server = _UnixServer(self.socket_path, _CommandHandler)
+        self._server.shamann_daemon = self
+        os.chmod(self.socket_path, 0o600) # Só o dono controla o daemon
+        self._server_thread = threading.Thread(target=self._server.serve_forever, name="shamann-socket", daemon=True)
+        self._server_thread.start()
+        if self.api is not None:
+            self.api.start()
+        self.scheduler.start()
+        if self.config_store is not None:
+            self.config_store.start()
+        if self.telemetry is not None:
+            self.telemetry.start()
+        if self.honeypot is not None:
+            self.honeypot.start()
+        if self.ids is not None:
+            self.ids.start()
+        logger.info(f"Daemon do Shamann ativo (pid {os.getpid()}), socket de controle em '{self.socket_path}'.")
+
+    def serve_forever(self):
+        """Inicia e bloqueia até SIGTERM/SIGINT ou o comando 'shutdown'."""
+        self.start()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda signum, frame: threading.Thread(target=self.shutdown, daemon=True).start())
+        self._stopped.wait()
+
+    def shutdown(self):
+        if self._stopped.is_set():
+            return
+        logger.info("Encerrando o daemon do Shamann...")
+        self.scheduler.stop()
+        if self.config_store is not None:
+            self.config_store.stop()
+        if self.telemetry is not None:
+            self.telemetry.stop()
+        if self.honeypot is not None:
+            self.honeypot.stop()
+        if self.ids is not None:
+            self.ids.stop()
+        for record in list(self.jobs.values()):
+            record["_cancel"].set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.api is not None:
+            self.api.stop()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        with self._queue_lock:
+            if self._queue is not None:
+                self._queue.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._stopped.set()
+        logger.info("Daemon do Shamann encerrado.")
+
+
+class DaemonClient:
+    """Cliente do socket de controle."""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: float = 10.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def request(self, cmd: str, **fields) -> dict:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(self.timeout)
+                sock.connect(self.socket_path)
+                sock.sendall(json.dumps(dict(fields, cmd=cmd)).encode("utf-8") + b"\n")
+                with sock.makefile("rb") as reader:
+                    line = reader.readline()
+        except OSError as e:
+            raise DaemonError(f"Não foi possível falar com o daemon em '{self.socket_path}': {e}") from e
+        if not line:
+            raise DaemonError("O daemon fechou a conexão sem responder.")
+        return json.loads(line)
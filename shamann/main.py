@@ -1,20 +1,34 @@
 # shamann/main.py
 
+import contextlib
 import os
 import logging
 import json
+import time
 from datetime import datetime
 import csv # Para escrever CSV
 
 # Importações dos seus módulos
+from shamann.modules.base_guardian import GuardianCancelled, ScanContext, run_blocking
 from shamann.modules.nmap_guardian import NmapGuardian
+from shamann.modules.recon.dns_cache import configure_dns_cache
+from shamann.modules.recon.asn_index import ASNIndex, ASNIndexError, enrich_hosts
+from shamann.modules.vuln_index import VulnIndex, VulnIndexError
+from shamann.core import metrics
+from shamann.core.config import CompiledConfig, ConfigError, compile_config, config_store
+from shamann.core.logging_config import setup_logging
+from shamann.core.profiling import Profiler, profiler_from_settings
+from shamann.core.targets import TargetError, TargetSet
+from shamann.core.tracing import Tracer, span
 # from shamann.persistence.db_manager import DBManager # Descomente se for usar DB
 # from shamann.utils.notifier import Notifier # Descomente se for usar Notifier
 
 # --- Configuração de Logging ---
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Os handlers são instalados pelos pontos de entrada (setup_logging), não na importação
 logger = logging.getLogger(__name__)
 
+CANCEL_POLL_INTERVAL = 0.5 # Segundos entre verificações de cancelamento durante o scan
+
 # --- Função para carregar configurações ---
 def load_config(config_path: str = 'shamann/config/scan_config.json') -> dict:
     # Tenta carregar o config.json, caso não haja um path CLI específico
@@ -49,7 +63,7 @@ def generate_reports(scan_results: dict, output_settings: dict):
         csv_filepath = os.path.join(output_dir, f"{csv_filename_prefix}_{timestamp}.csv")
 
         # Cabeçalhos do CSV
-        headers = ["Nivel", "Tipo", "IP", "Hostname", "OS", "Porta", "Protocolo", "Servico", "Versao_Servico", "Descricao_Alerta", "Recomendacao"]
+        headers = ["Nivel", "Tipo", "IP", "Hostname", "OS", "Porta", "Protocolo", "Servico", "Versao_Servico", "Descricao_Alerta", "Recomendacao", "ASN", "Org_ASN"]
 
         with open(csv_filepath, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
@@ -59,6 +73,8 @@ def generate_reports(scan_results: dict, output_settings: dict):
                 host_ip = host_data.get('ip_address', 'N/A')
                 host_hostname = host_data.get('hostname', 'N/A')
                 host_os = host_data.get('os_match', 'N/A')
+                host_asn = str(host_data.get('asn', 'N/A'))
+                host_as_org = host_data.get('as_org', 'N/A')
 
                 # Se há alertas, escreve cada um
                 if host_data.get('alerts'):
@@ -81,82 +97,239 @@ def generate_reports(scan_results: dict, output_settings: dict):
                             service_name,
                             f"{service_product} {service_version}".strip(),
                             alert.get('description', ''),
-                            alert.get('recommendation', '')
+                            alert.get('recommendation', ''),
+                            host_asn,
+                            host_as_org
                         ])
                 else: # Se não há alertas para o host, registra uma linha informativa
                     writer.writerow([
                         "INFO", "Nenhum Alerta Direto", host_ip, host_hostname, host_os,
-                        "N/A", "N/A", "N/A", "N/A", "Host online e escaneado, sem alertas de prioridade detectados.", ""
+                        "N/A", "N/A", "N/A", "N/A", "Host online e escaneado, sem alertas de prioridade detectados.", "",
+                        host_asn, host_as_org
                     ])
         logger.info(f"Relatório CSV de alertas salvo em: {csv_filepath}")
 
 
+# --- Rastreamento da execução (core.tracing) ---
+def _start_tracer(config: dict, trace: bool, started: float, target: str) -> Tracer | None:
+    if not (trace or config.get("tracing", {}).get("enabled")):
+        return None
+    tracer = Tracer("shamann.run", started=started, target=target)
+    tracer.add_span("load_config", started, time.perf_counter())
+    return tracer
+
+
+def _export_trace(tracer: Tracer, tracing_settings: dict):
+    """Grava o trace (JSON e/ou Chrome trace), registra o resumo por etapa no log e em internal_logs."""
+    for name, stage in tracer.summary()["stages"].items():
+        counts = ", ".join(f"{key}={value}" for key, value in stage["counts"].items())
+        logger.info(f"[trace] {name}: {stage['total_seconds']:.3f}s ({stage['calls']}x){' ' + counts if counts else ''}")
+    output_dir = tracing_settings.get("output_directory", "./output/traces")
+    formats = tracing_settings.get("formats", ["json", "chrome"])
+    prefix = os.path.join(output_dir, f"shamann_trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{tracer.trace_id[:8]}")
+    try:
+        if "json" in formats:
+            tracer.export_json(f"{prefix}.json")
+        if "chrome" in formats:
+            tracer.export_chrome_trace(f"{prefix}.chrome.json")
+        logger.info(f"Trace da execução salvo em: {prefix}.*")
+    except OSError as e:
+        logger.warning(f"Não foi possível salvar o trace em '{output_dir}': {e}")
+    if tracing_settings.get("db_path"):
+        from shamann.persistence.db_manager import DBManager
+        tracer.log_summary(DBManager(tracing_settings["db_path"]))
+
+
+# --- Perfilamento (core.profiling) ---
+def _start_profiler(config: dict, profile: dict | None) -> Profiler | None:
+    settings = config.get("profiling", {})
+    if profile is None and not settings.get("enabled"):
+        return None
+    return profiler_from_settings(settings, label=f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}", **(profile or {}))
+
+
 # --- Função principal do orquestrador (chamada pela CLI) ---
 def run_shamann_orchestrator(cli_target: str = None, config_path: str = 'shamann/config/scan_config.json',
-                              cli_ports: str = None, cli_output_dir: str = None):
+                              cli_ports: str = None, cli_output_dir: str = None, config: dict = None,
+                              write_reports: bool = True, trace: bool = False, metrics_file: str = None,
+                              profile: dict = None, cli_exclude: str = None, cancel_event=None) -> dict | None:
+    """
+    Executa o pipeline completo (scan Nmap, enriquecimento, classificação, relatórios).
+    config permite reutilizar uma configuração já carregada (ex: pelo daemon), sem reler o arquivo: um
+    CompiledConfig (core.config) é usado como está; um dict é validado e compilado nesta execução.
+    Sem config, o arquivo é compilado uma vez por processo e só recompilado quando muda (core.config.config_store).
+    trace (ou "tracing.enabled" na configuração) registra o tempo de cada etapa (ver _export_trace).
+    metrics_file (ou "metrics.textfile_path") recebe as métricas no formato texto do Prometheus ao final.
+    profile (ou "profiling.enabled") perfila a execução: {} perfila tudo; {"stages": [...], "memory_top": N,
+    "output_directory": ...} sobrepõe a seção "profiling" (ver core.profiling). O resumo vai para o log.
+    cli_exclude (ou "scan_profile.exclude") tira alvos do scan; as formas aceitas estão em core.targets.
+    cancel_event (threading.Event) interrompe o pipeline durante o scan e entre as etapas, levantando
+    GuardianCancelled; o processo do Nmap não pode ser encerrado (python-nmap) e termina em segundo plano.
+    Retorna os resultados processados, ou None se o scan não produziu resultados.
+    """
+    tracer = None
+    profiler = None
+    results = None
+    outcome = None
+    settings = config or {} # Disponível no finally mesmo se load_config falhar
+    started = time.perf_counter()
+    metrics.SCANS_STARTED.inc(guardian="pipeline")
     try:
-        config = load_config(config_path)
+        config = settings = config_store(config_path).refresh() if config is None else compile_config(config)
+        tracer = _start_tracer(config, trace, started, cli_target)
+        profiler = _start_profiler(config, profile)
+        with tracer or contextlib.nullcontext(), profiler or contextlib.nullcontext():
+            results = _run_pipeline(config, cli_target, cli_ports, cli_output_dir, write_reports, cli_exclude,
+                                    cancel_event)
+            return results
 
-        # Mesclar configurações da CLI com as do arquivo JSON
-        scan_profile = config.get("scan_profile", {})
-        alert_rules = config.get("alert_rules", [])
-        output_settings = config.get("output_settings", {})
+    except GuardianCancelled:
+        outcome = "cancelled"
+        logger.warning(f"Execução do Shamann para {cli_target} cancelada.")
+        raise
+    except FileNotFoundError as e:
+        logger.error(f"Erro de configuração: {e}")
+    except ConfigError as e:
+        logger.error(f"Configuração inválida: {e}")
+    except json.JSONDecodeError as e:
+        logger.error(f"Erro ao ler arquivo JSON de configuração: {e}")
+    except Exception as e:
+        logger.error(f"Ocorreu um erro inesperado na execução do Shamann: {e}", exc_info=True)
+    finally:
+        outcome = outcome or ("success" if results else "error")
+        metrics.record_scan_result("pipeline", outcome, time.perf_counter() - started, results)
+        if tracer is not None:
+            _export_trace(tracer, settings.get("tracing", {}))
+        if profiler is not None:
+            logger.info(profiler.report())
+        metrics_file = metrics_file or settings.get("metrics", {}).get("textfile_path")
+        if metrics_file:
+            try:
+                metrics.REGISTRY.write_textfile(metrics_file)
+            except OSError as e:
+                logger.warning(f"Não foi possível gravar as métricas em '{metrics_file}': {e}")
 
-        # Alvo: Prioridade para a CLI
-        target_network = cli_target if cli_target else scan_profile.get("target")
-        if not target_network:
-            logger.error("Alvo de scan não especificado. Use -t/--target ou configure em scan_config.json.")
-            return
 
-        # Portas: Prioridade para a CLI
-        ports_to_scan = cli_ports if cli_ports else scan_profile.get("ports", "1-1000")
-        if ports_to_scan.lower() == 'all':
-            ports_to_scan = "1-65535"
+def _run_pipeline(config: CompiledConfig, cli_target: str, cli_ports: str, cli_output_dir: str,
+                  write_reports: bool, cli_exclude: str = None, cancel_event=None) -> dict | None:
+    dns_cache_settings = config.get("dns_cache", {})
+    dns_cache = configure_dns_cache(dns_cache_settings)
 
-        # Opções Nmap: Vêm do config.json
-        nmap_options = scan_profile.get("nmap_options", "-sS -sV -O -A -T4")
-        include_default_scripts = scan_profile.get("include_default_scripts", True)
-        custom_scripts = scan_profile.get("custom_scripts", [])
+    # Mesclar configurações da CLI com as do arquivo JSON
+    scan_profile = config.scan_profile
+    alert_rules = config.rules # Já validadas e compiladas (core.config)
+    # Diretório de Saída: Prioridade para a CLI
+    output_settings = config.output_settings.as_dict(output_directory=cli_output_dir)
 
-        # Diretório de Saída: Prioridade para a CLI
-        if cli_output_dir:
-            output_settings["output_directory"] = cli_output_dir
+    # Alvo: Prioridade para a CLI
+    target_network = cli_target if cli_target else scan_profile.target
+    if not target_network:
+        logger.error("Alvo de scan não especificado. Use -t/--target ou configure em scan_config.json.")
+        return
 
-        logger.info(f"Iniciando operação do Shamann para o alvo: {target_network}")
-        logger.info(f"Portas a escanear: {ports_to_scan}")
+    # Expansão dos alvos: repetidos e sobrepostos se unem e as exclusões saem antes de chegar ao Nmap
+    try:
+        targets = TargetSet.parse(target_network, exclude=cli_exclude if cli_exclude else scan_profile.exclude)
+    except TargetError as e:
+        logger.error(f"Alvo inválido: {e}")
+        return
+    if not targets:
+        logger.error(f"Nenhum alvo restou de '{target_network}' depois das exclusões.")
+        return
+    summary = targets.summary()
+    logger.info(f"Alvos: {summary['addresses']} endereços em {summary['intervals']} intervalos, "
+                f"{summary['hostnames']} hostnames.")
+
+    # Portas: Prioridade para a CLI
+    ports_to_scan = cli_ports if cli_ports else scan_profile.ports
+    if ports_to_scan.lower() == 'all':
+        ports_to_scan = "1-65535"
+
+    # Opções Nmap: Vêm do config.json
+    nmap_options = scan_profile.nmap_options
+    include_default_scripts = scan_profile.include_default_scripts
+    custom_scripts = list(scan_profile.custom_scripts)
+
+    logger.info(f"Iniciando operação do Shamann para o alvo: {target_network}")
+    logger.info(f"Portas a escanear: {ports_to_scan}")
 
-        # 1. Inicializar NmapGuardian com o target da CLI/config
-        nmap_guardian = NmapGuardian(target=target_network)
+    # Pontos de cancelamento entre as etapas (e durante o scan, pelo adaptador de streaming)
+    context = ScanContext("pipeline", target_network, cancel_event=cancel_event)
+    context.check()
 
-        # 2. Executar o scan
-        scan_results = nmap_guardian.run_scan(
+    # 1. Inicializar NmapGuardian com o target da CLI/config
+    nmap_guardian = NmapGuardian(target=" ".join(targets.to_nmap()))
+
+    # 2. Executar o scan
+    with span("nmap.scan", target=target_network, ports=ports_to_scan) as scan_span:
+        scan = lambda: nmap_guardian.run_scan(
             nmap_options=nmap_options,
             ports_to_scan=ports_to_scan,
             include_default_scripts=include_default_scripts,
             custom_scripts=custom_scripts
         )
+        if cancel_event is None:
+            scan_results = scan()
+        else:
+            # run_blocking levanta GuardianCancelled no cancelamento, sem esperar o Nmap terminar
+            scan_results = next(event["result"] for event in run_blocking(scan, context, CANCEL_POLL_INTERVAL)
+                                if event["event"] == "result")
+        hosts = (scan_results or {}).get("hosts", [])
+        scan_span.count("hosts", len(hosts)).count("ports", sum(len(h.get("ports", [])) for h in hosts))
 
-        if not scan_results or not scan_results.get('hosts'):
-            logger.warning(f"Nenhum resultado ou hosts encontrados para o alvo {target_network}.")
-            return
+    if not scan_results or not scan_results.get('hosts'):
+        logger.warning(f"Nenhum resultado ou hosts encontrados para o alvo {target_network}.")
+        return
 
-        # 3. Classificar alertas com base nas regras do JSON
-        processed_scan_results = nmap_guardian.classify_alerts_with_rules(scan_results, alert_rules)
+    # 2.1 Enriquecer hosts com ASN/bloco/organização a partir do dump local (sem consultas de rede)
+    asn_database = config.get("enrichment", {}).get("asn_database")
+    if asn_database:
+        try:
+            with span("enrichment.asn", database=asn_database) as asn_span:
+                enriched = enrich_hosts(scan_results, ASNIndex.load(asn_database))
+                asn_span.count("hosts_enriched", enriched)
+            logger.info(f"{enriched} hosts enriquecidos com dados de ASN de '{asn_database}'.")
+        except (OSError, ValueError, ASNIndexError) as e:
+            logger.warning(f"Enriquecimento de ASN ignorado: não foi possível carregar '{asn_database}': {e}")
 
-        # 4. Gerar relatórios para validação manual
-        generate_reports(processed_scan_results, output_settings)
+    # 2.2 Índice local de vulnerabilidades (CPE -> CVE), usado na classificação
+    vuln_index = None
+    vuln_database = config.get("enrichment", {}).get("vuln_database")
+    if vuln_database:
+        try:
+            with span("enrichment.vuln_index_load", database=vuln_database):
+                vuln_index = VulnIndex.load(vuln_database)
+            logger.info(f"Índice de vulnerabilidades carregado de '{vuln_database}': {vuln_index.sizes['cves']} CVEs.")
+        except (OSError, ValueError, VulnIndexError) as e:
+            logger.warning(f"Correlação de CVEs ignorada: não foi possível carregar '{vuln_database}': {e}")
 
-        logger.info(f"Operação do Shamann para o alvo {target_network} concluída. Relatórios gerados.")
+    # 3. Classificar alertas com base nas regras do JSON
+    context.check()
+    with span("classify_alerts", rules=len(alert_rules)):
+        processed_scan_results = nmap_guardian.classify_alerts_with_rules(
+            scan_results, alert_rules, vuln_index=vuln_index,
+            max_cves_per_service=config.get("enrichment", {}).get("max_cves_per_service", 10))
 
-    except FileNotFoundError as e:
-        logger.error(f"Erro de configuração: {e}")
-    except json.JSONDecodeError as e:
-        logger.error(f"Erro ao ler arquivo JSON de configuração: {e}")
-    except Exception as e:
-        logger.error(f"Ocorreu um erro inesperado na execução do Shamann: {e}", exc_info=True)
+    # Estatísticas da execução (cache DNS compartilhado entre os guardiões)
+    dns_cache_stats = dns_cache.stats()
+    processed_scan_results["run_stats"] = {"dns_cache": dns_cache_stats}
+    logger.info(f"Cache DNS: {dns_cache_stats['hits']} acertos, {dns_cache_stats['misses']} falhas "
+                f"(taxa de acerto {dns_cache_stats['hit_rate']:.1%}), {dns_cache_stats['size']} entradas.")
+    if dns_cache_settings.get("persist_path"):
+        dns_cache.save(dns_cache_settings["persist_path"])
+
+    # 4. Gerar relatórios para validação manual
+    context.check()
+    if write_reports:
+        with span("generate_reports", formats=",".join(output_settings.get("report_format", ["json"]))):
+            generate_reports(processed_scan_results, output_settings)
+
+    logger.info(f"Operação do Shamann para o alvo {target_network} concluída.")
+    return processed_scan_results
 
 # Este bloco não é mais o ponto de entrada principal,
 # mas mantém a compatibilidade se alguém o executar diretamente (não recomendado).
 if __name__ == "__main__":
+    setup_logging(load_config('shamann/config/scan_config.json').get("logging"))
     logger.warning("Executando shamann/main.py diretamente. Use 'python -m shamann.cli.main --help' para a CLI.")
     run_shamann_orchestrator(config_path='shamann/config/scan_config.json') # Exemplo de uso direto
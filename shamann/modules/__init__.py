@@ -2,19 +2,17 @@
 
 # Inicializa o pacote shamann.modules
 
-# Importações explícitas para os módulos guardiões.
-# Isso pode ajudar o Python a encontrá-los ao importar o pacote.
-try:
-    from .whois_guardian import WhoisGuardian
-except ImportError:
-    print("Erro ao importar WhoisGuardian dentro de __init__.py")
+# Os guardiões são importados sob demanda (ver guardian_registry): importar o pacote
+# não carrega python-nmap, pexpect nem python-whois.
+_LAZY_GUARDIANS = {
+    "WhoisGuardian": ".whois_guardian",
+    "NmapGuardian": ".nmap_guardian",
+    "DirbGuardian": ".dirb_guardian",
+}
 
-try:
-    from .nmap_guardian import NmapGuardian
-except ImportError:
-    print("Erro ao importar NmapGuardian dentro de __init__.py")
 
-try:
-    from .dirb_guardian import DirbGuardian  # Adicionado import para DirbGuardian
-except ImportError:
-    print("Erro ao importar DirbGuardian dentro de __init__.py")
+def __getattr__(name):
+    if name in _LAZY_GUARDIANS:
+        from importlib import import_module
+        return getattr(import_module(_LAZY_GUARDIANS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
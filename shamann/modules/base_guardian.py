@@ -1,7 +1,249 @@
+# shamann/modules/base_guardian.py
+"""
+Classe base dos guardiões e protocolo de execução em streaming.
+
+Além do clássico run_scan(target, options) -> dict, um guardião expõe iter_scan(), um gerador
+de eventos (dicts) que permite acompanhar a execução:
+  - {"event": "progress", "guardian", "target", "done", "total", "elapsed", "message"}
+  - {"event": "partial", "guardian", "target", "data"} (um resultado parcial, ex: um achado)
+  - {"event": "result", "guardian", "target", "result"} (sempre o último; result no formato de run_scan)
+
+stream()/scan()/astream() envolvem iter_scan com timeout e cancelamento cooperativo: o guardião
+consulta o ScanContext (context.check() ou context.is_set()) e encerra seus processos/threads
+quando ele sinaliza. Guardiões que só implementam run_scan continuam funcionando pelo adaptador
+padrão, que executa run_scan em uma thread e emite eventos de progresso enquanto ela roda.
+
+RESOURCES declara o que uma execução consome (cpu em núcleos, conexões de rede simultâneas,
+subprocessos) para que agendadores possam empacotar trabalhos sem sobrecarregar a máquina.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+
+from shamann.core import metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESOURCES = {"cpu": 0.1, "network": 0, "subprocess": 0}
+
+
+class GuardianCancelled(Exception):
+    """Levantada por ScanContext.check() quando a execução foi cancelada ou excedeu o tempo limite."""
+
+    def __init__(self, reason: str = "cancelled"):
+        super().__init__(reason)
+        self.reason = reason # "cancelled" ou "timeout"
+
+
+class ScanContext:
+    """
+    Estado de uma execução: prazo, cancelamento e fábrica de eventos.
+    Também se comporta como um threading.Event (is_set/set/wait), então pode ser passado
+    diretamente como stop_event para código que já aceita um.
+    """
+
+    def __init__(self, guardian: str, target: str, timeout: float = None, cancel_event: threading.Event = None):
+        self.guardian = guardian
+        self.target = target
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout if timeout else None
+        self._parent = cancel_event
+        self._cancelled = threading.Event()
+
+    @property
+    def reason(self) -> str | None:
+        """None enquanto a execução pode continuar; senão 'cancelled' ou 'timeout'."""
+        if self._cancelled.is_set() or (self._parent is not None and self._parent.is_set()):
+            return "cancelled"
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return "timeout"
+        return None
+
+    def is_set(self) -> bool:
+        return self.reason is not None
+
+    def set(self):
+        """Cancela a execução."""
+        self._cancelled.set()
+
+    cancel = set
+
+    def wait(self, timeout: float = None) -> bool:
+        end = None if timeout is None else time.monotonic() + timeout
+        while not self.is_set():
+            remaining = None if end is None else end - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            self._cancelled.wait(0.1 if remaining is None else min(0.1, remaining))
+        return True
+
+    def remaining(self) -> float | None:
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        """Ponto de cancelamento cooperativo: levanta GuardianCancelled se a execução deve parar."""
+        reason = self.reason
+        if reason:
+            raise GuardianCancelled(reason)
+
+    # --- Eventos ---
+
+    def _event(self, kind: str, **fields) -> dict:
+        return {"event": kind, "guardian": self.guardian, "target": self.target, **fields}
+
+    def progress(self, done: int = 0, total: int = None, message: str = None) -> dict:
+        return self._event("progress", done=done, total=total,
+                           elapsed=round(time.monotonic() - self.started, 3), message=message)
+
+    def partial(self, data) -> dict:
+        return self._event("partial", data=data)
+
+    def result(self, result: dict) -> dict:
+        return self._event("result", result=result)
+
+
+def run_blocking(func, context: ScanContext, interval: float = 1.0):
+    """
+    Executa func() em uma thread e produz eventos de progresso enquanto ela roda; termina com
+    o evento "result" contendo o retorno (ou um resultado de erro). Código bloqueante não pode
+    ser interrompido: se o contexto for cancelado, a thread é abandonada (daemon) e
+    GuardianCancelled é levantada.
+    """
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = func()
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target, name=f"guardian-{context.guardian}", daemon=True)
+    thread.start()
+    while True:
+        remaining = context.remaining()
+        thread.join(interval if remaining is None else min(interval, remaining))
+        if not thread.is_alive():
+            break
+        if context.is_set():
+            logger.warning(f"Guardião '{context.guardian}' não pode ser interrompido; a execução em "
+                           f"{context.target} continua em segundo plano até terminar.")
+            context.check()
+        yield context.progress(message="em execução")
+    if "error" in outcome:
+        yield context.result({"target": context.target, "guardian": context.guardian, "status": "error",
+                              "error_message": str(outcome["error"])})
+    else:
+        yield context.result(outcome.get("result") or {"target": context.target, "guardian": context.guardian,
+                                                        "status": "error", "error_message": "Resultado vazio."})
+
+
 class BaseGuardian:
-    @staticmethod
-    def run_scan(target: str, options: str = "") -> dict:
-        raise NotImplementedError("Todo guardião deve implementar run_scan()")
+    RESOURCES = DEFAULT_RESOURCES
+    PROGRESS_INTERVAL = 1.0 # Segundos entre eventos de progresso do adaptador
+
+    @classmethod
+    def name(cls) -> str:
+        return cls.__name__.removesuffix("Guardian").lower()
+
+    @classmethod
+    def resources(cls, options: str = "") -> dict:
+        """Recursos que uma execução com estas opções consome (ver RESOURCES)."""
+        return dict(DEFAULT_RESOURCES, **cls.RESOURCES)
+
+    @classmethod
+    def run_scan(cls, target: str, options: str = "") -> dict:
+        if cls.iter_scan.__func__ is BaseGuardian.iter_scan.__func__:
+            raise NotImplementedError("Todo guardião deve implementar run_scan() ou iter_scan()")
+        return cls.scan(target, options)
+
+    @classmethod
+    def iter_scan(cls, target: str, options: str = "", context: ScanContext = None):
+        """
+        Gerador de eventos da execução (ver o docstring do módulo). O padrão adapta run_scan;
+        guardiões com resultados incrementais sobrescrevem este método.
+        """
+        context = context or ScanContext(cls.name(), target)
+        yield from run_blocking(lambda: cls.run_scan(target, options), context, cls.PROGRESS_INTERVAL)
+
+    @classmethod
+    def stream(cls, target: str, options: str = "", timeout: float = None, cancel_event: threading.Event = None):
+        """
+        Executa iter_scan com timeout e cancelamento. O último evento é sempre "result"; em caso de
+        cancelamento ou timeout, o resultado tem status 'cancelled'/'timeout_error' e os parciais já obtidos.
+        """
+        context = ScanContext(cls.name(), target, timeout, cancel_event)
+        partials = []
+        final = {"status": "abandoned", "result": None} # Para as métricas: consumidor que desiste no meio
+        metrics.SCANS_STARTED.inc(guardian=cls.name())
+        events = cls.iter_scan(target, options, context)
+        try:
+            for event in events:
+                if event["event"] == "partial":
+                    partials.append(event["data"])
+                elif event["event"] == "result":
+                    final.update(status=(event["result"] or {}).get("status", "error"), result=event["result"])
+                yield event
+                if event["event"] == "result":
+                    return
+                context.check()
+            raise RuntimeError(f"Guardião '{cls.name()}' terminou sem produzir um resultado.")
+        except GuardianCancelled as e:
+            events.close() # Dá ao guardião a chance de encerrar processos e threads
+            status = "timeout_error" if e.reason == "timeout" else "cancelled"
+            message = f"Tempo limite de {timeout}s excedido." if e.reason == "timeout" else "Execução cancelada."
+            final["status"] = status
+            yield context.result({"target": target, "guardian": cls.name(), "status": status,
+                                  "error_message": message, "partial_results": partials})
+        except Exception as e:
+            logger.error(f"Erro no guardião '{cls.name()}' para {target}: {e}", exc_info=True)
+            final["status"] = "error"
+            yield context.result({"target": target, "guardian": cls.name(), "status": "error",
+                                  "error_message": str(e), "partial_results": partials})
+        finally:
+            context.set() # Libera threads auxiliares se o consumidor abandonou o gerador
+            events.close()
+            metrics.record_scan_result(cls.name(), final["status"], time.monotonic() - context.started, final["result"])
+
+    @classmethod
+    def scan(cls, target: str, options: str = "", timeout: float = None, cancel_event: threading.Event = None,
+             on_event=None) -> dict:
+        """Consome stream() e retorna o resultado final; on_event(evento) recebe cada evento."""
+        result = None
+        for event in cls.stream(target, options, timeout, cancel_event):
+            if on_event is not None:
+                on_event(event)
+            if event["event"] == "result":
+                result = event["result"]
+        return result
+
+    @classmethod
+    async def astream(cls, target: str, options: str = "", timeout: float = None, cancel_event: threading.Event = None):
+        """
+        Versão assíncrona de stream(): o guardião roda em uma thread e os eventos chegam pelo loop.
+        Cancelar a task consumidora (ou fechar o gerador) cancela a execução.
+        """
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        cancel = threading.Event()
+        done = object()
+
+        def produce():
+            linked = cancel if cancel_event is None else _AnyEvent(cancel, cancel_event)
+            try:
+                for event in cls.stream(target, options, timeout, linked):
+                    loop.call_soon_threadsafe(events.put_nowait, event)
+            finally:
+                loop.call_soon_threadsafe(events.put_nowait, done)
+
+        producer = loop.run_in_executor(None, produce)
+        try:
+            while (event := await events.get()) is not done:
+                yield event
+        finally:
+            cancel.set()
+            await asyncio.shield(producer)
 
     @staticmethod
     def get_metadata() -> dict:
@@ -11,3 +253,30 @@ class BaseGuardian:
             "parameters": {},
             "version": "0.1"
         }
+
+
+class _AnyEvent:
+    """Combina dois eventos: sinalizado quando qualquer um deles for."""
+
+    def __init__(self, *events):
+        self.events = events
+
+    def is_set(self) -> bool:
+        return any(event.is_set() for event in self.events)
+
+
+def adapt_guardian(guardian_cls) -> type:
+    """
+    Garante o protocolo de streaming para uma classe de guardião: subclasses de BaseGuardian
+    são devolvidas como estão; guardiões legados (ex: plugins só com run_scan estático) ganham
+    um adaptador.
+    """
+    if isinstance(guardian_cls, type) and issubclass(guardian_cls, BaseGuardian):
+        return guardian_cls
+    legacy_name = getattr(guardian_cls, "__name__", "Guardian").removesuffix("Guardian").lower()
+    return type(f"{guardian_cls.__name__}Adapter", (BaseGuardian,), {
+        "RESOURCES": getattr(guardian_cls, "RESOURCES", DEFAULT_RESOURCES),
+        "run_scan": staticmethod(lambda target, options="": guardian_cls.run_scan(target, options)),
+        "name": classmethod(lambda cls: legacy_name),
+        "wrapped": guardian_cls,
+    })
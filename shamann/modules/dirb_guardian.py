@@ -1,137 +1,326 @@
-import subprocess
-from .base_guardian import BaseGuardian
-
 # shamann/modules/dirb_guardian.py
+import logging
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .base_guardian import BaseGuardian, ScanContext
 
-import sys
-import json
 # Importar pexpect (necessita 'pip install pexpect')
 try:
     import pexpect
 except ImportError:
-    print("Erro: A biblioteca 'pexpect' não está instalada. Por favor, instale-a usando 'pip install pexpect'")
+    # Sem saída na importação: o erro é informado no resultado do scan
     pexpect = None # Define pexpect como None se não puder importar
 
-class DirbGuardian:
+logger = logging.getLogger(__name__)
+
+# Linhas de resultado do Dirb:
+#   + http://alvo/index.html (CODE:200|SIZE:1234)
+#   ==> DIRECTORY: http://alvo/admin/
+# Usamos search() porque, sob TTY, o Dirb sobrescreve a linha de progresso com '\r'
+# e o achado pode vir precedido de lixo da linha "--> Testing: ...".
+FOUND_LINE_RE = re.compile(r"\+\s+(?P<url>\S+)\s+\(CODE:(?P<code>\d+)\|SIZE:(?P<size>\d+)\)")
+DIRECTORY_LINE_RE = re.compile(r"==>\s+DIRECTORY:\s+(?P<url>\S+)")
+
+
+class DirbGuardian(BaseGuardian):
     """
     Guardião responsável por interagir com a ferramenta Dirb usando pexpect.
+    A saída do Dirb é consumida linha a linha e convertida em achados estruturados
+    à medida que aparecem (ver stream_scan), em vez de um read() bloqueante até o EOF.
     """
 
+    RESOURCES = {"cpu": 0.3, "network": 1, "subprocess": 1}
+    DEFAULT_TIMEOUT_SECONDS = 300 # 5 minutos por processo Dirb
+    DEFAULT_MAX_PARALLEL = 4 # Processos Dirb simultâneos no modo multi-alvo
+
     @staticmethod
-    def run_scan(target: str, options: str = "") -> dict:
+    def parse_dirb_line(line: str) -> dict | None:
         """
-        Executa um scan Dirb para um target usando pexpect e retorna os resultados.
+        Converte uma linha de saída do Dirb em um achado estruturado.
+        Retorna None se a linha não for um achado (banner, progresso, estatísticas).
         """
-        print(f"DEBUG: DirbGuardian.run_scan iniciado para {target} com opções {options}")
+        match = FOUND_LINE_RE.search(line)
+        if match:
+            return {
+                "url": match.group("url"),
+                "code": int(match.group("code")),
+                "size": int(match.group("size")),
+                "directory": False
+            }
+        match = DIRECTORY_LINE_RE.search(line)
+        if match:
+            return {
+                "url": match.group("url"),
+                "code": None,
+                "size": None,
+                "directory": True
+            }
+        return None
 
-        # Verificar se pexpect foi importado com sucesso
-        if pexpect is None:
-            return {"target": target, "options": options, "status": "error", "error_message": "A biblioteca 'pexpect' não está disponível."}
+    @staticmethod
+    def _terminate_child(child):
+        """Encerra o processo Dirb (close -> terminate -> kill) se ele ainda estiver vivo."""
+        if child is None or not child.isalive():
+            return
+        try:
+            child.close() # Tenta fechar normalmente
+            if child.isalive(): # Se ainda vivo
+                child.terminate() # Tenta terminar
+                if child.isalive(): # Se ainda vivo
+                    child.kill(9) # Mata forçosamente
+        except Exception as kill_err:
+            logger.warning(f"Erro ao tentar matar o processo Dirb: {kill_err}")
+
+    @staticmethod
+    def stream_scan(target: str, options: str = "", timeout_seconds: int = DEFAULT_TIMEOUT_SECONDS,
+                    include_lines: bool = False, stop_event: threading.Event = None):
+        """
+        Executa o Dirb para um target e produz eventos à medida que a saída chega.
+
+        Eventos produzidos (dicts):
+          - {"event": "finding", "target", "finding": {url, code, size, directory}}
+          - {"event": "line", "target", "line"} (apenas se include_lines=True)
+          - {"event": "end", "target", "command_executed", "returncode", "status", ...} (sempre o último)
 
-        # --- Lógica real de execução do Dirb usando pexpect ---
-        # Certifique-se de que a ferramenta 'dirb' está instalada no sistema.
-        # Monta o comando completo como uma string para pexpect.spawn
-        # pexpect.spawn lida melhor com caminhos e argumentos
+        timeout_seconds limita a duração total do processo, não apenas o intervalo entre linhas.
+        stop_event permite ao chamador interromper o scan (o processo é encerrado).
+        """
         command_string = f"dirb {target}"
         if options:
             command_string += f" {options}"
 
-        print(f"DEBUG: Executando comando Dirb com pexpect: {command_string}")
+        end_event = {"event": "end", "target": target, "options": options, "command_executed": command_string}
 
-        # Adicionar timeout para a execução do pexpect
-        timeout_seconds = 300 # 5 minutos de timeout
-        child = None # Inicializar child fora do try
+        # Verificar se pexpect foi importado com sucesso
+        if pexpect is None:
+            end_event.update(status="error", error_message="A biblioteca 'pexpect' não está disponível. Instale-a com 'pip install pexpect'.")
+            yield end_event
+            return
+
+        logger.debug(f"Executando comando Dirb com pexpect: {command_string}")
 
+        child = None # Inicializar child fora do try
+        findings_count = 0
+        deadline = time.monotonic() + timeout_seconds
         try:
-            # Inicia o processo usando pexpect.spawn
-            # pexpect tenta simular um TTY, o que pode resolver o problema de hang.
-            # encoding='utf-8' para obter saída como string
+            # pexpect simula um TTY, o que evita o hang do Dirb com pipes.
             child = pexpect.spawn(command_string, encoding='utf-8', timeout=timeout_seconds)
 
-            # pexpect pode interagir com o processo, mas para dirb, geralmente só precisamos ler a saída até o fim (EOF)
-            # read() lê toda a saída até o final do arquivo (EOF) ou timeout
-            stdout = child.read()
-            stderr = "" # pexpect combina stdout e stderr por padrão, a menos que configurado de forma diferente
+            while True:
+                if stop_event is not None and stop_event.is_set():
+                    DirbGuardian._terminate_child(child)
+                    end_event.update(status="cancelled", findings_count=findings_count, returncode=None)
+                    yield end_event
+                    return
 
-            # Espera pelo processo terminar e obtém o código de retorno
-            child.close() # Fecha os pipes e espera o processo filho terminar
-            returncode = child.exitstatus if child.exitstatus is not None else child.signalstatus
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise pexpect.exceptions.TIMEOUT("Tempo limite total do Dirb excedido.")
 
-            print("DEBUG: Resultado bruto do Dirb (primeiros 200 chars):", stdout[:200])
-            print("DEBUG: Erro bruto do Dirb (se houver, capturado no stdout):", stderr[:200]) # Stderr estará vazio aqui
+                # Lê até o próximo fim de linha; o timeout curto permite reavaliar stop_event e o prazo total.
+                index = child.expect([r"\r?\n", pexpect.EOF, pexpect.TIMEOUT], timeout=min(remaining, 1.0))
+                if index == 2:
+                    continue
 
-            # TODO: Implementar o parsing real da saída do Dirb aqui
-            parsed_data = {
-                "target": target,
-                "options": options,
-                "returncode_dirb": returncode,
-                "files_found_count": stdout.count('+'), # Contagem simples baseada em '+ '
-                "stdout_summary": stdout.splitlines()[:10], # Primeiras 10 linhas
-                # stderr_summary não disponível separadamente com pexpect.read() padrão
-            }
+                line = child.before
+                if line:
+                    if include_lines:
+                        yield {"event": "line", "target": target, "line": line}
+                    finding = DirbGuardian.parse_dirb_line(line)
+                    if finding:
+                        findings_count += 1
+                        yield {"event": "finding", "target": target, "finding": finding}
+
+                if index == 1: # EOF
+                    break
+
+            # Espera pelo processo terminar e obtém o código de retorno
+            child.close()
+            returncode = child.exitstatus if child.exitstatus is not None else child.signalstatus
 
-            # Determinar o status com base no returncode (e talvez na saída)
+            # Determinar o status com base no returncode
             status = "completed"
             if returncode != 0:
-                 status = "error"
-                 if returncode is None: # Pode ser None se o processo foi encerrado por sinal (ex: timeout)
-                     status = "terminated"
+                status = "error"
+                if returncode is None: # Pode ser None se o processo foi encerrado por sinal
+                    status = "terminated"
 
-
-            return {
-                "target": target,
-                "options": options,
-                "command_executed": command_string,
-                "stdout": stdout, # Contém stdout e stderr combinados
-                "stderr": stderr, # Vazio neste método de captura simples
-                "returncode": returncode,
-                "status": status,
-                "parsed_data": parsed_data
-            }
+            end_event.update(status=status, returncode=returncode, findings_count=findings_count)
+            yield end_event
 
         except pexpect.exceptions.TIMEOUT:
-            print(f"Erro: O comando Dirb excedeu o tempo limite ({timeout_seconds} segundos) com pexpect.")
+            logger.error(f"O comando Dirb excedeu o tempo limite ({timeout_seconds} segundos) com pexpect.")
             stdout_partial = ""
             if child:
-                 try:
-                      stdout_partial = child.before + child.buffer # Tenta pegar o que foi lido antes do timeout
-                 except Exception as e_partial:
-                      print(f"Aviso: Erro ao obter saída parcial de pexpect: {e_partial}")
-
-            # Tenta matar o processo Dirb se ele ainda estiver rodando
-            if child and child.isalive():
-                 try:
-                      child.close() # Tenta fechar normalmente
-                      if child.isalive(): # Se ainda vivo
-                           child.terminate() # Tenta terminar
-                           if child.isalive(): # Se ainda vivo
-                                child.kill() # Mata forçosamente
-                 except Exception as kill_err:
-                      print(f"Aviso: Erro ao tentar matar processo Dirb após timeout: {kill_err}")
+                try:
+                    stdout_partial = (child.before or "") + (child.buffer or "") # O que foi lido e ainda não consumido
+                except Exception as e_partial:
+                    logger.warning(f"Erro ao obter saída parcial de pexpect: {e_partial}")
+            DirbGuardian._terminate_child(child)
+            end_event.update(
+                status="timeout_error", returncode=None, findings_count=findings_count,
+                error_message=f"Comando Dirb excedeu o tempo limite ({timeout_seconds}s) com pexpect.",
+                stdout_partial=stdout_partial, stderr_partial=None # stderr não separado
+            )
+            yield end_event
 
+        except pexpect.exceptions.ExceptionPexpect as e:
+            # ExceptionPexpect cobre o "comando não encontrado" levantado pelo spawn
+            logger.error(f"Falha ao iniciar o Dirb via pexpect: {e}. Certifique-se de que o Dirb está instalado e no PATH.")
+            DirbGuardian._terminate_child(child)
+            end_event.update(status="error", findings_count=findings_count,
+                             error_message=f"Comando Dirb não encontrado ou falhou (pexpect): {e}")
+            yield end_event
 
-            return {
-                "target": target, "options": options, "command_executed": command_string,
-                "status": "timeout_error", "error_message": f"Comando Dirb excedeu o tempo limite ({timeout_seconds}s) com pexpect.",
-                "stdout_partial": stdout_partial, "stderr_partial": None # stderr não separado
-            }
-        except pexpect.exceptions.ChildNotFound:
-             print("Erro: O comando 'dirb' não foi encontrado (pexpect ChildNotFound). Certifique-se de que o Dirb está instalado e no PATH.")
-             return {"target": target, "options": options, "command_executed": command_string, "status": "error", "error_message": "Comando Dirb não encontrado (pexpect)"}
+        except GeneratorExit:
+            # O consumidor abandonou o gerador: não deixar o Dirb órfão.
+            DirbGuardian._terminate_child(child)
+            raise
 
         except Exception as e:
-            print(f"Ocorreu um erro ao executar o Dirb (via pexpect): {e}")
-             # Tenta matar o processo Dirb se ele ainda estiver rodando
-            if child and child.isalive():
-                 try:
-                      child.close() # Tenta fechar normalmente
-                      if child.isalive(): # Se ainda vivo
-                           child.terminate() # Tenta terminar
-                           if child.isalive(): # Se ainda vivo
-                                kill() # Mata forçosamente
-                 except Exception as kill_err:
-                      print(f"Aviso: Erro ao tentar matar processo Dirb: {kill_err}")
-            return {"target": target, "options": options, "command_executed": command_string, "status": "error", "error_message": str(e)}
+            logger.error(f"Ocorreu um erro ao executar o Dirb (via pexpect): {e}", exc_info=True)
+            DirbGuardian._terminate_child(child)
+            end_event.update(status="error", findings_count=findings_count, error_message=str(e))
+            yield end_event
+
+    @classmethod
+    def iter_scan(cls, target: str, options: str = "", context: ScanContext = None):
+        """Protocolo de streaming: cada achado do Dirb vira um evento "partial"; o contexto encerra o processo."""
+        context = context or ScanContext(cls.name(), target)
+        remaining = context.remaining()
+        findings = []
+        for event in cls.stream_scan(target, options, cls.DEFAULT_TIMEOUT_SECONDS if remaining is None else remaining,
+                                     stop_event=context):
+            if event["event"] == "finding":
+                findings.append(event["finding"])
+                yield context.partial(event["finding"])
+            elif event["event"] == "end":
+                result = {k: v for k, v in event.items() if k != "event"}
+                result.update(guardian=cls.name(), findings=findings)
+                if result["status"] == "cancelled" and context.reason == "timeout":
+                    result["status"] = "timeout_error" # O prazo do contexto acabou antes do timeout do próprio Dirb
+                yield context.result(result)
+
+    @staticmethod
+    def run_scan(target: str, options: str = "") -> dict:
+        """
+        Executa um scan Dirb para um target usando pexpect e retorna os resultados.
+        Consome stream_scan até o fim; para resultados incrementais use stream_scan diretamente.
+        """
+        logger.debug(f"DirbGuardian.run_scan iniciado para {target} com opções {options}")
+
+        lines = []
+        findings = []
+        end_event = {}
+        for event in DirbGuardian.stream_scan(target, options, include_lines=True):
+            if event["event"] == "line":
+                lines.append(event["line"])
+            elif event["event"] == "finding":
+                findings.append(event["finding"])
+            elif event["event"] == "end":
+                end_event = event
+
+        stdout = "\n".join(lines) # Contém stdout e stderr combinados (pexpect)
+        result = {
+            "target": target,
+            "options": options,
+            "command_executed": end_event.get("command_executed"),
+            "status": end_event.get("status", "error"),
+        }
+        if "error_message" in end_event:
+            result["error_message"] = end_event["error_message"]
+        if result["status"] == "timeout_error":
+            result["stdout_partial"] = stdout + end_event.get("stdout_partial", "")
+            result["stderr_partial"] = None
+            result["findings"] = findings
+            return result
+        if "returncode" not in end_event:
+            return result # Falha antes de iniciar o processo
+
+        result.update({
+            "stdout": stdout,
+            "stderr": "", # pexpect combina stdout e stderr
+            "returncode": end_event.get("returncode"),
+            "findings": findings,
+            "parsed_data": {
+                "target": target,
+                "options": options,
+                "returncode_dirb": end_event.get("returncode"),
+                "files_found_count": sum(1 for f in findings if not f["directory"]),
+                "directories_found_count": sum(1 for f in findings if f["directory"]),
+                "stdout_summary": lines[:10], # Primeiras 10 linhas
+            }
+        })
+        return result
+
+    @staticmethod
+    def iter_multi_scan(targets, options: str = "", max_parallel: int = DEFAULT_MAX_PARALLEL,
+                        timeout_seconds: int = DEFAULT_TIMEOUT_SECONDS):
+        """
+        Executa vários processos Dirb em paralelo (no máximo max_parallel ao mesmo tempo)
+        e produz os eventos de stream_scan de todos os alvos conforme chegam.
+        Cada processo tem seu próprio timeout_seconds. Um evento "end" é produzido por alvo.
+        """
+        if isinstance(targets, str):
+            targets = [t.strip() for t in targets.split(",") if t.strip()]
+        targets = list(targets) # Geradores também: o total de "end" esperados vem de len(targets)
+        if not targets:
+            return
+
+        events = queue.Queue()
+        stop_event = threading.Event()
+
+        def worker(target):
+            try:
+                for event in DirbGuardian.stream_scan(target, options, timeout_seconds, stop_event=stop_event):
+                    events.put(event)
+            except Exception as e: # stream_scan já trata os erros; isto é só uma rede de segurança
+                events.put({"event": "end", "target": target, "options": options,
+                            "status": "error", "error_message": str(e)})
+
+        executor = ThreadPoolExecutor(max_workers=max(1, max_parallel), thread_name_prefix="dirb")
+        try:
+            for target in targets:
+                executor.submit(worker, target)
+            pending = len(targets)
+            while pending:
+                event = events.get()
+                if event["event"] == "end":
+                    pending -= 1
+                yield event
+        finally:
+            # Se o consumidor parar antes do fim, encerra os Dirb em execução e descarta os pendentes.
+            stop_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def run_multi_scan(targets, options: str = "", max_parallel: int = DEFAULT_MAX_PARALLEL,
+                       timeout_seconds: int = DEFAULT_TIMEOUT_SECONDS, on_finding=None) -> dict:
+        """
+        Executa o Dirb em vários alvos em paralelo e agrega os resultados por alvo.
+        on_finding(target, finding) é chamado para cada achado assim que ele aparece.
+        """
+        results = {}
+        for event in DirbGuardian.iter_multi_scan(targets, options, max_parallel, timeout_seconds):
+            entry = results.setdefault(event["target"], {"target": event["target"], "findings": []})
+            if event["event"] == "finding":
+                entry["findings"].append(event["finding"])
+                if on_finding:
+                    on_finding(event["target"], event["finding"])
+            elif event["event"] == "end":
+                entry.update({k: v for k, v in event.items() if k not in ("event", "target")})
+
+        statuses = {entry.get("status") for entry in results.values()}
+        return {
+            "targets": list(results.keys()),
+            "options": options,
+            "status": "completed" if statuses <= {"completed"} else "warning",
+            "findings_count": sum(len(entry["findings"]) for entry in results.values()),
+            "results": results
+        }
 
 # (Bloco __main__ comentado aqui)
 # if __name__ == "__main__":
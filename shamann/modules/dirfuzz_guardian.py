@@ -1,40 +1,85 @@
 import subprocess
-from .base_guardian import BaseGuardian
+from .base_guardian import BaseGuardian, ScanContext
+from shamann.core.metrics import HTTP_REQUESTS
 
+import time
 import threading
 import requests
-from queue import Queue
+from queue import Queue, Empty
+from urllib.parse import urlparse
 
-class DirFuzzGuardian:
-    @staticmethod
-    def run_scan(target: str, options: str = "") -> dict:
+from .recon.dns import resolve_addresses
+
+class DirFuzzGuardian(BaseGuardian):
+    RESOURCES = {"cpu": 0.5, "network": 10, "subprocess": 0}
+
+    @classmethod
+    def resources(cls, options: str = "") -> dict:
+        # Uma conexão por thread de fuzzing
+        import shlex
+        tokens = shlex.split(options)
+        threads = next((int(tokens[i + 1]) for i, tok in enumerate(tokens[:-1]) if tok in ("-t", "--threads")), 10)
+        return dict(super().resources(options), network=threads)
+
+    @classmethod
+    def run_scan(cls, target: str, options: str = "") -> dict:
+        return cls.scan(target, options)
+
+    @classmethod
+    def iter_scan(cls, target: str, options: str = "", context: ScanContext = None):
         import argparse, shlex
 
-        parser = argparse.ArgumentParser()
+        context = context or ScanContext(cls.name(), target)
+        parser = argparse.ArgumentParser(prog="dirfuzz", add_help=False)
         parser.add_argument("-w", "--wordlist", required=True)
         parser.add_argument("-t", "--threads", type=int, default=10)
-        args = parser.parse_args(shlex.split(options))
+        try:
+            args = parser.parse_args(shlex.split(options))
+        except SystemExit:
+            yield context.result({"target": target, "guardian": cls.name(), "status": "error",
+                                  "error_message": f"Opções inválidas para o DirFuzz: {options}"})
+            return
+
+        # Pré-validação pelo cache DNS compartilhado: falha cedo se o host não existir
+        host = urlparse(target).hostname
+        if host and not resolve_addresses(host):
+            yield context.result({
+                "target": target,
+                "status": "error",
+                "error_message": f"Não foi possível resolver o host '{host}'."
+            })
+            return
 
         q = Queue()
+        found = Queue()
         results = []
+        progress = {"done": 0}
 
         def worker():
-            while not q.empty():
-                word = q.get()
+            # Uma sessão por thread reaproveita conexões keep-alive; cada conexão nova ainda resolve
+            # o nome pelo getaddrinfo do sistema (o requests não consulta o cache DNS do Shamann)
+            session = requests.Session()
+            while not context.is_set():
+                try:
+                    word = q.get_nowait()
+                except Empty:
+                    return
                 url = f"{target.rstrip('/')}/{word}"
                 try:
-                    r = requests.get(url, timeout=5)
+                    r = session.get(url, timeout=5)
                     if r.status_code < 400:
-                        results.append(f"{r.status_code} - {url}")
-                except:
-                    pass
-                q.task_done()
+                        found.put(f"{r.status_code} - {url}")
+                    HTTP_REQUESTS.inc(guardian="dirfuzz", outcome="hit" if r.status_code < 400 else "miss")
+                except requests.RequestException:
+                    HTTP_REQUESTS.inc(guardian="dirfuzz", outcome="error")
+                progress["done"] += 1
 
         with open(args.wordlist, "r") as f:
             for line in f:
                 word = line.strip()
                 if word:
                     q.put(word)
+        total = q.qsize()
 
         threads = []
         for _ in range(args.threads):
@@ -43,10 +88,23 @@ class DirFuzzGuardian:
             t.start()
             threads.append(t)
 
-        q.join()
+        try:
+            last_progress = time.monotonic()
+            while any(t.is_alive() for t in threads) or not found.empty():
+                try:
+                    item = found.get(timeout=0.2)
+                    results.append(item)
+                    yield context.partial(item)
+                except Empty:
+                    pass
+                if time.monotonic() - last_progress >= cls.PROGRESS_INTERVAL:
+                    last_progress = time.monotonic()
+                    yield context.progress(progress["done"], total)
+        finally:
+            context.set() # Se o consumidor desistir, os workers param na próxima palavra
 
-        return {
+        yield context.result({
             "target": target,
             "status": "success",
             "found": results
-        }
+        })
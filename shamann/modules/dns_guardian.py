@@ -1,22 +1,59 @@
-import subprocess
+import logging
 from .base_guardian import BaseGuardian
+from .recon.dns import QTYPES, resolve_bulk, format_records
+from .recon.dns_cache import get_dns_cache
+
+logger = logging.getLogger(__name__)
 
 class DNSGuardian(BaseGuardian):
+    """
+    Guardião DNS: resolve nomes com o cliente assíncrono em processo (recon.dns),
+    sem abrir um processo 'dig' por consulta.
+    """
+
+    RESOURCES = {"cpu": 0.2, "network": 50, "subprocess": 0}
+
     @classmethod
     def name(cls) -> str:
         return "dns"
 
+    @staticmethod
+    def parse_options(options: str = "") -> dict:
+        """
+        Interpreta as opções no estilo do dig: '@servidor', tipo de registro (A, MX, ...).
+        Opções '+...' do dig não têm equivalente e são ignoradas.
+        """
+        parsed = {"qtype": "A", "nameservers": None}
+        for token in options.split():
+            if token.startswith("@"):
+                parsed["nameservers"] = (parsed["nameservers"] or []) + [token[1:]]
+            elif token.upper() in QTYPES:
+                parsed["qtype"] = token.upper()
+            else:
+                logger.warning(f"Opção DNS ignorada (sem equivalente no resolvedor interno): {token}")
+        return parsed
+
+    @classmethod
+    def run_bulk(cls, targets: list, qtype: str = "A", nameservers: list = None, **resolver_options) -> list[dict]:
+        """Resolve muitos nomes de uma vez, compartilhando os sockets do resolvedor."""
+        return resolve_bulk(targets, qtype, nameservers=nameservers, **resolver_options)
+
     @classmethod
     def run_scan(cls, target: str, options: str = "") -> dict:
         try:
-            options = options.strip()  # Limpa espaços extras
-            cmd = ["dig"] + options.split() + [target]  # Monta o comando
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+            opts = cls.parse_options(options.strip())
+            names = [t.strip() for t in target.split(",") if t.strip()]
+            results = cls.run_bulk(names, opts["qtype"], opts["nameservers"])
+            records = [record for result in results for record in result.get("answers", [])]
+            statuses = {result["status"] for result in results}
             return {
                 "target": target,
-                "command": " ".join(cmd),
-                "output": result.stdout.strip(),
-                "status": "success" if result.returncode == 0 else "warning"
+                "query_type": opts["qtype"],
+                "records": records,
+                "results": results,
+                "output": format_records(records),
+                "dns_cache": get_dns_cache().stats(),
+                "status": "error" if statuses == {"error"} else ("success" if statuses == {"success"} else "warning")
             }
         except Exception as e:
             return {
@@ -5,72 +5,10 @@ Este módulo define um guardião que executa uma tarefa específica de seguranç
 Substitua este texto pela descrição real da função do guardião.
 """
 
-class ExampleGuardian:
-    """
-    Executa uma análise fictícia de exemplo para fins de demonstração.
-    """
-
-    @staticmethod
-    def run_scan(target: str, options: str = "") -> dict:
-        """
-        Executa o processo de varredura/análise.
-
-        Args:
-            target (str): Alvo do escaneamento (ex: domínio, IP, URL).
-            options (str): Opções adicionais específicas do guardião.
-
-        Returns:
-            dict: Resultado estruturado contendo status e dados da análise.
-        """
-        try:
-            # Simulação de execução
-            fake_result = {
-                "info": "Este é um exemplo de resultado",
-                "input_target": target,
-                "used_options": options
-            }
-
-            return {
-                "target": target,
-                "guardian": "example",
-                "status": "success",
-                "data": fake_result
-            }
-
-        except Exception as e:
-            return {
-                "target": target,
-                "guardian": "example",
-                "status": "error",
-                "error_message": str(e)
-            }
-
-    @staticmethod
-    def get_metadata() -> dict:
-        """
-        Retorna metadados sobre este guardião.
+from .base_guardian import BaseGuardian
 
-        Returns:
-            dict: Metadados como nome, descrição e parâmetros aceitos.
-        """
-        return {
-            "name": "Example Guardian",
-            "description": "Guardião de demonstração para fins de teste e modelo.",
-            "parameters": {
-                "target": "Alvo do teste (ex: domínio ou IP)",
-                "options": "Opções adicionais como string"
-            },
-            "version": "1.0",
-            "author": "IA Shamann"
-        }
-"""
-Guardião de exemplo para o framework Shamann.
-Este módulo define um guardião que executa uma tarefa específica de segurança.
-
-Substitua este texto pela descrição real da função do guardião.
-"""
 
-class ExampleGuardian:
+class ExampleGuardian(BaseGuardian):
     """
     Executa uma análise fictícia de exemplo para fins de demonstração.
     """
@@ -1,66 +1,225 @@
 # shamann/modules/guardian_registry.py
+"""
+Registro central de guardiões.
 
-# Importe as classes de Guardiões.
-# Note: Você importou NmapGuardian duas vezes na versão que enviou, removi a duplicação.
-from .nmap_guardian import NmapGuardian
-from .dirb_guardian import DirbGuardian
-from .dirfuzz_guardian import DirFuzzGuardian
-from .dns_guardian import DNSGuardian
-from .whois_guardian import WhoisGuardian
-from .shamann_guardian import ShamannGuardian # Assumindo que este é o componente de alertas/decisão
-from .example_guardian import ExampleGuardian
-
-# Lista central de guardiões registrados:
-# Formato: (nome, classe, ativo?)
-GUARDIAN_CLASSES = [
-    ("nmap", NmapGuardian, True),
-    ("dirb", DirbGuardian, True),
-    ("dirfuzz", DirFuzzGuardian, True),
-    ("dns", DNSGuardian, True),
-    ("whois", WhoisGuardian, True),
-    ("shamann", ShamannGuardian, True),  # Ativado por padrão (componente de alerta/decisão?)
-    ("example", ExampleGuardian, False), # Exemplo desativado
+O registro guarda apenas descritores leves (nome, caminho de importação, metadados): a classe
+de um guardião só é importada no primeiro uso, então quem usa um único guardião não paga pelas
+dependências dos outros (python-nmap, pexpect, python-whois, requests...).
+
+Plugins externos são descobertos pelo grupo de entry points "shamann.guardians"
+(ex: `nome = pacote.modulo:ClasseGuardiao`). Como varrer os pacotes instalados é lento, o
+resultado fica em um índice em cache, invalidado quando algum diretório do sys.path muda.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+from collections.abc import Mapping
+from importlib import import_module
+
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "shamann.guardians"
+INDEX_PATH = os.environ.get("SHAMANN_GUARDIAN_INDEX",
+                            os.path.join(os.path.expanduser("~"), ".cache", "shamann", "guardian_index.json"))
+
+
+class GuardianLoadError(ImportError):
+    """O módulo de um guardião (ou uma dependência dele) não pôde ser importado."""
+
+
+class GuardianDescriptor:
+    """Descreve um guardião sem importá-lo. `import_path` tem o formato 'modulo:Classe'."""
+
+    def __init__(self, name: str, import_path: str, active: bool = True, description: str = "",
+                 source: str = "builtin"):
+        self.name = name
+        self.import_path = import_path
+        self.active = active
+        self.description = description
+        self.source = source # "builtin" ou "plugin"
+        self._cls = None
+
+    def __repr__(self):
+        return f"GuardianDescriptor({self.name!r}, {self.import_path!r}, active={self.active})"
+
+    def load(self) -> type:
+        """Importa (uma única vez) e retorna a classe do guardião."""
+        if self._cls is None:
+            module_name, _, class_name = self.import_path.partition(":")
+            try:
+                self._cls = getattr(import_module(module_name), class_name)
+            except (ImportError, AttributeError) as e:
+                raise GuardianLoadError(f"Não foi possível carregar o guardião '{self.name}' ({self.import_path}): {e}") from e
+        return self._cls
+
+    @property
+    def loaded(self) -> bool:
+        return self._cls is not None
+
+    def info(self) -> dict:
+        return {"name": self.name, "import_path": self.import_path, "active": self.active,
+                "description": self.description, "source": self.source}
+
+
+# Lista central de guardiões embutidos (nenhum é importado aqui)
+BUILTIN_GUARDIANS = [
+    GuardianDescriptor("nmap", "shamann.modules.nmap_guardian:NmapGuardian", True,
+                       "Scan de portas, serviços e SO com o Nmap, com classificação de alertas."),
+    GuardianDescriptor("dirb", "shamann.modules.dirb_guardian:DirbGuardian", True,
+                       "Força bruta de diretórios web com o Dirb (saída em streaming)."),
+    GuardianDescriptor("dirfuzz", "shamann.modules.dirfuzz_guardian:DirFuzzGuardian", True,
+                       "Fuzzing de diretórios web em Python puro."),
+    GuardianDescriptor("dns", "shamann.modules.dns_guardian:DNSGuardian", True,
+                       "Consultas DNS em lote com o resolvedor assíncrono."),
+    GuardianDescriptor("subdomain", "shamann.modules.subdomain_guardian:SubdomainGuardian", True,
+                       "Enumeração de subdomínios por wordlist com detecção de wildcard."),
+    GuardianDescriptor("whois", "shamann.modules.whois_guardian:WhoisGuardian", True,
+                       "Consultas WHOIS com cache persistente."),
+    GuardianDescriptor("shamann", "shamann.modules.shamann_guardian:ShamannGuardian", True,
+                       "Manutenção do sistema (atualizações, limpeza, backup)."),
+    GuardianDescriptor("example", "shamann.modules.example_guardian:ExampleGuardian", False,
+                       "Guardião de demonstração para fins de teste e modelo."),
 ]
 
-# --- ADIÇÃO: Crie o dicionário GUARDIANS para acesso direto por nome ---
-# Este dicionário incluirá apenas os guardiões marcados como ativos em GUARDIAN_CLASSES
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def _sys_path_fingerprint() -> list:
+    """Diretórios do sys.path com seus mtimes: instalar/remover um pacote altera o mtime do site-packages."""
+    fingerprint = []
+    for path in sys.path:
+        try:
+            fingerprint.append([path, os.stat(path or ".").st_mtime_ns])
+        except OSError:
+            continue
+    return fingerprint
+
+
+def _scan_entry_points() -> list:
+    from importlib.metadata import entry_points # Só importado quando o índice precisa ser refeito
+    return [{"name": ep.name, "import_path": ep.value} for ep in entry_points(group=ENTRY_POINT_GROUP)]
+
+
+def discover_plugins(index_path: str = None, refresh: bool = False) -> list:
+    """
+    Retorna os descritores dos plugins registrados no grupo de entry points, usando o índice em
+    cache quando ele ainda corresponde ao sys.path atual.
+    """
+    index_path = index_path or INDEX_PATH
+    fingerprint = _sys_path_fingerprint()
+    plugins = None
+    if not refresh:
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("fingerprint") == fingerprint:
+                plugins = index["plugins"]
+        except (OSError, ValueError, KeyError):
+            pass
+    if plugins is None:
+        plugins = _scan_entry_points()
+        try:
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+            tmp_path = f"{index_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": fingerprint, "plugins": plugins}, f)
+            os.replace(tmp_path, index_path)
+        except OSError as e:
+            logger.debug(f"Índice de guardiões não gravado em '{index_path}': {e}")
+    return [GuardianDescriptor(p["name"], p["import_path"], True, p.get("description", ""), "plugin") for p in plugins]
+
+
+def get_registry() -> dict:
+    """Retorna {nome: GuardianDescriptor} com os embutidos e os plugins (um plugin não substitui um embutido)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            registry = {descriptor.name: descriptor for descriptor in BUILTIN_GUARDIANS}
+            try:
+                plugins = discover_plugins()
+            except Exception as e:
+                logger.warning(f"Falha na descoberta de plugins de guardiões: {e}")
+                plugins = []
+            for descriptor in plugins:
+                if descriptor.name in registry:
+                    logger.warning(f"Plugin '{descriptor.import_path}' ignorado: já existe um guardião '{descriptor.name}'.")
+                    continue
+                registry[descriptor.name] = descriptor
+            _registry = registry
+        return _registry
+
+
+class _LazyGuardianMap(Mapping):
+    """Mapeamento nome -> classe dos guardiões ativos; a classe é importada no acesso."""
+
+    def __getitem__(self, name: str) -> type:
+        descriptor = get_registry().get(name)
+        if descriptor is None or not descriptor.active:
+            raise KeyError(name)
+        return descriptor.load()
+
+    def __contains__(self, name) -> bool:
+        descriptor = get_registry().get(name)
+        return descriptor is not None and descriptor.active
+
+    def __iter__(self):
+        return (name for name, descriptor in get_registry().items() if descriptor.active)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
 # O Mestre e outros módulos podem usar este dicionário para obter a classe de um Guardião pelo seu nome.
-GUARDIANS = {name: cls for name, cls, active in GUARDIAN_CLASSES if active}
+GUARDIANS = _LazyGuardianMap()
+
+
+def __getattr__(name):
+    # Compatibilidade: GUARDIAN_CLASSES (nome, classe, ativo?) importa todos os guardiões
+    if name == "GUARDIAN_CLASSES":
+        return [(d.name, d.load(), d.active) for d in get_registry().values()]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# --- Opcional: Se precisar de um dicionário com TODOS os guardiões (ativos ou não)
-# ALL_GUARDIANS_DICT = {name: cls for name, cls, active in GUARDIAN_CLASSES}
 
-# --- Funções que você já tinha (nomes ajustados para maior clareza) ---
+def list_guardians(include_inactive: bool = True) -> list:
+    """Informações de todos os guardiões sem importar nenhum deles."""
+    return [d.info() for d in get_registry().values() if include_inactive or d.active]
 
-def get_active_guardian_classes(): # Nome ajustado para maior clareza
+
+def get_active_guardian_classes():
     """
-    Retorna uma lista das classes de guardiões ativos.
+    Retorna uma lista das classes de guardiões ativos (importa todos eles).
     """
-    return [cls for name, cls, active in GUARDIAN_CLASSES if active]
+    return [descriptor.load() for descriptor in get_registry().values() if descriptor.active]
 
 
-def get_all_guardian_info(): # Nome ajustado para maior clareza
+def get_all_guardian_info():
     """
     Retorna uma lista de dicionários com informações (nome, classe, ativo) de todos os guardiões.
+    Importa as classes; para listar sem importar, use list_guardians().
     """
-    return [
-        {
-            "name": name,
-            "class": cls,
-            "active": active
-        }
-        for name, cls, active in GUARDIAN_CLASSES
-    ]
+    return [dict(descriptor.info(), **{"class": descriptor.load()}) for descriptor in get_registry().values()]
 
 
 def get_guardian_by_name(name: str):
     """
-    Retorna a classe de um guardião ATIVO pelo nome usando o dicionário GUARDIANS.
-    Retorna None se o guardião não for encontrado ou não estiver ativo.
+    Retorna a classe de um guardião ATIVO pelo nome, importando apenas o módulo dele.
+    Retorna None se o guardião não for encontrado ou não estiver ativo; levanta
+    GuardianLoadError se ele existir mas suas dependências não estiverem instaladas.
     """
-    # Use o dicionário GUARDIANS criado acima para uma busca eficiente apenas entre os ativos.
     return GUARDIANS.get(name)
 
-# Note: A importação 'from ... import load_guardians' no seu main.py não corresponde a nenhuma função aqui.
-# Se a função load_guardians não existe ou não é necessária neste arquivo, você deve removê-la do import no main.py.
-# Se load_guardians era para popular o dicionário GUARDIANS, a adição acima já faz isso de forma estática.
+
+def get_streaming_guardian(name: str):
+    """
+    Como get_guardian_by_name, mas sempre com o protocolo de streaming de BaseGuardian
+    (stream/scan/astream/resources), adaptando guardiões legados quando necessário.
+    """
+    guardian_cls = GUARDIANS.get(name)
+    if guardian_cls is None:
+        return None
+    from .base_guardian import adapt_guardian
+    return adapt_guardian(guardian_cls)
@@ -0,0 +1,425 @@
+# shamann/modules/honeypot.py
+"""
+Honeypot de baixa interação em asyncio puro (sem dependências externas).
+
+Cada porta configurada imita um serviço o suficiente para registrar quem conecta e o que tenta:
+  ssh     banner do OpenSSH; guarda a identificação do cliente
+  http    página de login de um Apache; guarda método, caminho, Host e User-Agent
+  telnet  prompt de login de um Ubuntu; guarda usuário e senha tentados
+  smb     lê a mensagem NetBIOS e identifica SMB1/SMB2; não responde
+
+Um único loop atende milhares de conexões simultâneas. Cada conexão tem limites próprios:
+bytes guardados (max_capture_bytes, que também é o limite do buffer do StreamReader, então um
+cliente que só envia dados não faz a memória crescer), tempo ocioso por leitura e duração total.
+Acima de max_connections simultâneas, novas conexões são fechadas na hora e contadas como
+rejeitadas.
+
+Os eventos (um por conexão) são gravados em lote (persistence.honeypot_store) por uma única
+tarefa, a cada batch_size eventos ou flush_interval segundos, fora do loop (to_thread). Origens
+que voltam repeat_threshold vezes em repeat_window segundos geram um alerta no formato dos
+guardiões, gravado pelo DBManager na tabela de alertas (guardião "honeypot") e entregue aos
+callbacks on_alert (ex: o Notifier).
+
+    with HoneypotService({"ports": {"2222": "ssh", "8080": "http"}, "db_path": "agent_ia.db"}) as honeypot:
+        ...
+        honeypot.stats()
+"""
+
+import asyncio
+import collections
+import logging
+import re
+import threading
+import time
+from datetime import datetime, UTC
+
+from shamann.core.metrics import REGISTRY
+from shamann.persistence.db_manager import DBManager
+from shamann.persistence.honeypot_store import HoneypotStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    "host": "0.0.0.0",
+    "ports": {"2222": "ssh", "8080": "http", "2323": "telnet", "4445": "smb"}, # Sem root; redirecione 22/80/... com iptables
+    "max_connections": 5000,
+    "max_capture_bytes": 4096,
+    "idle_timeout": 10.0,
+    "max_duration": 30.0,
+    "batch_size": 500,
+    "flush_interval": 1.0,
+    "max_pending_events": 100000, # Acima disso (banco lento sob inundação) os eventos mais antigos são descartados
+    "repeat_threshold": 20,
+    "repeat_window": 60.0,
+    "alert_cooldown": 600.0,
+    "max_tracked_sources": 100000,
+    "db_path": "agent_ia.db",
+}
+PREVIEW_BYTES = 256 # Bytes brutos guardados no evento (latin-1: qualquer byte vira um caractere)
+
+SSH_BANNER = b"SSH-2.0-OpenSSH_8.9p1 Ubuntu-3ubuntu0.10\r\n"
+HTTP_PAGE = (b"<html><head><title>Login</title></head><body><form method=\"post\" action=\"/login\">"
+             b"<input name=\"user\"><input name=\"password\" type=\"password\"><button>Entrar</button></form></body></html>")
+TELNET_NEGOTIATION = b"\xff\xfb\x01\xff\xfb\x03" # IAC WILL ECHO, IAC WILL SUPPRESS-GO-AHEAD
+TELNET_IAC_RE = re.compile(rb"\xff[\xfb-\xfe].|\xff[\xf0-\xfa]", re.DOTALL)
+
+HONEYPOT_CONNECTIONS = REGISTRY.counter("shamann_honeypot_connections_total", "Conexões recebidas pelo honeypot.",
+                                        ("protocol", "outcome"))
+HONEYPOT_ACTIVE = REGISTRY.gauge("shamann_honeypot_active_connections", "Conexões abertas no honeypot.")
+HONEYPOT_DROPPED = REGISTRY.counter("shamann_honeypot_events_dropped_total",
+                                    "Eventos descartados porque a fila de gravação estava cheia.")
+HONEYPOT_ALERTS = REGISTRY.counter("shamann_honeypot_alerts_total", "Alertas de origens repetidas.")
+
+
+class _Session:
+    """Leituras de uma conexão com tempo ocioso e captura limitados."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, max_capture: int, idle_timeout: float):
+        self.reader = reader
+        self.writer = writer
+        self.max_capture = max_capture
+        self.idle_timeout = idle_timeout
+        self.captured = bytearray()
+        self.bytes_in = 0
+        self.truncated = False
+        self.details = {}
+
+    def _keep(self, data: bytes) -> bytes:
+        self.bytes_in += len(data)
+        room = self.max_capture - len(self.captured)
+        if len(data) > room:
+            self.truncated = True
+        self.captured += data[:max(room, 0)]
+        return data
+
+    async def read(self, n: int = None) -> bytes:
+        return self._keep(await asyncio.wait_for(self.reader.read(n or self.max_capture), self.idle_timeout))
+
+    async def read_until(self, separator: bytes) -> bytes | None:
+        """Até o separador (inclusive); None se o cliente fechar antes ou passar do limite de captura."""
+        try:
+            return self._keep(await asyncio.wait_for(self.reader.readuntil(separator), self.idle_timeout))
+        except asyncio.IncompleteReadError as e:
+            self._keep(e.partial)
+        except asyncio.LimitOverrunError as e:
+            self._keep(await self.reader.read(e.consumed))
+            self.truncated = True
+        return None
+
+    async def send(self, data: bytes):
+        self.writer.write(data)
+        await asyncio.wait_for(self.writer.drain(), self.idle_timeout)
+
+
+def _text(data: bytes | None, limit: int = 200) -> str | None:
+    return None if data is None else data[:limit].decode("utf-8", errors="replace").strip()
+
+
+async def _ssh(session: _Session):
+    await session.send(SSH_BANNER)
+    session.details["client_banner"] = _text(await session.read_until(b"\n"))
+    await session.read() # KEXINIT do cliente, só para a captura
+
+
+async def _http(session: _Session):
+    head = await session.read_until(b"\r\n\r\n")
+    if head is None:
+        return
+    lines = head.decode("latin-1").split("\r\n")
+    method, _, rest = lines[0].partition(" ")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if value:
+            headers[name.strip().lower()] = value.strip()
+    session.details.update(method=method[:16], path=rest.rpartition(" ")[0][:200] or rest[:200],
+                           host=headers.get("host", "")[:200], user_agent=headers.get("user-agent", "")[:200])
+    await session.send(b"HTTP/1.1 200 OK\r\nServer: Apache/2.4.57 (Debian)\r\nContent-Type: text/html\r\n"
+                       b"Content-Length: " + str(len(HTTP_PAGE)).encode() + b"\r\nConnection: close\r\n\r\n" + HTTP_PAGE)
+
+
+async def _telnet(session: _Session):
+    await session.send(TELNET_NEGOTIATION + b"\r\nUbuntu 22.04.4 LTS\r\nlogin: ")
+    username = await session.read_until(b"\n")
+    if username is None:
+        return
+    session.details["username"] = _text(TELNET_IAC_RE.sub(b"", username), 64)
+    await session.send(b"Password: ")
+    password = await session.read_until(b"\n")
+    if password is not None:
+        session.details["password"] = _text(TELNET_IAC_RE.sub(b"", password), 64)
+    await session.send(b"\r\nLogin incorrect\r\n")
+
+
+async def _smb(session: _Session):
+    header = await session.read(4)
+    if len(header) < 4:
+        return
+    length = int.from_bytes(header[1:4], "big")
+    message = await session.read(min(length, session.max_capture)) if length else b""
+    session.details["dialect"] = "SMB2" if message[:4] == b"\xfeSMB" else "SMB1" if message[:4] == b"\xffSMB" else "?"
+
+
+PROTOCOLS = {"ssh": _ssh, "http": _http, "telnet": _telnet, "smb": _smb}
+
+
+class HoneypotService:
+    """
+    :param settings: Seção "honeypot" da configuração (ver DEFAULT_SETTINGS); "ports" mapeia porta -> protocolo
+                     (ou é uma lista de pares [porta, protocolo]; porta 0 = escolhida pelo sistema).
+    :param store: HoneypotStore já aberto (padrão: um novo em settings["db_path"]).
+    :param db: DBManager que grava os alertas (padrão: um novo em settings["db_path"]).
+    :param on_alert: Callbacks chamados com cada alerta (na thread de gravação).
+    """
+
+    def __init__(self, settings: dict = None, store: HoneypotStore = None, db: DBManager = None, on_alert=()):
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        ports = self.settings["ports"]
+        self.ports = [(int(port), protocol) for port, protocol in (ports.items() if isinstance(ports, dict) else ports)]
+        unknown = [protocol for _, protocol in self.ports if protocol not in PROTOCOLS]
+        if unknown:
+            raise ValueError(f"Protocolos de honeypot desconhecidos: {', '.join(unknown)} (use {', '.join(PROTOCOLS)}).")
+        self.store = store or HoneypotStore(self.settings["db_path"])
+        self.db = db or DBManager(self.settings["db_path"])
+        self.on_alert = list(on_alert)
+        self.bound = {} # porta real -> protocolo
+        self.counters = collections.Counter()
+        self.active = 0
+        self._pending = collections.deque()
+        self._alerts = []
+        self._sources = collections.OrderedDict() # ip -> deque(instantes), LRU limitado
+        self._alerted = {} # ip -> instante do último alerta
+        self._servers = []
+        self._writers = set()
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._wake = None
+        self._closing = None
+        self._flusher = None
+        self._error = None
+
+    # --- Conexões ---
+
+    async def _handle(self, protocol: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info("peername") or ("?", 0)
+        port = (writer.get_extra_info("sockname") or ("", 0))[1]
+        if self.active >= self.settings["max_connections"]:
+            self.counters["rejected"] += 1
+            HONEYPOT_CONNECTIONS.inc(protocol=protocol, outcome="rejected")
+            writer.transport.abort()
+            return
+        self.active += 1
+        HONEYPOT_ACTIVE.inc()
+        self._writers.add(writer)
+        started, timestamp = time.monotonic(), datetime.now(UTC).isoformat()
+        session = _Session(reader, writer, self.settings["max_capture_bytes"], self.settings["idle_timeout"])
+        outcome = "handled"
+        try:
+            await asyncio.wait_for(PROTOCOLS[protocol](session), self.settings["max_duration"])
+        except (TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+            pass # Cliente lento, ocioso ou que desconectou: o evento é registrado assim mesmo
+        except Exception as e:
+            outcome = "error"
+            logger.warning(f"Erro na sessão {protocol} de {peer[0]}: {e}")
+        finally:
+            self.active -= 1
+            HONEYPOT_ACTIVE.dec()
+            self._writers.discard(writer)
+            writer.close() # Sem esperar wait_closed: o transporte termina de enviar e fecha sozinho
+        self.counters[outcome] += 1
+        HONEYPOT_CONNECTIONS.inc(protocol=protocol, outcome=outcome)
+        if session.captured:
+            session.details["preview"] = bytes(session.captured[:PREVIEW_BYTES]).decode("latin-1")
+        self._record({"timestamp": timestamp, "source_ip": peer[0], "source_port": peer[1], "listen_port": port,
+                      "protocol": protocol, "duration": round(time.monotonic() - started, 3),
+                      "bytes_in": session.bytes_in, "truncated": session.truncated, "details": session.details})
+
+    def _record(self, event: dict):
+        if len(self._pending) >= self.settings["max_pending_events"]:
+            self._pending.popleft()
+            self.counters["dropped"] += 1
+            HONEYPOT_DROPPED.inc()
+        self._pending.append(event)
+        self._track(event)
+        if len(self._pending) >= self.settings["batch_size"]:
+            self._wake.set()
+
+    def _track(self, event: dict):
+        """Janela deslizante por origem: repeat_threshold conexões em repeat_window segundos geram um alerta."""
+        now, ip = time.monotonic(), event["source_ip"]
+        history = self._sources.pop(ip, None) or collections.deque(maxlen=self.settings["repeat_threshold"])
+        history.append((now, event["listen_port"], event["protocol"]))
+        self._sources[ip] = history
+        if len(self._sources) > self.settings["max_tracked_sources"]:
+            self._sources.popitem(last=False)
+        if len(history) < history.maxlen or now - history[0][0] > self.settings["repeat_window"]:
+            return
+        if now - self._alerted.get(ip, -float("inf")) < self.settings["alert_cooldown"]:
+            return
+        self._alerted[ip] = now
+        if len(self._alerted) > self.settings["max_tracked_sources"]:
+            self._alerted.pop(next(iter(self._alerted)))
+        ports = sorted({port for _, port, _ in history})
+        protocols = sorted({protocol for _, _, protocol in history})
+        window = round(now - history[0][0], 1)
+        self._alerts.append({
+            "level": "HIGH", "type": "Honeypot: origem recorrente", "host": ip,
+            "description": f"{ip} abriu {len(history)} conexões com o honeypot em {window}s "
+                           f"({', '.join(protocols)}; portas {', '.join(map(str, ports))}).",
+            "recommendation": "Nenhum serviço legítimo usa o honeypot: investigar a origem e bloqueá-la no firewall.",
+            "details": {"source_ip": ip, "connections": len(history), "window_seconds": window, "ports": ports,
+                        "protocols": protocols, "last_event": event["details"]},
+        })
+        self.counters["alerts"] += 1
+        HONEYPOT_ALERTS.inc()
+        logger.warning(self._alerts[-1]["description"])
+        self._wake.set()
+
+    # --- Gravação em lote ---
+
+    def _write_alerts(self, alerts: list):
+        self.db.save_guardian_result("honeypot", "honeypot", {"status": "success", "alerts": alerts})
+        for alert in alerts:
+            for callback in self.on_alert:
+                try:
+                    callback(alert)
+                except Exception as e:
+                    logger.error(f"Erro no callback de alerta do honeypot: {e}", exc_info=True)
+
+    def _requeue(self, events: list, alerts: list):
+        """
+        Devolve o que não foi gravado à frente da fila, para a próxima gravação. max_pending_events
+        continua valendo: sem espaço, os eventos mais antigos do lote são descartados, como em _record.
+        """
+        self._alerts[:0] = alerts
+        room = max(0, self.settings["max_pending_events"] - len(self._pending))
+        kept = events[len(events) - room:] if room < len(events) else events
+        self._pending.extendleft(reversed(kept))
+        if len(kept) < len(events):
+            self.counters["dropped"] += len(events) - len(kept)
+            HONEYPOT_DROPPED.inc(len(events) - len(kept))
+
+    async def _flush_forever(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.settings["flush_interval"])
+            except TimeoutError:
+                pass
+            self._wake.clear()
+            flushed = await self._flush()
+            if self._closing.is_set():
+                if not flushed: # Última tentativa no encerramento: o que sobrou se perde
+                    logger.error(f"Honeypot encerrado com {len(self._pending)} eventos e {len(self._alerts)} "
+                                 "alertas não gravados.")
+                return
+
+    async def _flush(self) -> bool:
+        """Grava o pendente em lotes. Retorna False se uma gravação falhou (o lote volta para a fila)."""
+        while self._pending or self._alerts:
+            batch = [self._pending.popleft() for _ in range(min(len(self._pending), self.settings["batch_size"]))]
+            alerts, self._alerts = self._alerts, []
+            try:
+                await asyncio.to_thread(self.store.insert_events, batch)
+                self.counters["written"] += len(batch)
+                self.counters["batches"] += 1
+                batch = [] # Já gravados: se os alertas falharem, só eles voltam
+                if alerts:
+                    await asyncio.to_thread(self._write_alerts, alerts)
+            except Exception as e:
+                self.counters["write_errors"] += 1
+                logger.error(f"Falha ao gravar {len(batch)} eventos e {len(alerts)} alertas do honeypot "
+                             f"(nova tentativa na próxima gravação): {e}", exc_info=True)
+                self._requeue(batch, alerts)
+                return False
+        return True
+
+    # --- Ciclo de vida ---
+
+    async def start_async(self):
+        """Abre as portas no loop corrente e inicia a gravação em lote."""
+        self._wake, self._closing = asyncio.Event(), asyncio.Event()
+        limit = max(self.settings["max_capture_bytes"], 64) # Também limita o buffer do StreamReader
+        for port, protocol in self.ports:
+            server = await asyncio.start_server(
+                lambda reader, writer, protocol=protocol: self._handle(protocol, reader, writer),
+                self.settings["host"], port, limit=limit, backlog=4096, reuse_address=True)
+            self._servers.append(server)
+            self.bound[server.sockets[0].getsockname()[1]] = protocol
+        self._flusher = asyncio.ensure_future(self._flush_forever())
+        logger.info("Honeypot ativo: " + ", ".join(f"{protocol}/{port}" for port, protocol in self.bound.items()))
+        return self
+
+    async def aclose(self):
+        for server in self._servers:
+            server.close()
+        for writer in list(self._writers): # wait_closed espera as conexões abertas
+            writer.transport.abort()
+        for server in self._servers:
+            await server.wait_closed()
+        self._servers = []
+        if self._flusher is not None:
+            self._closing.set()
+            self._wake.set()
+            await self._flusher
+            self._flusher = None
+
+    def start(self):
+        """Roda o honeypot em uma thread com loop próprio; retorna quando as portas estão abertas."""
+        if self._thread is not None:
+            return self
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self.start_async())
+            except Exception as e:
+                self._error = e
+                self._ready.set()
+                self._loop.close()
+                return
+            self._ready.set()
+            try:
+                self._loop.run_forever()
+                self._loop.run_until_complete(self.aclose())
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="shamann-honeypot", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            self._thread = None
+            raise self._error
+        return self
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=30)
+        self._thread = None
+        self._ready.clear()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def stats(self) -> dict:
+        return {"ports": {str(port): protocol for port, protocol in self.bound.items()}, "active": self.active,
+                "pending_events": len(self._pending), "tracked_sources": len(self._sources),
+                "running": self._thread is not None or bool(self._servers), **self.counters}
+
+
+_services = []
+_services_lock = threading.Lock()
+
+
+def honeypot_service(settings: dict = None) -> HoneypotService:
+    """Honeypot compartilhado pelo processo (criado e iniciado com settings na primeira chamada)."""
+    with _services_lock:
+        if not _services:
+            _services.append(HoneypotService(settings).start())
+        return _services[0]
@@ -0,0 +1,685 @@
+# shamann/modules/intrusion_detection.py
+"""
+Detecção de intrusões sobre os logs do sistema (auth.log, syslog e exportações do journald).
+
+As fontes são lidas de forma incremental: a cada poll, só os bytes escritos desde o último
+offset (pread até a última linha completa). Offset, inode e dispositivo de cada arquivo são
+gravados em state_path depois de cada poll, então um reinício continua de onde parou sem reler
+nada. Rotação (inode novo no caminho) e truncamento (copytruncate) são detectados: o resto do
+arquivo antigo é lido pelo descritor ainda aberto antes de passar ao novo, e uma rotação ocorrida
+com o detector parado é terminada em <caminho>.1, se o inode gravado estiver lá.
+
+Assinaturas (DEFAULT_SIGNATURES mais os arquivos JSON de signature_files) são regex sobre a
+mensagem da linha, opcionalmente restritas a programas (sshd, sudo...). Para milhares delas em
+uma só passada, cada assinatura é indexada por uma palavra literal obrigatória do padrão
+(required_literals, ou "keyword" explícita): a mensagem é dividida em palavras, cada palavra é
+uma consulta ao dicionário e só as assinaturas das palavras presentes rodam. Padrões cujo literal
+não é uma palavra inteira entram em um segundo índice, por trecho de 4 caracteres, consultado em
+cada posição da mensagem. O custo por linha não cresce com o número de assinaturas; as poucas sem
+literal nenhum rodam em toda linha do programa delas.
+
+Com "aggregate": {"by": "ip", "threshold": 10, "window": 60}, a assinatura só alerta quando o mesmo
+valor do grupo nomeado aparece threshold vezes em window segundos, pelo horário da linha (então
+ler um atraso acumulado não gera alertas falsos), e cada chave respeita alert_cooldown. Os alertas
+seguem o formato dos guardiões, são gravados pelo DBManager (guardião "log_ids") e entregues aos
+callbacks on_alert.
+
+Formatos: "syslog" (BSD "Oct 19 18:26:57 host prog[pid]: msg" ou RFC 3339 do rsyslog) e
+"journal" (uma linha JSON por registro, de `journalctl -o json`).
+
+    with IntrusionDetector({"sources": ["/var/log/auth.log"], "state_path": "/tmp/ids.json"}) as ids:
+        ...
+        ids.stats(), ids.recent_alerts()
+"""
+
+import collections
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from shamann.core.metrics import REGISTRY
+from shamann.persistence.db_manager import DBManager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    "sources": [{"path": "/var/log/auth.log", "format": "syslog"}, {"path": "/var/log/syslog", "format": "syslog"}],
+    "state_path": "/var/lib/shamann/ids_state.json",
+    "from_start": False, # Arquivo sem estado gravado: False = começa do fim (sem alertas do histórico antigo)
+    "interval_seconds": 1.0,
+    "signature_files": [],
+    "disabled_signatures": [],
+    "alert_cooldown": 600.0,
+    "max_tracked_keys": 100000,
+    "db_path": "agent_ia.db",
+}
+GRAM_SIZE = 4 # Caracteres por chave do índice de trechos
+READ_SIZE = 1 << 20 # Bytes por pread; uma linha maior que isso sem '\n' é processada como está
+MONTHS = {name: number for number, name in enumerate(
+    ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), 1)}
+REGEX_SPECIAL = frozenset(".^$*+?{}[]()|")
+
+# Endereço IPv4 ou IPv6 de origem, como o sshd e o PAM escrevem
+IP = r"(?P<ip>[0-9A-Fa-f:.]+)"
+DEFAULT_SIGNATURES = [
+    {"id": "ssh_failed_password", "program": ["sshd", "sshd-session"], "level": "HIGH",
+     "pattern": rf"^Failed (?:password|publickey|keyboard-interactive/pam) for (?:invalid user )?(?P<user>\S*) from {IP} ",
+     "aggregate": {"by": "ip", "threshold": 10, "window": 60}, "type": "SSH: força bruta",
+     "description": "{count} falhas de login SSH de {ip} em {window}s (último usuário: {user}).",
+     "recommendation": "Bloquear a origem (fail2ban/ufw) e exigir autenticação por chave (PasswordAuthentication no)."},
+    {"id": "ssh_invalid_user", "program": ["sshd", "sshd-session"], "level": "MEDIUM",
+     "pattern": rf"^Invalid user (?P<user>\S*) from {IP}", "aggregate": {"by": "ip", "threshold": 5, "window": 60},
+     "type": "SSH: enumeração de usuários",
+     "description": "{count} tentativas de usuários inexistentes de {ip} em {window}s (último: {user}).",
+     "recommendation": "Bloquear a origem e conferir se algum dos nomes tentados existe no sistema."},
+    {"id": "ssh_preauth_disconnect", "program": ["sshd", "sshd-session"], "level": "MEDIUM",
+     "pattern": rf"^(?:Connection closed|Disconnected) by (?:invalid user \S* |authenticating user \S* )?{IP} port \d+ \[preauth\]$",
+     "aggregate": {"by": "ip", "threshold": 30, "window": 60}, "type": "SSH: varredura",
+     "description": "{count} conexões SSH encerradas antes da autenticação por {ip} em {window}s.",
+     "recommendation": "Origem varrendo o SSH: bloquear no firewall ou limitar conexões (MaxStartups)."},
+    {"id": "ssh_root_login", "program": ["sshd", "sshd-session"], "level": "HIGH",
+     "pattern": rf"^Accepted (?P<method>\S+) for root from {IP} ", "type": "SSH: login de root",
+     "description": "Login SSH de root aceito ({method}) a partir de {ip}.",
+     "recommendation": "Desabilitar PermitRootLogin e usar sudo a partir de contas nominais."},
+    {"id": "sudo_auth_failures", "program": "sudo", "level": "HIGH",
+     "pattern": r"^\s*(?P<user>\S+) : (?:\d+ incorrect password attempts?|user NOT in sudoers)",
+     "aggregate": {"by": "user", "threshold": 3, "window": 300}, "type": "sudo: falhas de autenticação",
+     "description": "{count} falhas de sudo do usuário {user} em {window}s.",
+     "recommendation": "Confirmar com o dono da conta; pode ser uma conta comprometida tentando escalar privilégio."},
+    {"id": "pam_auth_failure", "level": "MEDIUM",
+     "pattern": r"pam_unix\(\S+:auth\): authentication failure;.* rhost=(?P<ip>\S+)",
+     "aggregate": {"by": "ip", "threshold": 10, "window": 60}, "type": "PAM: falhas de autenticação",
+     "description": "{count} falhas de autenticação PAM de {ip} em {window}s.",
+     "recommendation": "Verificar o serviço atacado (ssh, ftp, login) e bloquear a origem."},
+    {"id": "user_created", "program": "useradd", "level": "MEDIUM", "pattern": r"^new user: name=(?P<user>[^,]+),",
+     "type": "Conta criada", "description": "Conta local criada: {user}.",
+     "recommendation": "Confirmar que a criação foi autorizada; contas novas são uma forma comum de persistência."},
+    {"id": "sudoers_group_change", "program": ["usermod", "gpasswd"], "level": "HIGH",
+     "pattern": r"add '(?P<user>[^']+)' to (?:shadow )?group '(?P<group>sudo|wheel|admin|root)'",
+     "type": "Privilégio concedido", "description": "Usuário {user} adicionado ao grupo {group}.",
+     "recommendation": "Confirmar a mudança; adicionar contas a grupos administrativos dá root pelo sudo."},
+    {"id": "ssh_breakin_attempt", "program": ["sshd", "sshd-session"], "level": "MEDIUM",
+     "pattern": r"POSSIBLE BREAK-IN ATTEMPT",
+     "type": "SSH: DNS reverso forjado", "description": "O sshd registrou uma possível tentativa de invasão.",
+     "recommendation": "Conferir o DNS reverso da origem e bloqueá-la se não for conhecida."},
+    {"id": "firewall_port_scan", "program": "kernel", "level": "MEDIUM",
+     "pattern": r"\[UFW BLOCK\] .*SRC=(?P<ip>\S+) .*DPT=(?P<port>\d+)",
+     "aggregate": {"by": "ip", "threshold": 20, "window": 60}, "type": "Firewall: varredura de portas",
+     "description": "{count} pacotes de {ip} bloqueados pelo UFW em {window}s (última porta: {port}).",
+     "recommendation": "Origem varrendo o host: manter o bloqueio e verificar se alguma porta ficou exposta."},
+    {"id": "kernel_segfault", "program": "kernel", "level": "LOW", "pattern": r"(?P<process>\S+)\[\d+\]: segfault at",
+     "aggregate": {"by": "process", "threshold": 5, "window": 300}, "type": "Falhas de segmentação",
+     "description": "{process} falhou {count} vezes em {window}s (pode ser tentativa de exploração).",
+     "recommendation": "Verificar a versão do programa e se ele recebe entrada da rede."},
+]
+
+IDS_LINES = REGISTRY.counter("shamann_ids_lines_total", "Linhas de log analisadas pelo detector de intrusões.",
+                             ("format",))
+IDS_MATCHES = REGISTRY.counter("shamann_ids_matches_total", "Linhas que casaram com alguma assinatura.")
+IDS_ALERTS = REGISTRY.counter("shamann_ids_alerts_total", "Alertas do detector de intrusões.", ("signature",))
+
+
+def required_literals(pattern: str) -> tuple[str | None, str | None]:
+    """
+    Literais que toda linha casada precisa conter, para os índices de assinaturas:
+    (maior palavra inteira, entre espaços literais ou entre ^/$ e um espaço; maior trecho literal).
+    Conservadora: só olha o nível externo do padrão e desiste com alternância no topo, (?i) ou (?x).
+    Escapes alfanuméricos (\\d, \\x41, \\u00e9, \\N{...}, \\1) e o conteúdo de {...} nunca são literais.
+    """
+    if re.search(r"\(\?[a-zA-Z]*[ix]", pattern):
+        return None, None
+    words, runs = [], []
+    word, clean, run, depth = [], True, [], 0
+    left = pattern.startswith("^") # Espaço (ou início ancorado) à esquerda da palavra corrente
+    end = len(pattern) - 1 if pattern.endswith("$") and not pattern.endswith("\\$") else len(pattern)
+    i = 1 if left else 0
+    while i < end:
+        char = pattern[i]
+        if char == "\\":
+            escaped = pattern[i + 1:i + 2]
+            if depth == 0 and escaped and not escaped.isalnum() and not escaped.isspace():
+                word.append(escaped)
+                run.append(escaped)
+            else:
+                clean = False
+                runs.append("".join(run))
+                run = []
+                if escaped.isalnum():
+                    i = _escape_end(pattern, i)
+                    if i is None:
+                        return None, None
+                    continue
+            i += 2
+            continue
+        if depth == 0 and char in "?*+{" and run: # O quantificador vale para o último literal
+            run.pop()
+        if char == "[": # Classe de caracteres: pula até o ']' que a fecha
+            i += 1
+            if pattern[i:i + 1] == "^":
+                i += 1
+            if pattern[i:i + 1] == "]":
+                i += 1
+            while i < end and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+        elif char == "{": # Limites do quantificador (ou chaves literais): nada ali conta como literal
+            i = pattern.find("}", i)
+            if i < 0:
+                return None, None
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return None, None
+        if char == " " and depth == 0:
+            solid = pattern[i + 1:i + 2] not in ("?", "*", "{") # Espaço opcional não delimita nada
+            if left and solid and clean and word:
+                words.append("".join(word))
+            word, clean, left = [], True, solid
+            run.append(char)
+        elif depth == 0 and char not in REGEX_SPECIAL:
+            word.append(char)
+            run.append(char)
+        else:
+            clean = False
+            if run:
+                runs.append("".join(run))
+                run = []
+        i += 1
+    if end < len(pattern) and left and clean and word:
+        words.append("".join(word))
+    runs.append("".join(run))
+    return max(words, key=len, default=None), max(runs, key=len) or None
+
+
+def _escape_end(pattern: str, i: int) -> int | None:
+    """Posição logo depois do escape alfanumérico que começa em pattern[i] ('\\'); None se não souber."""
+    kind = pattern[i + 1]
+    if kind in "xuU":
+        return i + 2 + {"x": 2, "u": 4, "U": 8}[kind]
+    if kind == "N":
+        close = pattern.find("}", i)
+        return None if close < 0 else close + 1
+    if kind.isdigit(): # Octal ou referência a grupo: até 3 dígitos (consumir demais só perde literal)
+        end = i + 2
+        while end < i + 4 and pattern[end:end + 1].isdigit():
+            end += 1
+        return end
+    return i + 2
+
+
+class Signature:
+    """Uma assinatura compilada (ver DEFAULT_SIGNATURES para o formato)."""
+
+    __slots__ = ("id", "programs", "regex", "keyword", "literal", "level", "type", "description", "recommendation",
+                 "by", "threshold", "window")
+
+    def __init__(self, spec: dict):
+        self.id = spec["id"]
+        programs = spec.get("program")
+        self.programs = frozenset([programs] if isinstance(programs, str) else programs) if programs else None
+        flags = re.IGNORECASE if spec.get("ignore_case") else 0
+        try:
+            self.regex = re.compile(spec["pattern"], flags)
+        except re.error as e:
+            raise ValueError(f"Assinatura '{self.id}': padrão inválido ({e}).") from e
+        self.keyword, self.literal = (None, None) if flags else required_literals(spec["pattern"])
+        self.keyword = spec.get("keyword") or self.keyword
+        self.level = spec.get("level", "MEDIUM")
+        self.type = spec.get("type", self.id)
+        self.description = spec.get("description", self.id)
+        self.recommendation = spec.get("recommendation", "")
+        aggregate = spec.get("aggregate") or {}
+        self.by = aggregate.get("by")
+        self.threshold = max(1, int(aggregate.get("threshold", 1)))
+        self.window = float(aggregate.get("window", 0))
+        if self.by is not None and self.by not in self.regex.groupindex:
+            raise ValueError(f"Assinatura '{self.id}': aggregate.by '{self.by}' não é um grupo nomeado do padrão.")
+
+
+class SignatureSet:
+    """
+    Assinaturas em três grupos: index (palavra obrigatória -> assinaturas), grams (trecho de
+    GRAM_SIZE caracteres de um literal obrigatório -> assinaturas, para padrões cujo literal não é
+    uma palavra inteira) e unindexed (sem literal nenhum: rodam em toda linha do programa).
+    """
+
+    def __init__(self, specs: list[dict]):
+        self.signatures = [Signature(spec) for spec in specs]
+        ids = collections.Counter(signature.id for signature in self.signatures)
+        duplicated = [signature_id for signature_id, count in ids.items() if count > 1]
+        if duplicated:
+            raise ValueError(f"Assinaturas duplicadas: {', '.join(duplicated)}.")
+        self.index, self.grams, self.unindexed = {}, {}, []
+        for signature in self.signatures:
+            if signature.keyword:
+                self.index.setdefault(signature.keyword, []).append(signature)
+            elif signature.literal and len(signature.literal) >= GRAM_SIZE:
+                # O trecho com menos assinaturas até aqui: os baldes ficam equilibrados
+                literal = signature.literal
+                gram = min((literal[i:i + GRAM_SIZE] for i in range(len(literal) - GRAM_SIZE + 1)),
+                           key=lambda gram: len(self.grams.get(gram, ())))
+                self.grams.setdefault(gram, []).append(signature)
+            else:
+                self.unindexed.append(signature)
+        # Programas com assinaturas no índice de trechos (None = algum vale para qualquer programa)
+        gram_signatures = [signature for signatures in self.grams.values() for signature in signatures]
+        self.gram_programs = None if any(signature.programs is None for signature in gram_signatures) \
+            else frozenset().union(*(signature.programs for signature in gram_signatures))
+        if self.unindexed:
+            logger.info(f"{len(self.unindexed)} assinaturas sem literal indexável rodam em toda linha: "
+                        + ", ".join(signature.id for signature in self.unindexed[:10]))
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> "SignatureSet":
+        specs = list(DEFAULT_SIGNATURES)
+        for path in settings.get("signature_files") or []:
+            with open(path, encoding="utf-8") as f:
+                specs.extend(json.load(f))
+        disabled = set(settings.get("disabled_signatures") or [])
+        return cls([spec for spec in specs if spec["id"] not in disabled])
+
+    def __len__(self):
+        return len(self.signatures)
+
+
+class _Fields(dict):
+    """Campos da descrição: grupos ausentes viram '?' em vez de KeyError."""
+
+    def __missing__(self, key):
+        return "?"
+
+
+class _Source:
+    """Um arquivo acompanhado: descritor aberto, identidade (inode, dispositivo) e offset lido."""
+
+    def __init__(self, path: str, format: str = "syslog", saved: dict = None):
+        if format not in ("syslog", "journal"):
+            raise ValueError(f"Formato de log desconhecido para '{path}': {format} (use syslog ou journal).")
+        self.path = path
+        self.format = format
+        self.saved = saved # Estado da execução anterior, usado só na primeira abertura
+        self.fd = None
+        self.inode = None
+        self.device = None
+        self.offset = 0
+        self.first_poll = True
+
+    def state(self) -> dict:
+        return {"inode": self.inode, "device": self.device, "offset": self.offset}
+
+    def open(self, path: str = None) -> os.stat_result:
+        self.fd = os.open(path or self.path, os.O_RDONLY | os.O_CLOEXEC)
+        info = os.fstat(self.fd)
+        self.inode, self.device = info.st_ino, info.st_dev
+        return info
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class IntrusionDetector:
+    """
+    :param settings: Seção "ids" da configuração (ver DEFAULT_SETTINGS); cada item de "sources" é um
+                     caminho ou {"path": ..., "format": "syslog" | "journal"}.
+    :param signatures: SignatureSet já montado (padrão: SignatureSet.from_settings(settings)).
+    :param db: DBManager que grava os alertas (padrão: um novo em settings["db_path"]).
+    :param on_alert: Callbacks chamados com cada alerta (na thread do poll).
+    """
+
+    def __init__(self, settings: dict = None, signatures: SignatureSet = None, db: DBManager = None, on_alert=()):
+        self.settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.signatures = signatures or SignatureSet.from_settings(self.settings)
+        self.db = db or DBManager(self.settings["db_path"])
+        self.on_alert = list(on_alert)
+        saved = self._load_state()
+        self.sources = []
+        for item in self.settings["sources"]:
+            item = {"path": item} if isinstance(item, str) else item
+            self.sources.append(_Source(item["path"], item.get("format", "syslog"), saved.get(item["path"])))
+        self.counters = collections.Counter()
+        self._windows = collections.OrderedDict() # (assinatura, chave) -> deque(horários), LRU limitado
+        self._alerted = collections.OrderedDict() # (assinatura, chave) -> horário do último alerta
+        self._pending = []
+        self._recent = collections.deque(maxlen=200)
+        self._stamp = (None, 0.0) # Último carimbo de data convertido (linhas seguidas repetem o segundo)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Estado persistido ---
+
+    def _load_state(self) -> dict:
+        path = self.settings["state_path"]
+        if not path:
+            return {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f).get("sources", {})
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Estado do detector de intrusões ilegível em '{path}' ({e}); as fontes começam do fim.")
+            return {}
+
+    def _save_state(self):
+        path = self.settings["state_path"]
+        if not path:
+            return
+        state = {"version": 1, "sources": {source.path: source.state() for source in self.sources
+                                           if source.inode is not None}}
+        temporary = f"{path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(temporary, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(temporary, path) # Atômico: um reinício nunca vê o arquivo pela metade
+        except OSError as e:
+            logger.error(f"Não foi possível gravar o estado do detector de intrusões em '{path}': {e}")
+
+    # --- Leitura incremental ---
+
+    def _follow(self, source: _Source):
+        try:
+            current = os.stat(source.path)
+        except FileNotFoundError:
+            current = None
+        except OSError as e:
+            logger.warning(f"Não foi possível ler '{source.path}': {e}")
+            return
+        if source.fd is not None and current is not None and (current.st_ino, current.st_dev) != (source.inode, source.device):
+            self._drain(source) # Rotação: termina o arquivo antigo pelo descritor ainda aberto
+            source.close()
+            source.offset = 0
+            self.counters["rotations"] += 1
+            logger.info(f"'{source.path}' foi rotacionado; lendo o arquivo novo do início.")
+        if source.fd is None:
+            if current is None:
+                source.first_poll = False
+                return
+            self._open(source)
+        elif current is not None and current.st_size < source.offset:
+            source.offset = 0
+            self.counters["truncations"] += 1
+            logger.info(f"'{source.path}' foi truncado; lendo do início.")
+        self._drain(source)
+
+    def _open(self, source: _Source):
+        saved, source.saved = source.saved, None
+        info = source.open()
+        if saved and (saved.get("inode"), saved.get("device")) == (source.inode, source.device):
+            source.offset = saved["offset"] if saved["offset"] <= info.st_size else 0
+        elif saved:
+            source.offset = 0
+            self._finish_rotated(source, saved)
+        elif source.first_poll and not self.settings["from_start"]:
+            source.offset = info.st_size
+        else:
+            source.offset = 0 # Arquivo que apareceu depois do início: é todo novo
+        source.first_poll = False
+
+    def _finish_rotated(self, source: _Source, saved: dict):
+        """O arquivo rodou com o detector parado: lê o que faltou do antigo, se ele ainda for <caminho>.1."""
+        rotated = _Source(f"{source.path}.1", source.format)
+        try:
+            rotated.open()
+        except OSError:
+            return
+        try:
+            if (rotated.inode, rotated.device) == (saved.get("inode"), saved.get("device")):
+                rotated.offset = saved["offset"]
+                self._drain(rotated)
+                self.counters["rotations"] += 1
+        finally:
+            rotated.close()
+
+    def _drain(self, source: _Source):
+        """Processa as linhas completas a partir do offset; uma linha pela metade fica para o próximo poll."""
+        while not self._stop.is_set():
+            data = os.pread(source.fd, READ_SIZE, source.offset)
+            end = data.rfind(b"\n") + 1
+            if not end:
+                if len(data) < READ_SIZE:
+                    return
+                end = len(data)
+            self._process(source, data[:end].decode("utf-8", errors="replace"))
+            source.offset += end
+            self.counters["bytes"] += end
+
+    # --- Análise ---
+
+    def _process(self, source: _Source, text: str):
+        lines = text.split("\n")
+        words_get = self.signatures.index.get
+        grams_get = self.signatures.grams.get if self.signatures.grams else None
+        gram_programs = self.signatures.gram_programs
+        unindexed = self.signatures.unindexed
+        journal = source.format == "journal"
+        matches = 0
+        for line in lines:
+            if not line:
+                continue
+            if journal:
+                record = self._journal_record(line)
+                if record is None:
+                    continue
+                program, message = record
+            else:
+                head, found, message = line.partition(": ")
+                if not found:
+                    program, message = "", line
+                else:
+                    program = head.rpartition(" ")[2].partition("[")[0]
+            candidates = None
+            for word in message.split():
+                found = words_get(word)
+                if found is not None:
+                    candidates = found if candidates is None else candidates + found
+            if grams_get is not None and (gram_programs is None or program in gram_programs):
+                for i in range(len(message) - GRAM_SIZE + 1):
+                    found = grams_get(message[i:i + GRAM_SIZE])
+                    if found is not None:
+                        candidates = found if candidates is None else candidates + found
+            if candidates is not None:
+                if len(candidates) > 1:
+                    candidates = dict.fromkeys(candidates) # Palavra repetida na linha: cada assinatura uma vez
+                for signature in candidates:
+                    if signature.programs is None or program in signature.programs:
+                        match = signature.regex.search(message)
+                        if match is not None:
+                            matches += 1
+                            self._matched(source, signature, match, program, message, line)
+            for signature in unindexed:
+                if signature.programs is None or program in signature.programs:
+                    match = signature.regex.search(message)
+                    if match is not None:
+                        matches += 1
+                        self._matched(source, signature, match, program, message, line)
+        count = len(lines) - (not lines[-1])
+        self.counters["lines"] += count
+        self.counters["matches"] += matches
+        IDS_LINES.inc(count, format=source.format)
+        if matches:
+            IDS_MATCHES.inc(matches)
+
+    def _journal_record(self, line: str):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            self.counters["invalid_lines"] += 1
+            return None
+        message = record.get("MESSAGE")
+        if not isinstance(message, str): # Mensagens binárias vêm como lista de bytes
+            return None
+        program = record.get("SYSLOG_IDENTIFIER") or record.get("_COMM") or ""
+        return program, message
+
+    def _line_time(self, source: _Source, line: str) -> float:
+        """Horário da linha (epoch); o horário atual se o formato não for reconhecido."""
+        if source.format == "journal":
+            try:
+                return int(json.loads(line)["__REALTIME_TIMESTAMP"]) / 1e6
+            except (ValueError, KeyError, TypeError):
+                return time.time()
+        rfc3339 = line[:4].isdigit()
+        stamp = line.partition(" ")[0] if rfc3339 else line[:15]
+        if stamp == self._stamp[0]:
+            return self._stamp[1]
+        try:
+            if rfc3339:
+                value = datetime.fromisoformat(stamp).timestamp()
+            else: # "Oct 19 18:26:57": sem ano, então o ano corrente (ou o anterior, logo depois da virada)
+                hour, minute, second = map(int, stamp[7:15].split(":"))
+                now = datetime.now()
+                parsed = datetime(now.year, MONTHS[stamp[:3]], int(stamp[4:6]), hour, minute, second)
+                if parsed.timestamp() > now.timestamp() + 86400:
+                    parsed = parsed.replace(year=now.year - 1)
+                value = parsed.timestamp()
+        except (ValueError, KeyError):
+            return time.time()
+        self._stamp = (stamp, value)
+        return value
+
+    def _matched(self, source: _Source, signature: Signature, match: re.Match, program: str, message: str, line: str):
+        fields = _Fields({name: value for name, value in match.groupdict().items() if value is not None})
+        count = 1
+        if signature.by is not None or signature.threshold > 1:
+            count = self._aggregate(signature, fields.get(signature.by), self._line_time(source, line))
+            if count is None:
+                return
+        fields.update(count=count, window=round(signature.window))
+        try:
+            description = signature.description.format_map(fields)
+        except (ValueError, IndexError, AttributeError):
+            description = signature.description
+        alert = {
+            "level": signature.level, "type": signature.type, "description": description,
+            "recommendation": signature.recommendation,
+            "details": {"signature": signature.id, "source": source.path, "program": program, "count": count,
+                        "window_seconds": signature.window, "fields": {name: value for name, value in fields.items()
+                                                                       if name not in ("count", "window")},
+                        "last_line": message[:500]},
+        }
+        if "ip" in fields:
+            alert["host"] = fields["ip"]
+        self._pending.append(alert)
+        self._recent.append(alert)
+        self.counters["alerts"] += 1
+        IDS_ALERTS.inc(signature=signature.id)
+        logger.warning(f"[IDS] {description}")
+
+    def _aggregate(self, signature: Signature, key, when: float) -> int | None:
+        """Janela deslizante por (assinatura, chave); retorna a contagem quando o limiar é atingido fora do cooldown."""
+        slot = (signature.id, key)
+        history = self._windows.pop(slot, None) or collections.deque(maxlen=signature.threshold)
+        history.append(when)
+        self._windows[slot] = history
+        if len(self._windows) > self.settings["max_tracked_keys"]:
+            self._windows.popitem(last=False)
+        if len(history) < history.maxlen or history[-1] - history[0] > signature.window:
+            return None
+        last = self._alerted.pop(slot, None)
+        if last is not None and abs(when - last) < self.settings["alert_cooldown"]:
+            self._alerted[slot] = last
+            return None
+        self._alerted[slot] = when
+        if len(self._alerted) > self.settings["max_tracked_keys"]:
+            self._alerted.popitem(last=False)
+        return len(history)
+
+    # --- Ciclo de vida ---
+
+    def poll(self) -> list[dict]:
+        """Lê o que há de novo em todas as fontes, grava os alertas e o estado; retorna os alertas novos."""
+        with self._lock:
+            for source in self.sources:
+                try:
+                    self._follow(source)
+                except OSError as e:
+                    logger.warning(f"Erro ao ler '{source.path}': {e}")
+                    source.close()
+            alerts, self._pending = self._pending, []
+            if alerts:
+                self._deliver(alerts)
+            self._save_state() # Depois dos alertas: um reinício no meio relê, mas não perde nada
+            self.counters["polls"] += 1
+        return alerts
+
+    def _deliver(self, alerts: list):
+        try:
+            self.db.save_guardian_result("log_ids", "logs", {"status": "success", "alerts": alerts})
+        except Exception as e:
+            logger.error(f"Falha ao gravar {len(alerts)} alertas do detector de intrusões: {e}", exc_info=True)
+        for alert in alerts:
+            for callback in self.on_alert:
+                try:
+                    callback(alert)
+                except Exception as e:
+                    logger.error(f"Erro no callback de alerta do detector de intrusões: {e}", exc_info=True)
+
+    def start(self):
+        """Poll a cada interval_seconds em uma thread própria."""
+        if self._thread is not None:
+            return self
+        self._stop.clear()
+
+        def run():
+            while True:
+                try:
+                    self.poll()
+                except Exception as e:
+                    logger.error(f"Erro no detector de intrusões: {e}", exc_info=True)
+                if self._stop.wait(self.settings["interval_seconds"]):
+                    return
+
+        self._thread = threading.Thread(target=run, name="shamann-ids", daemon=True)
+        self._thread.start()
+        logger.info(f"Detector de intrusões ativo: {len(self.signatures)} assinaturas sobre "
+                    + ", ".join(source.path for source in self.sources))
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=30)
+            self._thread = None
+            self._stop.clear() # Um poll() avulso depois do stop ainda lê tudo
+        with self._lock:
+            self._save_state()
+            for source in self.sources:
+                source.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def recent_alerts(self, limit: int = 50) -> list[dict]:
+        return list(self._recent)[-limit:]
+
+    def stats(self) -> dict:
+        return {"sources": {source.path: {"format": source.format, "open": source.fd is not None, **source.state()}
+                            for source in self.sources},
+                "signatures": len(self.signatures), "indexed_words": len(self.signatures.index),
+                "indexed_grams": len(self.signatures.grams),
+                "unindexed_signatures": len(self.signatures.unindexed), "tracked_keys": len(self._windows),
+                "running": self._thread is not None, **self.counters}
+
+
+_detectors = []
+_detectors_lock = threading.Lock()
+
+
+def intrusion_detector(settings: dict = None) -> IntrusionDetector:
+    """Detector compartilhado pelo processo: um só leitor por arquivo de estado."""
+    with _detectors_lock:
+        if not _detectors:
+            _detectors.append(IntrusionDetector(settings))
+        return _detectors[0]
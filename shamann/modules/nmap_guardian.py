@@ -6,12 +6,41 @@ import logging
 import datetime
 import re # Para expressões regulares na avaliação de regras
 
+from shamann.core import metrics
+from shamann.core.config import RULE_BUILTINS, RULE_REGEX, compile_rules
+from shamann.core.tracing import current_span, span
+from shamann.modules.base_guardian import BaseGuardian, ScanContext, run_blocking
+from shamann.modules.recon.dns import resolve_addresses
+
 logger = logging.getLogger(__name__)
 
-class NmapGuardian:
-    def __init__(self, target: str):
+class NmapGuardian(BaseGuardian):
+    RESOURCES = {"cpu": 1.0, "network": 100, "subprocess": 1}
+
+    def __init__(self, target: str, scanner: nmap.PortScanner = None):
+        """
+        :param scanner: PortScanner a usar; permite analisar XML já gerado (benchmarks, testes)
+            sem depender do binário do Nmap.
+        """
         self.target = target
-        self.scanner = nmap.PortScanner()
+        self.scanner = scanner if scanner is not None else nmap.PortScanner()
+        self.resolved_hostnames = {} # IP -> hostname informado no alvo (resolvido pelo cache DNS compartilhado)
+
+    def _prevalidate_hostname_targets(self):
+        """
+        Confere pelo cache DNS compartilhado os alvos que são hostnames, só para registrar (log e
+        resolved_hostnames) o que deve ser escaneado. Os hostnames seguem na linha de comando do
+        Nmap: ele resolve cada um e escaneia todos os endereços, e um IP escolhido aqui mudaria o
+        alvo (outro registro do round-robin, o IPv4 de um host que só responde em IPv6, SNI/vhost).
+        """
+        known = set(self.resolved_hostnames.values()) # Informados por quem já resolveu (ex: SubdomainGuardian)
+        for token in self.target.split():
+            if token not in known and re.fullmatch(r"[A-Za-z0-9.-]*[A-Za-z][A-Za-z0-9.-]*", token):
+                addresses = resolve_addresses(token)
+                if not addresses:
+                    logger.warning(f"Alvo '{token}' não resolve pelo DNS; o Nmap tentará resolvê-lo mesmo assim.")
+                for address in addresses:
+                    self.resolved_hostnames.setdefault(address, token)
 
     def run_scan(self, nmap_options: str = "-sS -sV -O -A -T4", ports_to_scan: str = "1-1000",
                  include_default_scripts: bool = True, custom_scripts: list = None) -> dict:
@@ -31,8 +60,12 @@ class NmapGuardian:
                     full_nmap_arguments += f" --script={script}"
 
         try:
-            self.scanner.scan(self.target, ports=ports_to_scan, arguments=full_nmap_arguments)
-            scan_results = self._parse_nmap_results()
+            with span("nmap.resolve_targets"):
+                self._prevalidate_hostname_targets()
+            with span("nmap.process", arguments=full_nmap_arguments):
+                self.scanner.scan(self.target, ports=ports_to_scan, arguments=full_nmap_arguments)
+            with span("nmap.parse"):
+                scan_results = self._parse_nmap_results()
             logger.info(f"Scan Nmap para {self.target} concluído. Encontrados {len(scan_results.get('hosts', []))} hosts com portas.")
             return scan_results
 
@@ -43,6 +76,34 @@ class NmapGuardian:
             logger.error(f"Erro inesperado ao executar scan Nmap: {e}", exc_info=True)
             return {}
 
+    @classmethod
+    def iter_scan(cls, target: str, options: str = "", context: ScanContext = None):
+        """
+        Protocolo de streaming: options são argumentos do Nmap ('-p' define as portas). O processo do
+        Nmap roda sem interrupção (o python-nmap não permite encerrá-lo); ao terminar, cada host vira
+        um evento "partial" antes do resultado.
+        """
+        context = context or ScanContext(cls.name(), target)
+        tokens = options.split()
+        ports = "1-1000"
+        if "-p" in tokens[:-1]:
+            index = tokens.index("-p")
+            ports = tokens[index + 1]
+            del tokens[index:index + 2]
+        nmap_options = " ".join(tokens) or "-sV -T4"
+        guardian = cls(target)
+        scan = lambda: guardian.run_scan(nmap_options=nmap_options, ports_to_scan=ports, include_default_scripts=False)
+        for event in run_blocking(scan, context, cls.PROGRESS_INTERVAL):
+            if event["event"] != "result":
+                yield event
+                continue
+            scan_results = event["result"]
+            for host in scan_results.get("hosts", []):
+                yield context.partial(host)
+            yield context.result({"target": target, "guardian": cls.name(),
+                                  "status": "success" if scan_results.get("hosts") else "error",
+                                  "scan_results": scan_results})
+
     def _parse_nmap_results(self) -> dict:
         """
         Analisa os resultados brutos do Nmap e os estrutura em um dicionário padronizado.
@@ -56,7 +117,7 @@ class NmapGuardian:
         for host in self.scanner.all_hosts():
             host_data = {
                 "ip_address": host,
-                "hostname": self.scanner[host].hostname() if self.scanner[host].hostname() else "N/A",
+                "hostname": self.scanner[host].hostname() or self.resolved_hostnames.get(host, "N/A"),
                 "status": self.scanner[host].state(),
                 "os_match": "N/A",
                 "os_accuracy": "N/A",
@@ -100,12 +161,21 @@ class NmapGuardian:
             parsed_results['hosts'].append(host_data)
         return parsed_results
 
-    def classify_alerts_with_rules(self, scan_results: dict, alert_rules: list) -> dict:
+    def classify_alerts_with_rules(self, scan_results: dict, alert_rules: list, vuln_index=None,
+                                   max_cves_per_service: int = 10) -> dict:
         """
         Classifica os alertas com base nas regras fornecidas na configuração.
         Modifica scan_results in-place para adicionar a lista de alertas a cada host.
+        alert_rules aceita dicts (compilados aqui; ConfigError se inválidos) ou core.config.AlertRule.
+        Com um vuln_index (shamann.modules.vuln_index.VulnIndex), também gera um alerta por CVE
+        conhecida de cada serviço aberto (as mais graves primeiro, até max_cves_per_service).
         """
         logger.info("Classificando alertas com base nas regras de configuração...")
+        rules = compile_rules(alert_rules) # Regras de um CompiledConfig já vêm compiladas
+        # Serviços repetidos em muitos hosts (mesmo CPE/produto/versão) são consultados uma única vez
+        vuln_matches = {}
+        rules_evaluated = 0 # Contadores para o rastreamento (core.tracing)
+        ports_classified = 0
         for host_data in scan_results.get('hosts', []):
             # Inicializa a lista de alertas para este host.
             host_data['alerts'] = []
@@ -132,63 +202,74 @@ class NmapGuardian:
                     "details": {}
                 })
 
+            # Variáveis de conveniência para as condições das regras (ver core.config.RULE_VARIABLES)
+            os_match = host_data.get('os_match')
+            vendor = host_data.get('vendor') # MAC Vendor
+            host_namespace = {
+                '__builtins__': RULE_BUILTINS, 're': RULE_REGEX,
+                'ip': host_data.get('ip_address'), 'hostname': host_data.get('hostname'), 'status': host_data['status'],
+                'os_match': os_match, 'os_accuracy': host_data.get('os_accuracy'), 'vendor': vendor,
+                # Versões lower case para facilitar comparações nas regras.
+                'vendor_lower': vendor.lower() if vendor else '', 'os_lower': os_match.lower() if os_match else '',
+            }
+
             for port_data in host_data.get('ports', []):
-                # Criar variáveis de conveniência para avaliação das regras.
-                # IMPORTANTE: Essas variáveis são usadas na string 'condition' do JSON.
-                ip = host_data.get('ip_address')
-                hostname = host_data.get('hostname')
-                os_match = host_data.get('os_match')
-                os_accuracy = host_data.get('os_accuracy')
-                vendor = host_data.get('vendor') # MAC Vendor
-                port_id = port_data.get('port_id')
-                protocol = port_data.get('protocol')
+                ports_classified += 1
                 state = port_data.get('state')
-                service_name = port_data.get('name') # service_name é 'name' no port_data
+                service_name = port_data.get('service_name', port_data.get('name'))
                 service_product = port_data.get('service_product')
                 service_version = port_data.get('service_version')
                 extrainfo = port_data.get('extrainfo')
                 cpe = port_data.get('cpe')
-                scripts_output = port_data.get('scripts') # Saída de scripts NSE
-
-                # Versões lower case para facilitar comparações nas regras.
-                service_lower = service_name.lower() if service_name else ''
-                product_lower = service_product.lower() if service_product else ''
-                version_lower = service_version.lower() if service_version else ''
-                extrainfo_lower = extrainfo.lower() if extrainfo else ''
-                cpe_lower = cpe.lower() if cpe else ''
-                vendor_lower = vendor.lower() if vendor else ''
-                os_lower = os_match.lower() if os_match else ''
-
+                namespace = dict(host_namespace)
+                namespace.update({
+                    'port_id': port_data.get('port_id'), 'protocol': port_data.get('protocol'), 'state': state,
+                    'service_name': service_name, 'service_product': service_product,
+                    'service_version': service_version, 'extrainfo': extrainfo, 'cpe': cpe,
+                    'scripts_output': port_data.get('scripts'), # Saída de scripts NSE
+                    'service_lower': service_name.lower() if service_name else '',
+                    'product_lower': service_product.lower() if service_product else '',
+                    'version_lower': service_version.lower() if service_version else '',
+                    'extrainfo_lower': extrainfo.lower() if extrainfo else '',
+                    'cpe_lower': cpe.lower() if cpe else '',
+                })
 
-                for rule in alert_rules:
-                    condition = rule.get('condition')
+                for rule in rules:
+                    rules_evaluated += 1
                     try:
-                        # Avalia a condição.
-                        # Segurança: 'eval' é poderoso. Em um ambiente de produção não controlado,
-                        # um parser de regras mais seguro seria recomendado. Para pentest pessoal, é funcional.
-                        if eval(condition, {
-                            # Variáveis disponíveis para as regras no JSON
-                            'ip': ip, 'hostname': hostname, 'os_match': os_match, 'os_accuracy': os_accuracy, 'vendor': vendor,
-                            'port_id': port_id, 'protocol': protocol, 'state': state, 'service_name': service_name,
-                            'service_product': service_product, 'service_version': service_version, 'extrainfo': extrainfo,
-                            'cpe': cpe, 'scripts_output': scripts_output, # Inclui saída de scripts
-                            'service_lower': service_lower, 'product_lower': product_lower,
-                            'version_lower': version_lower, 'extrainfo_lower': extrainfo_lower, 'cpe_lower': cpe_lower,
-                            'vendor_lower': vendor_lower, 'os_lower': os_lower
-                        }):
-                            host_data['alerts'].append({
-                                "level": rule.get('level', 'UNKNOWN'),
-                                "type": rule.get('type', 'Alerta Personalizado'),
-                                "description": rule.get('description', 'Alerta acionado por regra personalizada.'),
-                                "recommendation": rule.get('recommendation', 'Verificar a regra de alerta.'),
-                                "details": port_data # Detalhes completos da porta/serviço para o anexo
-                            })
+                        # As condições foram validadas e compiladas na carga (core.config.AlertRule).
+                        # Segurança: 'eval' é poderoso e a validação NÃO o torna um sandbox. Quem escreve
+                        # no scan_config.json executa código aqui (no daemon, pela recarga a quente):
+                        # proteja o arquivo como o próprio código.
+                        if eval(rule.code, namespace):
+                            # Detalhes completos da porta/serviço para o anexo
+                            host_data['alerts'].append(rule.alert(port_data))
                             # Se uma regra CRITICAL for acionada, as outras regras para esta porta não precisam ser verificadas,
                             # pois já é o nível mais alto.
-                            if rule.get('level') == 'CRITICAL':
+                            if rule.critical:
                                 break # Sai do loop de regras para esta porta
 
                     except Exception as e:
-                        logger.error(f"Erro ao avaliar regra '{condition}': {e}", exc_info=True)
+                        metrics.RULE_ERRORS.inc()
+                        logger.error(f"Erro ao avaliar regra '{rule.condition}': {e}", exc_info=True)
+
+                if vuln_index is not None and state == 'open':
+                    service_key = (cpe, service_product, service_version)
+                    if service_key not in vuln_matches:
+                        vuln_matches[service_key] = vuln_index.match_service(cpe, service_product, service_version)
+                    for vuln in vuln_matches[service_key][:max_cves_per_service]:
+                        host_data['alerts'].append({
+                            "level": vuln['severity'] if vuln['severity'] in ('CRITICAL', 'HIGH', 'MEDIUM', 'LOW') else 'INFO',
+                            "type": f"Vulnerabilidade Conhecida ({vuln['cve']})",
+                            "description": vuln['summary'] or f"{vuln['cve']} afeta {service_product} {service_version}.",
+                            "recommendation": f"Atualizar {service_product or service_name} para uma versão corrigida ou aplicar a mitigação do fornecedor.",
+                            "details": {**port_data, "cve": vuln['cve'], "cvss_score": vuln['score']}
+                        })
 
+        if vuln_index is not None:
+            logger.info(f"{len(vuln_matches)} serviços distintos consultados no índice de vulnerabilidades.")
+        metrics.RULE_EVALUATIONS.inc(rules_evaluated)
+        current_span().count("hosts", len(scan_results.get('hosts', []))).count("ports", ports_classified) \
+            .count("rules_evaluated", rules_evaluated).count("vuln_services", len(vuln_matches)) \
+            .count("alerts", sum(len(host.get('alerts', [])) for host in scan_results.get('hosts', [])))
         return scan_results
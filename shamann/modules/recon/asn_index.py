@@ -0,0 +1,255 @@
+# shamann/modules/recon/asn_index.py
+"""
+Consulta offline de IP -> ASN / bloco de rede / organização.
+
+Carrega um dump de ASN/RIR (formato TSV do iptoasn.com ou linhas "prefixo ASN [org] [país]")
+e o compila em arrays ordenados de intervalos disjuntos, gravados em um arquivo binário
+que é aberto com mmap: a inicialização não precisa reler o dump, e cada consulta é uma
+busca binária (longest-prefix match, pois prefixos aninhados são achatados na compilação
+com o mais específico vencendo). Suporta IPv4 e IPv6.
+"""
+
+import array
+import bisect
+import ipaddress
+import logging
+import mmap
+import os
+import struct
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SHASNIX1"
+_HEADER = struct.Struct("<8sQQQQ") # magic, n_v4, n_v6, n_meta, tamanho do blob de metadados
+COMPILED_SUFFIX = ".shidx"
+
+
+class ASNIndexError(Exception):
+    """Erro ao ler ou compilar um índice de ASN."""
+
+
+def _parse_source_line(line: str):
+    """Retorna (início, fim, versão, (asn, país, bloco, org)) ou None para linhas ignoradas."""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    fields = line.split("\t") if "\t" in line else line.split(None, 3)
+    if "/" in fields[0]:
+        # "prefixo ASN [org] [país]"
+        network = ipaddress.ip_network(fields[0], strict=False)
+        asn = int(fields[1].upper().removeprefix("AS")) if len(fields) > 1 else 0
+        org = fields[2] if len(fields) > 2 else ""
+        country = fields[3] if len(fields) > 3 else ""
+        return (int(network.network_address), int(network.broadcast_address), network.version,
+                (asn, country, str(network), org))
+    # iptoasn: início, fim, ASN, país, descrição
+    if len(fields) < 3:
+        raise ValueError(f"linha com campos insuficientes: {line!r}")
+    start, end = ipaddress.ip_address(fields[0]), ipaddress.ip_address(fields[1])
+    asn = int(fields[2])
+    if asn == 0: # "Not routed"
+        return None
+    country = fields[3] if len(fields) > 3 else ""
+    org = fields[4] if len(fields) > 4 else ""
+    netblocks = list(ipaddress.summarize_address_range(start, end))
+    netblock = str(netblocks[0]) if len(netblocks) == 1 else f"{start}-{end}"
+    return int(start), int(end), start.version, (asn, country, netblock, org)
+
+
+def _flatten(intervals: list) -> list:
+    """
+    Converte intervalos possivelmente aninhados em segmentos disjuntos ordenados,
+    onde cada endereço pertence ao intervalo mais específico que o contém.
+    """
+    intervals.sort(key=lambda item: (item[0], -item[1]))
+    segments = []
+    stack = [] # intervalos abertos (o topo é o mais interno)
+    position = None
+
+    def emit(start, end, meta):
+        if start > end:
+            return
+        if segments and segments[-1][2] == meta and segments[-1][1] + 1 == start:
+            segments[-1] = (segments[-1][0], end, meta)
+        else:
+            segments.append((start, end, meta))
+
+    for start, end, meta in intervals:
+        while stack and stack[-1][1] < start:
+            top = stack.pop()
+            emit(position, top[1], top[2])
+            position = max(position, top[1] + 1)
+        if stack:
+            emit(position, start - 1, stack[-1][2])
+        stack.append((start, end, meta))
+        position = start
+    while stack:
+        top = stack.pop()
+        emit(position, top[1], top[2])
+        position = max(position, top[1] + 1)
+    return segments
+
+
+class _FixedWidthKeys:
+    """Sequência de chaves big-endian de largura fixa sobre um buffer (para bisect em IPv6)."""
+
+    def __init__(self, buffer, width: int):
+        self.buffer = buffer
+        self.width = width
+
+    def __len__(self):
+        return len(self.buffer) // self.width
+
+    def __getitem__(self, index):
+        offset = index * self.width
+        return bytes(self.buffer[offset:offset + self.width])
+
+
+class ASNIndex:
+    """Índice compilado aberto em memória (mmap ou bytes)."""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        view = memoryview(buffer)
+        magic, n4, n6, n_meta, blob_size = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ASNIndexError("Arquivo não é um índice de ASN compilado pelo Shamann.")
+        offset = _HEADER.size
+
+        def take(size):
+            nonlocal offset
+            chunk = view[offset:offset + size]
+            offset += size
+            return chunk
+
+        self._v4_starts = take(n4 * 4).cast("I")
+        self._v4_ends = take(n4 * 4).cast("I")
+        self._v4_meta = take(n4 * 4).cast("I")
+        self._v6_starts = _FixedWidthKeys(take(n6 * 16), 16)
+        self._v6_ends = _FixedWidthKeys(take(n6 * 16), 16)
+        self._v6_meta = take(n6 * 4).cast("I")
+        self._meta_offsets = take((n_meta + 1) * 4).cast("I")
+        self._meta_blob = take(blob_size)
+        self.sizes = {"ipv4_segments": n4, "ipv6_segments": n6, "records": n_meta}
+
+    # --- Compilação ---
+
+    @staticmethod
+    def compile(source_path: str) -> bytes:
+        """Lê o dump de origem e retorna o índice compilado (bytes)."""
+        metas = []
+        meta_ids = {}
+        intervals = {4: [], 6: []}
+        skipped = 0
+        with open(source_path, "r", encoding="utf-8", errors="replace") as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    parsed = _parse_source_line(line)
+                except ValueError as e:
+                    skipped += 1
+                    logger.debug(f"Linha {line_number} ignorada no dump de ASN: {e}")
+                    continue
+                if parsed is None:
+                    continue
+                start, end, version, meta = parsed
+                meta_id = meta_ids.get(meta)
+                if meta_id is None:
+                    meta_id = meta_ids[meta] = len(metas)
+                    metas.append(meta)
+                intervals[version].append((start, end, meta_id))
+        if skipped:
+            logger.warning(f"{skipped} linhas inválidas ignoradas no dump de ASN '{source_path}'.")
+
+        v4 = _flatten(intervals[4])
+        v6 = _flatten(intervals[6])
+        blob = bytearray()
+        offsets = array.array("I", [0])
+        for asn, country, netblock, org in metas:
+            blob += f"{asn}\t{country}\t{netblock}\t{org}".encode("utf-8")
+            offsets.append(len(blob))
+
+        out = bytearray(_HEADER.pack(MAGIC, len(v4), len(v6), len(metas), len(blob)))
+        for column in range(3):
+            out += array.array("I", (segment[column] for segment in v4)).tobytes()
+        for column in range(2):
+            out += b"".join(segment[column].to_bytes(16, "big") for segment in v6)
+        out += array.array("I", (segment[2] for segment in v6)).tobytes()
+        out += offsets.tobytes() + blob
+        return bytes(out)
+
+    @classmethod
+    def build(cls, source_path: str, output_path: str) -> str:
+        """Compila o dump e grava o índice em output_path (troca atômica)."""
+        data = cls.compile(source_path)
+        tmp_path = f"{output_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, output_path)
+        logger.info(f"Índice de ASN compilado em '{output_path}' ({len(data)} bytes).")
+        return output_path
+
+    @classmethod
+    def open(cls, path: str) -> "ASNIndex":
+        """Abre um índice compilado via mmap (somente leitura)."""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped)
+
+    @classmethod
+    def load(cls, path: str) -> "ASNIndex":
+        """
+        Abre um índice compilado, ou compila o dump de origem (mantendo o resultado em
+        '<path>.shidx', recompilado apenas quando o dump for mais novo).
+        """
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) == MAGIC:
+                return cls.open(path)
+        compiled_path = path + COMPILED_SUFFIX
+        if not os.path.exists(compiled_path) or os.path.getmtime(compiled_path) < os.path.getmtime(path):
+            try:
+                cls.build(path, compiled_path)
+            except OSError:
+                # Diretório sem permissão de escrita: compila só em memória
+                return cls(cls.compile(path))
+        return cls.open(compiled_path)
+
+    # --- Consulta ---
+
+    def _meta(self, meta_id: int, address: str) -> dict:
+        raw = bytes(self._meta_blob[self._meta_offsets[meta_id]:self._meta_offsets[meta_id + 1]])
+        asn, country, netblock, org = raw.decode("utf-8").split("\t", 3)
+        return {"ip": address, "asn": int(asn), "netblock": netblock, "country": country or None, "org": org or None}
+
+    def lookup(self, address: str) -> dict | None:
+        """Retorna {ip, asn, netblock, country, org} do bloco mais específico que contém o IP, ou None."""
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return None
+        if ip.version == 4:
+            key = int(ip)
+            index = bisect.bisect_right(self._v4_starts, key) - 1
+            if index >= 0 and key <= self._v4_ends[index]:
+                return self._meta(self._v4_meta[index], address)
+            return None
+        key = ip.packed
+        index = bisect.bisect_right(self._v6_starts, key) - 1
+        if index >= 0 and key <= self._v6_ends[index]:
+            return self._meta(self._v6_meta[index], address)
+        return None
+
+
+def enrich_hosts(scan_results: dict, index: ASNIndex) -> int:
+    """
+    Acrescenta 'asn', 'netblock', 'as_org' e 'as_country' a cada host de scan_results (in-place),
+    sem nenhuma consulta de rede. Retorna quantos hosts foram enriquecidos.
+    """
+    enriched = 0
+    for host_data in scan_results.get("hosts", []):
+        info = index.lookup(host_data.get("ip_address", ""))
+        host_data["asn"] = info["asn"] if info else "N/A"
+        host_data["netblock"] = info["netblock"] if info else "N/A"
+        host_data["as_org"] = (info["org"] or "N/A") if info else "N/A"
+        host_data["as_country"] = (info["country"] or "N/A") if info else "N/A"
+        enriched += bool(info)
+    return enriched
@@ -1 +1,505 @@
-# Enumeração DNS
\ No newline at end of file
+# shamann/modules/recon/dns.py
+"""
+Cliente DNS assíncrono em processo.
+
+Monta e interpreta o formato de fio do DNS (RFC 1035) diretamente, sem depender do 'dig'.
+Muitas consultas são multiplexadas sobre poucos sockets UDP (identificadas pelo ID da
+mensagem), com timeout e retentativas por consulta e fallback para TCP quando a resposta
+vem truncada (bit TC).
+"""
+
+import asyncio
+import ipaddress
+import logging
+import secrets
+import socket
+import struct
+import time
+
+from .dns_cache import SYSTEM_RESOLVER, get_dns_cache, resolver_id
+
+logger = logging.getLogger(__name__)
+
+QTYPES = {
+    "A": 1, "NS": 2, "CNAME": 5, "SOA": 6, "PTR": 12, "MX": 15,
+    "TXT": 16, "AAAA": 28, "SRV": 33, "ANY": 255,
+}
+QTYPE_NAMES = {code: name for name, code in QTYPES.items()}
+
+RCODES = {0: "NOERROR", 1: "FORMERR", 2: "SERVFAIL", 3: "NXDOMAIN", 4: "NOTIMP", 5: "REFUSED"}
+
+CLASS_IN = 1
+_HEADER = struct.Struct("!HHHHHH")
+_FLAG_QR = 0x8000
+_FLAG_AA = 0x0400
+_FLAG_TC = 0x0200
+_FLAG_RD = 0x0100
+_FLAG_RA = 0x0080
+
+DEFAULT_NAMESERVERS = ["1.1.1.1", "8.8.8.8"]
+RECV_BUFFER_BYTES = 4 * 1024 * 1024
+FALLBACK_TTL = 300 # TTL usado para endereços obtidos via getaddrinfo (que não informa TTL)
+
+
+class DNSError(Exception):
+    """Erro ao montar ou interpretar uma mensagem DNS."""
+
+
+# --- Formato de fio ---
+
+def encode_name(name: str) -> bytes:
+    """Codifica um nome de domínio em labels (sem compressão)."""
+    name = name.rstrip(".")
+    if not name:
+        return b"\x00"
+    encoded = bytearray()
+    for label in name.split("."):
+        raw = label.encode("idna") if not label.isascii() else label.encode("ascii")
+        if not raw or len(raw) > 63:
+            raise DNSError(f"Label DNS inválido em '{name}'.")
+        encoded.append(len(raw))
+        encoded += raw
+    encoded.append(0)
+    if len(encoded) > 255:
+        raise DNSError(f"Nome DNS muito longo: '{name}'.")
+    return bytes(encoded)
+
+
+def _qtype_code(qtype) -> int:
+    if isinstance(qtype, int):
+        return qtype
+    try:
+        return QTYPES[qtype.upper()]
+    except KeyError:
+        raise DNSError(f"Tipo de registro DNS não suportado: '{qtype}'.") from None
+
+
+def build_query(qid: int, name: str, qtype="A", recursion: bool = True) -> bytes:
+    """Monta uma mensagem de consulta DNS com uma única pergunta."""
+    flags = _FLAG_RD if recursion else 0
+    return _HEADER.pack(qid, flags, 1, 0, 0, 0) + encode_name(name) + struct.pack("!HH", _qtype_code(qtype), CLASS_IN)
+
+
+def _decode_name(data: bytes, offset: int) -> tuple[str, int]:
+    """Decodifica um nome (com ponteiros de compressão) e retorna (nome, offset após o nome)."""
+    labels = []
+    end_offset = None
+    jumps = 0
+    while True:
+        if offset >= len(data):
+            raise DNSError("Nome DNS truncado.")
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if offset + 1 >= len(data):
+                raise DNSError("Ponteiro de compressão truncado.")
+            if end_offset is None:
+                end_offset = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            jumps += 1
+            if jumps > 64:
+                raise DNSError("Laço de ponteiros de compressão.")
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length].decode("ascii", errors="replace"))
+        offset += length
+    return ".".join(labels), (end_offset if end_offset is not None else offset)
+
+
+def _decode_rdata(rtype: int, data: bytes, offset: int, rdlength: int):
+    rdata = data[offset:offset + rdlength]
+    if rtype == 1 and rdlength == 4:
+        return socket.inet_ntop(socket.AF_INET, rdata)
+    if rtype == 28 and rdlength == 16:
+        return socket.inet_ntop(socket.AF_INET6, rdata)
+    if rtype in (2, 5, 12):
+        return _decode_name(data, offset)[0]
+    if rtype == 15:
+        preference = struct.unpack_from("!H", data, offset)[0]
+        return {"preference": preference, "exchange": _decode_name(data, offset + 2)[0]}
+    if rtype == 16:
+        strings = []
+        pos = 0
+        while pos < rdlength:
+            size = rdata[pos]
+            strings.append(rdata[pos + 1:pos + 1 + size].decode("utf-8", errors="replace"))
+            pos += 1 + size
+        return strings
+    if rtype == 6:
+        mname, pos = _decode_name(data, offset)
+        rname, pos = _decode_name(data, pos)
+        serial, refresh, retry, expire, minimum = struct.unpack_from("!IIIII", data, pos)
+        return {"mname": mname, "rname": rname, "serial": serial, "refresh": refresh,
+                "retry": retry, "expire": expire, "minimum": minimum}
+    if rtype == 33:
+        priority, weight, port = struct.unpack_from("!HHH", data, offset)
+        return {"priority": priority, "weight": weight, "port": port, "target": _decode_name(data, offset + 6)[0]}
+    return rdata.hex()
+
+
+def _decode_records(data: bytes, offset: int, count: int) -> tuple[list, int]:
+    records = []
+    for _ in range(count):
+        name, offset = _decode_name(data, offset)
+        if offset + 10 > len(data):
+            raise DNSError("Registro DNS truncado.")
+        rtype, rclass, ttl, rdlength = struct.unpack_from("!HHIH", data, offset)
+        offset += 10
+        if offset + rdlength > len(data):
+            raise DNSError("RDATA truncado.")
+        records.append({
+            "name": name,
+            "type": QTYPE_NAMES.get(rtype, str(rtype)),
+            "ttl": ttl,
+            "data": _decode_rdata(rtype, data, offset, rdlength),
+        })
+        offset += rdlength
+    return records, offset
+
+
+def parse_response(data: bytes) -> dict:
+    """Interpreta uma mensagem DNS completa em um dicionário estruturado."""
+    if len(data) < _HEADER.size:
+        raise DNSError("Mensagem DNS menor que o cabeçalho.")
+    qid, flags, qdcount, ancount, nscount, arcount = _HEADER.unpack_from(data)
+    offset = _HEADER.size
+    questions = []
+    for _ in range(qdcount):
+        name, offset = _decode_name(data, offset)
+        qtype, qclass = struct.unpack_from("!HH", data, offset)
+        offset += 4
+        questions.append({"name": name, "type": QTYPE_NAMES.get(qtype, str(qtype))})
+    truncated = bool(flags & _FLAG_TC)
+    answers = authority = additional = []
+    if not truncated:
+        answers, offset = _decode_records(data, offset, ancount)
+        authority, offset = _decode_records(data, offset, nscount)
+        additional, offset = _decode_records(data, offset, arcount)
+    return {
+        "id": qid,
+        "rcode": RCODES.get(flags & 0x000F, str(flags & 0x000F)),
+        "authoritative": bool(flags & _FLAG_AA),
+        "truncated": truncated,
+        "questions": questions,
+        "answers": answers,
+        "authority": authority,
+        "additional": additional,
+    }
+
+
+def _encode_rdata(rtype: int, value) -> bytes:
+    if rtype == 1:
+        return socket.inet_pton(socket.AF_INET, value)
+    if rtype == 28:
+        return socket.inet_pton(socket.AF_INET6, value)
+    if rtype in (2, 5, 12):
+        return encode_name(value)
+    if rtype == 15:
+        return struct.pack("!H", value["preference"]) + encode_name(value["exchange"])
+    if rtype == 16:
+        strings = [value] if isinstance(value, str) else value
+        out = bytearray()
+        for item in strings:
+            raw = item.encode("utf-8")[:255]
+            out.append(len(raw))
+            out += raw
+        return bytes(out)
+    if rtype == 6:
+        return (encode_name(value["mname"]) + encode_name(value["rname"]) +
+                struct.pack("!IIIII", value["serial"], value["refresh"], value["retry"],
+                            value["expire"], value["minimum"]))
+    if rtype == 33:
+        return struct.pack("!HHH", value["priority"], value["weight"], value["port"]) + encode_name(value["target"])
+    return bytes.fromhex(value)
+
+
+def build_response(query: bytes, answers: list = (), rcode: str = "NOERROR", authority: list = (),
+                   truncated: bool = False) -> bytes:
+    """
+    Monta uma resposta para a consulta recebida (usado por servidores DNS de teste/substitutos).
+    answers/authority são listas de registros no mesmo formato de parse_response.
+    """
+    qid, qflags = struct.unpack_from("!HH", query)
+    _, question_end = _decode_name(query, _HEADER.size)
+    question = query[_HEADER.size:question_end + 4]
+    rcode_code = {name: code for code, name in RCODES.items()}[rcode]
+    flags = _FLAG_QR | _FLAG_RA | (qflags & _FLAG_RD) | rcode_code
+    if truncated:
+        return _HEADER.pack(qid, flags | _FLAG_TC, 1, 0, 0, 0) + question
+
+    def encode_records(records):
+        out = bytearray()
+        for record in records:
+            rtype = _qtype_code(record["type"])
+            rdata = _encode_rdata(rtype, record["data"])
+            out += encode_name(record["name"]) + struct.pack("!HHIH", rtype, CLASS_IN, record["ttl"], len(rdata)) + rdata
+        return bytes(out)
+
+    return (_HEADER.pack(qid, flags, 1, len(answers), len(authority), 0) + question +
+            encode_records(answers) + encode_records(authority))
+
+
+def load_system_nameservers(path: str = "/etc/resolv.conf") -> list[str]:
+    """Lê os servidores de nomes do resolv.conf; usa DEFAULT_NAMESERVERS se não houver nenhum."""
+    nameservers = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == "nameserver":
+                    nameservers.append(parts[1].split("%")[0])
+    except OSError:
+        pass
+    return nameservers or list(DEFAULT_NAMESERVERS)
+
+
+# --- Transporte ---
+
+class _DNSDatagramProtocol(asyncio.DatagramProtocol):
+    """Um socket UDP compartilhado por muitas consultas em andamento, despachadas pelo ID."""
+
+    def __init__(self):
+        self.transport = None
+        self.pending = {} # qid -> (future, endereço do servidor)
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(data) < 2:
+            return
+        entry = self.pending.get(struct.unpack_from("!H", data)[0])
+        if entry is None:
+            return
+        future, expected = entry
+        # Ignora respostas de origem inesperada (proteção básica contra spoofing)
+        if addr[0] != expected[0] or addr[1] != expected[1] or future.done():
+            return
+        future.set_result(data)
+
+    def error_received(self, exc):
+        logger.debug(f"Erro recebido no socket DNS UDP: {exc}")
+
+    def connection_lost(self, exc):
+        for future, _ in self.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Socket DNS UDP fechado."))
+
+    async def exchange(self, payload: bytes, qid: int, addr: tuple, timeout: float) -> bytes:
+        future = asyncio.get_running_loop().create_future()
+        self.pending[qid] = (future, addr)
+        try:
+            self.transport.sendto(payload, addr)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.pending.pop(qid, None)
+
+
+class AsyncDNSResolver:
+    """
+    Resolvedor DNS assíncrono para grandes volumes de consultas.
+
+    :param nameservers: Lista de servidores ("ip" ou (ip, porta)); padrão: /etc/resolv.conf.
+    :param timeout: Timeout (s) da primeira tentativa; cresce linearmente nas retentativas.
+    :param retries: Retentativas por consulta (alternando entre os servidores).
+    :param sockets: Quantidade de sockets UDP por família de endereço.
+    :param concurrency: Máximo de consultas em andamento ao mesmo tempo.
+    :param use_cache: Consulta/alimenta o cache DNS (por padrão o compartilhado, ver dns_cache), nas
+        entradas deste conjunto de servidores (resolver_id).
+    """
+
+    def __init__(self, nameservers: list = None, timeout: float = 2.0, retries: int = 2,
+                 sockets: int = 4, concurrency: int = 500, port: int = 53,
+                 use_cache: bool = True, cache=None):
+        self.resolver_id = resolver_id(nameservers, port)
+        nameservers = nameservers or load_system_nameservers()
+        self.nameservers = [ns if isinstance(ns, tuple) else (ns, port) for ns in nameservers]
+        self.timeout = timeout
+        self.retries = retries
+        self.sockets = max(1, sockets)
+        self.concurrency = max(1, concurrency)
+        self._channels = {} # família -> lista de _DNSDatagramProtocol
+        self._next_channel = 0
+        self._next_nameserver = 0
+        self._semaphore = None
+        self.cache = (cache or get_dns_cache()) if use_cache else None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        for channels in self._channels.values():
+            for channel in channels:
+                if channel.transport:
+                    channel.transport.close()
+        self._channels = {}
+
+    async def _channel_for(self, host: str) -> _DNSDatagramProtocol:
+        family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        channels = self._channels.get(family)
+        if channels is None:
+            loop = asyncio.get_running_loop()
+            local_addr = ("::", 0) if family == socket.AF_INET6 else ("0.0.0.0", 0)
+            channels = []
+            for _ in range(self.sockets):
+                transport, protocol = await loop.create_datagram_endpoint(
+                    _DNSDatagramProtocol, local_addr=local_addr, family=family)
+                try:
+                    # Rajadas de respostas estouram o buffer padrão do kernel e viram timeouts
+                    transport.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER_BYTES)
+                except OSError:
+                    pass
+                channels.append(protocol)
+            self._channels[family] = channels
+        self._next_channel = (self._next_channel + 1) % len(channels)
+        return channels[self._next_channel]
+
+    async def _tcp_exchange(self, payload: bytes, addr: tuple, timeout: float) -> bytes:
+        async def exchange():
+            reader, writer = await asyncio.open_connection(addr[0], addr[1])
+            try:
+                writer.write(struct.pack("!H", len(payload)) + payload)
+                await writer.drain()
+                size = struct.unpack("!H", await reader.readexactly(2))[0]
+                return await reader.readexactly(size)
+            finally:
+                writer.close()
+        return await asyncio.wait_for(exchange(), timeout)
+
+    async def query(self, name: str, qtype="A") -> dict:
+        """Executa uma consulta e retorna o resultado estruturado (nunca levanta exceção de rede)."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        name = name.strip().rstrip(".")
+        qtype_name = qtype.upper() if isinstance(qtype, str) else QTYPE_NAMES.get(qtype, str(qtype))
+        result = {"name": name, "type": qtype_name}
+        start = time.monotonic()
+        last_error = "timeout"
+        try:
+            qtype_code = _qtype_code(qtype)
+            encode_name(name)
+        except DNSError as e:
+            # Nome ou tipo inválido: não adianta consultar
+            result.update(status="error", error_message=str(e), attempts=0)
+            return result
+        if self.cache is not None:
+            cached = self.cache.get(name, qtype_name, self.resolver_id)
+            if cached is not None:
+                return cached
+
+        async with self._semaphore:
+            self._next_nameserver = (self._next_nameserver + 1) % len(self.nameservers)
+            for attempt in range(self.retries + 1):
+                addr = self.nameservers[(self._next_nameserver + attempt) % len(self.nameservers)]
+                timeout = self.timeout * (attempt + 1)
+                try:
+                    channel = await self._channel_for(addr[0])
+                    qid = secrets.randbits(16)
+                    while qid in channel.pending:
+                        qid = secrets.randbits(16)
+                    payload = build_query(qid, name, qtype_code)
+                    response = parse_response(await channel.exchange(payload, qid, addr, timeout))
+                    if response["truncated"]:
+                        response = parse_response(await self._tcp_exchange(payload, addr, timeout))
+                        result["transport"] = "tcp"
+                except DNSError as e:
+                    last_error = f"resposta inválida: {e}"
+                    continue
+                except (asyncio.TimeoutError, OSError, asyncio.IncompleteReadError) as e:
+                    last_error = "timeout" if isinstance(e, asyncio.TimeoutError) else str(e)
+                    continue
+
+                if response["rcode"] in ("SERVFAIL", "REFUSED") and attempt < self.retries:
+                    last_error = response["rcode"]
+                    continue
+
+                result.update({
+                    "status": "success" if response["rcode"] == "NOERROR" else "warning",
+                    "rcode": response["rcode"],
+                    "answers": response["answers"],
+                    "authority": response["authority"],
+                    "nameserver": addr[0],
+                    "attempts": attempt + 1,
+                    "elapsed_ms": round((time.monotonic() - start) * 1000, 3),
+                })
+                if self.cache is not None:
+                    self.cache.put(result, self.resolver_id)
+                return result
+
+        result.update(status="error", error_message=f"Falha na consulta DNS: {last_error}",
+                      attempts=self.retries + 1, elapsed_ms=round((time.monotonic() - start) * 1000, 3))
+        return result
+
+    async def resolve_many(self, names, qtype="A") -> list[dict]:
+        """Resolve vários nomes em paralelo (limitado por concurrency), preservando a ordem."""
+        return await asyncio.gather(*(self.query(name, qtype) for name in names))
+
+
+def resolve_bulk(names, qtype="A", **resolver_options) -> list[dict]:
+    """Atalho síncrono: resolve uma lista de nomes com um AsyncDNSResolver temporário."""
+    async def _run():
+        async with AsyncDNSResolver(**resolver_options) as resolver:
+            return await resolver.resolve_many(names, qtype)
+    return asyncio.run(_run())
+
+
+def resolve_addresses(name: str, **resolver_options) -> list[str]:
+    """
+    Resolve um hostname para endereços IPv4/IPv6 (IPv4 primeiro) usando o cache compartilhado
+    (nas entradas dos servidores de resolver_options). Chamada síncrona para os guardiões; se o DNS
+    não trouxer endereços, recorre ao getaddrinfo do sistema (/etc/hosts, mDNS) e guarda o resultado
+    no cache, como resposta do resolvedor do sistema, com FALLBACK_TTL.
+    """
+    name = name.strip().rstrip(".")
+    try:
+        return [str(ipaddress.ip_address(name))]
+    except ValueError:
+        pass
+
+    cache = get_dns_cache()
+    resolver = AsyncDNSResolver(**resolver_options) # Os sockets só são abertos na primeira consulta
+    results = [cache.get(name, "A", resolver.resolver_id), cache.get(name, "AAAA", resolver.resolver_id)]
+    if any(result is None for result in results):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            async def _run():
+                async with resolver:
+                    return await asyncio.gather(resolver.query(name, "A"), resolver.query(name, "AAAA"))
+            results = asyncio.run(_run())
+        # Dentro de um loop asyncio não dá para bloquear em asyncio.run: usa só o fallback abaixo
+
+    addresses = [record["data"] for result in results if result
+                 for record in result.get("answers") or [] if record["type"] in ("A", "AAAA")]
+    if addresses:
+        return addresses
+
+    try:
+        infos = socket.getaddrinfo(name, None, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError):
+        return []
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    for qtype, family_addresses in (("A", [a for a in addresses if ":" not in a]),
+                                    ("AAAA", [a for a in addresses if ":" in a])):
+        if family_addresses:
+            cache.put({"name": name, "type": qtype, "status": "success", "rcode": "NOERROR",
+                       "answers": [{"name": name, "type": qtype, "ttl": FALLBACK_TTL, "data": a}
+                                   for a in family_addresses]}, SYSTEM_RESOLVER)
+    return sorted(addresses, key=lambda address: ":" in address)
+
+
+def format_records(records: list) -> str:
+    """Formata registros no estilo da seção ANSWER do dig (uma linha por registro)."""
+    lines = []
+    for record in records:
+        data = record["data"]
+        if isinstance(data, dict):
+            data = " ".join(str(v) for v in data.values())
+        elif isinstance(data, list):
+            data = " ".join(f'"{item}"' for item in data)
+        lines.append(f"{record['name']}.\t{record['ttl']}\tIN\t{record['type']}\t{data}")
+    return "\n".join(lines)
@@ -0,0 +1,188 @@
+# shamann/modules/recon/dns_cache.py
+"""
+Cache DNS compartilhado pelo processo.
+
+Respeita o TTL dos registros (inclusive cache negativo para NXDOMAIN/NODATA, com o TTL
+do SOA da resposta), limita o número de entradas com despejo LRU e pode ser salvo em
+disco entre execuções. Todos os guardiões que resolvem nomes usam a mesma instância
+(get_dns_cache), e as estatísticas de acerto aparecem nas estatísticas da execução.
+Cada entrada pertence a um resolvedor (resolver_id): servidores diferentes podem dar
+respostas diferentes para o mesmo nome (split-horizon, DNS interno), e uma resposta de um
+não pode ser servida a quem consultou outro.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_RESOLVER = "system" # Servidores do resolv.conf (e o getaddrinfo do sistema)
+CACHE_FILE_VERSION = 2
+
+
+def resolver_id(nameservers=None, port: int = 53) -> str:
+    """Identificador estável de um conjunto de servidores ("ip" ou (ip, porta)); None é o resolvedor do sistema."""
+    if not nameservers:
+        return SYSTEM_RESOLVER
+    servers = [ns if isinstance(ns, tuple) else (ns, port) for ns in nameservers]
+    return ",".join(f"[{host}]:{server_port}" if ":" in host else f"{host}:{server_port}"
+                    for host, server_port in servers)
+
+
+class DNSCache:
+    """
+    Cache LRU de resultados de consultas DNS (no formato de AsyncDNSResolver.query).
+
+    :param max_entries: Número máximo de entradas; as menos usadas são despejadas.
+    :param negative_ttl: TTL (s) para respostas negativas sem SOA na seção de autoridade.
+    :param min_ttl: TTL mínimo aplicado (evita reconsultar registros com TTL 0 em rajadas).
+    :param max_ttl: TTL máximo aplicado.
+    """
+
+    def __init__(self, max_entries: int = 10000, negative_ttl: int = 60, min_ttl: int = 0, max_ttl: int = 86400):
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self._entries = OrderedDict() # (resolvedor, nome, tipo) -> (expira_em, resultado)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "negative_hits": 0, "misses": 0, "expired": 0, "evictions": 0, "stores": 0}
+
+    @staticmethod
+    def _key(name: str, qtype: str, resolver: str) -> tuple:
+        return resolver, name.strip().rstrip(".").lower(), qtype.upper()
+
+    def _ttl_for(self, result: dict) -> int | None:
+        """TTL de cache de um resultado, ou None se ele não deve ser armazenado (erros, SERVFAIL)."""
+        rcode = result.get("rcode")
+        if rcode not in ("NOERROR", "NXDOMAIN"):
+            return None
+        answers = result.get("answers") or []
+        if rcode == "NOERROR" and answers:
+            ttl = min(record["ttl"] for record in answers)
+        else:
+            # Cache negativo (RFC 2308): min(TTL do SOA, campo minimum do SOA)
+            soa = [r for r in result.get("authority") or [] if r.get("type") == "SOA"]
+            ttl = min(soa[0]["ttl"], soa[0]["data"]["minimum"]) if soa else self.negative_ttl
+        return max(self.min_ttl, min(ttl, self.max_ttl))
+
+    def get(self, name: str, qtype: str = "A", resolver: str = SYSTEM_RESOLVER) -> dict | None:
+        """Retorna uma cópia do resultado em cache para o resolvedor (com TTLs restantes) ou None."""
+        key = self._key(name, qtype, resolver)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            expires_at, result = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            if result.get("rcode") != "NOERROR" or not result.get("answers"):
+                self._stats["negative_hits"] += 1
+
+        remaining = int(expires_at - now)
+        cached = dict(result)
+        cached["answers"] = [dict(record, ttl=min(record["ttl"], remaining)) for record in result.get("answers") or []]
+        cached["cached"] = True
+        return cached
+
+    def put(self, result: dict, resolver: str = SYSTEM_RESOLVER) -> bool:
+        """Armazena um resultado de consulta feita ao resolvedor; retorna False se ele não for cacheável."""
+        ttl = self._ttl_for(result)
+        if ttl is None or ttl <= 0:
+            return False
+        key = self._key(result["name"], result["type"], resolver)
+        stored = {k: v for k, v in result.items() if k not in ("cached", "elapsed_ms", "attempts")}
+        stored["resolver"] = resolver
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, stored)
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Estatísticas de uso do cache (acertos, falhas, despejos e taxa de acerto)."""
+        with self._lock:
+            stats = dict(self._stats, size=len(self._entries), max_entries=self.max_entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def save(self, path: str):
+        """Grava as entradas ainda válidas em disco (JSON, expiração em tempo absoluto)."""
+        now = time.time()
+        with self._lock:
+            entries = [[expires_at, result] for expires_at, result in self._entries.values() if expires_at > now]
+        tmp_path = f"{path}.tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_FILE_VERSION, "entries": entries}, f)
+        os.replace(tmp_path, path) # Troca atômica: um arquivo corrompido nunca substitui o anterior
+        logger.info(f"Cache DNS salvo em '{path}' ({len(entries)} entradas).")
+
+    def load(self, path: str) -> int:
+        """Carrega entradas salvas por save(), descartando as expiradas. Retorna quantas foram carregadas."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache DNS em '{path}' ignorado (ilegível): {e}")
+            return 0
+        if data.get("version") != CACHE_FILE_VERSION:
+            # Versões antigas não registravam o resolvedor de cada entrada
+            logger.info(f"Cache DNS em '{path}' ignorado (formato da versão {data.get('version')}).")
+            return 0
+        now = time.time()
+        loaded = 0
+        with self._lock:
+            for expires_at, result in data.get("entries", []):
+                if expires_at > now:
+                    key = self._key(result["name"], result["type"], result.get("resolver", SYSTEM_RESOLVER))
+                    self._entries[key] = (expires_at, result)
+                    loaded += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.info(f"Cache DNS carregado de '{path}' ({loaded} entradas válidas).")
+        return loaded
+
+
+_shared_cache = DNSCache()
+
+
+def get_dns_cache() -> DNSCache:
+    """Retorna o cache DNS compartilhado pelo processo."""
+    return _shared_cache
+
+
+def configure_dns_cache(settings: dict = None) -> DNSCache:
+    """
+    Ajusta o cache compartilhado a partir da seção "dns_cache" da configuração
+    (max_entries, negative_ttl, min_ttl, max_ttl, persist_path) e carrega o arquivo persistido.
+    """
+    settings = settings or {}
+    cache = get_dns_cache()
+    for option in ("max_entries", "negative_ttl", "min_ttl", "max_ttl"):
+        if option in settings:
+            setattr(cache, option, int(settings[option]))
+    if settings.get("persist_path"):
+        cache.load(settings["persist_path"])
+    return cache
@@ -1,60 +1,117 @@
-import os
-import subprocess
+import threading
 from datetime import datetime
-from .base_guardian import BaseGuardian
+
+from shamann.core.tasks import Task, TaskError, run_tasks, with_dependencies
+from shamann.core.telemetry import disk_usage
+from .base_guardian import BaseGuardian, ScanContext
+from .system_tools import TEMP_DIRECTORIES, TEMP_MIN_AGE, remove_stale_entries
+
+APT_ENV = {"DEBIAN_FRONTEND": "noninteractive"} # Sem terminal, nenhum prompt do dpkg pode ser respondido
 
 
 class ShamannGuardian(BaseGuardian):
     """
     Guardião Shamann: responsável pela manutenção e defesa do ecossistema do Kali Linux.
+    As tarefas rodam em paralelo (core.tasks), cada uma com tempo limite próprio.
+    Opções: --tasks check_disk,apt_upgrade (dependências entram junto) e --timeout N (teto por tarefa).
     """
 
+    RESOURCES = {"cpu": 0.5, "network": 1, "subprocess": 3}
+
     @classmethod
     def name(cls) -> str:
         return "shamann"
 
+    @staticmethod
+    def maintenance_tasks() -> list[Task]:
+        return [
+            Task("check_disk", func=lambda: disk_usage("/"), timeout=10),
+            Task("clear_temp", func=lambda: remove_stale_entries(TEMP_DIRECTORIES, TEMP_MIN_AGE), timeout=300),
+            Task("apt_update", ["apt", "update", "-y"], timeout=900, env=APT_ENV),
+            Task("apt_upgrade", ["apt", "upgrade", "-y"], depends_on=["apt_update"], timeout=3600, env=APT_ENV),
+        ]
+
     @classmethod
     def run_scan(cls, target: str = "", options: str = "") -> dict:
         """
         Executa uma checagem completa do sistema.
         """
-        try:
-            return {
-                "timestamp": datetime.now().isoformat(),
-                "check_disk": cls.check_disk_usage(),
-                "clear_trash": cls.clear_temp_files(),
-                "apt_update": cls.run_apt_update(),
-                "status": "success"
-            }
-        except Exception as e:
-            return {
-                "status": "error",
-                "error_message": str(e)
-            }
+        return cls.scan(target, options)
 
-    @staticmethod
-    def check_disk_usage() -> str:
-        result = subprocess.run(["df", "-h", "/"], capture_output=True, text=True)
-        return result.stdout.strip()
+    @classmethod
+    def iter_scan(cls, target: str = "", options: str = "", context: ScanContext = None):
+        import argparse, shlex
 
-    @staticmethod
-    def clear_temp_files() -> str:
+        context = context or ScanContext(cls.name(), target)
+        parser = argparse.ArgumentParser(prog="shamann", add_help=False)
+        parser.add_argument("--tasks", type=lambda value: [name.strip() for name in value.split(",") if name.strip()])
+        parser.add_argument("--timeout", type=float)
         try:
-            subprocess.run(["rm", "-rf", "/tmp/*", "/var/tmp/*"], check=True)
-            return "🧹 Temp folders cleaned."
-        except subprocess.CalledProcessError as e:
-            return f"Erro ao limpar pastas temporárias: {e}"
+            args = parser.parse_args(shlex.split(options))
+            tasks = cls.maintenance_tasks()
+            if args.tasks:
+                tasks = with_dependencies(tasks, args.tasks)
+        except (SystemExit, TaskError) as e:
+            message = str(e) if isinstance(e, TaskError) else f"Opções inválidas para o Shamann: {options}"
+            yield context.result({"status": "error", "error_message": message})
+            return
+        if args.timeout:
+            for task in tasks:
+                task.timeout = min(task.timeout or args.timeout, args.timeout)
+
+        # O contexto é o cancel_event: cancelamento ou prazo encerram os subprocessos em andamento
+        outcome = {}
+        thread = threading.Thread(target=lambda: outcome.update(sweep=run_tasks(tasks, cancel_event=context)),
+                                  name="guardian-shamann", daemon=True)
+        thread.start()
+        while thread.is_alive():
+            thread.join(cls.PROGRESS_INTERVAL)
+            if thread.is_alive():
+                yield context.progress(message="tarefas de manutenção em execução")
+        context.check()
+        if "sweep" not in outcome:
+            yield context.result({"status": "error", "error_message": "Falha inesperada no executor de tarefas."})
+            return
+        yield context.result(cls.summarize(outcome["sweep"]))
 
     @staticmethod
-    def run_apt_update() -> str:
-        try:
-            subprocess.run(["apt", "update", "-y"], capture_output=True, text=True, check=True)
-            subprocess.run(["apt", "upgrade", "-y"], capture_output=True, text=True, check=True)
-            return "📦 Sistema atualizado com apt."
-        except subprocess.CalledProcessError as e:
-            return f"Erro ao atualizar sistema: {e}"
+    def summarize(sweep: dict) -> dict:
+        """Resultado do guardião: chaves de sempre (check_disk, clear_trash, apt_update) mais o detalhe por tarefa."""
+        tasks = sweep["tasks"]
+        result = {"timestamp": datetime.now().isoformat(), "status": "success", "elapsed": sweep["elapsed"],
+                  "busy_seconds": sweep["busy_seconds"], "failed": sweep["failed"], "tasks": tasks}
+        if "check_disk" in tasks:
+            disk = tasks["check_disk"]
+            if disk["status"] == "success":
+                usage = disk["output"]
+                result["check_disk"] = (f"/: {usage['used_percent']}% em uso, {usage['free_bytes'] / 2**30:.1f} GiB "
+                                        f"livres de {usage['total_bytes'] / 2**30:.1f} GiB")
+            else:
+                result["check_disk"] = f"Erro ao verificar o disco: {disk.get('error_message')}"
+        if "clear_temp" in tasks:
+            clear = tasks["clear_temp"]
+            result["clear_trash"] = f"🧹 {clear['output']} itens temporários removidos." if clear["status"] == "success" \
+                else f"Erro ao limpar pastas temporárias: {clear.get('error_message')}"
+        apt = [tasks[name] for name in ("apt_update", "apt_upgrade") if name in tasks]
+        if apt:
+            failed = next((task for task in apt if task["status"] != "success"), None)
+            result["apt_update"] = "📦 Sistema atualizado com apt." if failed is None \
+                else f"Erro ao atualizar sistema ({failed['task']}): {failed.get('error_message')} {failed.get('stderr', '')}".strip()
+        return result
 
     @staticmethod
-    def detect_intrusions() -> str:
-        # Placeholder: Integrar com Fail2Ban, auditd ou ferramentas de detecção
-        return "🔐 Monitoramento de intrusões ainda não implementado."
+    def detect_intrusions(settings: dict = None) -> dict:
+        """
+        Uma passada do detector de intrusões (modules.intrusion_detection) sobre o que os logs
+        ganharam desde a última leitura; o detector é o do processo, então o daemon e esta chamada
+        compartilham offsets e janelas.
+        """
+        from .intrusion_detection import intrusion_detector
+        try:
+            detector = intrusion_detector(settings)
+            alerts = detector.poll()
+        except (OSError, ValueError) as e:
+            return {"status": "error", "error_message": f"Falha no detector de intrusões: {e}"}
+        stats = detector.stats()
+        return {"timestamp": datetime.now().isoformat(), "status": "success", "alerts": alerts,
+                "lines": stats.get("lines", 0), "sources": stats["sources"]}
@@ -0,0 +1,360 @@
+# shamann/modules/subdomain_guardian.py
+"""
+Guardião de enumeração de subdomínios por força bruta.
+
+Estende o DNSGuardian: lê a wordlist de forma preguiçosa, detecta zonas com wildcard
+antes de começar e resolve os candidatos com alta concorrência sobre o resolvedor
+assíncrono (recon.dns). A concorrência se ajusta sozinha (reduz quando os timeouts
+sobem, cresce quando o servidor aguenta) e os candidatos que falharam voltam para
+rodadas de retentativa com timeout maior. Os hosts encontrados podem ser entregues
+ao NmapGuardian em lotes à medida que aparecem.
+"""
+
+import argparse
+import asyncio
+import logging
+import queue
+import secrets
+import shlex
+import string
+import threading
+import time
+
+from .base_guardian import ScanContext
+from .dns_guardian import DNSGuardian
+from .recon.dns import AsyncDNSResolver
+from .recon.dns_cache import get_dns_cache
+
+logger = logging.getLogger(__name__)
+
+WILDCARD_PROBES = 3
+MIN_CONCURRENCY = 10
+ADJUST_EVERY = 200 # Consultas entre reavaliações da concorrência
+TIMEOUT_RATE_HIGH = 0.05 # Acima disto a concorrência cai pela metade
+TIMEOUT_RATE_LOW = 0.01 # Abaixo disto a concorrência cresce 10%
+NMAP_FEEDER_JOIN_TIMEOUT = 2.0 # Espera máxima pelo Nmap em andamento depois de um cancelamento
+
+
+def iter_wordlist(path: str):
+    """Lê a wordlist linha a linha (sem carregar o arquivo), ignorando vazios, comentários e repetidos consecutivos."""
+    previous = None
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            word = line.strip().lower().strip(".")
+            if not word or word.startswith("#") or word == previous:
+                continue
+            previous = word
+            yield word
+
+
+class _AdaptiveEnumerator:
+    """Executa a força bruta dentro de um loop asyncio, com janela de concorrência adaptativa."""
+
+    def __init__(self, domain: str, resolver: AsyncDNSResolver, max_concurrency: int, retry_rounds: int, on_host,
+                 stop_event=None, stats: dict = None):
+        self.domain = domain
+        self.resolver = resolver
+        self.max_concurrency = max_concurrency
+        self.window = max_concurrency
+        self.retry_rounds = retry_rounds
+        self.on_host = on_host
+        self.stop_event = stop_event
+        self.wildcard_addresses = set()
+        self.stats = stats if stats is not None else {}
+        self.stats.update(candidates=0, resolved=0, wildcard_filtered=0, errors=0, retried=0)
+        self._window_changed = None
+        self._exhausted = False
+        self._recent = 0
+        self._recent_timeouts = 0
+
+    async def detect_wildcard(self) -> set:
+        """Consulta rótulos aleatórios: se algum resolver, a zona tem wildcard e esses IPs são descartados."""
+        alphabet = string.ascii_lowercase + string.digits
+        probes = ["".join(secrets.choice(alphabet) for _ in range(16)) + "." + self.domain for _ in range(WILDCARD_PROBES)]
+        for result in await asyncio.gather(*(self.resolver.query(name, "A") for name in probes)):
+            for record in result.get("answers") or []:
+                if record["type"] == "A":
+                    self.wildcard_addresses.add(record["data"])
+        return self.wildcard_addresses
+
+    def _adjust(self, timed_out: bool):
+        self._recent += 1
+        self._recent_timeouts += timed_out
+        if self._recent < ADJUST_EVERY:
+            return
+        rate = self._recent_timeouts / self._recent
+        previous = self.window
+        if rate > TIMEOUT_RATE_HIGH:
+            self.window = max(MIN_CONCURRENCY, self.window // 2)
+        elif rate < TIMEOUT_RATE_LOW:
+            self.window = min(self.max_concurrency, int(self.window * 1.1) + 1)
+        if self.window != previous:
+            logger.debug(f"Concorrência DNS ajustada de {previous} para {self.window} (timeouts {rate:.1%}).")
+            self._window_changed.set()
+            self._window_changed = asyncio.Event()
+        self._recent = self._recent_timeouts = 0
+
+    async def _worker(self, index: int, names, failed: list):
+        while True:
+            # Workers acima da janela atual esperam até ela crescer de novo (ou os nomes acabarem)
+            while index >= self.window and not self._exhausted:
+                await self._window_changed.wait()
+            name = next(names, None) if self.stop_event is None or not self.stop_event.is_set() else None
+            if name is None:
+                self._exhausted = True
+                self._window_changed.set()
+                return
+            result = await self.resolver.query(name, "A")
+            timed_out = result["status"] == "error"
+            self._adjust(timed_out)
+            if timed_out:
+                failed.append(name)
+                continue
+            addresses = [r["data"] for r in result.get("answers") or [] if r["type"] == "A"]
+            if not addresses:
+                continue
+            if self.wildcard_addresses and set(addresses) <= self.wildcard_addresses:
+                self.stats["wildcard_filtered"] += 1
+                continue
+            self.stats["resolved"] += 1
+            get_dns_cache().put(result, self.resolver.resolver_id) # Só vale para quem consultar os mesmos servidores
+            self.on_host({"hostname": name, "addresses": addresses,
+                          "cnames": [r["data"] for r in result["answers"] if r["type"] == "CNAME"]})
+
+    async def _run_round(self, names) -> list:
+        failed = []
+        self._window_changed = asyncio.Event()
+        self._exhausted = False
+        await asyncio.gather(*(self._worker(i, names, failed) for i in range(self.max_concurrency)))
+        return failed
+
+    async def run(self, words) -> dict:
+        def candidates():
+            for word in words:
+                self.stats["candidates"] += 1
+                yield f"{word}.{self.domain}"
+
+        # O gerador é compartilhado pelos workers: cada nome é consumido por exatamente um deles
+        failed = await self._run_round(candidates())
+        for round_number in range(self.retry_rounds):
+            if not failed or (self.stop_event is not None and self.stop_event.is_set()):
+                break
+            self.stats["retried"] += len(failed)
+            self.resolver.timeout *= 1.5
+            self.max_concurrency = max(MIN_CONCURRENCY, self.window)
+            logger.info(f"Rodada de retentativa {round_number + 1}: {len(failed)} candidatos, "
+                        f"timeout {self.resolver.timeout:.2f}s, concorrência {self.max_concurrency}.")
+            failed = await self._run_round(iter(failed))
+        self.stats["errors"] = len(failed)
+        self.stats["final_concurrency"] = self.window
+        return self.stats
+
+
+class SubdomainGuardian(DNSGuardian):
+    """
+    Enumeração de subdomínios por wordlist com detecção de wildcard.
+    Opções: -w/--wordlist (obrigatório), -c/--concurrency, --timeout, --retries,
+    --retry-rounds, --nameserver (repetível, aceita ip:porta), --nmap, --nmap-options, --nmap-ports, --nmap-batch.
+    """
+
+    @classmethod
+    def name(cls) -> str:
+        return "subdomain"
+
+    @staticmethod
+    def parse_options(options: str = "") -> argparse.Namespace:
+        parser = argparse.ArgumentParser(prog="subdomain", add_help=False)
+        parser.add_argument("-w", "--wordlist", required=True)
+        parser.add_argument("-c", "--concurrency", type=int, default=500)
+        parser.add_argument("--timeout", type=float, default=2.0)
+        parser.add_argument("--retries", type=int, default=1)
+        parser.add_argument("--retry-rounds", type=int, default=2)
+        parser.add_argument("--nameserver", action="append")
+        parser.add_argument("--nmap", action="store_true")
+        parser.add_argument("--nmap-options", default="-sV -T4")
+        parser.add_argument("--nmap-ports", default="1-1000")
+        parser.add_argument("--nmap-batch", type=int, default=16)
+        args = parser.parse_args(shlex.split(options))
+        if args.nameserver:
+            # Aceita "ip:porta" para servidores IPv4 fora da porta 53
+            args.nameserver = [(ns.rsplit(":", 1)[0], int(ns.rsplit(":", 1)[1])) if ns.count(":") == 1 else ns
+                               for ns in args.nameserver]
+        return args
+
+    RESOURCES = {"cpu": 1.0, "network": 500, "subprocess": 0}
+
+    @classmethod
+    def resources(cls, options: str = "") -> dict:
+        try:
+            args = cls.parse_options(options)
+        except SystemExit:
+            return super().resources(options)
+        return dict(super().resources(options), network=args.concurrency, subprocess=1 if args.nmap else 0)
+
+    @staticmethod
+    def enumerate(domain: str, words, on_host, concurrency: int = 500, timeout: float = 2.0, retries: int = 1,
+                  retry_rounds: int = 2, nameservers: list = None, stop_event=None, stats: dict = None) -> dict:
+        """
+        Executa a enumeração (bloqueante) e chama on_host(host) para cada subdomínio válido assim que ele resolve.
+        Retorna as estatísticas e os endereços de wildcard detectados. stop_event interrompe a enumeração
+        (os candidatos já em voo terminam); stats, se informado, é atualizado durante a execução.
+        """
+        domain = domain.strip().strip(".").lower()
+
+        async def _run():
+            # Sem cache na força bruta: milhões de NXDOMAIN só expulsariam entradas úteis do cache compartilhado
+            async with AsyncDNSResolver(nameservers=nameservers, timeout=timeout, retries=retries,
+                                        concurrency=concurrency, use_cache=False) as resolver:
+                enumerator = _AdaptiveEnumerator(domain, resolver, concurrency, retry_rounds, on_host, stop_event, stats)
+                wildcard = await enumerator.detect_wildcard()
+                if wildcard:
+                    logger.warning(f"Zona {domain} com wildcard DNS ({', '.join(sorted(wildcard))}); respostas iguais serão descartadas.")
+                return await enumerator.run(words), wildcard
+
+        start = time.monotonic()
+        stats, wildcard = asyncio.run(_run())
+        elapsed = time.monotonic() - start
+        stats["elapsed_seconds"] = round(elapsed, 3)
+        stats["queries_per_second"] = round(stats["candidates"] / elapsed, 1) if elapsed else 0.0
+        return {"stats": stats, "wildcard": {"detected": bool(wildcard), "addresses": sorted(wildcard)}}
+
+    @staticmethod
+    def iter_subdomains(domain: str, words, **enumerate_options):
+        """Gerador: produz os subdomínios encontrados enquanto a enumeração ainda está rodando (em outra thread)."""
+        found = queue.Queue()
+        done = object()
+
+        def run():
+            try:
+                SubdomainGuardian.enumerate(domain, words, found.put, **enumerate_options)
+            finally:
+                found.put(done)
+
+        thread = threading.Thread(target=run, name="subdomain-enum", daemon=True)
+        thread.start()
+        while (host := found.get()) is not done:
+            yield host
+        thread.join()
+
+    @staticmethod
+    def _nmap_feeder(hosts: queue.Queue, results: list, args, stop_event=None):
+        """
+        Consome os hosts encontrados e os escaneia com o Nmap em lotes, sem esperar o fim da enumeração.
+        Com stop_event sinalizado, nenhum lote novo é iniciado (os hosts ainda na fila são descartados).
+        """
+        from .nmap_guardian import NmapGuardian # Import tardio: só quem usa --nmap paga pelo python-nmap
+
+        finished = False
+        while not finished:
+            batch = []
+            while len(batch) < args.nmap_batch:
+                try:
+                    host = hosts.get(timeout=2.0 if batch else None)
+                except queue.Empty:
+                    break # Lote parcial: escaneia o que já chegou
+                if host is None:
+                    finished = True
+                    break
+                batch.append(host)
+            if stop_event is not None and stop_event.is_set():
+                return
+            if batch:
+                guardian = NmapGuardian(target=" ".join(h["hostname"] for h in batch))
+                # Já resolvidos pelos servidores da enumeração: a pré-validação não consulta o DNS de novo
+                guardian.resolved_hostnames = {address: h["hostname"] for h in batch for address in h["addresses"]}
+                results.append(guardian.run_scan(nmap_options=args.nmap_options, ports_to_scan=args.nmap_ports,
+                                                 include_default_scripts=False))
+
+    @classmethod
+    def run_scan(cls, target: str, options: str = "") -> dict:
+        return cls.scan(target, options)
+
+    @classmethod
+    def iter_scan(cls, target: str, options: str = "", context: ScanContext = None):
+        """Protocolo de streaming: cada subdomínio encontrado vira um evento "partial" assim que resolve."""
+        context = context or ScanContext(cls.name(), target)
+        try:
+            args = cls.parse_options(options)
+        except SystemExit:
+            # argparse encerra com SystemExit em opções inválidas
+            yield context.result({"target": target, "guardian": "subdomain", "status": "error",
+                                  "error_message": f"Opções inválidas para o guardião de subdomínios: {options}"})
+            return
+
+        found = []
+        nmap_results = []
+        nmap_queue = queue.Queue() if args.nmap else None
+        feeder = None
+        if nmap_queue is not None:
+            feeder = threading.Thread(target=cls._nmap_feeder, args=(nmap_queue, nmap_results, args, context),
+                                      name="subdomain-nmap", daemon=True)
+            feeder.start()
+
+        hosts = queue.Queue()
+        stats = {}
+        outcome = {}
+        done = object()
+
+        def on_host(host):
+            hosts.put(host)
+            if nmap_queue is not None:
+                nmap_queue.put(host)
+
+        def run():
+            try:
+                outcome["summary"] = cls.enumerate(target, iter_wordlist(args.wordlist), on_host,
+                                                   concurrency=args.concurrency, timeout=args.timeout,
+                                                   retries=args.retries, retry_rounds=args.retry_rounds,
+                                                   nameservers=args.nameserver, stop_event=context, stats=stats)
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                hosts.put(done)
+
+        thread = threading.Thread(target=run, name="subdomain-enum", daemon=True)
+        thread.start()
+        completed = False
+        try:
+            last_progress = time.monotonic()
+            while True:
+                try:
+                    host = hosts.get(timeout=cls.PROGRESS_INTERVAL)
+                except queue.Empty:
+                    host = None
+                if host is done:
+                    completed = True
+                    break
+                if host is not None:
+                    found.append(host)
+                    yield context.partial(host)
+                if time.monotonic() - last_progress >= cls.PROGRESS_INTERVAL:
+                    last_progress = time.monotonic()
+                    yield context.progress(stats.get("candidates", 0), message=f"{stats.get('resolved', 0)} encontrados")
+        finally:
+            if not completed:
+                context.set() # Consumidor saiu antes do fim: interrompe a enumeração e o Nmap
+            thread.join()
+            if feeder is not None:
+                nmap_queue.put(None)
+                # Cancelado, a espera é limitada: um Nmap em andamento não pode ser interrompido e
+                # termina em segundo plano (thread daemon), com o resultado descartado
+                feeder.join(NMAP_FEEDER_JOIN_TIMEOUT if context.is_set() else context.remaining())
+                if feeder.is_alive():
+                    logger.warning(f"Scan Nmap dos subdomínios de {target} ainda em andamento; resultado descartado.")
+
+        if "error" in outcome:
+            yield context.result({"target": target, "guardian": "subdomain", "status": "error",
+                                  "error_message": str(outcome["error"])})
+            return
+        summary = outcome["summary"]
+        result = {
+            "target": target,
+            "guardian": "subdomain",
+            "status": "success" if not summary["stats"]["errors"] else "warning",
+            "found": found,
+            "wildcard": summary["wildcard"],
+            "stats": summary["stats"],
+        }
+        if args.nmap:
+            result["nmap_results"] = nmap_results
+        yield context.result(result)
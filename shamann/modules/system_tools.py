@@ -1,34 +1,137 @@
-import subprocess
+import fnmatch
 import os
 import shutil
+import stat
 import time
 
+from shamann.core.tasks import Task, run_tasks, with_dependencies
+from shamann.core.telemetry import disk_usage, telemetry_collector
+from shamann.persistence.backup_store import BackupError, BackupRepository, DEFAULT_EXCLUDE, DEFAULT_KEEP, DEFAULT_PATHS
+
+TEMP_DIRECTORIES = ("/tmp", "/var/tmp")
+TEMP_MIN_AGE = 24 * 3600 # Só remove o que não é modificado há um dia
+# Diretórios de sistema no topo de /tmp: sockets do X/tmux/ssh e o PrivateTmp de serviços em execução
+# (systemd-private-*) ficam dias sem mudar e continuam em uso
+TEMP_PROTECTED = (".X11-unix", ".ICE-unix", ".XIM-unix", ".font-unix", ".Test-unix", "systemd-private-*",
+                  "tmux-*", "ssh-*", "screen-*", "snap-private-tmp", "pulse-*", ".X*-lock")
+
+
+def remove_stale_entries(directories=TEMP_DIRECTORIES, min_age: float = TEMP_MIN_AGE,
+                         protected=TEMP_PROTECTED) -> int:
+    """
+    Remove arquivos não modificados há min_age segundos e, de baixo para cima, os diretórios que
+    ficaram vazios e também eram antigos. A idade de um diretório diz só se os filhos diretos mudaram,
+    então cada arquivo é julgado pela própria data: um diretório antigo com um arquivo recente fica.
+    Sockets, FIFOs e dispositivos nunca são removidos, outros sistemas de arquivos montados dentro do
+    diretório não são percorridos, e os nomes de topo em protected (fnmatch) são ignorados.
+    Retorna quantos itens foram removidos.
+    """
+    cutoff = time.time() - min_age
+    removed = 0
+    for directory in directories:
+        try:
+            device = os.lstat(directory).st_dev
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if any(fnmatch.fnmatch(entry.name, pattern) for pattern in protected):
+                continue
+            removed += _remove_stale(entry.path, cutoff, device)[0]
+    return removed
+
+
+def _remove_stale(path: str, cutoff: float, device: int) -> tuple[int, bool]:
+    """(itens removidos, se path foi removido) para um arquivo ou uma árvore."""
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return 0, False
+    stale = info.st_mtime <= cutoff
+    if not stat.S_ISDIR(info.st_mode):
+        if not stale or not (stat.S_ISREG(info.st_mode) or stat.S_ISLNK(info.st_mode)):
+            return 0, False
+        try:
+            os.unlink(path)
+        except OSError:
+            return 0, False # Sem permissão ou removido por outro processo
+        return 1, True
+    if info.st_dev != device: # Ponto de montagem
+        return 0, False
+    removed, kept = 0, False
+    try:
+        children = list(os.scandir(path))
+    except OSError:
+        return 0, False
+    for child in children:
+        count, gone = _remove_stale(child.path, cutoff, device)
+        removed += count
+        kept = kept or not gone
+    # A data lida antes de limpar os filhos: a remoção deles acabou de atualizá-la
+    if kept or not stale:
+        return removed, False
+    try:
+        os.rmdir(path)
+    except OSError:
+        return removed, False # Alguém criou algo nele nesse meio-tempo
+    return removed + 1, True
+
+
+def _run_one(task: Task) -> dict:
+    """Executa uma tarefa isolada (com tempo limite e teto de saída) e retorna o resultado dela."""
+    return run_tasks([task])["tasks"][task.name]
+
+
+def _legacy(outcome: dict, task: str, **extra) -> dict:
+    if outcome["status"] == "success":
+        return {"task": task, "result": "success", **extra}
+    return {"task": task, "result": "error", "message": outcome.get("error_message") or outcome.get("stderr")}
+
+
 class SystemTools:
 
+    @staticmethod
+    def maintenance_tasks() -> list[Task]:
+        """Tarefas da varredura de manutenção (ver core.tasks); independentes, então rodam em paralelo."""
+        return [
+            Task("disk_usage", func=SystemTools.verify_disk_usage, timeout=10),
+            Task("sync_time", ["ntpdate", "-u", "pool.ntp.org"], timeout=30),
+            Task("check_dependencies", func=SystemTools.check_dependencies, timeout=10),
+            Task("clean_temp", func=remove_stale_entries, timeout=300),
+            Task("backup", func=SystemTools.create_backup, timeout=1800),
+        ]
+
+    @staticmethod
+    def run_maintenance(tasks: list = None, max_concurrency: int = None, cancel_event=None) -> dict:
+        """Executa a varredura (ou só as tarefas nomeadas, com as dependências) e retorna o resultado de run_tasks."""
+        selected = SystemTools.maintenance_tasks()
+        if tasks:
+            selected = with_dependencies(selected, tasks)
+        return run_tasks(selected, max_concurrency, cancel_event)
+
     @staticmethod
     def clean_temp_files():
         try:
-            shutil.rmtree('/tmp/', ignore_errors=True)
-            os.makedirs('/tmp/', exist_ok=True)
-            return {"task": "clean_temp", "result": "success"}
+            return {"task": "clean_temp", "result": "success", "removed": remove_stale_entries()}
         except Exception as e:
             return {"task": "clean_temp", "result": "error", "message": str(e)}
 
     @staticmethod
-    def verify_disk_usage():
-        try:
-            result = subprocess.run(["df", "-h"], capture_output=True, text=True)
-            return {"task": "disk_usage", "result": "success", "output": result.stdout.strip()}
-        except Exception as e:
-            return {"task": "disk_usage", "result": "error", "message": str(e)}
+    def verify_disk_usage(mounts=("/", "/tmp", "/var", "/home")):
+        # statvfs direto em vez de df: sem subprocesso e com números em vez de texto
+        disks = {}
+        for mount in mounts:
+            try:
+                disks[mount] = disk_usage(mount)
+            except OSError:
+                continue
+        if not disks:
+            return {"task": "disk_usage", "result": "error", "message": "Nenhum ponto de montagem acessível."}
+        return {"task": "disk_usage", "result": "success", "disks": disks}
 
     @staticmethod
     def sync_time():
-        try:
-            subprocess.run(["ntpdate", "-u", "pool.ntp.org"], capture_output=True)
-            return {"task": "sync_time", "result": "success"}
-        except Exception as e:
-            return {"task": "sync_time", "result": "error", "message": str(e)}
+        return _legacy(_run_one(Task("sync_time", ["ntpdate", "-u", "pool.ntp.org"], timeout=30)), "sync_time")
 
     @staticmethod
     def check_dependencies():
@@ -39,35 +142,38 @@ class SystemTools:
         return {"task": "check_dependencies", "result": "success"}
 
     @staticmethod
-    def create_backup():
+    def create_backup(settings: dict = None):
+        # Snapshot incremental e deduplicado (persistence.backup_store) no lugar do tar.gz completo em /tmp
+        settings = settings or {}
         try:
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            backup_file = f"/tmp/shamann_backup_{timestamp}.tar.gz"
-            subprocess.run(["tar", "-czf", backup_file, "--exclude=/proc", "--exclude=/sys", "/etc", "/home"], check=True)
-            return {"task": "backup", "result": "success", "backup_file": backup_file}
-        except Exception as e:
+            repository = BackupRepository.from_settings(settings)
+            snapshot = repository.snapshot(settings.get("paths") or DEFAULT_PATHS, settings.get("exclude", DEFAULT_EXCLUDE))
+            pruned = repository.prune(settings.get("keep", DEFAULT_KEEP))
+        except (OSError, BackupError) as e:
             return {"task": "backup", "result": "error", "message": str(e)}
+        return {"task": "backup", "result": "success", "repository": repository.root, "snapshot": snapshot["id"],
+                "stats": snapshot["stats"], "pruned_snapshots": pruned["removed_snapshots"]}
 
     @staticmethod
     def activate_firewall():
-        try:
-            subprocess.run(["ufw", "enable"], check=True)
-            return {"task": "firewall", "result": "success"}
-        except Exception as e:
-            return {"task": "firewall", "result": "error", "message": str(e)}
+        # --force: sem terminal (stdin fechado), o 'ufw enable' interativo abortaria na confirmação
+        return _legacy(_run_one(Task("firewall", ["ufw", "--force", "enable"], timeout=30)), "firewall")
 
     @staticmethod
-    def start_network_monitor():
+    def start_network_monitor(settings: dict = None):
+        # Coletor de telemetria do processo (core.telemetry) no lugar do iftop, cuja saída era descartada
         try:
-            subprocess.Popen(["iftop", "-t"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            return {"task": "network_monitor", "result": "started"}
+            collector = telemetry_collector(settings).start()
+            return {"task": "network_monitor", "result": "started", "telemetry": collector.info()}
         except Exception as e:
             return {"task": "network_monitor", "result": "error", "message": str(e)}
 
     @staticmethod
-    def launch_honeypot():
+    def launch_honeypot(settings: dict = None):
+        # Honeypot asyncio do processo (modules.honeypot); chamadas repetidas devolvem o mesmo serviço
+        from .honeypot import honeypot_service
         try:
-            # Suporte básico com cowrie ou dummy listener
-            return {"task": "honeypot", "result": "placeholder: configure honeypot manually"}
-        except Exception as e:
+            service = honeypot_service(settings)
+            return {"task": "honeypot", "result": "started", "ports": service.stats()["ports"]}
+        except (OSError, ValueError) as e:
             return {"task": "honeypot", "result": "error", "message": str(e)}
@@ -0,0 +1,277 @@
+# shamann/modules/vuln_index.py
+"""
+Índice offline de vulnerabilidades (CPE -> CVE) para enriquecer os serviços do Nmap.
+
+Compila um feed baixado (NVD JSON 2.0, NVD JSON 1.1 ou JSON Lines simples, opcionalmente
+.gz) em um índice por vendor:produto com as faixas de versão vulneráveis ordenadas pelo
+início da faixa. O índice compilado é gravado com marshal (apenas tipos básicos, carrega
+rápido e não executa código) e recompilado só quando o feed muda. Na consulta, as faixas de
+um produto formam uma árvore de intervalos implícita (ver _subtree_max_ends).
+"""
+
+import gzip
+import json
+import logging
+import marshal
+import os
+import re
+import sys
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+COMPILED_SUFFIX = ".shvdb"
+MAX_KEY = ((9, ""),) # Maior que qualquer chave de versão: faixa sem limite superior
+
+
+class VulnIndexError(Exception):
+    """Erro ao ler ou compilar o índice de vulnerabilidades."""
+
+
+def version_key(version: str) -> tuple:
+    """
+    Chave de ordenação de versões: '2.4.49' -> ((0,2),(0,4),(0,49)); '1.1.1k' -> (..., (0,1), (1,'k')).
+    Números comparam numericamente e antes de sufixos alfabéticos.
+    """
+    parts = re.findall(r"\d+|[a-z]+", (version or "").lower())
+    return tuple((0, int(part)) if part.isdigit() else (1, part) for part in parts)
+
+
+def parse_cpe(cpe: str) -> tuple[str, str, str] | None:
+    """Extrai (vendor, produto, versão) de um CPE 2.2 ('cpe:/a:v:p:ver') ou 2.3 ('cpe:2.3:a:v:p:ver:...')."""
+    if not cpe or not cpe.startswith("cpe:"):
+        return None
+    fields = cpe[len("cpe:2.3:"):].split(":") if cpe.startswith("cpe:2.3:") else cpe[len("cpe:/"):].split(":")
+    if len(fields) < 3:
+        return None
+    vendor, product = fields[1].lower(), fields[2].lower()
+    version = fields[3] if len(fields) > 3 else ""
+    return vendor, product, version.replace("\\", "")
+
+
+def _open_feed(path: str):
+    return gzip.open(path, "rt", encoding="utf-8") if path.endswith(".gz") else open(path, "r", encoding="utf-8")
+
+
+def _iter_nvd_matches(nodes, key_uri: str, key_matches: str):
+    for node in nodes or []:
+        for match in node.get(key_matches, []) or []:
+            if match.get("vulnerable", True):
+                yield match.get(key_uri), match
+        yield from _iter_nvd_matches(node.get("children"), key_uri, key_matches)
+
+
+def _iter_feed_entries(path: str):
+    """Normaliza qualquer formato de feed suportado em dicts {cve, cpe|vendor/product, faixas, severity, score, summary}."""
+    with _open_feed(path) as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == "{" and not path.endswith((".jsonl", ".jsonl.gz", ".ndjson")):
+            data = json.load(f)
+            if "vulnerabilities" in data: # NVD 2.0
+                for item in data["vulnerabilities"]:
+                    cve = item["cve"]
+                    metrics = cve.get("metrics", {})
+                    cvss = next((m[0]["cvssData"] for key in ("cvssMetricV31", "cvssMetricV30", "cvssMetricV2")
+                                 if (m := metrics.get(key))), {})
+                    severity = cvss.get("baseSeverity") or (metrics.get("cvssMetricV2") or [{}])[0].get("baseSeverity")
+                    summary = next((d["value"] for d in cve.get("descriptions", []) if d.get("lang") == "en"), "")
+                    for config in cve.get("configurations", []):
+                        for cpe, match in _iter_nvd_matches(config.get("nodes"), "criteria", "cpeMatch"):
+                            yield {"cve": cve["id"], "cpe": cpe, "severity": severity, "score": cvss.get("baseScore"),
+                                   "summary": summary, **match}
+                return
+            if "CVE_Items" in data: # NVD 1.1
+                for item in data["CVE_Items"]:
+                    cve_id = item["cve"]["CVE_data_meta"]["ID"]
+                    impact = item.get("impact", {})
+                    cvss = impact.get("baseMetricV3", {}).get("cvssV3") or impact.get("baseMetricV2", {}).get("cvssV2", {})
+                    severity = cvss.get("baseSeverity") or impact.get("baseMetricV2", {}).get("severity")
+                    summary = next((d["value"] for d in item["cve"].get("description", {}).get("description_data", [])), "")
+                    for cpe, match in _iter_nvd_matches(item.get("configurations", {}).get("nodes"), "cpe23Uri", "cpe_match"):
+                        yield {"cve": cve_id, "cpe": cpe, "severity": severity, "score": cvss.get("baseScore"),
+                               "summary": summary, **match}
+                return
+            raise VulnIndexError(f"Formato de feed JSON não reconhecido em '{path}'.")
+        for line in f: # JSON Lines: um registro por linha
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _subtree_max_ends(ends: tuple) -> list:
+    """
+    Árvore de intervalos implícita sobre as faixas ordenadas pelo início: o nó de [lo, hi) é o
+    índice mid = (lo + hi) // 2, e max_ends[mid] guarda o maior fim entre ends[lo:hi].
+    """
+    max_ends = [None] * len(ends)
+
+    def build(lo: int, hi: int):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        best = ends[mid]
+        for child in (build(lo, mid), build(mid + 1, hi)): # Profundidade log2(n)
+            if child is not None and child > best:
+                best = child
+        max_ends[mid] = best
+        return best
+
+    build(0, len(ends))
+    return max_ends
+
+
+class VulnIndex:
+    """Índice carregado em memória; use VulnIndex.load() para obter um."""
+
+    def __init__(self, data: dict):
+        if data.get("format") != FORMAT_VERSION:
+            raise VulnIndexError("Versão de índice de vulnerabilidades incompatível; recompile o feed.")
+        self._cves = data["cves"] # cve -> (severity, score, summary)
+        self._ranges = data["ranges"] # "vendor:produto" -> (starts, start_incl, ends, end_incl, cve_ids)
+        self._exact = data["exact"] # "vendor:produto" -> {versão normalizada: [cve_ids]}
+        self._by_product = data["by_product"] # produto -> ["vendor:produto", ...]
+        self._max_ends = {} # "vendor:produto" -> _subtree_max_ends, montado na primeira consulta
+        self.sizes = {"cves": len(self._cves), "products": len(self._ranges.keys() | self._exact.keys())}
+
+    # --- Compilação ---
+
+    @staticmethod
+    def compile(feed_path: str) -> dict:
+        """Lê o feed e produz a estrutura do índice (tipos básicos, pronta para marshal)."""
+        cves = {}
+        ranges = {}
+        exact = {}
+        entries = 0
+        for entry in _iter_feed_entries(feed_path):
+            if entry.get("cpe"):
+                parsed = parse_cpe(entry["cpe"])
+                if not parsed:
+                    continue
+                vendor, product, version = parsed
+            else:
+                vendor, product = entry.get("vendor", "*").lower(), entry.get("product", "").lower()
+                version = entry.get("version", "*")
+            if not product:
+                continue
+            key = f"{vendor}:{product}"
+            cve_id = entry["cve"]
+            cves.setdefault(cve_id, ((entry.get("severity") or "UNKNOWN").upper(), entry.get("score"),
+                                     (entry.get("summary") or "")[:300]))
+            entries += 1
+
+            start = entry.get("versionStartIncluding") or entry.get("versionStartExcluding") or entry.get("version_start")
+            end = entry.get("versionEndIncluding") or entry.get("versionEndExcluding") or entry.get("version_end")
+            if start or end or version in ("*", "", None):
+                start_incl = "versionStartExcluding" not in entry and bool(entry.get("version_start_incl", True))
+                end_incl = "versionEndIncluding" in entry or bool(entry.get("version_end_incl", False))
+                ranges.setdefault(key, []).append(
+                    (version_key(start) if start else (), start_incl, version_key(end) if end else MAX_KEY, end_incl, cve_id))
+            elif version != "-":
+                exact.setdefault(key, {}).setdefault(".".join(str(p[1]) for p in version_key(version)), []).append(cve_id)
+
+        compiled_ranges = {}
+        for key, items in ranges.items():
+            items = sorted(set(items))
+            compiled_ranges[key] = tuple(tuple(item[i] for item in items) for i in range(5))
+        by_product = {}
+        for key in compiled_ranges.keys() | exact.keys():
+            by_product.setdefault(key.split(":", 1)[1], []).append(key)
+        logger.info(f"Feed de vulnerabilidades '{feed_path}': {entries} entradas, {len(cves)} CVEs, {len(by_product)} produtos.")
+        return {"format": FORMAT_VERSION, "cves": cves, "ranges": compiled_ranges, "exact": exact, "by_product": by_product}
+
+    @classmethod
+    def build(cls, feed_path: str, output_path: str) -> str:
+        data = cls.compile(feed_path)
+        tmp_path = f"{output_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            # A versão do interpretador acompanha o arquivo: o formato do marshal pode mudar entre versões
+            marshal.dump((sys.version_info[:2], data), f)
+        os.replace(tmp_path, output_path)
+        return output_path
+
+    @classmethod
+    def load(cls, path: str) -> "VulnIndex":
+        """
+        Carrega um índice compilado ('.shvdb') ou compila o feed indicado, mantendo o resultado em
+        '<feed>.shvdb' (recompilado quando o feed for mais novo ou o interpretador mudar).
+        """
+        compiled_path = path if path.endswith(COMPILED_SUFFIX) else path + COMPILED_SUFFIX
+        if compiled_path != path and (not os.path.exists(compiled_path) or
+                                      os.path.getmtime(compiled_path) < os.path.getmtime(path)):
+            cls.build(path, compiled_path)
+        with open(compiled_path, "rb") as f:
+            try:
+                python_version, data = marshal.load(f)
+            except (EOFError, ValueError, TypeError) as e:
+                raise VulnIndexError(f"Índice de vulnerabilidades corrompido em '{compiled_path}': {e}") from e
+        if tuple(python_version) != sys.version_info[:2]:
+            if compiled_path == path:
+                raise VulnIndexError(f"Índice '{path}' foi compilado por outra versão do Python; recompile o feed.")
+            cls.build(path, compiled_path)
+            return cls.load(path)
+        return cls(data)
+
+    # --- Consulta ---
+
+    def match(self, vendor: str, product: str, version: str) -> list[dict]:
+        """Retorna as CVEs que afetam vendor:produto na versão indicada (vendor '*' procura pelo produto)."""
+        product = product.lower().replace(" ", "_")
+        keys = self._by_product.get(product, []) if vendor in ("*", "", None) else [f"{vendor.lower()}:{product}"]
+        key_v = version_key(version)
+        if not key_v:
+            return []
+        found = []
+        for key in keys:
+            found.extend(self._exact.get(key, {}).get(".".join(str(p[1]) for p in key_v), []))
+            compiled = self._ranges.get(key)
+            if compiled:
+                found.extend(compiled[4][i] for i in self._stab(key, compiled, key_v))
+        results = []
+        for cve_id in dict.fromkeys(found):
+            severity, score, summary = self._cves[cve_id]
+            results.append({"cve": cve_id, "severity": severity, "score": score, "summary": summary})
+        results.sort(key=lambda item: item["score"] or 0, reverse=True)
+        return results
+
+    def _stab(self, key: str, compiled: tuple, key_v: tuple) -> list[int]:
+        """
+        Índices (em ordem) das faixas de key que contêm key_v. Subárvores cujo maior fim fica antes da
+        versão são descartadas, assim como as que começam depois dela: O(k log n) para k faixas
+        encontradas, mesmo com milhares de faixas sem início ("até a versão X").
+        """
+        starts, start_incl, ends, end_incl, _ = compiled
+        max_ends = self._max_ends.get(key)
+        if max_ends is None:
+            max_ends = self._max_ends[key] = _subtree_max_ends(ends)
+        found = []
+        stack = [(0, len(starts))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if max_ends[mid] < key_v:
+                continue
+            stack.append((lo, mid))
+            if starts[mid] > key_v:
+                continue # As faixas à direita começam ainda depois
+            stack.append((mid + 1, hi))
+            if starts[mid] == key_v and not start_incl[mid]:
+                continue
+            if key_v < ends[mid] or (key_v == ends[mid] and end_incl[mid]):
+                found.append(mid)
+        found.sort()
+        return found
+
+    def match_service(self, cpe: str = None, product: str = None, version: str = None) -> list[dict]:
+        """Casa um serviço do Nmap: usa o CPE quando existe; senão tenta pelo nome do produto."""
+        parsed = parse_cpe(cpe) if cpe and cpe != "N/A" else None
+        if parsed:
+            vendor, cpe_product, cpe_version = parsed
+            return self.match(vendor, cpe_product, cpe_version or version or "")
+        if product and product != "N/A" and version and version != "N/A":
+            return self.match("*", product, version.split()[0])
+        return []
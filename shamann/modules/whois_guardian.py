@@ -1,18 +1,76 @@
 # shamann/modules/whois_guardian.py
-import subprocess
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from .base_guardian import BaseGuardian
+from shamann.persistence.whois_cache import get_whois_cache, normalize_whois_record
 
 import whois
 
-class WhoisGuardian:
+
+class _ServerRateLimiter:
+    """
+    Limita as consultas por servidor de registro: no máximo `concurrency` consultas
+    simultâneas e um intervalo mínimo de `interval` segundos entre consultas ao mesmo servidor.
+    """
+
+    def __init__(self, interval: float, concurrency: int):
+        self.interval = interval
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+        self._servers = {} # chave -> [semáforo, próximo horário livre]
+
+    def acquire(self, server_key: str):
+        with self._lock:
+            state = self._servers.setdefault(server_key, [threading.Semaphore(self.concurrency), 0.0])
+        state[0].acquire()
+        with self._lock:
+            now = time.monotonic()
+            wait = state[1] - now
+            state[1] = max(now, state[1]) + self.interval # Reserva o próximo horário antes de dormir
+        if wait > 0:
+            time.sleep(wait)
+
+    def release(self, server_key: str):
+        self._servers[server_key][0].release()
+
+
+_limiters = {} # (intervalo, concorrência) -> _ServerRateLimiter
+_limiters_lock = threading.Lock()
+
+
+def _shared_limiter(interval: float, concurrency: int) -> _ServerRateLimiter:
+    """
+    Limitador compartilhado pelo processo: lookup, run_scan e bulk_lookup (com os limites padrão)
+    disputam o mesmo limite por servidor, inclusive entre chamadas e threads diferentes.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get((interval, concurrency))
+        if limiter is None:
+            limiter = _limiters[(interval, concurrency)] = _ServerRateLimiter(interval, concurrency)
+        return limiter
+
+
+class WhoisGuardian(BaseGuardian):
+    RESOURCES = {"cpu": 0.05, "network": 1, "subprocess": 0}
+    DEFAULT_MAX_WORKERS = 8
+    DEFAULT_SERVER_INTERVAL = 1.0 # segundos entre consultas ao mesmo servidor de registro
+    DEFAULT_SERVER_CONCURRENCY = 1
+
     @staticmethod
     def run_scan(target: str, options: str = "") -> dict:
+        return WhoisGuardian._scan(target)
+
+    @staticmethod
+    def _scan(target: str, limiter: _ServerRateLimiter = None) -> dict:
         try:
-            whois_data = WhoisGuardian.perform_whois_lookup(target)
+            whois_data, cached = WhoisGuardian._lookup(target, limiter=limiter)
             return {
                 "target": target,
                 "guardian": "whois",
                 "status": "success",
+                "cached": cached,
                 "whois_data": whois_data
             }
         except Exception as e:
@@ -23,12 +81,100 @@ class WhoisGuardian:
                 "error_message": str(e)
             }
 
+    @staticmethod
+    def server_key(target: str) -> str:
+        """
+        Chave do servidor de registro usada no rate limit. O python-whois escolhe o servidor
+        pelo TLD, então domínios do mesmo TLD disputam o mesmo limite.
+        """
+        return target.strip().rstrip(".").lower().rsplit(".", 1)[-1]
+
+    @staticmethod
+    def _lookup(target: str, use_cache: bool = True, limiter: _ServerRateLimiter = None) -> tuple[dict, bool]:
+        """Retorna (registro estruturado, veio_do_cache). Só a consulta à rede passa pelo limitador."""
+        cache = get_whois_cache() if use_cache else None
+        if cache is not None:
+            record = cache.get(target)
+            if record is not None:
+                return record, True
+        limiter = limiter or _shared_limiter(WhoisGuardian.DEFAULT_SERVER_INTERVAL,
+                                             WhoisGuardian.DEFAULT_SERVER_CONCURRENCY)
+        key = WhoisGuardian.server_key(target)
+        limiter.acquire(key)
+        try:
+            raw = whois.whois(target)
+        finally:
+            limiter.release(key)
+        record = normalize_whois_record(raw)
+        if cache is not None:
+            cache.put(target, record, server_key=WhoisGuardian.server_key(target))
+        return record, False
+
+    @staticmethod
+    def lookup(target: str, use_cache: bool = True) -> dict:
+        """Consulta WHOIS estruturada (dict), servida do cache quando possível."""
+        return WhoisGuardian._lookup(target, use_cache)[0]
+
     @staticmethod
     def perform_whois_lookup(target: str) -> str:
-        result = whois.whois(target)
-        return str(result)
+        # Mesmo formato de str(WhoisEntry): JSON indentado do registro
+        return json.dumps(WhoisGuardian.lookup(target), indent=2, ensure_ascii=False)
 
     @staticmethod
     def run_query(target: str) -> str:
         """Interface direta usada pelos testes unitários"""
         return WhoisGuardian.perform_whois_lookup(target)
+
+    @staticmethod
+    def bulk_lookup(targets, max_workers: int = DEFAULT_MAX_WORKERS,
+                    server_interval: float = DEFAULT_SERVER_INTERVAL,
+                    server_concurrency: int = DEFAULT_SERVER_CONCURRENCY) -> dict:
+        """
+        Consulta WHOIS em lote. Acertos de cache são respondidos sem rede; os demais são
+        consultados em paralelo (max_workers), respeitando o limite de cada servidor de registro,
+        compartilhado com as demais consultas do processo que usam os mesmos limites.
+        Retorna {domínio: resultado no formato de run_scan}.
+        """
+        cache = get_whois_cache()
+        results = {}
+        misses = []
+        for target in dict.fromkeys(t.strip() for t in targets if t and t.strip()):
+            record = cache.get(target)
+            if record is not None:
+                results[target] = {"target": target, "guardian": "whois", "status": "success",
+                                   "cached": True, "whois_data": record}
+            else:
+                misses.append(target)
+
+        if not misses:
+            return results
+
+        limiter = _shared_limiter(server_interval, server_concurrency)
+
+        def fetch(target):
+            return WhoisGuardian._scan(target, limiter)
+
+        # Intercala os TLDs para que os workers não fiquem todos presos no limite do mesmo servidor
+        by_server = {}
+        for target in misses:
+            by_server.setdefault(WhoisGuardian.server_key(target), []).append(target)
+        interleaved = [t for group in _round_robin(by_server.values()) for t in group]
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="whois") as executor:
+            for target, result in zip(interleaved, executor.map(fetch, interleaved)):
+                results[target] = result
+        return results
+
+
+def _round_robin(groups):
+    """Produz rodadas com um item de cada grupo (round-robin) até esgotar todos."""
+    iterators = [iter(group) for group in groups]
+    while iterators:
+        round_items = []
+        for iterator in list(iterators):
+            try:
+                round_items.append(next(iterator))
+            except StopIteration:
+                iterators.remove(iterator)
+        if round_items:
+            yield round_items
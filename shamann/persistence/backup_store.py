@@ -0,0 +1,363 @@
+import contextlib
+import fcntl
+import fnmatch
+import gzip
+import hashlib
+import json
+import logging
+import os
+import stat
+import threading
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, UTC
+
+# Configuração de logging para este módulo
+logger = logging.getLogger(__name__)
+
+# --- LAYOUT DO REPOSITÓRIO ---
+# <raiz>/objects/ab/abcdef...   pedaço (chunk) de arquivo comprimido com zlib, nomeado pelo SHA-256 do conteúdo
+# <raiz>/snapshots/<id>.json.gz manifesto: metadados de cada arquivo e a lista de chunks que o compõem
+# <raiz>/lock                   flock: exclusivo em snapshot() e prune(), compartilhado em restore()
+# Um chunk que já existe nunca é gravado de novo, em nenhum snapshot: a deduplicação vale entre
+# arquivos, caminhos e execuções. Os chunks têm tamanho fixo (chunk_size): um corte por conteúdo
+# (rolling hash) em Python puro custaria mais do que a deduplicação economizaria aqui.
+
+DEFAULT_REPOSITORY = "/var/backups/shamann" # Fora do /tmp, que é limpo pela manutenção
+DEFAULT_PATHS = ("/etc", "/home")
+DEFAULT_EXCLUDE = ("/proc/*", "/sys/*", "*/.cache/*")
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_COMPRESSION_LEVEL = 6
+DEFAULT_KEEP = 14
+RACY_WINDOW_NS = 2 * 10**9 # Arquivo modificado perto do snapshot anterior: mtime não é confiável, relê
+
+
+class BackupError(Exception):
+    """Repositório ou snapshot inexistente, ou chunk corrompido."""
+
+
+class BackupRepository:
+    """
+    Backups incrementais e deduplicados, com compressão em paralelo.
+    :param root: Diretório do repositório (criado se não existir).
+    :param chunk_size: Tamanho dos chunks em bytes.
+    :param workers: Threads de leitura/hash e de compressão (hashlib e zlib liberam o GIL,
+                    então usam vários núcleos). Padrão: número de CPUs.
+    :param compression_level: Nível do zlib (1 = rápido, 9 = menor).
+    """
+
+    def __init__(self, root: str = DEFAULT_REPOSITORY, chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = None,
+                 compression_level: int = DEFAULT_COMPRESSION_LEVEL):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 2
+        self.compression_level = compression_level
+        self._objects = os.path.join(root, "objects")
+        self._snapshots = os.path.join(root, "snapshots")
+        os.makedirs(self._objects, exist_ok=True)
+        os.makedirs(self._snapshots, exist_ok=True)
+        self._known = set() # Chunks já gravados ou em gravação nesta instância
+        self._lock = threading.Lock()
+        self._lock_path = os.path.join(root, "lock")
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> "BackupRepository":
+        return cls(settings.get("repository", DEFAULT_REPOSITORY), settings.get("chunk_size", DEFAULT_CHUNK_SIZE),
+                   settings.get("workers"), settings.get("compression_level", DEFAULT_COMPRESSION_LEVEL))
+
+    @contextlib.contextmanager
+    def _locked(self, operation: int = fcntl.LOCK_EX):
+        """
+        Trava o repositório entre processos e threads (cada chamada abre o próprio descritor). Um
+        snapshot grava chunks antes do manifesto que os referencia: sem a trava, um prune
+        concorrente os apagaria como não referenciados, junto com os .tmp em gravação.
+        """
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, operation) # Espera a operação em andamento terminar
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    # --- Objetos ---
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self._objects, digest[:2], digest)
+
+    def _claim(self, digest: str) -> bool:
+        """True se o chunk ainda precisa ser gravado (e reserva a gravação para quem chamou)."""
+        with self._lock:
+            if digest in self._known:
+                return False
+            self._known.add(digest)
+        if os.path.exists(self._object_path(digest)):
+            return False
+        return True
+
+    def _write_object(self, digest: str, data: bytes) -> int:
+        compressed = zlib.compress(data, self.compression_level)
+        path = self._object_path(digest)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(compressed)
+            os.replace(tmp_path, path) # Um chunk incompleto nunca fica visível com o nome final
+        except OSError:
+            with self._lock:
+                self._known.discard(digest)
+            raise
+        return len(compressed)
+
+    def _read_object(self, digest: str) -> bytes:
+        try:
+            with open(self._object_path(digest), "rb") as f:
+                data = zlib.decompress(f.read())
+        except (OSError, zlib.error) as e:
+            raise BackupError(f"Chunk {digest} ausente ou ilegível: {e}") from e
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise BackupError(f"Chunk {digest} corrompido (hash não confere).")
+        return data
+
+    # --- Snapshots ---
+
+    def list_snapshots(self) -> list[str]:
+        """Ids dos snapshots, do mais antigo ao mais recente (o id começa pela data em UTC)."""
+        return sorted(name[:-len(".json.gz")] for name in os.listdir(self._snapshots) if name.endswith(".json.gz"))
+
+    def load_manifest(self, snapshot_id: str = None) -> dict:
+        """Manifesto do snapshot (o mais recente, sem id)."""
+        if snapshot_id is None:
+            snapshots = self.list_snapshots()
+            if not snapshots:
+                raise BackupError(f"Nenhum snapshot em '{self.root}'.")
+            snapshot_id = snapshots[-1]
+        try:
+            with gzip.open(os.path.join(self._snapshots, f"{snapshot_id}.json.gz"), "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise BackupError(f"Snapshot não encontrado: {snapshot_id}") from None
+
+    def _walk(self, paths, exclude, stats: dict):
+        """(caminho, stat) de cada entrada sob paths, sem seguir links simbólicos."""
+        def excluded(path):
+            return any(fnmatch.fnmatch(path, pattern) for pattern in exclude)
+
+        stack = [os.path.abspath(path) for path in reversed(paths)]
+        while stack:
+            path = stack.pop()
+            if excluded(path):
+                continue
+            try:
+                st = os.lstat(path)
+            except OSError as e:
+                stats["errors"].append(f"{path}: {e}")
+                continue
+            yield path, st
+            if stat.S_ISDIR(st.st_mode):
+                try:
+                    names = sorted(os.listdir(path), reverse=True)
+                except OSError as e:
+                    stats["errors"].append(f"{path}: {e}")
+                    continue
+                stack.extend(os.path.join(path, name) for name in names)
+
+    def _store_file(self, path: str, compressor: ThreadPoolExecutor, slots: threading.Semaphore) -> dict:
+        """Lê e faz o hash do arquivo; os chunks novos vão para o pool de compressão."""
+        chunks, pending, size = [], [], 0
+        try:
+            with open(path, "rb") as f:
+                while block := f.read(self.chunk_size):
+                    digest = hashlib.sha256(block).hexdigest()
+                    chunks.append(digest)
+                    size += len(block)
+                    if self._claim(digest):
+                        slots.acquire() # Limita os chunks lidos e ainda não gravados (memória)
+                        future = compressor.submit(self._write_object, digest, block)
+                        future.add_done_callback(lambda _: slots.release())
+                        pending.append((len(block), future))
+            error = None
+        except OSError as e: # Arquivo sumiu ou sem permissão: fica fora do snapshot
+            error = f"{path}: {e}"
+        # Os chunks já enviados são esperados mesmo com erro de leitura: outros arquivos podem usá-los.
+        # Erro de gravação (ex: disco cheio) sobe e aborta o snapshot antes do manifesto.
+        stored_bytes = sum(future.result() for _, future in pending)
+        if error is not None:
+            return {"error": error}
+        return {"chunks": chunks, "size": size, "new_bytes": sum(length for length, _ in pending),
+                "stored_bytes": stored_bytes}
+
+    def snapshot(self, paths=DEFAULT_PATHS, exclude=DEFAULT_EXCLUDE) -> dict:
+        """
+        Cria um snapshot de paths. Arquivos com tamanho, mtime e inode iguais aos do snapshot
+        anterior reaproveitam a lista de chunks sem serem lidos; os demais são lidos e só os
+        chunks inéditos são comprimidos e gravados. Retorna o resumo (id e estatísticas).
+        """
+        with self._locked():
+            return self._snapshot(paths, exclude)
+
+    def _snapshot(self, paths, exclude) -> dict:
+        started = time.monotonic()
+        started_ns = time.time_ns()
+        snapshot_id = f"{datetime.now(UTC):%Y%m%dT%H%M%S.%fZ}-{uuid.uuid4().hex[:6]}" # Ordem lexicográfica = cronológica
+        try:
+            parent = self.load_manifest()
+        except BackupError:
+            parent = None
+        previous = parent["files"] if parent else {}
+        trusted_before = parent["started_ns"] - RACY_WINDOW_NS if parent else 0
+        stats = {"files": 0, "directories": 0, "symlinks": 0, "skipped": 0, "unchanged": 0, "read": 0,
+                 "bytes_read": 0, "new_bytes": 0, "stored_bytes": 0, "errors": []}
+        files, to_read = {}, []
+
+        for path, st in self._walk(paths, exclude, stats):
+            entry = {"mode": stat.S_IMODE(st.st_mode), "uid": st.st_uid, "gid": st.st_gid, "mtime_ns": st.st_mtime_ns}
+            if stat.S_ISDIR(st.st_mode):
+                entry["type"] = "dir"
+                stats["directories"] += 1
+            elif stat.S_ISLNK(st.st_mode):
+                try:
+                    entry.update(type="symlink", target=os.readlink(path))
+                except OSError as e:
+                    stats["errors"].append(f"{path}: {e}")
+                    continue
+                stats["symlinks"] += 1
+            elif stat.S_ISREG(st.st_mode):
+                entry.update(type="file", size=st.st_size, inode=st.st_ino)
+                stats["files"] += 1
+                old = previous.get(path)
+                if (old and old["type"] == "file" and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns
+                        and old.get("inode") == st.st_ino and old["mtime_ns"] < trusted_before):
+                    entry["chunks"] = old["chunks"]
+                    stats["unchanged"] += 1
+                else:
+                    to_read.append(path)
+            else:
+                stats["skipped"] += 1 # Sockets, FIFOs e dispositivos não entram no backup
+                continue
+            files[path] = entry
+
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="shamann-backup-compress") as compressor, \
+                ThreadPoolExecutor(self.workers, thread_name_prefix="shamann-backup-read") as readers:
+            slots = threading.Semaphore(self.workers * 4)
+            for path, outcome in zip(to_read, readers.map(lambda p: self._store_file(p, compressor, slots), to_read)):
+                if "error" in outcome:
+                    stats["errors"].append(outcome["error"])
+                    files.pop(path)
+                    stats["files"] -= 1
+                    continue
+                files[path].update(chunks=outcome["chunks"], size=outcome["size"])
+                stats["read"] += 1
+                stats["bytes_read"] += outcome["size"]
+                stats["new_bytes"] += outcome["new_bytes"]
+                stats["stored_bytes"] += outcome["stored_bytes"]
+
+        stats["total_bytes"] = sum(entry.get("size", 0) for entry in files.values())
+        stats["elapsed"] = round(time.monotonic() - started, 3)
+        manifest = {"id": snapshot_id, "created": datetime.now(UTC).isoformat(), "started_ns": started_ns,
+                    "paths": [os.path.abspath(path) for path in paths], "parent": parent["id"] if parent else None,
+                    "chunk_size": self.chunk_size, "stats": stats, "files": files}
+        final_path = os.path.join(self._snapshots, f"{snapshot_id}.json.gz")
+        with gzip.open(final_path + ".tmp", "wt", encoding="utf-8", compresslevel=self.compression_level) as f:
+            json.dump(manifest, f, separators=(",", ":"))
+        os.replace(final_path + ".tmp", final_path) # O manifesto só aparece depois de todos os chunks
+        if stats["errors"]:
+            logger.warning(f"Snapshot {snapshot_id}: {len(stats['errors'])} entradas não puderam ser lidas.")
+        logger.info(f"Snapshot {snapshot_id}: {stats['files']} arquivos, {stats['read']} lidos, "
+                    f"{stats['new_bytes']} bytes novos ({stats['stored_bytes']} comprimidos) em {stats['elapsed']}s.")
+        return {"id": snapshot_id, "parent": manifest["parent"], "stats": stats}
+
+    # --- Restauração e limpeza ---
+
+    def restore(self, destination: str, snapshot_id: str = None, paths=None) -> dict:
+        """
+        Restaura o snapshot (o mais recente, sem id) sob destination, mantendo os caminhos absolutos
+        como subdiretórios. paths restringe a arquivos/diretórios específicos (prefixos ou padrões
+        fnmatch): só os chunks deles são lidos.
+        """
+        with self._locked(fcntl.LOCK_SH): # Um prune não apaga chunks durante a restauração
+            return self._restore(destination, snapshot_id, paths)
+
+    def _restore(self, destination: str, snapshot_id: str, paths) -> dict:
+        manifest = self.load_manifest(snapshot_id)
+
+        def selected(path):
+            if not paths:
+                return True
+            return any(path == p or path.startswith(p.rstrip("/") + "/") or fnmatch.fnmatch(path, p) for p in paths)
+
+        entries = [(path, entry) for path, entry in manifest["files"].items() if selected(path)]
+        result = {"snapshot": manifest["id"], "files": 0, "bytes": 0, "errors": []}
+
+        def target_of(path):
+            return os.path.join(destination, path.lstrip("/"))
+
+        for path, entry in entries: # Diretórios e links primeiro (em ordem), arquivos em paralelo depois
+            target = target_of(path)
+            if entry["type"] == "dir":
+                os.makedirs(target, exist_ok=True)
+            elif entry["type"] == "symlink":
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if os.path.lexists(target):
+                    os.unlink(target)
+                os.symlink(entry["target"], target)
+
+        def restore_file(item):
+            path, entry = item
+            target = target_of(path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target + ".shamann-restore", "wb") as f:
+                for digest in entry["chunks"]:
+                    f.write(self._read_object(digest))
+            os.replace(target + ".shamann-restore", target)
+            if os.geteuid() == 0:
+                os.chown(target, entry["uid"], entry["gid"])
+            os.chmod(target, entry["mode"])
+            os.utime(target, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+            return entry["size"]
+
+        files = [item for item in entries if item[1]["type"] == "file"]
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="shamann-backup-restore") as pool:
+            futures = [(path, pool.submit(restore_file, (path, entry))) for path, entry in files]
+            for path, future in futures:
+                try:
+                    result["bytes"] += future.result()
+                    result["files"] += 1
+                except (OSError, BackupError) as e:
+                    result["errors"].append(f"{path}: {e}")
+        for path, entry in reversed(entries): # mtime dos diretórios por último (criar arquivos o altera)
+            if entry["type"] == "dir":
+                os.chmod(target_of(path), entry["mode"] | stat.S_IWUSR | stat.S_IXUSR)
+                os.utime(target_of(path), ns=(entry["mtime_ns"], entry["mtime_ns"]))
+        return result
+
+    def prune(self, keep: int = DEFAULT_KEEP) -> dict:
+        """
+        Mantém os `keep` snapshots mais recentes e apaga os chunks que nenhum deles usa. Espera
+        snapshots e restaurações em andamento: os chunks deles ainda não estão em nenhum manifesto.
+        """
+        with self._locked():
+            return self._prune(keep)
+
+    def _prune(self, keep: int) -> dict:
+        snapshots = self.list_snapshots()
+        removed = snapshots[:-keep] if keep > 0 else snapshots
+        for snapshot_id in removed:
+            os.unlink(os.path.join(self._snapshots, f"{snapshot_id}.json.gz"))
+        referenced = set()
+        for snapshot_id in snapshots[len(removed):]:
+            for entry in self.load_manifest(snapshot_id)["files"].values():
+                referenced.update(entry.get("chunks", ()))
+        objects = freed = 0
+        for directory, _, names in os.walk(self._objects):
+            for name in names:
+                if name not in referenced: # Inclui .tmp de gravações interrompidas (nenhuma está em andamento)
+                    path = os.path.join(directory, name)
+                    freed += os.path.getsize(path)
+                    os.unlink(path)
+                    objects += 1
+        with self._lock:
+            self._known &= referenced
+        return {"removed_snapshots": removed, "removed_objects": objects, "freed_bytes": freed}
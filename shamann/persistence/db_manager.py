@@ -2,6 +2,10 @@ import sqlite3
 import json
 from datetime import datetime, UTC
 import logging
+import time
+
+from shamann.core.metrics import DB_COMMIT_SECONDS
+from shamann.core.tracing import traced
 
 # Configuração de logging para este módulo
 logger = logging.getLogger(__name__)
@@ -85,6 +89,53 @@ CREATE TABLE IF NOT EXISTS internal_logs (
 );
 """
 
+def normalize_scan_result(guardian_name: str, result: dict) -> dict:
+    """
+    Converte o resultado de um guardião (formato de run_scan/scan) no formato esperado por
+    insert_scan_results: chaves 'success', 'command' e 'returncode' no topo; para o Nmap, hosts
+    e portas com os nomes de coluna do banco e os alertas de cada host levados para o topo
+    (com 'host', 'port' e 'protocol' para a associação).
+    """
+    result = result or {}
+    status = result.get("status", "error")
+    normalized = {
+        "success": status in ("success", "completed", "warning"),
+        "command": result.get("command_executed") or result.get("command") or [guardian_name, result.get("target", "")],
+        "returncode": result.get("returncode", 0 if status in ("success", "completed") else -1),
+        "error_message": result.get("error_message"),
+        "stdout": result.get("stdout"),
+        "stderr": result.get("stderr"),
+        "scan_info": result.get("scan_info", {}),
+    }
+    scan_results = result.get("scan_results", result) # NmapGuardian.scan() aninha os hosts em 'scan_results'
+    hosts = scan_results.get("hosts") if isinstance(scan_results, dict) else None
+    if hosts:
+        normalized["hosts"] = []
+        normalized["alerts"] = list(result.get("alerts", []))
+        for host_data in hosts:
+            normalized["hosts"].append({
+                "ip_address": host_data.get("ip_address"),
+                "hostname": host_data.get("hostname"),
+                "mac_address": host_data.get("mac_address"),
+                "mac_vendor": host_data.get("mac_vendor", host_data.get("vendor")),
+                "os_info": host_data.get("os_info", host_data.get("os_match")),
+                "status": host_data.get("status"),
+                "ports": [dict(port_data,
+                               product=port_data.get("product", port_data.get("service_product")),
+                               version=port_data.get("version", port_data.get("service_version")))
+                          for port_data in host_data.get("ports", [])],
+            })
+            for alert in host_data.get("alerts", []):
+                details = alert.get("details") or {}
+                entry = dict(alert, host=host_data.get("ip_address"))
+                if "port_id" in details and "protocol" in details:
+                    entry.update(port=details["port_id"], protocol=details["protocol"])
+                normalized["alerts"].append(entry)
+    elif "alerts" in result:
+        normalized["alerts"] = result["alerts"]
+    return normalized
+
+
 class DBManager:
     def __init__(self, db_path):
         """
@@ -126,6 +177,14 @@ class DBManager:
         conn.execute("PRAGMA journal_mode=WAL;") # Ativa o modo WAL
         return conn
 
+    @staticmethod
+    def _commit(conn, operation: str):
+        """Commit medido (métrica shamann_db_commit_seconds)."""
+        started = time.perf_counter()
+        conn.commit()
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - started, operation=operation)
+
+    @traced("db.insert_scan_results")
     def insert_scan_results(self, guardian_name: str, target: str, scan_result: dict) -> int | None:
         """
         Insere os resultados processados de um scan no banco de dados.
@@ -251,7 +310,7 @@ class DBManager:
                           alert_data.get("description"), alert_data.get("recommendation"),
                           json.dumps(alert_data.get("details", {})) if alert_data.get("details") else None ))
 
-            conn.commit() # Confirma todas as operações de inserção
+            self._commit(conn, "insert_scan_results") # Confirma todas as operações de inserção
             logger.info(f"Resultados do scan '{guardian_name}' para '{target}' (DB ID: {scan_id}) inseridos com sucesso.")
             return scan_id
 
@@ -277,6 +336,10 @@ class DBManager:
             if conn:
                 conn.close() # Sempre fecha a conexão
 
+    def save_guardian_result(self, guardian_name: str, target: str, result: dict) -> int | None:
+        """Normaliza (ver normalize_scan_result) e insere o resultado de qualquer guardião."""
+        return self.insert_scan_results(guardian_name, target, normalize_scan_result(guardian_name, result))
+
     def add_internal_log(self, level: str, source: str, message: str, details: dict = None):
         """
         Adiciona um log interno de atividade ao banco de dados.
@@ -295,7 +358,7 @@ class DBManager:
                 INSERT INTO internal_logs (timestamp, level, source, message, details_json)
                 VALUES (?, ?, ?, ?, ?)
             """, (timestamp, level, source, message, json.dumps(details) if details else None))
-            conn.commit()
+            self._commit(conn, "add_internal_log")
         except sqlite3.Error as e:
             logger.error(f"Erro ao adicionar log interno ao DB: {e}", exc_info=True)
         finally:
@@ -323,6 +386,37 @@ class DBManager:
             if conn:
                 conn.close()
 
+    def list_scans(self, limit: int = 50, offset: int = 0, guardian_name: str = None, target: str = None,
+                   status: str = None) -> dict:
+        """
+        Histórico paginado de scans, do mais recente para o mais antigo, sem as saídas brutas.
+        Retorna {"total": int, "items": [dict]}; filtros opcionais por guardião, alvo e status.
+        """
+        conditions, params = [], []
+        for column, value in (("guardian_name", guardian_name), ("target", target), ("status", status)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        conn = None
+        try:
+            conn = self._connect()
+            cursor = conn.cursor()
+            total = cursor.execute(f"SELECT COUNT(*) FROM scans {where}", params).fetchone()[0]
+            cursor.execute(f"""
+                SELECT id, guardian_name, target, scan_start_utc, scan_end_utc, duration_seconds, status,
+                       command_executed, return_code, error_message
+                FROM scans {where} ORDER BY id DESC LIMIT ? OFFSET ?
+            """, params + [limit, offset])
+            cols = [description[0] for description in cursor.description]
+            return {"total": total, "items": [dict(zip(cols, row)) for row in cursor.fetchall()]}
+        except sqlite3.Error as e:
+            logger.error(f"Erro ao listar o histórico de scans: {e}", exc_info=True)
+            return {"total": 0, "items": []}
+        finally:
+            if conn:
+                conn.close()
+
     def get_alerts_by_scan_id(self, scan_id: int) -> list[dict]:
         """Busca todos os alertas para um dado scan_id."""
         conn = None
@@ -0,0 +1,104 @@
+import sqlite3
+import json
+import threading
+import time
+import logging
+
+from shamann.core.metrics import DB_COMMIT_SECONDS
+
+# Configuração de logging para este módulo
+logger = logging.getLogger(__name__)
+
+# --- ESQUEMA DOS EVENTOS DO HONEYPOT ---
+# Uma linha por conexão recebida; gravadas em lote (um executemany e um commit por lote).
+HONEYPOT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS honeypot_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp_utc TEXT NOT NULL,      -- Início da conexão, ISO 8601 (UTC)
+    source_ip TEXT NOT NULL,
+    source_port INTEGER,
+    listen_port INTEGER NOT NULL,
+    protocol TEXT NOT NULL,           -- 'ssh', 'http', 'telnet', 'smb'
+    duration_seconds REAL,
+    bytes_in INTEGER NOT NULL,        -- Bytes recebidos (inclusive os não guardados)
+    truncated INTEGER NOT NULL,       -- 1 se o limite de captura por conexão foi atingido
+    details_json TEXT                 -- Banner do cliente, requisição HTTP, credenciais tentadas...
+);
+CREATE INDEX IF NOT EXISTS idx_honeypot_events_source ON honeypot_events (source_ip, timestamp_utc);
+"""
+
+DEFAULT_DB_PATH = "agent_ia.db"
+
+
+class HoneypotStore:
+    """
+    Eventos do honeypot no SQLite. Uma conexão única, usada por uma thread por vez (lock).
+    :param db_path: Caminho do arquivo SQLite (o mesmo banco do DBManager, por padrão).
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.execute("PRAGMA synchronous=NORMAL;") # Em WAL, commits sem fsync por transação
+        self._conn.executescript(HONEYPOT_SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def insert_events(self, events: list[dict]) -> int:
+        """Grava um lote de eventos em uma transação; retorna quantos foram gravados."""
+        if not events:
+            return 0
+        rows = [(event["timestamp"], event["source_ip"], event.get("source_port"), event["listen_port"],
+                 event["protocol"], event.get("duration"), event.get("bytes_in", 0), int(bool(event.get("truncated"))),
+                 json.dumps(event.get("details"), ensure_ascii=False) if event.get("details") else None)
+                for event in events]
+        with self._lock:
+            try:
+                self._conn.executemany("""
+                    INSERT INTO honeypot_events (timestamp_utc, source_ip, source_port, listen_port, protocol,
+                                                 duration_seconds, bytes_in, truncated, details_json)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                started = time.perf_counter()
+                self._conn.commit()
+                DB_COMMIT_SECONDS.observe(time.perf_counter() - started, operation="honeypot_events")
+            except sqlite3.Error:
+                self._conn.rollback()
+                raise
+        return len(rows)
+
+    def recent_events(self, limit: int = 100, source_ip: str = None) -> list[dict]:
+        query = "SELECT * FROM honeypot_events"
+        params = []
+        if source_ip:
+            query += " WHERE source_ip = ?"
+            params.append(source_ip)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        for row in rows:
+            details = row.pop("details_json")
+            row["details"] = json.loads(details) if details else None
+        return rows
+
+    def top_sources(self, limit: int = 20) -> list[dict]:
+        """Origens com mais conexões registradas."""
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT source_ip, COUNT(*), COUNT(DISTINCT listen_port), MIN(timestamp_utc), MAX(timestamp_utc)
+                FROM honeypot_events GROUP BY source_ip ORDER BY COUNT(*) DESC LIMIT ?
+            """, (limit,)).fetchall()
+        return [{"source_ip": ip, "connections": count, "ports": ports, "first_seen": first, "last_seen": last}
+                for ip, count, ports, first, last in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM honeypot_events").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
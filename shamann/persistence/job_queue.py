@@ -0,0 +1,263 @@
+import sqlite3
+import os
+import socket
+import time
+import threading
+import logging
+import uuid
+from datetime import datetime, UTC
+
+from shamann.core.targets import TargetSet
+
+# Configuração de logging para este módulo
+logger = logging.getLogger(__name__)
+
+# --- ESQUEMA DA FILA DE JOBS ---
+# Cada linha é uma unidade de trabalho (fatia de alvos × guardião). Um worker "aluga" a linha por
+# lease_seconds e renova o aluguel com heartbeats; se o worker morrer, o aluguel expira e outro
+# worker reivindica a unidade. Falhas voltam para a fila com backoff até max_attempts.
+JOB_QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id TEXT,                    -- Agrupa as fatias de um mesmo pedido
+    guardian TEXT NOT NULL,
+    target TEXT NOT NULL,
+    options TEXT,
+    timeout REAL,                     -- Segundos; NULL = sem limite
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,             -- 'queued', 'leased', 'done', 'failed'
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    available_at REAL NOT NULL,       -- Epoch a partir do qual pode ser reivindicado (backoff)
+    lease_owner TEXT,                 -- Identificador do worker (host:pid:thread)
+    lease_expires REAL,               -- Epoch de expiração do aluguel
+    enqueued_at_utc TEXT NOT NULL,
+    started_at_utc TEXT,
+    finished_at_utc TEXT,
+    result_status TEXT,               -- Status retornado pelo guardião
+    scan_id INTEGER,                  -- ID em 'scans' (DBManager) quando o resultado foi gravado
+    error_message TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_job_queue_claim ON job_queue (status, priority DESC, available_at);
+CREATE INDEX IF NOT EXISTS idx_job_queue_batch ON job_queue (batch_id);
+"""
+
+DEFAULT_DB_PATH = "agent_ia.db"
+DEFAULT_LEASE_SECONDS = 60
+DEFAULT_MAX_ATTEMPTS = 3
+RETRY_BACKOFF_SECONDS = 15 # Base do backoff exponencial entre tentativas
+DEFAULT_SHARD_SIZE = 16
+# Como cada guardião aceita vários alvos em uma única execução
+TARGET_SEPARATORS = {"nmap": " ", "dns": ","}
+# O WAL precisa de memória compartilhada no mesmo host, e os locks do SQLite em sistemas de arquivos
+# de rede não são confiáveis: aluguéis duplicados, travamentos ou banco corrompido
+NETWORK_FILESYSTEMS = frozenset({"nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "ceph", "glusterfs", "lustre", "afs",
+                                 "gpfs", "davfs", "fuse.sshfs", "fuse.glusterfs", "fuse.s3fs", "fuse.rclone"})
+
+
+class JobQueueError(RuntimeError):
+    """A fila não pode ser aberta com segurança (ex: banco em um sistema de arquivos de rede)."""
+
+
+def filesystem_type(path: str, mountinfo: str = "/proc/self/mountinfo") -> str | None:
+    """Tipo do sistema de arquivos que contém path, pelo mountinfo do kernel (None fora do Linux)."""
+    directory = os.path.realpath(os.path.dirname(os.path.abspath(path)))
+    best, fstype = "", None
+    try:
+        with open(mountinfo, encoding="utf-8") as f:
+            for line in f:
+                fields, _, rest = line.partition(" - ")
+                mount_point = fields.split()[4].replace("\\040", " ")
+                inside = directory == mount_point or directory.startswith(mount_point.rstrip("/") + "/")
+                if inside and len(mount_point) >= len(best):
+                    best, fstype = mount_point, rest.split()[0]
+    except (OSError, IndexError):
+        return None
+    return fstype
+
+
+def check_local_database(db_path: str, mountinfo: str = "/proc/self/mountinfo"):
+    """Levanta JobQueueError se o banco da fila estiver em um sistema de arquivos de rede."""
+    fstype = filesystem_type(db_path, mountinfo)
+    if fstype in NETWORK_FILESYSTEMS:
+        raise JobQueueError(f"A fila de jobs '{db_path}' está em um sistema de arquivos de rede ({fstype}). "
+                            "O SQLite só coordena processos de um mesmo host: use um disco local.")
+
+
+def worker_identity() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def shard_targets(targets, guardian: str, shard_size: int = DEFAULT_SHARD_SIZE, exclude=None) -> list[str]:
+    """
+    Divide os alvos em unidades de trabalho. Quando o guardião aceita vários alvos por execução
+    (ver TARGET_SEPARATORS), os alvos são expandidos por core.targets: repetidos e sobrepostos se
+    unem, exclude é subtraído e os endereços são cortados em fatias contíguas de até shard_size
+    (cada uma como a menor lista de CIDRs); hostnames são agrupados até shard_size por unidade.
+    shard_size limita ENDEREÇOS por unidade, não itens da lista: '10.0.0.0/24,10.0.1.0/24,10.0.2.5'
+    com shard_size=256 são 3 unidades (256 + 256 + 1 endereços), e não uma unidade de 513 endereços
+    como quando cada rede pequena contava como um alvo. Assim o custo de cada job é limitado.
+    Os demais guardiões recebem uma unidade por alvo, sem repetição (exclude não se aplica).
+    Levanta core.targets.TargetError (um ValueError) para alvos inválidos.
+    """
+    separator = TARGET_SEPARATORS.get(guardian)
+    if separator is None:
+        if isinstance(targets, str):
+            targets = targets.replace(",", " ").split()
+        return list(dict.fromkeys(targets))
+    expanded = TargetSet.parse(targets, exclude=exclude)
+    units = [separator.join(chunk.to_nmap()) for chunk in expanded.chunks(shard_size)]
+    names = expanded.names
+    units.extend(separator.join(names[i:i + shard_size]) for i in range(0, len(names), shard_size))
+    return units
+
+
+class JobQueue:
+    """
+    Fila de jobs em SQLite, compartilhável pelos processos e threads de UM host. A reivindicação é
+    um único UPDATE ... RETURNING dentro de BEGIN IMMEDIATE, então dois workers nunca recebem a mesma
+    unidade. Vários hosts não podem dividir o arquivo: o WAL depende de memória compartilhada local e
+    os locks do SQLite em NFS/SMB não são confiáveis, então um banco em sistema de arquivos de rede é
+    recusado (JobQueueError). Para vários hosts, o daemon serve esta fila pela API HTTP (rotas /queue)
+    e os workers remotos usam worker.RemoteJobQueue.
+    :param db_path: Caminho do arquivo SQLite (pode ser o mesmo do DBManager), em disco local.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        check_local_database(db_path)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        # isolation_level=None: transações explícitas (BEGIN IMMEDIATE na reivindicação)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._conn.row_factory = sqlite3.Row
+        try:
+            self._conn.execute("PRAGMA journal_mode=WAL;")
+            self._conn.execute("PRAGMA busy_timeout=30000;")
+            self._conn.executescript(JOB_QUEUE_SCHEMA)
+        except sqlite3.Error as e:
+            logger.critical(f"Erro CRÍTICO ao inicializar a fila de jobs em {self.db_path}: {e}", exc_info=True)
+            raise
+
+    def enqueue(self, guardian: str, targets, options: str = "", timeout: float = None, priority: int = 0,
+                shard_size: int = DEFAULT_SHARD_SIZE, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                exclude=None) -> dict:
+        """Fatia os alvos (menos exclude, ver shard_targets) e enfileira uma unidade por fatia. Retorna {batch_id, jobs}."""
+        units = shard_targets(targets, guardian, shard_size, exclude)
+        batch_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        enqueued_at = datetime.now(UTC).isoformat()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany("""
+                    INSERT INTO job_queue (batch_id, guardian, target, options, timeout, priority, status,
+                                           max_attempts, available_at, enqueued_at_utc)
+                    VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?)
+                """, [(batch_id, guardian, unit, options, timeout, priority, max_attempts, now, enqueued_at)
+                      for unit in units])
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+        logger.info(f"Lote {batch_id}: {len(units)} unidades de '{guardian}' enfileiradas.")
+        return {"batch_id": batch_id, "jobs": len(units)}
+
+    def claim(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS, guardians: list = None) -> dict | None:
+        """
+        Reivindica a próxima unidade disponível (fila por prioridade, depois ordem de chegada),
+        incluindo unidades cujo aluguel expirou. Retorna o job como dict ou None.
+        """
+        now = time.time()
+        guardian_filter = ""
+        params = [worker_id, now + lease_seconds, datetime.now(UTC).isoformat(), now, now]
+        if guardians:
+            guardian_filter = f"AND guardian IN ({', '.join('?' * len(guardians))})"
+            params.extend(guardians)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._fail_exhausted(now)
+                row = self._conn.execute(f"""
+                    UPDATE job_queue
+                    SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1,
+                        started_at_utc = ?
+                    WHERE id = (
+                        SELECT id FROM job_queue
+                        WHERE ((status = 'queued' AND available_at <= ?) OR (status = 'leased' AND lease_expires < ?))
+                          {guardian_filter}
+                        ORDER BY priority DESC, id
+                        LIMIT 1)
+                    RETURNING *
+                """, params).fetchone()
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+        return dict(row) if row else None
+
+    def _fail_exhausted(self, now: float):
+        # Aluguel expirado na última tentativa: o worker morreu repetidamente nesta unidade
+        self._conn.execute("""
+            UPDATE job_queue SET status = 'failed', finished_at_utc = ?,
+                   error_message = COALESCE(error_message, 'Aluguel expirado na última tentativa.')
+            WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts
+        """, (datetime.now(UTC).isoformat(), now))
+
+    def heartbeat(self, job_id: int, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """Renova o aluguel. Retorna False se o worker perdeu a unidade (expirou e outro a pegou)."""
+        with self._lock:
+            cursor = self._conn.execute("""
+                UPDATE job_queue SET lease_expires = ?
+                WHERE id = ? AND status = 'leased' AND lease_owner = ?
+            """, (time.time() + lease_seconds, job_id, worker_id))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result_status: str, scan_id: int = None,
+                 error_message: str = None) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("""
+                UPDATE job_queue SET status = 'done', result_status = ?, scan_id = ?, error_message = ?,
+                       finished_at_utc = ?, lease_expires = NULL
+                WHERE id = ? AND status = 'leased' AND lease_owner = ?
+            """, (result_status, scan_id, error_message, datetime.now(UTC).isoformat(), job_id, worker_id))
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error_message: str, retry: bool = True) -> str | None:
+        """Devolve a unidade à fila com backoff (ou marca 'failed' sem tentativas restantes). Retorna o novo status."""
+        with self._lock:
+            row = self._conn.execute("SELECT attempts, max_attempts FROM job_queue WHERE id = ? AND lease_owner = ?",
+                                     (job_id, worker_id)).fetchone()
+            if row is None:
+                return None
+            if retry and row["attempts"] < row["max_attempts"]:
+                status = "queued"
+                available_at = time.time() + RETRY_BACKOFF_SECONDS * (2 ** (row["attempts"] - 1))
+            else:
+                status = "failed"
+                available_at = time.time()
+            self._conn.execute("""
+                UPDATE job_queue SET status = ?, available_at = ?, error_message = ?, lease_owner = NULL,
+                       lease_expires = NULL, finished_at_utc = CASE WHEN ? = 'failed' THEN ? END
+                WHERE id = ? AND status = 'leased' AND lease_owner = ?
+            """, (status, available_at, error_message, status, datetime.now(UTC).isoformat(), job_id, worker_id))
+        return status
+
+    def stats(self, batch_id: str = None) -> dict:
+        """Contagem por status (de um lote ou da fila inteira)."""
+        where, params = ("WHERE batch_id = ?", (batch_id,)) if batch_id else ("", ())
+        with self._lock:
+            rows = self._conn.execute(f"SELECT status, COUNT(*) AS n FROM job_queue {where} GROUP BY status",
+                                      params).fetchall()
+        counts = {"queued": 0, "leased": 0, "done": 0, "failed": 0}
+        counts.update({row["status"]: row["n"] for row in rows})
+        counts["total"] = sum(counts.values())
+        return counts
+
+    def get_job(self, job_id: int) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM job_queue WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,180 @@
+import sqlite3
+import json
+import time
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime, date, UTC
+
+# Configuração de logging para este módulo
+logger = logging.getLogger(__name__)
+
+# --- ESQUEMA DO CACHE WHOIS ---
+# Registros WHOIS estruturados (JSON), com expiração em epoch para consultas rápidas por TTL.
+WHOIS_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS whois_cache (
+    domain TEXT PRIMARY KEY,          -- Domínio normalizado (minúsculas, sem ponto final)
+    server_key TEXT,                  -- Chave do servidor de registro (TLD) usada no rate limit
+    record_json TEXT NOT NULL,        -- Registro WHOIS estruturado como JSON
+    fetched_at_utc TEXT NOT NULL,     -- Formato ISO 8601 (UTC)
+    expires_at REAL NOT NULL          -- Epoch (segundos) de expiração
+);
+CREATE INDEX IF NOT EXISTS idx_whois_cache_expires ON whois_cache (expires_at);
+"""
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600 # Registros WHOIS mudam pouco: uma semana
+DEFAULT_DB_PATH = "agent_ia.db"
+
+
+def normalize_whois_record(record) -> dict:
+    """
+    Converte o resultado do python-whois (WhoisEntry, um dict com datetimes) em um dict
+    serializável em JSON: datas viram ISO 8601, conjuntos viram listas ordenadas.
+    """
+    def convert(value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, (list, tuple)):
+            return [convert(v) for v in value]
+        if isinstance(value, set):
+            return sorted(convert(v) for v in value)
+        if isinstance(value, dict):
+            return {str(k): convert(v) for k, v in value.items()}
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return value
+        return str(value)
+    return convert(dict(record))
+
+
+class WhoisCache:
+    """
+    Cache WHOIS em duas camadas: LRU em memória (acertos em microssegundos) na frente
+    de uma tabela SQLite (sobrevive entre execuções).
+    :param db_path: Caminho do arquivo SQLite.
+    :param ttl_seconds: Validade padrão de um registro.
+    :param memory_entries: Tamanho da camada em memória.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, ttl_seconds: int = DEFAULT_TTL_SECONDS, memory_entries: int = 4096):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict() # domínio -> (expira_em, registro)
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        # Uma conexão única e protegida por lock: abrir uma conexão por consulta custaria mais que a consulta
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            self._conn.execute("PRAGMA journal_mode=WAL;")
+            self._conn.executescript(WHOIS_CACHE_SCHEMA)
+            self._conn.commit()
+        except sqlite3.Error as e:
+            logger.critical(f"Erro CRÍTICO ao inicializar o cache WHOIS em {self.db_path}: {e}", exc_info=True)
+            raise
+
+    @staticmethod
+    def normalize_domain(domain: str) -> str:
+        return domain.strip().rstrip(".").lower()
+
+    def _remember(self, domain: str, expires_at: float, record: dict):
+        self._memory[domain] = (expires_at, record)
+        self._memory.move_to_end(domain)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, domain: str) -> dict | None:
+        """Retorna o registro em cache (válido) ou None."""
+        domain = self.normalize_domain(domain)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(domain)
+            if entry is not None and entry[0] > now:
+                self._memory.move_to_end(domain)
+                self._stats["memory_hits"] += 1
+                return entry[1]
+            try:
+                row = self._conn.execute(
+                    "SELECT record_json, expires_at FROM whois_cache WHERE domain = ? AND expires_at > ?",
+                    (domain, now)).fetchone()
+            except sqlite3.Error as e:
+                logger.error(f"Erro ao ler o cache WHOIS para '{domain}': {e}", exc_info=True)
+                row = None
+            if row is None:
+                self._memory.pop(domain, None)
+                self._stats["misses"] += 1
+                return None
+            record = json.loads(row[0])
+            self._remember(domain, row[1], record)
+            self._stats["disk_hits"] += 1
+            return record
+
+    def put(self, domain: str, record: dict, server_key: str = None, ttl_seconds: int = None):
+        """Armazena um registro já normalizado (ver normalize_whois_record)."""
+        domain = self.normalize_domain(domain)
+        expires_at = time.time() + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        with self._lock:
+            try:
+                self._conn.execute("""
+                    INSERT OR REPLACE INTO whois_cache (domain, server_key, record_json, fetched_at_utc, expires_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (domain, server_key, json.dumps(record, ensure_ascii=False), datetime.now(UTC).isoformat(), expires_at))
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Erro ao gravar o cache WHOIS para '{domain}': {e}", exc_info=True)
+            self._remember(domain, expires_at, record)
+            self._stats["stores"] += 1
+
+    def purge_expired(self) -> int:
+        """Remove registros expirados da tabela. Retorna quantos foram removidos."""
+        with self._lock:
+            try:
+                cursor = self._conn.execute("DELETE FROM whois_cache WHERE expires_at <= ?", (time.time(),))
+                self._conn.commit()
+                return cursor.rowcount
+            except sqlite3.Error as e:
+                logger.error(f"Erro ao limpar o cache WHOIS: {e}", exc_info=True)
+                return 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats, memory_size=len(self._memory))
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_whois_cache(db_path: str = None, ttl_seconds: int = None) -> WhoisCache:
+    """
+    Retorna o cache WHOIS compartilhado pelo processo (criado na primeira chamada).
+    db_path/ttl_seconds só têm efeito na criação.
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = WhoisCache(db_path or DEFAULT_DB_PATH,
+                                       ttl_seconds if ttl_seconds is not None else DEFAULT_TTL_SECONDS)
+        return _shared_cache
+
+
+def configure_whois_cache(db_path: str = None, ttl_seconds: int = None) -> WhoisCache | None:
+    """
+    Troca o cache compartilhado: o atual é fechado e, com db_path, outro é aberto nesse arquivo
+    (ex: testes, que não devem criar a tabela no agent_ia.db). Sem db_path, o próximo
+    get_whois_cache() volta a abrir o banco padrão.
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is not None:
+            _shared_cache.close()
+        _shared_cache = None
+        if db_path:
+            _shared_cache = WhoisCache(db_path, ttl_seconds if ttl_seconds is not None else DEFAULT_TTL_SECONDS)
+        return _shared_cache
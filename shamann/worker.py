@@ -0,0 +1,290 @@
+# shamann/worker.py
+"""
+Worker da fila de jobs (persistence.job_queue).
+
+Cada worker reivindica unidades da fila, executa o guardião correspondente pelo protocolo de
+streaming (com o timeout da unidade), mantém o aluguel vivo com heartbeats enquanto a execução
+dura e grava o resultado pelo DBManager. Vários workers (threads e processos do mesmo host)
+consomem a mesma fila sem coordenação além do SQLite; o banco precisa estar em disco local
+(ver JobQueue). Workers de outros hosts usam RemoteJobQueue: a fila é servida pela API HTTP do
+daemon (rotas /queue de shamann.api) e só o host do daemon abre o SQLite.
+
+Com `profile`, cada processo perfila o próprio trabalho (core.profiling, rótulo worker_<pid>) e o
+processo pai junta os perfis dos filhos no resumo de hotspots.
+"""
+
+import contextlib
+import contextvars
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from urllib.parse import urlencode, urlsplit
+
+from shamann.core.profiling import (
+    DEFAULT_OUTPUT_DIRECTORY, DEFAULT_TOP, format_hotspots, hotspots, merge_profiles, profiler_from_settings, stage,
+)
+from shamann.modules.guardian_registry import GuardianLoadError, get_streaming_guardian
+from shamann.persistence.db_manager import DBManager
+from shamann.persistence.job_queue import DEFAULT_DB_PATH, DEFAULT_LEASE_SECONDS, JobQueue, worker_identity
+
+logger = logging.getLogger(__name__)
+
+IDLE_POLL_MIN = 0.2 # Segundos entre consultas à fila vazia (cresce até IDLE_POLL_MAX)
+IDLE_POLL_MAX = 5.0
+REMOTE_TIMEOUT = 30.0 # Segundos por requisição ao servidor da fila (a reivindicação pode esperar o lock do SQLite)
+
+
+class RemoteQueueError(RuntimeError):
+    """O servidor da fila recusou o pedido (token, rota ou corpo inválido)."""
+
+
+class RemoteJobQueue:
+    """
+    Cliente da fila servida pela API HTTP do daemon, com a interface de JobQueue (e o
+    save_guardian_result do DBManager, que grava no banco do daemon): workers de outros hosts
+    consomem a fila sem abrir o SQLite fora do host dele.
+    Falhas de rede não derrubam o worker: claim devolve None (o worker espera e tenta de novo), um
+    heartbeat que não chega mantém a execução (se a rede não voltar, o aluguel expira) e
+    complete/fail devolvem False/None, deixando a unidade para outro worker quando o aluguel expirar.
+    :param url: http://host:porta da API do daemon (o host precisa ser aceito por "api.allowed_hosts").
+    :param token: O "api.token" do daemon.
+    """
+
+    def __init__(self, url: str, token: str, timeout: float = REMOTE_TIMEOUT):
+        parts = urlsplit(url)
+        if parts.scheme != "http" or not parts.hostname:
+            raise ValueError(f"URL do servidor da fila inválida: '{url}' (esperado http://host:porta).")
+        if not token:
+            raise ValueError("O servidor da fila exige o api.token do daemon.")
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.token = token
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, body: dict = None) -> dict:
+        """Levanta OSError se o servidor não responder e RemoteQueueError se responder com erro."""
+        headers = {"Authorization": f"Bearer {self.token}"}
+        payload = None
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+            payload = json.dumps(body, default=str).encode("utf-8")
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except http.client.HTTPException as e:
+            raise ConnectionError(f"Resposta inválida de {self.url}: {e}") from e
+        finally:
+            conn.close()
+        try:
+            decoded = json.loads(data or b"{}")
+        except ValueError:
+            decoded = {}
+        if response.status >= 400:
+            raise RemoteQueueError(f"{method} {path} -> {response.status}: {decoded.get('error', response.reason)}")
+        return decoded
+
+    def _request_or(self, fallback, method: str, path: str, body: dict = None):
+        try:
+            return self._request(method, path, body)
+        except OSError as e:
+            logger.warning(f"Servidor da fila {self.url} inacessível ({method} {path}): {e}")
+            return fallback
+
+    def enqueue(self, guardian: str, targets, options: str = "", timeout: float = None, priority: int = 0,
+                shard_size: int = None, max_attempts: int = None, exclude=None) -> dict:
+        spec = {"guardian": guardian, "targets": targets, "options": options, "timeout": timeout, "priority": priority,
+                "shard_size": shard_size, "max_attempts": max_attempts, "exclude": exclude}
+        return self._request("POST", "/queue", {key: value for key, value in spec.items() if value is not None})["batch"]
+
+    def claim(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS, guardians: list = None) -> dict | None:
+        body = {"worker_id": worker_id, "lease_seconds": lease_seconds, "guardians": guardians}
+        return self._request_or({}, "POST", "/queue/claim", body).get("job")
+
+    def heartbeat(self, job_id: int, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        body = {"worker_id": worker_id, "lease_seconds": lease_seconds}
+        return self._request_or({"ok": True}, "POST", f"/queue/{job_id}/heartbeat", body)["ok"]
+
+    def complete(self, job_id: int, worker_id: str, result_status: str, scan_id: int = None,
+                 error_message: str = None) -> bool:
+        body = {"worker_id": worker_id, "result_status": result_status, "scan_id": scan_id, "error_message": error_message}
+        return self._request_or({"ok": False}, "POST", f"/queue/{job_id}/complete", body)["ok"]
+
+    def fail(self, job_id: int, worker_id: str, error_message: str, retry: bool = True) -> str | None:
+        body = {"worker_id": worker_id, "error_message": error_message, "retry": retry}
+        return self._request_or({"status": None}, "POST", f"/queue/{job_id}/fail", body)["status"]
+
+    def stats(self, batch_id: str = None) -> dict:
+        return self._request("GET", "/queue" + (f"?{urlencode({'batch': batch_id})}" if batch_id else ""))["stats"]
+
+    def save_guardian_result(self, guardian_name: str, target: str, result: dict) -> int | None:
+        body = {"guardian": guardian_name, "target": target, "result": result}
+        return self._request_or({"scan_id": None}, "POST", "/queue/results", body)["scan_id"]
+
+    def close(self):
+        pass # Uma conexão por requisição
+
+
+class QueueWorker:
+    """
+    :param queue: JobQueue compartilhada (ou RemoteJobQueue).
+    :param db: DBManager onde os resultados são gravados (None = não grava; uma RemoteJobQueue grava no banco do daemon).
+    :param concurrency: Unidades executadas em paralelo por este worker (threads).
+    :param guardians: Restringe os guardiões aceitos (ex: só 'nmap' em um host com o binário).
+    """
+
+    def __init__(self, queue: JobQueue, db: DBManager = None, concurrency: int = 1,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS, guardians: list = None):
+        self.queue = queue
+        self.db = db
+        self.concurrency = max(1, concurrency)
+        self.lease_seconds = lease_seconds
+        self.guardians = guardians
+        self.stop_event = threading.Event()
+        self.processed = 0
+        self._counter_lock = threading.Lock()
+
+    def _heartbeat(self, job: dict, worker_id: str, cancel: threading.Event, done: threading.Event):
+        interval = self.lease_seconds / 3
+        while not done.wait(interval):
+            if not self.queue.heartbeat(job["id"], worker_id, self.lease_seconds):
+                logger.warning(f"Aluguel da unidade {job['id']} perdido; interrompendo a execução.")
+                cancel.set()
+                return
+
+    def execute(self, job: dict, worker_id: str) -> str:
+        """Executa uma unidade já reivindicada e registra o desfecho na fila. Retorna o status final da unidade."""
+        cancel = threading.Event()
+        done = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(job, worker_id, cancel, done),
+                                name=f"heartbeat-{job['id']}", daemon=True)
+        beat.start()
+        try:
+            guardian = get_streaming_guardian(job["guardian"])
+            if guardian is None:
+                raise GuardianLoadError(f"Guardião desconhecido ou inativo: '{job['guardian']}'.")
+            with stage(f"guardian.{guardian.name()}"):
+                result = guardian.scan(job["target"], job["options"] or "", timeout=job["timeout"], cancel_event=cancel)
+        except GuardianLoadError as e:
+            # Dependência ausente neste host: não adianta tentar de novo aqui
+            return self.queue.fail(job["id"], worker_id, str(e), retry=False)
+        except Exception as e:
+            logger.error(f"Erro na unidade {job['id']} ({job['guardian']} -> {job['target']}): {e}", exc_info=True)
+            return self.queue.fail(job["id"], worker_id, str(e))
+        finally:
+            done.set()
+            beat.join()
+
+        if cancel.is_set():
+            return "lost" # Outro worker assumiu a unidade
+        if result.get("status") == "error":
+            # O stream converte exceções do guardião em resultado 'error': volta para a fila com backoff
+            return self.queue.fail(job["id"], worker_id, result.get("error_message") or "Erro no guardião.")
+        scan_id = self.db.save_guardian_result(guardian.name(), job["target"], result) if self.db else None
+        self.queue.complete(job["id"], worker_id, result.get("status", "error"), scan_id, result.get("error_message"))
+        return "done"
+
+    def _loop(self, max_jobs: int = None, exit_when_empty: bool = False):
+        worker_id = worker_identity()
+        idle = IDLE_POLL_MIN
+        while not self.stop_event.is_set():
+            with self._counter_lock:
+                if max_jobs is not None and self.processed >= max_jobs:
+                    return
+                self.processed += 1 # Reserva a vaga antes de reivindicar
+            job = self.queue.claim(worker_id, self.lease_seconds, self.guardians)
+            if job is None:
+                with self._counter_lock:
+                    self.processed -= 1
+                if exit_when_empty:
+                    return
+                self.stop_event.wait(idle)
+                idle = min(IDLE_POLL_MAX, idle * 2)
+                continue
+            idle = IDLE_POLL_MIN
+            status = self.execute(job, worker_id)
+            logger.info(f"Unidade {job['id']} ({job['guardian']} -> {job['target']}): {status}.")
+
+    def run(self, max_jobs: int = None, exit_when_empty: bool = False) -> int:
+        """Consome a fila até stop() (ou até max_jobs / fila vazia). Retorna quantas unidades processou."""
+        # Cada thread recebe uma cópia do contexto: o Profiler ativo (core.profiling) continua visível nela
+        threads = [threading.Thread(target=contextvars.copy_context().run, args=(self._loop, max_jobs, exit_when_empty),
+                                    name=f"worker-{i}") for i in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5) # join com timeout mantém o Ctrl+C responsivo
+        except KeyboardInterrupt:
+            logger.info("Interrompido; aguardando as unidades em execução terminarem...")
+            self.stop()
+            for thread in threads:
+                thread.join()
+        return self.processed
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def _process_main(db_path: str, results_db: str, concurrency: int, lease_seconds: float, guardians: list,
+                  max_jobs: int, exit_when_empty: bool, profile: dict = None, server: tuple = None):
+    if server is not None:
+        queue = RemoteJobQueue(*server)
+        db = DBManager(results_db) if results_db else queue
+    else:
+        queue = JobQueue(db_path)
+        db = DBManager(results_db) if results_db else None
+    worker = QueueWorker(queue, db, concurrency, lease_seconds, guardians)
+    profiler = profiler_from_settings({}, label=f"worker_{os.getpid()}", **profile) if profile is not None else None
+    with profiler or contextlib.nullcontext():
+        worker.run(max_jobs, exit_when_empty)
+    if profiler is not None:
+        logger.info(profiler.report())
+
+
+def _report_children_profiles(profile: dict, pids: list):
+    """Junta os perfis gravados pelos processos filhos e registra os hotspots combinados."""
+    directory = profile.get("output_directory") or DEFAULT_OUTPUT_DIRECTORY
+    prefixes = tuple(f"worker_{pid}." for pid in pids)
+    paths_by_stage = {}
+    for filename in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+        if filename.startswith(prefixes) and filename.endswith(".pstats"):
+            stage_name = filename.split(".", 1)[1].removesuffix(".pstats")
+            paths_by_stage.setdefault(stage_name, []).append(os.path.join(directory, filename))
+    stats = {name: merge_profiles(paths) for name, paths in paths_by_stage.items()}
+    if stats:
+        logger.info(format_hotspots(hotspots(stats, profile.get("top") or DEFAULT_TOP),
+                                    f"Hotspots combinados de {len(pids)} processos worker ({directory})"))
+
+
+def run_workers(db_path: str = DEFAULT_DB_PATH, results_db: str = DEFAULT_DB_PATH, processes: int = 1,
+                concurrency: int = 1, lease_seconds: float = DEFAULT_LEASE_SECONDS, guardians: list = None,
+                max_jobs: int = None, exit_when_empty: bool = False, profile: dict = None, server: tuple = None):
+    """
+    Inicia `processes` processos worker (cada um com `concurrency` threads) e espera todos terminarem.
+    profile: opções de core.profiling.profiler_from_settings (ex: {"stages": ["guardian.*"]}); None = sem perfil.
+    server: (url, token) da API do daemon para consumir a fila de outro host (db_path é ignorado e, sem
+    results_db, os resultados vão para o banco do daemon).
+    """
+    args = (db_path, results_db, concurrency, lease_seconds, guardians, max_jobs, exit_when_empty, profile, server)
+    if processes <= 1:
+        _process_main(*args)
+        return
+    children = [multiprocessing.Process(target=_process_main, args=args, name=f"shamann-worker-{i}")
+                for i in range(processes)]
+    for child in children:
+        child.start()
+    try:
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        for child in children:
+            child.join() # Os filhos recebem o mesmo SIGINT e encerram sozinhos
+    if profile is not None:
+        _report_children_profiles(profile, [child.pid for child in children])
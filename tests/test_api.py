@@ -0,0 +1,146 @@
+# tests/test_api.py
+import http.client
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from shamann.daemon import ShamannDaemon
+from shamann.modules.base_guardian import BaseGuardian, ScanContext
+from shamann.worker import QueueWorker, RemoteJobQueue, RemoteQueueError
+
+
+class EchoGuardian(BaseGuardian):
+    @classmethod
+    def iter_scan(cls, target: str, options: str = "", context: ScanContext = None):
+        context = context or ScanContext(cls.name(), target)
+        for word in options.split():
+            if word == "sleep":
+                context.wait(0.2)
+                continue
+            yield context.partial({"ip_address": word})
+        yield context.result({"target": target, "guardian": "echo", "status": "success"})
+
+
+class TestApi(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        config = {"daemon": {"db_path": os.path.join(self.tmp.name, "shamann.db"), "max_workers": 4, "jobs": []},
+                  "api": {"token": "segredo"}, "job_queue": {"db_path": os.path.join(self.tmp.name, "queue.db")}}
+        patcher = mock.patch("shamann.daemon.get_streaming_guardian", return_value=EchoGuardian)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.daemon = ShamannDaemon(socket_path=os.path.join(self.tmp.name, "shamann.sock"), config=config,
+                                    api_address=("127.0.0.1", 0))
+        self.daemon.start()
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.tmp.cleanup()
+
+    def request(self, method, path, body=None, token="segredo", **extra):
+        conn = http.client.HTTPConnection("127.0.0.1", self.daemon.api.port, timeout=10)
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        headers.update(extra)
+        conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = conn.getresponse()
+        data = response.read()
+        conn.close()
+        return response.status, data
+
+    def submit(self, options):
+        status, data = self.request("POST", "/scans", {"guardian": "echo", "target": "alvo", "options": options})
+        self.assertEqual(status, 202)
+        return json.loads(data)["job"]["id"]
+
+    def test_requires_token(self):
+        self.assertEqual(self.request("GET", "/health", token=None)[0], 401)
+        self.assertEqual(self.request("GET", "/health")[0], 200)
+        with self.assertRaises(ValueError): # Sem token a API nem sobe
+            ShamannDaemon(socket_path=os.path.join(self.tmp.name, "outro.sock"), api_address=("127.0.0.1", 0),
+                          config={"daemon": {"jobs": [], "db_path": None}, "api": {"token": None}})
+
+    def test_browser_requests_are_refused(self):
+        spec = {"guardian": "echo", "target": "alvo"}
+        port = self.daemon.api.port
+        # POST entre origens com text/plain dispensa preflight: o corpo não pode ser aceito
+        self.assertEqual(self.request("POST", "/scans", spec, **{"Content-Type": "text/plain"})[0], 415)
+        self.assertEqual(self.request("POST", "/scans", spec, Origin="http://evil.example")[0], 403)
+        # DNS rebinding: o navegador manda o nome do atacante no Host
+        self.assertEqual(self.request("GET", "/health", Host=f"evil.example:{port}")[0], 403)
+        self.assertEqual(self.request("GET", "/health", Host=f"localhost:{port}")[0], 200)
+        self.assertEqual(self.request("GET", "/health", Host=f"127.0.0.1:{port + 1}")[0], 403)
+        self.assertEqual(self.daemon.jobs, {})
+
+    def test_stream_ndjson_and_history(self):
+        job_id = self.submit("sleep 10.0.0.1 10.0.0.2")
+        status, data = self.request("GET", f"/scans/{job_id}/events")
+        self.assertEqual(status, 200)
+        events = [json.loads(line) for line in data.splitlines() if line.strip()]
+        self.assertEqual([e["data"]["ip_address"] for e in events if e["event"] == "partial"], ["10.0.0.1", "10.0.0.2"])
+        self.assertEqual(events[-1]["event"], "finished")
+        scan_id = events[-1]["job"]["scan_id"]
+
+        page = json.loads(self.request("GET", "/history?limit=1")[1])
+        self.assertEqual(page["total"], 1)
+        self.assertEqual(page["items"][0]["id"], scan_id)
+        self.assertIsNone(page["next_offset"])
+        self.assertEqual(json.loads(self.request("GET", f"/history/{scan_id}")[1])["scan"]["status"], "success")
+
+    def test_concurrent_sse_clients(self):
+        job_id = self.submit("sleep 10.0.0.1")
+        results = []
+
+        def client():
+            conn = http.client.HTTPConnection("127.0.0.1", self.daemon.api.port, timeout=10)
+            conn.request("GET", f"/scans/{job_id}/events?format=sse", headers={"Authorization": "Bearer segredo"})
+            results.append(conn.getresponse().read().decode())
+            conn.close()
+
+        threads = [threading.Thread(target=client) for _ in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 50)
+        self.assertTrue(all("event: partial" in body and "event: finished" in body for body in results))
+
+    def test_metrics_endpoint(self):
+        status, data = self.request("GET", "/metrics")
+        self.assertEqual(status, 200)
+        self.assertIn(b"# TYPE shamann_daemon_jobs gauge", data)
+
+    def test_remote_workers_consume_queue(self):
+        # Um worker de outro host só fala HTTP: o SQLite da fila fica com o daemon
+        remote = RemoteJobQueue(f"http://127.0.0.1:{self.daemon.api.port}", "segredo")
+        batch = remote.enqueue("echo", "a,b,c")
+        self.assertEqual(batch["jobs"], 3)
+        with mock.patch("shamann.worker.get_streaming_guardian", return_value=EchoGuardian):
+            processed = QueueWorker(remote, remote, concurrency=2).run(exit_when_empty=True)
+        self.assertEqual(processed, 3)
+        self.assertEqual(remote.stats(batch["batch_id"])["done"], 3)
+        job = self.daemon.job_queue().get_job(1)
+        self.assertEqual(job["result_status"], "success")
+        self.assertEqual(self.daemon.db.get_scan_by_id(job["scan_id"])["status"], "success")
+        self.assertIsNone(remote.claim("w1"))
+        with self.assertRaises(RemoteQueueError):
+            RemoteJobQueue(f"http://127.0.0.1:{self.daemon.api.port}", "errado").claim("w1")
+        with self.assertRaises(RemoteQueueError):
+            remote.enqueue("nmap", "10.0.0.0/30", exclude="10.0.0.0/30")
+        self.assertEqual(self.request("POST", "/queue/claim", {})[0], 400)
+
+    def test_errors(self):
+        self.assertEqual(self.request("GET", "/scans/inexistente")[0], 404)
+        self.assertEqual(self.request("POST", "/scans", {"guardian": "echo"})[0], 400)
+        self.assertEqual(self.request("GET", "/history?limit=x")[0], 400)
+        self.assertEqual(self.request("PUT", "/scans")[0], 405)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+# tests/test_asn_index.py
+import os
+import tempfile
+import unittest
+
+from shamann.modules.recon.asn_index import ASNIndex, enrich_hosts
+
+IPTOASN_DUMP = """\
+1.0.0.0\t1.0.0.255\t13335\tUS\tCLOUDFLARENET
+1.0.1.0\t1.0.3.255\t0\tNone\tNot routed
+8.8.8.0\t8.8.8.255\t15169\tUS\tGOOGLE
+2001:4860::\t2001:4860:ffff:ffff:ffff:ffff:ffff:ffff\t15169\tUS\tGOOGLE
+"""
+
+PREFIX_DUMP = """\
+# prefixo ASN org país
+10.0.0.0/8\tAS64500\tCorp Backbone\tBR
+10.20.0.0/16\t64501\tCorp Filial\tBR
+10.20.30.0/24\t64502\tCorp DMZ\tBR
+"""
+
+
+class TestASNIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_iptoasn_dump_ipv4_and_ipv6(self):
+        index = ASNIndex.load(self.write("ip2asn.tsv", IPTOASN_DUMP))
+        self.assertEqual(index.lookup("1.0.0.1")["org"], "CLOUDFLARENET")
+        self.assertEqual(index.lookup("1.0.0.1")["netblock"], "1.0.0.0/24")
+        self.assertIsNone(index.lookup("1.0.2.1")) # ASN 0 = não roteado
+        self.assertEqual(index.lookup("2001:4860:4860::8888")["asn"], 15169)
+        self.assertIsNone(index.lookup("2001:db8::1"))
+        self.assertIsNone(index.lookup("não-é-ip"))
+
+    def test_longest_prefix_match(self):
+        index = ASNIndex.load(self.write("prefixes.txt", PREFIX_DUMP))
+        self.assertEqual(index.lookup("10.20.30.40")["asn"], 64502)
+        self.assertEqual(index.lookup("10.20.31.1")["asn"], 64501)
+        self.assertEqual(index.lookup("10.21.0.1")["asn"], 64500)
+        self.assertEqual(index.lookup("10.255.255.255")["netblock"], "10.0.0.0/8")
+
+    def test_compiled_file_is_reused(self):
+        source = self.write("prefixes.txt", PREFIX_DUMP)
+        ASNIndex.load(source)
+        compiled = source + ".shidx"
+        self.assertTrue(os.path.exists(compiled))
+        self.assertEqual(ASNIndex.open(compiled).lookup("10.1.1.1")["org"], "Corp Backbone")
+
+    def test_enrich_hosts(self):
+        index = ASNIndex.load(self.write("prefixes.txt", PREFIX_DUMP))
+        scan_results = {"hosts": [{"ip_address": "10.20.30.5"}, {"ip_address": "192.0.2.1"}]}
+        self.assertEqual(enrich_hosts(scan_results, index), 1)
+        self.assertEqual(scan_results["hosts"][0]["as_org"], "Corp DMZ")
+        self.assertEqual(scan_results["hosts"][1]["asn"], "N/A")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+# tests/test_backup_store.py
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from shamann.persistence.backup_store import BackupError, BackupRepository
+
+
+class TestBackupRepository(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.source = os.path.join(self.tmp.name, "origem")
+        self.repository = BackupRepository(os.path.join(self.tmp.name, "repo"), chunk_size=1024, workers=4)
+        self.write("etc/hosts", b"127.0.0.1 localhost\n")
+        self.write("etc/grande.bin", os.urandom(10 * 1024))
+        self.write("home/copia.bin", self.read("etc/grande.bin")) # Mesmo conteúdo: nenhum chunk novo
+        self.write("home/cache/lixo.tmp", b"x")
+        os.symlink("hosts", os.path.join(self.source, "etc", "atalho"))
+
+    def write(self, name, data, age=3600):
+        path = os.path.join(self.source, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        mtime = time.time() - age # Fora da janela em que o mtime não é confiável
+        os.utime(path, (mtime, mtime))
+
+    def read(self, name, root=None):
+        with open(os.path.join(root or self.source, name), "rb") as f:
+            return f.read()
+
+    def objects(self):
+        return sum(len(names) for _, _, names in os.walk(os.path.join(self.repository.root, "objects")))
+
+    def test_incremental_and_deduplicated(self):
+        first = self.repository.snapshot([self.source], exclude=["*/cache/*"])
+        stats = first["stats"]
+        self.assertEqual((stats["files"], stats["read"], stats["symlinks"]), (3, 3, 1))
+        self.assertEqual(self.objects(), 11) # 10 chunks do arquivo grande (compartilhados com a cópia) + hosts
+        self.assertEqual(stats["new_bytes"], 10 * 1024 + 20)
+
+        self.write("etc/hosts", b"127.0.0.1 localhost shamann\n")
+        second = self.repository.snapshot([self.source], exclude=["*/cache/*"])
+        self.assertEqual(second["parent"], first["id"])
+        self.assertEqual((second["stats"]["read"], second["stats"]["unchanged"]), (1, 2))
+        self.assertEqual(self.objects(), 12)
+        self.assertEqual(self.repository.list_snapshots(), [first["id"], second["id"]])
+
+    def test_restore_single_file_and_prune(self):
+        first = self.repository.snapshot([self.source])
+        os.chmod(os.path.join(self.source, "etc", "hosts"), 0o600)
+        self.write("etc/hosts", b"alterado\n")
+        self.repository.snapshot([self.source])
+
+        destination = os.path.join(self.tmp.name, "restaurado")
+        result = self.repository.restore(destination, first["id"], [os.path.join(self.source, "etc", "hosts")])
+        self.assertEqual((result["files"], result["errors"]), (1, []))
+        restored = os.path.join(destination, self.source.lstrip("/"))
+        self.assertEqual(self.read("etc/hosts", restored), b"127.0.0.1 localhost\n")
+        self.assertFalse(os.path.exists(os.path.join(restored, "etc", "grande.bin")))
+
+        result = self.repository.restore(destination)
+        self.assertEqual(result["files"], 4)
+        self.assertEqual(self.read("home/copia.bin", restored), self.read("etc/grande.bin"))
+        self.assertEqual(os.readlink(os.path.join(restored, "etc", "atalho")), "hosts")
+        self.assertEqual(os.stat(os.path.join(restored, "etc", "hosts")).st_mode & 0o777, 0o600)
+
+        pruned = self.repository.prune(keep=1)
+        self.assertEqual((pruned["removed_snapshots"], pruned["removed_objects"]), ([first["id"]], 1))
+        with self.assertRaises(BackupError):
+            self.repository.restore(destination, first["id"])
+
+    def test_prune_waits_for_running_snapshot(self):
+        # Os chunks de um snapshot em andamento ainda não estão em nenhum manifesto
+        written, release = threading.Event(), threading.Event()
+
+        class PausedRepository(BackupRepository):
+            def _write_object(self, digest, data):
+                size = super()._write_object(digest, data)
+                written.set()
+                release.wait(5)
+                return size
+
+        paused = PausedRepository(self.repository.root, chunk_size=1024, workers=1)
+        snapshot = threading.Thread(target=paused.snapshot, args=([os.path.join(self.source, "etc")],))
+        snapshot.start()
+        self.assertTrue(written.wait(5))
+        prune = threading.Thread(target=self.repository.prune, kwargs={"keep": 1})
+        prune.start()
+        prune.join(0.3)
+        self.assertTrue(prune.is_alive()) # Espera a trava do repositório
+        release.set()
+        snapshot.join(5)
+        prune.join(5)
+        result = self.repository.restore(os.path.join(self.tmp.name, "restaurado"))
+        self.assertEqual((result["files"], result["errors"]), (2, []))
+
+    def test_corrupted_chunk_is_reported(self):
+        self.repository.snapshot([os.path.join(self.source, "etc", "hosts")])
+        for directory, _, names in os.walk(os.path.join(self.repository.root, "objects")):
+            for name in names:
+                with open(os.path.join(directory, name), "wb") as f:
+                    f.write(b"lixo")
+        result = self.repository.restore(os.path.join(self.tmp.name, "restaurado"))
+        self.assertEqual(result["files"], 0)
+        self.assertIn("ilegível", result["errors"][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+# tests/test_base_guardian.py
+import asyncio
+import threading
+import time
+import unittest
+
+from shamann.modules.base_guardian import BaseGuardian, ScanContext, adapt_guardian
+
+
+class SlowLegacyGuardian:
+    """Guardião legado: só run_scan estático, sem herdar BaseGuardian."""
+
+    @staticmethod
+    def run_scan(target: str, options: str = "") -> dict:
+        time.sleep(float(options or 0))
+        return {"target": target, "status": "success"}
+
+
+class CountingGuardian(BaseGuardian):
+    RESOURCES = {"cpu": 0.5, "network": 2}
+    PROGRESS_INTERVAL = 0.05
+    stopped = threading.Event()
+
+    @classmethod
+    def iter_scan(cls, target: str, options: str = "", context: ScanContext = None):
+        context = context or ScanContext(cls.name(), target)
+        try:
+            for i in range(int(options or 3)):
+                time.sleep(0.02)
+                yield context.partial(i)
+            yield context.result({"target": target, "status": "success"})
+        finally:
+            cls.stopped.set()
+
+
+class TestBaseGuardian(unittest.TestCase):
+
+    def test_legacy_guardian_is_adapted(self):
+        adapted = adapt_guardian(SlowLegacyGuardian)
+        self.assertEqual(adapted.name(), "slowlegacy")
+        self.assertEqual(adapted.resources()["subprocess"], 0)
+        self.assertEqual(adapted.scan("alvo")["status"], "success")
+        self.assertIs(adapt_guardian(CountingGuardian), CountingGuardian)
+
+    def test_stream_yields_partials_and_result(self):
+        events = list(CountingGuardian.stream("alvo", "3"))
+        self.assertEqual([e["data"] for e in events if e["event"] == "partial"], [0, 1, 2])
+        self.assertEqual(events[-1]["result"]["status"], "success")
+        self.assertEqual(CountingGuardian.run_scan("alvo", "2")["status"], "success")
+        self.assertEqual(CountingGuardian.resources(), {"cpu": 0.5, "network": 2, "subprocess": 0})
+
+    def test_timeout_keeps_partial_results(self):
+        CountingGuardian.stopped.clear()
+        result = CountingGuardian.scan("alvo", "1000", timeout=0.1)
+        self.assertEqual(result["status"], "timeout_error")
+        self.assertGreater(len(result["partial_results"]), 0)
+        self.assertTrue(CountingGuardian.stopped.is_set()) # O gerador do guardião foi fechado
+
+    def test_legacy_adapter_reports_progress_and_cancels(self):
+        adapted = adapt_guardian(SlowLegacyGuardian)
+        adapted.PROGRESS_INTERVAL = 0.05
+        cancel = threading.Event()
+        events = []
+        threading.Timer(0.2, cancel.set).start()
+        result = adapted.scan("alvo", "5", cancel_event=cancel, on_event=events.append)
+        self.assertEqual(result["status"], "cancelled")
+        self.assertTrue(any(e["event"] == "progress" for e in events))
+
+    def test_astream_cancellation(self):
+        async def consume():
+            seen = []
+            async for event in CountingGuardian.astream("alvo", "1000"):
+                seen.append(event)
+                if len(seen) == 3:
+                    break
+            return seen
+
+        CountingGuardian.stopped.clear()
+        self.assertEqual(len(asyncio.run(consume())), 3)
+        self.assertTrue(CountingGuardian.stopped.wait(2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+# tests/test_benchmarks.py
+import logging
+import unittest
+
+from benchmarks.compare import compare_results
+from benchmarks.fixtures import OfflinePortScanner, generate_nmap_xml, parsed_results, synthetic_rules
+from benchmarks.run import run_suite
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_fixtures_are_reproducible(self):
+        self.assertEqual(generate_nmap_xml(50, seed=7), generate_nmap_xml(50, seed=7))
+        parsed = parsed_results(generate_nmap_xml(50, seed=7))
+        self.assertEqual(len(parsed["hosts"]), 50)
+        self.assertTrue(any(host["ports"] for host in parsed["hosts"]))
+        self.assertEqual(len(OfflinePortScanner(generate_nmap_xml(3)).all_hosts()), 3)
+        self.assertEqual(len(synthetic_rules(12)), 12)
+
+    def test_suite_runs_all_cases(self):
+        logging.disable(logging.INFO)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        results = run_suite([20], [5], repeat=1)
+        self.assertIn("parse_nmap_results/hosts=20", results)
+        self.assertIn("classify_alerts/hosts=20/rules=5", results)
+        self.assertIn("db_insert_scan_results/hosts=20", results)
+        self.assertIn("db_get_ports_by_host_id", {case["name"] for case in results.values()})
+
+    def test_compare_flags_regressions(self):
+        baseline = {"results": {"a": {"min": 1.0}, "b": {"min": 1.0}, "c": {"min": 0.0001}, "gone": {"min": 1.0}}}
+        current = {"results": {"a": {"min": 1.3}, "b": {"min": 1.05}, "c": {"min": 0.0009}}}
+        comparison = compare_results(current, baseline, threshold=0.15)
+        self.assertEqual([entry["case"] for entry in comparison["regressions"]], ["a"])
+        self.assertEqual(comparison["missing"], ["gone"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+# tests/test_cli.py
+import contextlib
+import io
+import json
+import unittest
+
+from benchmarks.fake_nmap import fake_nmap
+from shamann.cli.main import main
+
+
+class TestSingleGuardian(unittest.TestCase):
+
+    def run_cli(self, *argv):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            main(["--log-level", "WARNING", *argv])
+        return json.loads(out.getvalue())
+
+    def test_nmap_guardian_runs_from_cli(self):
+        # NmapGuardian.run_scan é de instância: -g precisa passar pelo protocolo de streaming
+        with fake_nmap({"seed": 5, "down_ratio": 0.0}):
+            result = self.run_cli("-g", "nmap", "-t", "10.9.0.1", "--guardian-options", "-sV -p 1-200")
+        self.assertEqual(result["status"], "success")
+        self.assertEqual([host["ip_address"] for host in result["scan_results"]["hosts"]], ["10.9.0.1"])
+
+    def test_failed_guardian_exits_with_error(self):
+        with fake_nmap({"error": "Falha simulada"}), self.assertRaises(SystemExit) as raised:
+            self.run_cli("-g", "nmap", "-t", "10.9.0.1")
+        self.assertEqual(raised.exception.code, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
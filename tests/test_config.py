@@ -0,0 +1,135 @@
+# tests/test_config.py
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from shamann.core.config import ConfigError, ConfigStore, compile_config, compile_rules
+from shamann.modules.nmap_guardian import NmapGuardian
+
+
+def _results():
+    port = {"port_id": 21, "protocol": "tcp", "state": "open", "service_name": "ftp", "service_product": "vsftpd",
+            "service_version": "2.3.4", "extrainfo": "Anonymous login", "cpe": "cpe:/a:vsftpd:vsftpd:2.3.4", "scripts": {}}
+    return {"hosts": [{"ip_address": "10.0.0.1", "hostname": "N/A", "status": "up", "os_match": "N/A",
+                       "os_accuracy": "N/A", "vendor": "N/A", "ports": [port]}]}
+
+
+class TestCompileConfig(unittest.TestCase):
+
+    def test_default_config_compiles(self):
+        with open("shamann/config/scan_config.json", encoding="utf-8") as f:
+            raw = json.load(f)
+        config = compile_config(raw)
+        self.assertEqual(len(config.rules), len(raw["alert_rules"]))
+        self.assertEqual(config.scan_profile.ports, raw["scan_profile"]["ports"])
+        self.assertEqual(config.get("daemon"), raw["daemon"])
+        raw["daemon"]["max_workers"] = 99
+        self.assertNotEqual(config["daemon"]["max_workers"], 99)
+
+    def test_invalid_rules_are_reported_together(self):
+        with self.assertRaises(ConfigError) as ctx:
+            compile_rules([
+                {"type": "sintaxe", "level": "LOW", "condition": "port_id =="},
+                {"type": "nome", "level": "LOW", "condition": "porta == 22"},
+                {"type": "privado", "level": "LOW", "condition": "ip.__class__ is str"},
+                {"type": "builtin", "level": "LOW", "condition": "open('/etc/passwd')"},
+                {"type": "nível", "level": "GRAVE", "condition": "True"},
+                {"type": "ok", "level": "LOW", "condition": "any(p in service_lower for p in ('ftp', 'ssh'))"},
+            ])
+        errors = ctx.exception.errors
+        self.assertEqual(len(errors), 5)
+        self.assertIn("porta", errors[1])
+        self.assertIn("open", errors[3])
+        with self.assertRaises(ConfigError):
+            compile_config({"output_settings": {"report_format": ["pdf"]}, "scan_profile": {"ports": 80}})
+
+    def test_rules_see_status_and_service_name(self):
+        rules = compile_rules([
+            {"type": "SO", "level": "INFO", "condition": "os_match == 'N/A' and status == 'up'"},
+            {"type": "FTP", "level": "CRITICAL", "condition": "service_name == 'ftp' and 'anonymous' in extrainfo_lower"},
+            {"type": "Depois do CRITICAL", "level": "LOW", "condition": "state == 'open'"},
+        ])
+        results = NmapGuardian("10.0.0.1", scanner=object()).classify_alerts_with_rules(_results(), rules)
+        types = [alert["type"] for alert in results["hosts"][0]["alerts"]]
+        self.assertEqual(types, ["Sistema Operacional Não Identificado", "SO", "FTP"])
+
+    def test_attributes_only_on_rule_variables(self):
+        escapes = [
+            "re.enum.sys.modules['os'].system('echo PWNED') == 0",
+            "re.compile('x').pattern == 'x'",
+            "'{0}'.format(ip) == ''",
+            "str.mro() == []",
+            "service_lower.lower().join(ip) == ''",
+            "ip.format_map({}) == ''",
+        ]
+        with self.assertRaises(ConfigError) as ctx:
+            compile_rules([{"type": f"fuga {i}", "level": "INFO", "condition": c} for i, c in enumerate(escapes)])
+        self.assertEqual(len(ctx.exception.errors), len(escapes))
+        rules = compile_rules([
+            {"type": "Regex", "level": "HIGH", "condition": "re.search(r'vsftpd 2\\.3', service_product + ' ' + service_version, re.I) is not None"},
+            {"type": "Método", "level": "LOW", "condition": "any(p.startswith('ftp') for p in [service_name]) and extrainfo_lower.startswith('anonymous')"},
+        ])
+        results = NmapGuardian("10.0.0.1", scanner=object()).classify_alerts_with_rules(_results(), rules)
+        types = [alert["type"] for alert in results["hosts"][0]["alerts"]]
+        self.assertEqual(types[-2:], ["Regex", "Método"])
+
+
+class TestConfigStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "scan_config.json")
+        self.mtime = time.time()
+
+    def write(self, content):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(content if isinstance(content, str) else json.dumps(content))
+        self.mtime += 1 # Garante um mtime diferente mesmo em sistemas de arquivos com resolução grosseira
+        os.utime(self.path, (self.mtime, self.mtime))
+
+    def test_reload_on_change_and_keep_previous_on_error(self):
+        self.write({"alert_rules": [{"level": "LOW", "condition": "port_id == 22"}]})
+        store = ConfigStore(self.path)
+        first = store.current
+        self.assertIs(store.refresh(), first)
+        self.write({"alert_rules": [{"level": "LOW", "condition": "port_id == 22"},
+                                    {"level": "HIGH", "condition": "port_id == 23"}]})
+        second = store.refresh()
+        self.assertEqual((second.version, len(second.rules), len(first.rules)), (2, 2, 1))
+
+        self.write('{"alert_rules": [')
+        self.assertIs(store.refresh(), second)
+        self.write({"alert_rules": [{"level": "LOW", "condition": "porta == 22"}]})
+        self.assertIs(store.refresh(), second)
+        self.assertIn("porta", store.info()["last_error"])
+        self.assertEqual(store.failures, 2)
+
+        self.write({"alert_rules": []})
+        self.assertEqual(store.refresh().version, 3)
+        self.assertIsNone(store.info()["last_error"])
+
+    def test_initial_load_errors_are_raised(self):
+        self.write({"alert_rules": "nada"})
+        with self.assertRaises(ConfigError):
+            ConfigStore(self.path).current
+        self.assertEqual(ConfigStore(os.path.join(self.tmp.name, "ausente.json")).current.rules, ())
+
+    def test_watcher_thread_reloads(self):
+        self.write({"scan_profile": {"ports": "22"}})
+        reloaded = []
+        with ConfigStore(self.path, poll_interval=0.02) as store:
+            store.subscribe(lambda new, old: reloaded.append((new.scan_profile.ports, old.scan_profile.ports)))
+            self.write({"scan_profile": {"ports": "80"}})
+            for _ in range(250):
+                if reloaded:
+                    break
+                time.sleep(0.02)
+        self.assertEqual(reloaded, [("80", "22")])
+        self.assertEqual(store.current.scan_profile.ports, "80")
+
+
+if __name__ == "__main__":
+    unittest.main()
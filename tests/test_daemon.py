@@ -0,0 +1,100 @@
+# tests/test_daemon.py
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from benchmarks.fake_nmap import fake_nmap
+from shamann.core.telemetry import TelemetryCollector
+from shamann.daemon import DaemonClient, ShamannDaemon
+from shamann.modules.base_guardian import BaseGuardian, ScanContext
+
+
+class EchoGuardian(BaseGuardian):
+    @classmethod
+    def iter_scan(cls, target: str, options: str = "", context: ScanContext = None):
+        context = context or ScanContext(cls.name(), target)
+        for word in options.split():
+            if word == "sleep":
+                while not context.is_set():
+                    time.sleep(0.01)
+            yield context.partial(word)
+        yield context.result({"target": target, "guardian": "echo", "status": "success", "words": options.split()})
+
+
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        config = {"daemon": {"db_path": os.path.join(self.tmp.name, "shamann.db"), "max_workers": 2, "jobs": []}}
+        patcher = mock.patch("shamann.daemon.get_streaming_guardian", return_value=EchoGuardian)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.daemon = ShamannDaemon(socket_path=os.path.join(self.tmp.name, "shamann.sock"), config=config)
+        self.daemon.start()
+        self.client = DaemonClient(self.daemon.socket_path)
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.tmp.cleanup()
+
+    def wait_finished(self, job_id):
+        for _ in range(200):
+            job = self.client.request("status", id=job_id, include_result=True)["job"]
+            if job["finished_at"]:
+                return job
+            time.sleep(0.02)
+        self.fail(f"Job {job_id} não terminou")
+
+    def test_submit_over_socket_and_persist(self):
+        self.assertTrue(self.client.request("ping")["ok"])
+        job_id = self.client.request("submit", guardian="echo", target="alvo", options="a b")["job"]["id"]
+        job = self.wait_finished(job_id)
+        self.assertEqual(job["status"], "finished")
+        self.assertEqual(job["partials"], 2)
+        self.assertEqual(job["result"]["words"], ["a", "b"])
+        self.assertEqual(self.daemon.db.get_scan_by_id(job["scan_id"])["status"], "success")
+
+    def test_cancel_running_job(self):
+        job_id = self.client.request("submit", guardian="echo", target="alvo", options="sleep")["job"]["id"]
+        time.sleep(0.1)
+        self.assertTrue(self.client.request("cancel", id=job_id)["ok"])
+        job = self.wait_finished(job_id)
+        self.assertEqual(job["status"], "cancelled")
+
+    def test_cancel_running_pipeline(self):
+        # O cancelamento chega ao scan do pipeline: o job termina sem esperar o Nmap
+        with fake_nmap({"host_latency": 3.0}):
+            job_id = self.client.request("submit", guardian="pipeline", target="10.7.0.0/28", ports="80",
+                                         reports=False)["job"]["id"]
+            time.sleep(0.3)
+            started = time.monotonic()
+            self.assertTrue(self.client.request("cancel", id=job_id)["ok"])
+            job = self.wait_finished(job_id)
+        self.assertEqual(job["status"], "cancelled")
+        self.assertEqual(job["result_status"], "cancelled")
+        self.assertLess(time.monotonic() - started, 2.0)
+
+    def test_profiled_job(self):
+        self.daemon.config["profiling"] = {"output_directory": os.path.join(self.tmp.name, "profiles")}
+        job_id = self.client.request("submit", guardian="echo", target="alvo", options="a",
+                                     profile={"stages": "guardian.*"})["job"]["id"]
+        job = self.wait_finished(job_id)
+        self.assertEqual(job["profile"]["stages"]["guardian.echo"]["calls"], 1)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "profiles", f"job_{job_id}.guardian.echo.pstats")))
+
+    def test_telemetry_command(self):
+        self.assertFalse(self.client.request("telemetry")["ok"]) # Desabilitada na configuração do teste
+        self.daemon.telemetry = TelemetryCollector()
+        self.daemon.telemetry.sample()
+        response = self.client.request("telemetry", samples=True)
+        self.assertEqual((response["telemetry"]["samples"], len(response["samples"])), (1, 1))
+        self.assertIn("disk_used_percent:/", response["telemetry"]["stats"])
+
+    def test_unknown_command(self):
+        self.assertFalse(self.client.request("voar")["ok"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+# tests/test_dirb_guardian.py
+import contextlib
+import io
+import os
+import stat
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from shamann.modules.dirb_guardian import DirbGuardian
+
+# Emulador do Dirb: o comportamento depende do host do alvo ("rapido" termina, "lento" fica preso)
+FAKE_DIRB = """#!{python}
+import os, sys, time
+target = sys.argv[1]
+host = target.split("//", 1)[-1].strip("/")
+with open(os.path.join({directory!r}, host + ".pid"), "w") as f:
+    f.write(str(os.getpid()))
+print("DIRB v2.22")
+print("---- Scanning URL: " + target + " ----")
+print("--> Testing: " + target + "aa\\r                \\r+ " + target + "index.html (CODE:200|SIZE:120)", flush=True)
+time.sleep(0.5 if host == "rapido" else 60)
+print("==> DIRECTORY: " + target + "admin/")
+print("DOWNLOADED: 4612 - FOUND: 2", flush=True)
+"""
+
+
+class TestDirbGuardianParser(unittest.TestCase):
+
+    def test_parse_found_line(self):
+        finding = DirbGuardian.parse_dirb_line("+ http://alvo/index.html (CODE:200|SIZE:1234)")
+        self.assertEqual(finding, {"url": "http://alvo/index.html", "code": 200, "size": 1234, "directory": False})
+
+    def test_parse_directory_line(self):
+        finding = DirbGuardian.parse_dirb_line("==> DIRECTORY: http://alvo/admin/")
+        self.assertTrue(finding["directory"])
+        self.assertEqual(finding["url"], "http://alvo/admin/")
+
+    def test_parse_line_with_progress_overwrite(self):
+        # Sob TTY o Dirb sobrescreve a linha "--> Testing" com '\r' antes do achado
+        line = "--> Testing: http://alvo/zz\r                    \r+ http://alvo/cgi-bin/ (CODE:403|SIZE:10)"
+        self.assertEqual(DirbGuardian.parse_dirb_line(line)["code"], 403)
+
+    def test_ignore_non_finding_lines(self):
+        self.assertIsNone(DirbGuardian.parse_dirb_line("---- Scanning URL: http://alvo/ ----"))
+        self.assertIsNone(DirbGuardian.parse_dirb_line("DOWNLOADED: 4612 - FOUND: 2"))
+
+
+class TestDirbGuardianProcess(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        path = os.path.join(self.directory, "dirb")
+        with open(path, "w") as f:
+            f.write(FAKE_DIRB.format(python=sys.executable, directory=self.directory))
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+        previous = os.environ.get("PATH", "")
+        os.environ["PATH"] = self.directory + os.pathsep + previous
+        self.addCleanup(os.environ.__setitem__, "PATH", previous)
+
+    def assert_killed(self, host):
+        with open(os.path.join(self.directory, f"{host}.pid")) as f:
+            pid = int(f.read())
+        for _ in range(50):
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(pid, 0)
+                time.sleep(0.1)
+                continue
+            return
+        os.kill(pid, 9)
+        self.fail(f"O Dirb de '{host}' continuou rodando")
+
+    def test_findings_are_streamed_before_exit(self):
+        events = []
+        for event in DirbGuardian.stream_scan("http://rapido/"):
+            events.append((time.monotonic(), event))
+        kinds = [event["event"] for _, event in events]
+        self.assertEqual(kinds, ["finding", "finding", "end"])
+        self.assertEqual(events[0][1]["finding"]["url"], "http://rapido/index.html")
+        self.assertTrue(events[1][1]["finding"]["directory"])
+        self.assertGreater(events[1][0] - events[0][0], 0.3) # O primeiro achado chegou antes do sleep do processo
+        end = events[-1][1]
+        self.assertEqual((end["status"], end["returncode"], end["findings_count"]), ("completed", 0, 2))
+
+    def test_timeout_kills_process(self):
+        started = time.monotonic()
+        events = list(DirbGuardian.stream_scan("http://lento/", timeout_seconds=1))
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(events[0]["event"], "finding")
+        self.assertEqual((events[-1]["status"], events[-1]["findings_count"]), ("timeout_error", 1))
+        self.assert_killed("lento")
+
+    def test_stop_event_cancels_scan(self):
+        stop_event = threading.Event()
+        events = []
+        for event in DirbGuardian.stream_scan("http://lento/", stop_event=stop_event):
+            events.append(event)
+            stop_event.set() # Cancela assim que o primeiro achado chega
+        self.assertEqual([event["event"] for event in events], ["finding", "end"])
+        self.assertEqual(events[-1]["status"], "cancelled")
+        self.assert_killed("lento")
+
+    def test_multi_scan_streams_and_closing_cancels_the_rest(self):
+        events = DirbGuardian.iter_multi_scan("http://rapido/,http://lento/", max_parallel=2, timeout_seconds=30)
+        seen = []
+        for event in events:
+            seen.append((event["target"], event["event"]))
+            if event["event"] == "end" and event["target"] == "http://rapido/":
+                break
+        self.assertIn(("http://lento/", "finding"), seen) # Achados dos dois alvos chegam intercalados
+        self.assertEqual(seen.count(("http://rapido/", "finding")), 2)
+        events.close() # O consumidor desistiu: o Dirb que ainda roda é encerrado
+        self.assert_killed("lento")
+
+    def test_multi_scan_accepts_generator(self):
+        results = DirbGuardian.run_multi_scan((url for url in ["http://rapido/"]), timeout_seconds=30)
+        self.assertEqual((results["targets"], results["findings_count"]), (["http://rapido/"], 2))
+
+    def test_no_output_on_stdout(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), self.assertLogs("shamann.modules.dirb_guardian", "DEBUG"):
+            DirbGuardian.run_scan("http://rapido/")
+        self.assertEqual(output.getvalue(), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
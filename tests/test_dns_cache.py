@@ -0,0 +1,83 @@
+# tests/test_dns_cache.py
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from shamann.modules.recon.dns_cache import DNSCache, resolver_id
+
+
+def answer(name, ttl, address="10.0.0.1"):
+    return {"name": name, "type": "A", "status": "success", "rcode": "NOERROR",
+            "answers": [{"name": name, "type": "A", "ttl": ttl, "data": address}]}
+
+
+class TestDNSCache(unittest.TestCase):
+
+    def test_hit_respects_ttl(self):
+        cache = DNSCache()
+        with mock.patch("shamann.modules.recon.dns_cache.time.time", return_value=1000.0):
+            cache.put(answer("www.example.test", 30))
+            self.assertEqual(cache.get("WWW.example.test.", "a")["answers"][0]["data"], "10.0.0.1")
+        with mock.patch("shamann.modules.recon.dns_cache.time.time", return_value=1031.0):
+            self.assertIsNone(cache.get("www.example.test", "A"))
+        self.assertEqual(cache.stats()["expired"], 1)
+
+    def test_negative_caching_uses_soa_minimum(self):
+        cache = DNSCache(negative_ttl=600)
+        soa = {"name": "example.test", "type": "SOA", "ttl": 3600,
+               "data": {"mname": "ns", "rname": "h", "serial": 1, "refresh": 1, "retry": 1, "expire": 1, "minimum": 5}}
+        nxdomain = {"name": "nope.example.test", "type": "A", "status": "warning", "rcode": "NXDOMAIN",
+                    "answers": [], "authority": [soa]}
+        with mock.patch("shamann.modules.recon.dns_cache.time.time", return_value=1000.0):
+            cache.put(nxdomain)
+            self.assertEqual(cache.get("nope.example.test")["rcode"], "NXDOMAIN")
+        with mock.patch("shamann.modules.recon.dns_cache.time.time", return_value=1006.0):
+            self.assertIsNone(cache.get("nope.example.test"))
+        self.assertEqual(cache.stats()["negative_hits"], 1)
+
+    def test_errors_are_not_cached(self):
+        cache = DNSCache()
+        self.assertFalse(cache.put({"name": "x.test", "type": "A", "status": "error", "error_message": "timeout"}))
+        self.assertFalse(cache.put(dict(answer("y.test", 30), rcode="SERVFAIL")))
+
+    def test_lru_eviction(self):
+        cache = DNSCache(max_entries=2)
+        cache.put(answer("a.test", 300))
+        cache.put(answer("b.test", 300))
+        cache.get("a.test")
+        cache.put(answer("c.test", 300))
+        self.assertIsNone(cache.get("b.test"))
+        self.assertIsNotNone(cache.get("a.test"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_save_and_load(self):
+        cache = DNSCache()
+        cache.put(answer("www.example.test", 300))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "dns_cache.json")
+            cache.save(path)
+            restored = DNSCache()
+            self.assertEqual(restored.load(path), 1)
+            self.assertTrue(restored.get("www.example.test")["cached"])
+
+    def test_entries_are_per_resolver(self):
+        # Split-horizon: o DNS interno e um resolvedor público respondem coisas diferentes
+        cache = DNSCache()
+        internal = resolver_id(["10.0.0.53"])
+        cache.put(answer("app.example.test", 300, "10.0.0.8"), internal)
+        cache.put(answer("app.example.test", 300, "203.0.113.8"), resolver_id([("8.8.8.8", 53)]))
+        self.assertEqual(cache.get("app.example.test", "A", internal)["answers"][0]["data"], "10.0.0.8")
+        self.assertEqual(cache.get("app.example.test", "A", "8.8.8.8:53")["answers"][0]["data"], "203.0.113.8")
+        self.assertIsNone(cache.get("app.example.test")) # Resolvedor do sistema: nunca consultado
+        self.assertIsNone(cache.get("app.example.test", "A", resolver_id(["10.0.0.53"], port=5353)))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "dns_cache.json")
+            cache.save(path)
+            restored = DNSCache()
+            restored.load(path)
+            self.assertEqual(restored.get("app.example.test", "A", internal)["answers"][0]["data"], "10.0.0.8")
+            self.assertIsNone(restored.get("app.example.test"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+# tests/test_dns_resolver.py
+import asyncio
+import socket
+import struct
+import unittest
+
+from shamann.modules.recon.dns import (
+    AsyncDNSResolver, build_query, build_response, parse_response, _decode_name,
+)
+
+ZONE = {
+    ("www.example.test", "A"): [{"name": "www.example.test", "type": "A", "ttl": 300, "data": "10.0.0.1"}],
+    ("mail.example.test", "MX"): [{"name": "mail.example.test", "type": "MX", "ttl": 60,
+                                   "data": {"preference": 10, "exchange": "mx.example.test"}}],
+    ("big.example.test", "A"): [{"name": "big.example.test", "type": "A", "ttl": 30, "data": f"10.1.0.{i}"}
+                                for i in range(1, 40)],
+}
+
+
+class StandInDNS(asyncio.DatagramProtocol):
+    """Servidor DNS local mínimo: responde a partir de ZONE, trunca 'big.*' e descarta a 1ª consulta de 'flaky.*'."""
+
+    def __init__(self):
+        self.seen = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def answer(self, query, over_tcp=False):
+        name, offset = _decode_name(query, 12)
+        qtype = {1: "A", 15: "MX"}.get(struct.unpack_from("!H", query, offset)[0], "A")
+        if name.startswith("big.") and not over_tcp:
+            return build_response(query, truncated=True)
+        if name.startswith("flaky."):
+            self.seen[name] = self.seen.get(name, 0) + 1
+            if self.seen[name] == 1:
+                return None
+            return build_response(query, [{"name": name, "type": "A", "ttl": 5, "data": "10.9.9.9"}])
+        records = ZONE.get((name, qtype))
+        if records is None:
+            return build_response(query, rcode="NXDOMAIN")
+        return build_response(query, records)
+
+    def datagram_received(self, data, addr):
+        response = self.answer(data)
+        if response:
+            self.transport.sendto(response, addr)
+
+
+class TestWireFormat(unittest.TestCase):
+
+    def test_query_roundtrip(self):
+        query = build_query(0x1234, "www.example.test", "A")
+        response = parse_response(build_response(query, ZONE[("www.example.test", "A")]))
+        self.assertEqual(response["id"], 0x1234)
+        self.assertEqual(response["questions"], [{"name": "www.example.test", "type": "A"}])
+        self.assertEqual(response["answers"][0]["data"], "10.0.0.1")
+
+
+class TestAsyncDNSResolver(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        loop = asyncio.get_running_loop()
+        self.transport, self.server = await loop.create_datagram_endpoint(StandInDNS, local_addr=("127.0.0.1", 0))
+        self.transport.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.port = self.transport.get_extra_info("sockname")[1]
+
+        async def handle_tcp(reader, writer):
+            size = struct.unpack("!H", await reader.readexactly(2))[0]
+            response = self.server.answer(await reader.readexactly(size), over_tcp=True)
+            writer.write(struct.pack("!H", len(response)) + response)
+            await writer.drain()
+            writer.close()
+
+        self.tcp_server = await asyncio.start_server(handle_tcp, "127.0.0.1", self.port)
+        self.resolver = AsyncDNSResolver(nameservers=["127.0.0.1"], port=self.port, timeout=0.5, retries=2,
+                                         use_cache=False)
+
+    async def asyncTearDown(self):
+        self.resolver.close()
+        self.transport.close()
+        self.tcp_server.close()
+        await self.tcp_server.wait_closed()
+
+    async def test_resolve_many(self):
+        results = await self.resolver.resolve_many(["www.example.test", "nope.example.test"])
+        self.assertEqual(results[0]["status"], "success")
+        self.assertEqual(results[0]["answers"][0]["data"], "10.0.0.1")
+        self.assertEqual(results[1]["rcode"], "NXDOMAIN")
+
+    async def test_structured_mx(self):
+        result = await self.resolver.query("mail.example.test", "MX")
+        self.assertEqual(result["answers"][0]["data"], {"preference": 10, "exchange": "mx.example.test"})
+
+    async def test_truncated_falls_back_to_tcp(self):
+        result = await self.resolver.query("big.example.test")
+        self.assertEqual(result["transport"], "tcp")
+        self.assertEqual(len(result["answers"]), 39)
+
+    async def test_retry_after_timeout(self):
+        result = await self.resolver.query("flaky.example.test")
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["attempts"], 2)
+
+    async def test_many_concurrent_queries(self):
+        names = [f"n{i}.example.test" for i in range(1000)] + ["www.example.test"]
+        results = await self.resolver.resolve_many(names)
+        self.assertEqual(len(results), 1001)
+        self.assertTrue(all(r["rcode"] == "NXDOMAIN" for r in results[:-1]))
+        self.assertEqual(results[-1]["answers"][0]["data"], "10.0.0.1")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+# tests/test_guardian_registry.py
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from shamann.modules import guardian_registry
+from shamann.modules.guardian_registry import GuardianDescriptor, GuardianLoadError, discover_plugins
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+class TestGuardianRegistry(unittest.TestCase):
+
+    def test_registry_import_does_not_load_guardians(self):
+        code = ("import sys; from shamann.modules.guardian_registry import GUARDIANS, list_guardians; "
+                "list_guardians(); assert 'dns' in GUARDIANS; "
+                "heavy = [m for m in ('nmap', 'pexpect', 'whois', 'requests', 'shamann.modules.nmap_guardian') if m in sys.modules]; "
+                "print(','.join(heavy))")
+        env = dict(os.environ, SHAMANN_GUARDIAN_INDEX=os.path.join(tempfile.gettempdir(), "shamann_test_index.json"))
+        output = subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), "")
+
+    def test_descriptor_loads_on_first_use(self):
+        descriptor = GuardianDescriptor("example", "shamann.modules.example_guardian:ExampleGuardian")
+        self.assertFalse(descriptor.loaded)
+        self.assertEqual(descriptor.load().__name__, "ExampleGuardian")
+        self.assertTrue(descriptor.loaded)
+        with self.assertRaises(GuardianLoadError):
+            GuardianDescriptor("ghost", "shamann.modules.nao_existe:Ghost").load()
+
+    def test_plugins_come_from_cached_index(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index_path = os.path.join(tmp, "index.json")
+            found = [{"name": "meu_plugin", "import_path": "pacote.modulo:MeuGuardiao"}]
+            with mock.patch.object(guardian_registry, "_scan_entry_points", return_value=found) as scan:
+                first = discover_plugins(index_path)
+                second = discover_plugins(index_path)
+            self.assertEqual(scan.call_count, 1) # A segunda chamada usa o índice em cache
+            self.assertEqual([d.name for d in second], ["meu_plugin"])
+            self.assertEqual(first[0].source, "plugin")
+
+
+if __name__ == '__main__':
+    unittest.main()
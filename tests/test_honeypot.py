@@ -0,0 +1,140 @@
+# tests/test_honeypot.py
+import asyncio
+import os
+import socket
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from benchmarks.load import flood
+from shamann.modules.honeypot import HoneypotService
+from shamann.persistence.honeypot_store import HoneypotStore
+
+
+class FlakyStore(HoneypotStore):
+    """Falha na primeira gravação, como um banco travado por outro processo."""
+    failures = 1
+
+    def insert_events(self, events):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return super().insert_events(events)
+
+
+class TestHoneypotService(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = os.path.join(self.tmp.name, "honeypot.db")
+
+    def service(self, store=None, **settings):
+        defaults = {"host": "127.0.0.1", "ports": [[0, "ssh"], [0, "http"], [0, "telnet"]], "db_path": self.db_path,
+                    "flush_interval": 0.05, "idle_timeout": 2.0}
+        honeypot = HoneypotService({**defaults, **settings}, store=store).start()
+        self.addCleanup(honeypot.stop)
+        return honeypot
+
+    def port(self, honeypot, protocol):
+        return next(port for port, name in honeypot.bound.items() if name == protocol)
+
+    def talk(self, port, *messages):
+        """Envia as mensagens em sequência e lê até o servidor fechar."""
+        received = b""
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+            try:
+                for message in messages:
+                    client.sendall(message)
+                    time.sleep(0.05)
+                client.shutdown(socket.SHUT_WR)
+                while chunk := client.recv(65536):
+                    received += chunk
+            except OSError: # O honeypot pode fechar antes de o cliente terminar de enviar
+                pass
+        return received
+
+    def wait_written(self, honeypot, count):
+        deadline = time.monotonic() + 5
+        while honeypot.counters["written"] < count and time.monotonic() < deadline:
+            time.sleep(0.02)
+        return honeypot.store.recent_events(100)
+
+    def test_protocols_are_recorded(self):
+        honeypot = self.service()
+        self.assertTrue(self.talk(self.port(honeypot, "ssh"), b"SSH-2.0-libssh_0.9.6\r\n").startswith(b"SSH-2.0-OpenSSH"))
+        page = self.talk(self.port(honeypot, "http"), b"GET /admin HTTP/1.1\r\nHost: alvo\r\nUser-Agent: curl/8\r\n\r\n")
+        self.assertIn(b"200 OK", page.split(b"\r\n", 1)[0])
+        self.talk(self.port(honeypot, "telnet"), b"root\r\n", b"123456\r\n")
+
+        events = {event["protocol"]: event for event in self.wait_written(honeypot, 3)}
+        self.assertEqual(events["ssh"]["details"]["client_banner"], "SSH-2.0-libssh_0.9.6")
+        self.assertEqual((events["http"]["details"]["method"], events["http"]["details"]["path"]), ("GET", "/admin"))
+        self.assertEqual((events["telnet"]["details"]["username"], events["telnet"]["details"]["password"]),
+                         ("root", "123456"))
+        self.assertEqual(events["ssh"]["source_ip"], "127.0.0.1")
+
+    def test_repeated_source_raises_alert(self):
+        received = []
+        honeypot = self.service(repeat_threshold=5)
+        honeypot.on_alert.append(received.append)
+        for _ in range(6):
+            self.talk(self.port(honeypot, "ssh"), b"SSH-2.0-scanner\r\n")
+        self.wait_written(honeypot, 6)
+        self.assertEqual(honeypot.counters["alerts"], 1) # Um só alerta por origem durante o cooldown
+        self.assertEqual((received[0]["level"], received[0]["host"]), ("HIGH", "127.0.0.1"))
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute("SELECT level, type FROM alerts").fetchall()
+        self.assertEqual(rows, [("HIGH", "Honeypot: origem recorrente")])
+
+    def test_failed_batch_is_retried(self):
+        received = []
+        honeypot = self.service(store=FlakyStore(self.db_path), repeat_threshold=3)
+        honeypot.on_alert.append(received.append)
+        for _ in range(3):
+            self.talk(self.port(honeypot, "ssh"), b"SSH-2.0-scanner\r\n")
+        self.assertEqual(len(self.wait_written(honeypot, 3)), 3)
+        self.assertEqual((honeypot.counters["write_errors"], honeypot.counters["dropped"]), (1, 0))
+        deadline = time.monotonic() + 5
+        while not received and time.monotonic() < deadline: # Os alertas são gravados logo depois dos eventos
+            time.sleep(0.02)
+        self.assertEqual(len(received), 1) # O alerta também voltou para a fila e foi gravado uma vez
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM alerts").fetchone(), (1,))
+
+    def test_capture_is_bounded(self):
+        honeypot = self.service(max_capture_bytes=1024)
+        self.talk(self.port(honeypot, "http"), b"POST /login HTTP/1.1\r\n" + b"X-Lixo: " + b"A" * 200000)
+        event = self.wait_written(honeypot, 1)[0]
+        self.assertTrue(event["truncated"])
+        self.assertLessEqual(len(event["details"]["preview"]), 256)
+
+    def test_connections_over_limit_are_rejected(self):
+        honeypot = self.service(max_connections=2, idle_timeout=5.0)
+        port = self.port(honeypot, "telnet")
+        idle = [socket.create_connection(("127.0.0.1", port), timeout=5) for _ in range(2)]
+        try:
+            for client in idle:
+                client.recv(64) # Negociação do telnet: a sessão já está aberta
+            with socket.create_connection(("127.0.0.1", port), timeout=5) as extra:
+                try:
+                    self.assertEqual(extra.recv(64), b"")
+                except ConnectionResetError:
+                    pass
+            self.assertEqual(honeypot.counters["rejected"], 1)
+        finally:
+            for client in idle:
+                client.close()
+
+    def test_flood_is_absorbed(self):
+        honeypot = self.service(batch_size=100)
+        outcome = asyncio.run(flood(honeypot.bound, 300, 100))
+        self.assertEqual(outcome, {"completed": 300, "errors": 0})
+        self.wait_written(honeypot, 300)
+        self.assertEqual(honeypot.store.count(), 300)
+        self.assertGreaterEqual(honeypot.counters["batches"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
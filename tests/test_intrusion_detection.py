@@ -0,0 +1,182 @@
+# tests/test_intrusion_detection.py
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from shamann.modules.intrusion_detection import DEFAULT_SIGNATURES, IntrusionDetector, SignatureSet, required_literals
+
+
+def failed_login(ip, second=0, user="root"):
+    return f"Oct 19 18:26:{second:02d} kali sshd[42]: Failed password for {user} from {ip} port 22 ssh2\n"
+
+
+class TestSignatures(unittest.TestCase):
+
+    def test_required_literals(self):
+        self.assertEqual(required_literals(r"^Failed password for (?P<user>\S+)"), ("password", "Failed password for "))
+        self.assertEqual(required_literals(r"\[UFW BLOCK\] .*SRC=(\S+)")[0], "BLOCK]")
+        self.assertEqual(required_literals(r"a (?:opcional )?bloco c"), (None, "bloco c")) # Só o nível externo
+        self.assertEqual(required_literals(r"usuarios? x")[1], "usuario") # O quantificador tira o último literal
+        self.assertEqual(required_literals(r"token=(\S+) visto")[0], None) # Sem espaço à esquerda: não é palavra
+        self.assertEqual(required_literals(r"a b|c d"), (None, None))
+
+    def test_escapes_and_bounds_are_not_literals(self):
+        self.assertEqual(required_literals(r"^\w{3,8}-\d{1,5}"), (None, "-"))
+        self.assertEqual(required_literals(r"user \x41dmin"), (None, "user "))
+        self.assertEqual(required_literals(r"x \N{LATIN SMALL LETTER A}lpha")[1], "lpha")
+        self.assertEqual(required_literals(r"(a)b \1 c")[1], "b ")
+        self.assertEqual(required_literals(r"(?x) Failed password"), (None, None))
+
+    def test_index_agrees_with_brute_force(self):
+        tricky = [r"^\w{3,8}-\d{1,5}", r"user \x41dmin", r"code \u0042ravo", r"x \N{LATIN SMALL LETTER A}lpha",
+                  r"(ab) ponte \1 fim", r"\101lfa beta", r"porta{2} aberta", r"tentativas? de login",
+                  r"senha\.? errada", r"ID=\d{2,4} ok", r"\[x{1,2}\] marca"]
+        specs = DEFAULT_SIGNATURES + [{"id": f"especial_{i}", "pattern": pattern} for i, pattern in enumerate(tricky)]
+        lines = [failed_login("203.0.113.7"), failed_login("203.0.113.7", user="invalid user admin"),
+                 "Oct 19 18:26:00 kali kernel: [1.5] [UFW BLOCK] IN=eth0 OUT= SRC=203.0.113.9 DST=10.0.0.1 DPT=22\n",
+                 "Oct 19 18:26:00 kali sudo[1]:  alice : 3 incorrect password attempts ; TTY=pts/0 ; COMMAND=/bin/sh\n",
+                 "Oct 19 18:26:00 kali useradd[1]: new user: name=evil, UID=0, GID=0, home=/root, shell=/bin/bash\n",
+                 "Oct 19 18:26:00 kali kernel: nginx[77]: segfault at 0 ip 0 sp 0 error 4\n"]
+        lines += [f"Oct 19 18:26:00 kali app[1]: {message}\n" for message in (
+            "abcd-123", "user Admin", "user admin", "code Bravo", "x alpha", "ab ponte ab fim", "Alfa beta",
+            "portaa aberta", "porta aberta", "tentativa de login", "tentativas de login", "senha errada",
+            "senha. errada", "ID=123 ok", "ID=1 ok", "[xx] marca", "nada aqui")]
+        with tempfile.TemporaryDirectory() as tmp:
+            log = os.path.join(tmp, "auth.log")
+            with open(log, "w", encoding="utf-8") as f:
+                f.write("".join(lines))
+            detector = IntrusionDetector({"sources": [log], "state_path": None, "from_start": True,
+                                          "db_path": os.path.join(tmp, "ids.db")}, signatures=SignatureSet(specs))
+            found = set()
+            detector._matched = lambda source, signature, match, program, message, line: found.add((signature.id, line))
+            detector.poll()
+            detector.stop()
+        expected = set()
+        for line in lines:
+            head, _, message = line.rstrip("\n").partition(": ")
+            program = head.rpartition(" ")[2].partition("[")[0]
+            for signature in detector.signatures.signatures:
+                if (signature.programs is None or program in signature.programs) and signature.regex.search(message):
+                    expected.add((signature.id, line.rstrip("\n")))
+        self.assertEqual(found, expected)
+        self.assertGreater(len(expected), 15)
+
+    def test_thousands_of_signatures_are_indexed(self):
+        extra = [{"id": f"palavra_{i}", "program": "sshd", "pattern": rf"^Probe{i} from (?P<ip>\S+)"} for i in range(1000)]
+        extra += [{"id": f"trecho_{i}", "pattern": rf"token{i}=(?P<value>\S+)"} for i in range(1000)]
+        signatures = SignatureSet(DEFAULT_SIGNATURES + extra)
+        self.assertEqual(signatures.unindexed, [])
+        self.assertEqual(len(signatures.grams), 1000) # Cada assinatura em um balde próprio
+        with self.assertRaises(ValueError):
+            SignatureSet(DEFAULT_SIGNATURES + DEFAULT_SIGNATURES[:1])
+        with self.assertRaises(ValueError):
+            SignatureSet([{"id": "x", "pattern": "a (?P<ip>\\S+)", "aggregate": {"by": "host"}}])
+
+
+class TestIntrusionDetector(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.log = os.path.join(self.tmp.name, "auth.log")
+        self.state = os.path.join(self.tmp.name, "state.json")
+        self.db_path = os.path.join(self.tmp.name, "ids.db")
+        self.write("")
+
+    def write(self, text, path=None, mode="a"):
+        with open(path or self.log, mode, encoding="utf-8") as f:
+            f.write(text)
+
+    def detector(self, signatures=None, **settings):
+        defaults = {"sources": [self.log], "state_path": self.state, "from_start": True, "db_path": self.db_path}
+        detector = IntrusionDetector({**defaults, **settings},
+                                     signatures=SignatureSet(signatures) if signatures is not None else None)
+        self.addCleanup(detector.stop)
+        return detector
+
+    def test_brute_force_alert_and_resume_from_offset(self):
+        received = []
+        detector = self.detector()
+        detector.on_alert.append(received.append)
+        self.write("".join(failed_login("203.0.113.7", second) for second in range(9)))
+        self.write("Oct 19 18:26:09 kali sshd[42]: Failed password for ro") # Linha incompleta: fica para depois
+        self.assertEqual(detector.poll(), [])
+        self.write("ot from 203.0.113.7 port 22 ssh2\n" + failed_login("198.51.100.1"))
+        alerts = detector.poll()
+        self.assertEqual([alert["host"] for alert in alerts], ["203.0.113.7"])
+        self.assertEqual((alerts[0]["level"], alerts[0]["details"]["count"]), ("HIGH", 10))
+        self.assertEqual(received, alerts)
+        self.assertEqual(detector.counters["lines"], 11)
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(conn.execute("SELECT type FROM alerts").fetchall(), [("SSH: força bruta",)])
+        detector.stop()
+
+        self.write(failed_login("198.51.100.1", 20))
+        restarted = self.detector()
+        restarted.poll()
+        self.assertEqual(restarted.counters["lines"], 1) # Só a linha nova: nada foi relido
+
+    def test_window_uses_line_time_and_cooldown(self):
+        detector = self.detector()
+        # 10 falhas, mas a última 4 minutos depois das outras: a janela de 60s não se completa
+        self.write("".join(failed_login("203.0.113.9", second) for second in range(9)))
+        self.write(failed_login("203.0.113.9").replace("18:26", "18:30"))
+        self.assertEqual(detector.poll(), [])
+        self.write(failed_login("203.0.113.9", 30).replace("18:26", "18:30") * 20)
+        self.assertEqual(len(detector.poll()), 1) # 20 falhas seguidas, mas um só alerta no cooldown
+
+    def test_rotation_and_truncation(self):
+        detector = self.detector()
+        self.write(failed_login("203.0.113.1"))
+        detector.poll()
+        self.write(failed_login("203.0.113.2")) # Escrito antes da rotação: ainda precisa ser lido
+        os.rename(self.log, self.log + ".1")
+        self.write(failed_login("203.0.113.3") * 3)
+        detector.poll()
+        self.assertEqual((detector.counters["lines"], detector.counters["rotations"]), (5, 1))
+
+        self.write("", mode="w") # copytruncate
+        self.write(failed_login("203.0.113.4"))
+        detector.poll()
+        self.assertEqual((detector.counters["lines"], detector.counters["truncations"]), (6, 1))
+
+        detector.stop() # Rotação com o detector parado: o resto do antigo é lido em <caminho>.1
+        self.write(failed_login("203.0.113.5"))
+        os.replace(self.log, self.log + ".1")
+        self.write(failed_login("203.0.113.6") + failed_login("203.0.113.7"))
+        restarted = self.detector()
+        restarted.poll()
+        self.assertEqual(restarted.counters["lines"], 3)
+
+    def test_journal_export_and_tail_without_state(self):
+        journal = os.path.join(self.tmp.name, "journal.json")
+        records = [{"__REALTIME_TIMESTAMP": str(1_700_000_000_000_000 + i * 1_000_000), "SYSLOG_IDENTIFIER": "sudo",
+                    "MESSAGE": "  alice : 3 incorrect password attempts ; TTY=pts/0 ; COMMAND=/bin/bash"} for i in range(3)]
+        self.write("".join(json.dumps(record) + "\n" for record in records), journal)
+        self.write(failed_login("203.0.113.1") * 20) # Histórico antigo: sem estado e sem from_start, é ignorado
+        detector = self.detector(sources=[self.log, {"path": journal, "format": "journal"}], from_start=False)
+        self.assertEqual(detector.poll(), [])
+        self.write(json.dumps(records[0]) + "\n", journal)
+        self.write(failed_login("203.0.113.1"))
+        detector.poll()
+        self.assertEqual(detector.counters["lines"], 2)
+
+        replay = self.detector(sources=[{"path": journal, "format": "journal"}], state_path=None)
+        alerts = replay.poll()
+        self.assertEqual([alert["details"]["fields"]["user"] for alert in alerts], ["alice"])
+        self.assertNotIn("host", alerts[0])
+
+    def test_custom_signatures(self):
+        signatures = [{"id": f"sonda_{i}", "program": "sshd", "pattern": rf"probe{i}=(?P<ip>\S+)", "level": "LOW"}
+                      for i in range(500)]
+        detector = self.detector(signatures)
+        self.write("Oct 19 18:26:00 kali sshd[1]: x probe321=10.0.0.9 y\n"
+                   "Oct 19 18:26:00 kali cron[1]: probe321=10.0.0.9\n") # Outro programa: não casa
+        alerts = detector.poll()
+        self.assertEqual([(alert["details"]["signature"], alert["host"]) for alert in alerts], [("sonda_321", "10.0.0.9")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+# tests/test_job_queue.py
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from shamann.cli import worker as worker_cli
+from shamann.modules.base_guardian import BaseGuardian, ScanContext
+from shamann.persistence.db_manager import DBManager
+from shamann.persistence.job_queue import (JobQueue, JobQueueError, check_local_database, filesystem_type,
+                                            shard_targets)
+from shamann.worker import QueueWorker
+
+
+class EchoGuardian(BaseGuardian):
+    @classmethod
+    def iter_scan(cls, target: str, options: str = "", context: ScanContext = None):
+        context = context or ScanContext(cls.name(), target)
+        if options == "boom":
+            raise RuntimeError("falhou")
+        yield context.result({"target": target, "guardian": "echo", "status": "success"})
+
+
+class TestShardTargets(unittest.TestCase):
+
+    def test_large_network_split_into_subnets(self):
+        units = shard_targets("10.0.0.0/24", "nmap", shard_size=16)
+        self.assertEqual(len(units), 16)
+        self.assertEqual(units[0], "10.0.0.0/28")
+
+    def test_singles_grouped_when_guardian_accepts_many(self):
+        targets = [f"10.0.0.{i}" for i in range(5)]
+        self.assertEqual(shard_targets(targets, "nmap", shard_size=2), ["10.0.0.0 10.0.0.1", "10.0.0.2 10.0.0.3", "10.0.0.4"])
+        self.assertEqual(shard_targets("a.com,b.com", "dns", shard_size=4), ["a.com,b.com"])
+        self.assertEqual(shard_targets("a.com,b.com", "dirb"), ["a.com", "b.com"])
+
+    def test_shard_size_counts_addresses(self):
+        # Redes menores que shard_size não são agrupadas além dele: cada unidade tem no máximo shard_size endereços
+        self.assertEqual(shard_targets("10.0.0.0/24,10.0.1.0/24,10.0.2.5", "nmap", shard_size=256),
+                         ["10.0.0.0/24", "10.0.1.0/24", "10.0.2.5"])
+        self.assertEqual(shard_targets("10.0.0.0/30,10.0.0.8/30,10.0.0.20", "nmap", shard_size=16),
+                         ["10.0.0.0/30 10.0.0.8/30 10.0.0.20"])
+        self.assertEqual(shard_targets("10.0.0.0/25,10.0.1.0/30", "nmap", shard_size=128),
+                         ["10.0.0.0/25", "10.0.1.0/30"])
+
+
+class TestJobQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "queue.db")
+        self.queue = JobQueue(self.db_path)
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp.cleanup()
+
+    def test_claims_are_exclusive_across_connections(self):
+        self.queue.enqueue("dirb", [f"host{i}" for i in range(20)])
+        other = JobQueue(self.db_path)
+        claimed = []
+        lock = threading.Lock()
+
+        def drain(queue, worker_id):
+            while (job := queue.claim(worker_id)) is not None:
+                with lock:
+                    claimed.append(job["id"])
+
+        threads = [threading.Thread(target=drain, args=(q, f"w{i}")) for i, q in enumerate((self.queue, other) * 2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        other.close()
+        self.assertEqual(sorted(claimed), list(range(1, 21)))
+
+    def test_expired_lease_is_reclaimed(self):
+        self.queue.enqueue("dirb", "alvo")
+        job = self.queue.claim("w1", lease_seconds=0.05)
+        self.assertIsNone(self.queue.claim("w2"))
+        time.sleep(0.1)
+        again = self.queue.claim("w2")
+        self.assertEqual(again["id"], job["id"])
+        self.assertEqual(again["attempts"], 2)
+        self.assertFalse(self.queue.heartbeat(job["id"], "w1"))
+        self.assertFalse(self.queue.complete(job["id"], "w1", "success"))
+        self.assertTrue(self.queue.complete(job["id"], "w2", "success"))
+
+    def test_retry_with_backoff_then_failed(self):
+        self.queue.enqueue("dirb", "alvo", max_attempts=2)
+        job = self.queue.claim("w1")
+        self.assertEqual(self.queue.fail(job["id"], "w1", "erro"), "queued")
+        self.assertIsNone(self.queue.claim("w1")) # Ainda em backoff
+        with mock.patch("shamann.persistence.job_queue.time.time", return_value=time.time() + 3600):
+            job = self.queue.claim("w1")
+        self.assertEqual(self.queue.fail(job["id"], "w1", "erro"), "failed")
+        self.assertEqual(self.queue.stats()["failed"], 1)
+
+
+    def test_network_filesystem_is_refused(self):
+        # Locks do SQLite não valem entre hosts: a fila só abre em disco local
+        mountinfo = os.path.join(self.tmp.name, "mountinfo")
+        with open(mountinfo, "w") as f:
+            f.write("22 1 0:21 / / rw,relatime shared:1 - ext4 /dev/sda1 rw\n"
+                    f"40 22 0:35 / {self.tmp.name} rw,relatime shared:9 - nfs4 srv:/export rw,vers=4.2\n")
+        self.assertEqual(filesystem_type("/var/lib/shamann/queue.db", mountinfo), "ext4")
+        self.assertEqual(filesystem_type(self.db_path, mountinfo), "nfs4")
+        with self.assertRaises(JobQueueError):
+            check_local_database(self.db_path, mountinfo)
+        check_local_database(self.db_path) # O diretório temporário real é local
+
+    def test_cli_enqueue_excludes_targets(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            code = worker_cli.main(["--db", self.db_path, "enqueue", "-g", "nmap", "-t", "10.0.0.0/24",
+                                    "--exclude", "10.0.0.0/25", "--shard-size", "256"])
+        self.assertEqual(code, 0)
+        batch = json.loads(output.getvalue())
+        self.assertEqual(batch["jobs"], 1)
+        self.assertEqual(self.queue.claim("w1")["target"], "10.0.0.128/25")
+
+class TestQueueWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(os.path.join(self.tmp.name, "queue.db"))
+        self.db = DBManager(os.path.join(self.tmp.name, "results.db"))
+        patcher = mock.patch("shamann.worker.get_streaming_guardian", return_value=EchoGuardian)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp.cleanup()
+
+    def test_worker_drains_queue_and_records_results(self):
+        batch = self.queue.enqueue("echo", ["a", "b", "c"])
+        failing = self.queue.enqueue("echo", "d", options="boom", max_attempts=1)
+        processed = QueueWorker(self.queue, self.db, concurrency=2).run(exit_when_empty=True)
+        self.assertEqual(processed, 4)
+        self.assertEqual(self.queue.stats(batch["batch_id"])["done"], 3)
+        self.assertEqual(self.queue.stats(failing["batch_id"])["failed"], 1)
+        job = self.queue.get_job(1)
+        self.assertEqual(job["result_status"], "success")
+        self.assertEqual(self.db.get_scan_by_id(job["scan_id"])["status"], "success")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+# tests/test_load_harness.py
+import io
+import logging
+import os
+import tempfile
+import unittest
+
+from benchmarks.fake_nmap import expand_targets, fake_nmap, parse_command_line, run_scan
+from benchmarks.fake_servers import FakeDNSServer, FakeHTTPServer
+from benchmarks.fixtures import OfflinePortScanner
+from benchmarks.load import run_load_suite
+from shamann.modules.dirfuzz_guardian import DirFuzzGuardian
+from shamann.modules.dns_guardian import DNSGuardian
+from shamann.modules.nmap_guardian import NmapGuardian
+
+
+class TestFakeNmap(unittest.TestCase):
+
+    def test_command_line_and_targets(self):
+        command = parse_command_line(["-oX", "-", "10.0.0.0/30", "10.0.1.1-3", "-p", "1-100", "-sV",
+                                      "--exclude", "10.0.1.2", "-A"])
+        self.assertEqual(command["ports"], "1-100")
+        self.assertTrue(command["scripts"])
+        self.assertEqual(expand_targets(command["targets"], command["exclude"]),
+                         ["10.0.0.1", "10.0.0.2", "10.0.1.1", "10.0.1.3"])
+        with self.assertRaises(ValueError):
+            expand_targets(["10.0.0.0/16"], max_hosts=100)
+
+    def test_output_is_deterministic_per_address(self):
+        def scan(argv):
+            out = io.StringIO()
+            run_scan(argv, {"seed": 3}, out=out)
+            return NmapGuardian("x", scanner=OfflinePortScanner(out.getvalue()))._parse_nmap_results()["hosts"]
+
+        wide = {host["ip_address"]: host["ports"] for host in scan(["10.2.0.0/29", "-p", "1-1000"])}
+        narrow = scan(["10.2.0.3", "-p", "1-1000"])
+        self.assertEqual(narrow[0]["ports"], wide["10.2.0.3"])
+        self.assertTrue(all(port["port_id"] <= 1000 for ports in wide.values() for port in ports))
+
+    def test_nmap_guardian_runs_against_emulator(self):
+        with fake_nmap({"seed": 7, "down_ratio": 0.0}):
+            result = NmapGuardian.scan("10.1.0.0/28", "-sV --script=default -p 1-1000")
+        self.assertEqual(result["status"], "success")
+        hosts = result["scan_results"]["hosts"]
+        self.assertEqual(len(hosts), 14)
+        self.assertTrue(any(port["scripts"] for host in hosts for port in host["ports"]))
+
+    def test_emulated_failure_surfaces_as_error(self):
+        with fake_nmap({"error": "Falha simulada"}):
+            self.assertEqual(NmapGuardian.scan("10.1.0.0/30")["status"], "error")
+
+
+class TestFakeServers(unittest.TestCase):
+
+    def test_dirfuzz_against_fake_http(self):
+        with tempfile.TemporaryDirectory() as tmp, FakeHTTPServer(paths={"admin", "login"}) as http:
+            wordlist = os.path.join(tmp, "words.txt")
+            with open(wordlist, "w") as f:
+                f.write("\n".join(["admin", "nada", "login", "outra", "mais"]))
+            result = DirFuzzGuardian.scan(http.url, f"-w {wordlist} -t 3")
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(sorted(result["found"]), [f"200 - {http.url}/admin", f"200 - {http.url}/login"])
+        self.assertEqual((http.requests, http.hits), (5, 2))
+
+    def test_dns_guardian_against_fake_dns(self):
+        records = {("lab.test", "MX"): [{"name": "lab.test", "type": "MX", "ttl": 60,
+                                        "data": {"preference": 10, "exchange": "mx.lab.test"}}]}
+        with FakeDNSServer(records=records) as dns:
+            options = {"nameservers": ["127.0.0.1"], "port": dns.port, "use_cache": False, "timeout": 1.0}
+            results = DNSGuardian.run_bulk(["host258.lab.test", "nada.lab.test"], "A", **options)
+            mx = DNSGuardian.run_bulk(["lab.test"], "MX", **options)
+        self.assertEqual(results[0]["answers"][0]["data"], "10.0.1.2")
+        self.assertEqual(results[1]["rcode"], "NXDOMAIN")
+        self.assertEqual(mx[0]["answers"][0]["data"]["exchange"], "mx.lab.test")
+        self.assertEqual(dns.queries, 3)
+
+
+class TestLoadSuite(unittest.TestCase):
+
+    def test_suite_runs_all_scenarios(self):
+        logging.disable(logging.ERROR)
+        self.addCleanup(logging.disable, logging.NOTSET)
+        results = run_load_suite(hosts=[30], words=[40], names=[50], connections=[200], log_lines=[2000], repeat=1,
+                                 threads=4, target_exclusions=[500], target_shards=4096)
+        self.assertEqual({case["name"] for case in results.values()},
+                         {"nmap_guardian", "orchestrator", "dirfuzz", "dns", "honeypot", "ids", "targets"})
+        self.assertGreater(results["nmap_guardian/hosts=30"]["peak_memory_bytes"], 0)
+        self.assertGreater(results["dns/names=50"]["throughput_per_s"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
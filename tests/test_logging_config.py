@@ -0,0 +1,98 @@
+# tests/test_logging_config.py
+import gzip
+import io
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from shamann.core.logging_config import _QueueHandler, setup_logging, shutdown_logging
+
+
+def _log_in_child(message):
+    logging.getLogger("shamann.filho").warning(message)
+
+
+class TestLoggingConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(logging.getLogger().setLevel, logging.getLogger().level)
+        self.addCleanup(shutdown_logging)
+        self.stream = io.StringIO()
+        self.path = os.path.join(self.tmp.name, "logs", "shamann.log")
+
+    def queue_handlers(self):
+        return [handler for handler in logging.getLogger().handlers if isinstance(handler, _QueueHandler)]
+
+    def test_setup_is_idempotent(self):
+        first = setup_logging({"file": self.path}, stream=self.stream)
+        self.assertIs(setup_logging({"file": self.path}, stream=self.stream), first)
+        setup_logging({"file": self.path}, stream=self.stream, level="debug")
+        self.assertEqual(len(self.queue_handlers()), 1)
+        self.assertEqual(logging.getLogger().level, logging.DEBUG)
+        logging.getLogger("shamann.teste").debug("porta %d aberta", 22)
+        shutdown_logging()
+        self.assertEqual(self.queue_handlers(), [])
+        self.assertEqual(self.stream.getvalue().count("porta 22 aberta"), 1)
+        self.assertIsNotNone(logging._srcfile)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertIn("shamann.teste - DEBUG - porta 22 aberta", f.read())
+
+    def test_legacy_shim_keeps_configured_backend(self):
+        import core
+        listener = setup_logging({"file": self.path, "format": "json", "console": False})
+        logger = core.setup_logging("modulo.legado") # Não pode trocar o backend pelo padrão (só console)
+        logger.warning("ainda no arquivo")
+        self.assertEqual(len(self.queue_handlers()), 1)
+        self.assertIs(setup_logging({"file": self.path, "format": "json", "console": False}), listener)
+        shutdown_logging()
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(json.loads(f.readline())["message"], "ainda no arquivo")
+
+        core.setup_logging("modulo.legado") # Sem backend instalado: instala o padrão
+        self.assertEqual(len(self.queue_handlers()), 1)
+
+    def test_json_lines_with_extra_and_exception(self):
+        setup_logging({"file": self.path, "format": "json", "console": False, "caller_info": True})
+        logger = logging.getLogger("shamann.json")
+        logger.info("scan %s", "ok", extra={"target": "10.0.0.1"})
+        try:
+            raise ValueError("falhou")
+        except ValueError:
+            logger.exception("erro")
+        shutdown_logging()
+        with open(self.path, encoding="utf-8") as f:
+            first, second = [json.loads(line) for line in f]
+        self.assertEqual((first["message"], first["target"], first["level"]), ("scan ok", "10.0.0.1", "INFO"))
+        self.assertIn("ValueError: falhou", second["exc"])
+        self.assertTrue(first["source"].startswith("test_logging_config:"))
+
+    def test_size_rotation_compresses_archives(self):
+        setup_logging({"file": self.path, "console": False, "max_bytes": 200, "backup_count": 2, "compress": True})
+        logger = logging.getLogger("shamann.rotacao")
+        for i in range(20):
+            logger.warning("linha %d %s", i, "x" * 40)
+        shutdown_logging()
+        files = sorted(os.listdir(os.path.dirname(self.path)))
+        self.assertEqual(files, ["shamann.log", "shamann.log.1.gz", "shamann.log.2.gz"])
+        with gzip.open(self.path + ".1.gz", "rt", encoding="utf-8") as f:
+            self.assertIn("linha", f.read())
+
+    @unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "exige fork")
+    def test_forked_child_gets_its_own_listener(self):
+        setup_logging({"file": self.path, "console": False})
+        child = multiprocessing.get_context("fork").Process(target=_log_in_child, args=("do filho",))
+        child.start()
+        child.join(10)
+        self.assertEqual(child.exitcode, 0)
+        shutdown_logging()
+        with open(self.path, encoding="utf-8") as f:
+            self.assertIn("shamann.filho - WARNING - do filho", f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+# tests/test_metrics.py
+import os
+import tempfile
+import threading
+import unittest
+
+from shamann.core import metrics
+from shamann.core.metrics import MetricsRegistry
+from shamann.modules.base_guardian import BaseGuardian, ScanContext
+
+
+class HostGuardian(BaseGuardian):
+    @classmethod
+    def iter_scan(cls, target: str, options: str = "", context: ScanContext = None):
+        context = context or ScanContext(cls.name(), target)
+        yield context.result({"target": target, "status": "success",
+                              "hosts": [{"ip_address": "10.0.0.1", "ports": [{}, {}], "alerts": [{}]}]})
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_sums_thread_cells(self):
+        counter = self.registry.counter("test_requests_total", "Requisições.", ("outcome",))
+
+        def work():
+            for _ in range(1000):
+                counter.inc(outcome="hit")
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc(5, outcome='er"ro')
+        self.assertEqual(counter.value(outcome="hit"), 8000)
+        text = self.registry.render()
+        self.assertIn("# TYPE test_requests_total counter", text)
+        self.assertIn('test_requests_total{outcome="hit"} 8000', text)
+        self.assertIn('test_requests_total{outcome="er\\"ro"} 5', text)
+        with self.assertRaises(ValueError):
+            counter.inc(outcome="hit", extra="x")
+
+    def test_finished_threads_cells_are_folded(self):
+        counter = self.registry.counter("test_short_total", "Threads curtas.")
+        histogram = self.registry.histogram("test_short_seconds", "Threads curtas.", buckets=(1.0,))
+
+        def work():
+            counter.inc()
+            histogram.observe(0.5)
+
+        for _ in range(50):
+            threads = [threading.Thread(target=work) for _ in range(10)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertLessEqual(len(counter._cells), 11) # Threads encerradas não deixam célula para trás
+        self.assertLessEqual(len(histogram._cells), 11)
+        self.assertEqual(counter.value(), 500)
+        self.assertEqual(histogram.values()[()], ([500, 0], 250.0))
+        self.assertEqual((len(counter._cells), len(histogram._cells)), (0, 0))
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.registry.histogram("test_latency_seconds", "Latência.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        lines = self.registry.render().splitlines()
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 2', lines)
+        self.assertIn('test_latency_seconds_bucket{le="1"} 3', lines)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 4', lines)
+        self.assertIn("test_latency_seconds_sum 3.65", lines)
+        self.assertIn("test_latency_seconds_count 4", lines)
+
+    def test_gauge_function_and_textfile(self):
+        self.registry.gauge("test_queue_size", "Fila.").set_function(lambda: 7)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "shamann.prom")
+            self.registry.write_textfile(path)
+            with open(path) as f:
+                self.assertIn("test_queue_size 7", f.read())
+            self.assertEqual(os.listdir(tmp), ["shamann.prom"])
+
+    def test_guardian_stream_records_scan_metrics(self):
+        finished = metrics.SCANS_FINISHED.value(guardian="host", status="success")
+        ports = metrics.SCAN_PORTS.values().get(("host",), ([0], 0))[1]
+        HostGuardian.scan("alvo")
+        self.assertEqual(metrics.SCANS_FINISHED.value(guardian="host", status="success"), finished + 1)
+        self.assertEqual(metrics.SCAN_PORTS.values()[("host",)][1], ports + 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
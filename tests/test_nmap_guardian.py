@@ -0,0 +1,42 @@
+# tests/test_nmap_guardian.py
+import unittest
+
+from shamann.modules.nmap_guardian import NmapGuardian
+from shamann.modules.recon.dns_cache import get_dns_cache
+
+
+class RecordingScanner:
+    """Recebe a chamada que iria para o binário do Nmap, sem hosts no resultado."""
+
+    def __init__(self):
+        self.calls = []
+
+    def scan(self, hosts, ports=None, arguments=""):
+        self.calls.append(hosts)
+
+    def all_hosts(self):
+        return []
+
+
+class TestNmapTargets(unittest.TestCase):
+
+    def setUp(self):
+        cache = get_dns_cache()
+        self.addCleanup(cache.clear)
+        for qtype, addresses in (("A", ["10.0.0.7", "10.0.0.8"]), ("AAAA", ["2001:db8::7"])):
+            cache.put({"name": "app.example.test", "type": qtype, "status": "success", "rcode": "NOERROR",
+                       "answers": [{"name": "app.example.test", "type": qtype, "ttl": 300, "data": address}
+                                   for address in addresses]})
+
+    def test_hostnames_stay_on_the_command_line(self):
+        # O Nmap resolve e escaneia todos os endereços; o cache só pré-valida e registra
+        scanner = RecordingScanner()
+        guardian = NmapGuardian("app.example.test 10.0.0.9", scanner=scanner)
+        guardian.run_scan("-sT", "80", include_default_scripts=False)
+        self.assertEqual(scanner.calls, ["app.example.test 10.0.0.9"])
+        self.assertEqual(guardian.resolved_hostnames, {"10.0.0.7": "app.example.test", "10.0.0.8": "app.example.test",
+                                                       "2001:db8::7": "app.example.test"})
+
+
+if __name__ == "__main__":
+    unittest.main()
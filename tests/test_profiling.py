@@ -0,0 +1,77 @@
+# tests/test_profiling.py
+import json
+import os
+import pstats
+import tempfile
+import unittest
+
+from shamann.core.profiling import Profiler, collapsed_stacks, merge_profiles, stage
+from shamann.core.tracing import Tracer, span
+
+
+def inner():
+    return sum(i * i for i in range(20000))
+
+
+def outer():
+    return [inner() for _ in range(3)]
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_whole_run_writes_files_and_hotspots(self):
+        with Profiler(self.tmp.name, label="teste") as profiler:
+            outer()
+        self.assertEqual(list(profiler.results), ["run"])
+        self.assertTrue(any(row["function"].startswith("<genexpr>") for row in profiler.hotspots()))
+        files = sorted(os.listdir(self.tmp.name))
+        self.assertEqual(files, ["teste.run.collapsed", "teste.run.pstats", "teste.summary.json"])
+        self.assertIn("inner", str(pstats.Stats(os.path.join(self.tmp.name, "teste.run.pstats")).stats))
+        with open(os.path.join(self.tmp.name, "teste.summary.json")) as f:
+            self.assertEqual(json.load(f)["stages"]["run"]["calls"], 1)
+        self.assertIn("Hotspots", profiler.report())
+
+    def test_stages_follow_spans_without_tracer(self):
+        with Profiler(self.tmp.name, stages=["work.*"], label="etapas") as profiler:
+            for _ in range(2):
+                with span("work.outer"):
+                    with span("work.nested"):
+                        outer()
+            with span("other"):
+                inner()
+        self.assertEqual(profiler.results["work.outer"]["calls"], 2)
+        self.assertEqual(profiler.skipped, {"work.nested": 2})
+        self.assertNotIn("other", profiler.results)
+
+    def test_stage_helper_and_memory(self):
+        with Tracer("teste"), Profiler(self.tmp.name, stages=["guardian.*"], memory_top=3, label="mem") as profiler:
+            with stage("guardian.eco"):
+                kept = [bytearray(1024) for _ in range(200)]
+            with stage("ignorado"):
+                inner()
+        self.assertEqual(list(profiler.results), ["guardian.eco"])
+        memory = profiler.memory_hotspots("guardian.eco")
+        self.assertGreaterEqual(memory[0]["size_bytes"], 200 * 1024)
+        self.assertIn("test_profiling.py", memory[0]["location"])
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "mem.guardian.eco.memory.txt")))
+        del kept
+
+    def test_collapsed_stacks_and_merge(self):
+        with Profiler(self.tmp.name, label="a") as first:
+            outer()
+        with Profiler(self.tmp.name, label="b"):
+            outer()
+        stacks = collapsed_stacks(first.results["run"]["stats"])
+        self.assertTrue(any(stack.startswith("outer (test_profiling.py") and stack.split(";")[-1].startswith("inner (")
+                            for stack in stacks))
+        merged = merge_profiles([os.path.join(self.tmp.name, f"{label}.run.pstats") for label in "ab"])
+        calls = next(value[1] for func, value in merged.stats.items() if func[2] == "outer")
+        self.assertEqual(calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
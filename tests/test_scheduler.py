@@ -0,0 +1,51 @@
+# tests/test_scheduler.py
+import unittest
+from datetime import datetime, timedelta
+
+from shamann.core.scheduler import CronSchedule, ScheduledJob, Scheduler, ScheduleError
+
+
+class TestCronSchedule(unittest.TestCase):
+
+    def test_next_after(self):
+        start = datetime(2026, 3, 6, 10, 7, 30) # sexta-feira
+        self.assertEqual(CronSchedule("*/15 * * * *").next_after(start), datetime(2026, 3, 6, 10, 15))
+        self.assertEqual(CronSchedule("0 2 * * *").next_after(start), datetime(2026, 3, 7, 2, 0))
+        self.assertEqual(CronSchedule("30 8 * * 1-5").next_after(start), datetime(2026, 3, 9, 8, 30)) # segunda
+        self.assertEqual(CronSchedule("0 0 * * 7").next_after(start), datetime(2026, 3, 8, 0, 0)) # 7 = domingo
+        self.assertEqual(CronSchedule("@monthly").next_after(start), datetime(2026, 4, 1, 0, 0))
+        self.assertEqual(CronSchedule("@every 90s").next_after(start), start + timedelta(seconds=90))
+        # Dia do mês e dia da semana restritos: basta um dos dois
+        self.assertEqual(CronSchedule("0 0 13 * 5").next_after(start), datetime(2026, 3, 13, 0, 0))
+
+    def test_invalid_expressions(self):
+        for expression in ("* * *", "61 * * * *", "0 0 30 2 *", "@every 0m", "*/0 * * * *"):
+            with self.assertRaises(ScheduleError, msg=expression):
+                CronSchedule(expression).next_after(datetime(2026, 1, 1))
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_overlap_is_skipped_and_jitter_bounded(self):
+        submitted = []
+        job = ScheduledJob("scan", "@every 60s", {"guardian": "dns", "target": "a.test"}, jitter_seconds=10)
+        scheduler = Scheduler([job], lambda spec, on_done: submitted.append((spec, on_done)))
+        now = datetime(2026, 1, 1, 12, 0)
+        job.next_run = now
+
+        self.assertEqual(scheduler.run_pending(now), ["scan"])
+        self.assertTrue(now + timedelta(seconds=60) <= job.next_run <= now + timedelta(seconds=70))
+        self.assertEqual(submitted[0][0]["scheduled_job"], "scan")
+
+        # Ainda em execução quando vence de novo: a rodada é pulada
+        self.assertEqual(scheduler.run_pending(job.next_run), [])
+        self.assertEqual(job.skipped, 1)
+
+        submitted[0][1]("success")
+        self.assertEqual(scheduler.run_pending(job.next_run), ["scan"])
+        self.assertEqual(job.runs, 2)
+        self.assertEqual(job.last_status, "success")
+
+
+if __name__ == '__main__':
+    unittest.main()
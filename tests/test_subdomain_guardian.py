@@ -0,0 +1,111 @@
+# tests/test_subdomain_guardian.py
+import os
+import socketserver
+import struct
+import tempfile
+import threading
+import time
+import unittest
+
+from benchmarks.fake_nmap import fake_nmap
+from shamann.modules.recon.dns import build_response, _decode_name
+from shamann.modules.subdomain_guardian import SubdomainGuardian
+
+EXISTING = {"www": "10.0.0.1", "mail": "10.0.0.2", "vpn": "10.0.0.3"}
+
+
+class ZoneHandler(socketserver.BaseRequestHandler):
+    """Responde A para EXISTING em good.test e para qualquer nome em wild.test (wildcard 10.6.6.6, exceto www)."""
+
+    def handle(self):
+        query, sock = self.request
+        name, _ = _decode_name(query, 12)
+        label, _, zone = name.partition(".")
+        if zone == "good.test" and label in EXISTING:
+            answers = [{"name": name, "type": "A", "ttl": 60, "data": EXISTING[label]}]
+        elif zone == "wild.test":
+            answers = [{"name": name, "type": "A", "ttl": 60, "data": "10.0.0.1" if label == "www" else "10.6.6.6"}]
+        else:
+            sock.sendto(build_response(query, rcode="NXDOMAIN"), self.client_address)
+            return
+        sock.sendto(build_response(query, answers), self.client_address)
+
+
+class TestSubdomainGuardian(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = socketserver.ThreadingUDPServer(("127.0.0.1", 0), ZoneHandler)
+        cls.nameserver = ("127.0.0.1", cls.server.server_address[1])
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.words = ["www", "mail", "vpn"] + [f"w{i}" for i in range(500)]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_enumerate_finds_existing_hosts(self):
+        found = []
+        summary = SubdomainGuardian.enumerate("good.test", iter(self.words), found.append, concurrency=50,
+                                              timeout=1.0, nameservers=[self.nameserver])
+        self.assertEqual(sorted(h["hostname"] for h in found), ["mail.good.test", "vpn.good.test", "www.good.test"])
+        self.assertFalse(summary["wildcard"]["detected"])
+        self.assertEqual(summary["stats"]["candidates"], len(self.words))
+
+    def test_wildcard_answers_are_filtered(self):
+        found = []
+        summary = SubdomainGuardian.enumerate("wild.test", iter(self.words), found.append, concurrency=50,
+                                              timeout=1.0, nameservers=[self.nameserver])
+        self.assertTrue(summary["wildcard"]["detected"])
+        self.assertEqual([h["hostname"] for h in found], ["www.wild.test"])
+        self.assertEqual(summary["stats"]["wildcard_filtered"], len(self.words) - 1)
+
+    def test_iter_subdomains_streams_hosts(self):
+        hosts = list(SubdomainGuardian.iter_subdomains("good.test", iter(["www", "mail", "nada"]), concurrency=10,
+                                                       timeout=1.0, nameservers=[self.nameserver]))
+        self.assertEqual(sorted(h["addresses"][0] for h in hosts), ["10.0.0.1", "10.0.0.2"])
+
+    def test_run_scan_with_wordlist_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wordlist = os.path.join(tmp, "words.txt")
+            with open(wordlist, "w") as f:
+                f.write("# comentário\nwww\n\nmail\nnada\n")
+            result = SubdomainGuardian.run_scan(
+                "good.test", f"-w {wordlist} -c 10 --timeout 1 --nameserver 127.0.0.1:{self.nameserver[1]}")
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(sorted(h["hostname"] for h in result["found"]), ["mail.good.test", "www.good.test"])
+        self.assertEqual(result["stats"]["candidates"], 3)
+
+    def test_stream_yields_partials_then_result(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            wordlist = os.path.join(tmp, "words.txt")
+            with open(wordlist, "w") as f:
+                f.write("www\nmail\nnada\n")
+            events = list(SubdomainGuardian.stream(
+                "good.test", f"-w {wordlist} -c 10 --timeout 1 --nameserver 127.0.0.1:{self.nameserver[1]}"))
+        partials = [e["data"]["hostname"] for e in events if e["event"] == "partial"]
+        self.assertEqual(sorted(partials), ["mail.good.test", "www.good.test"])
+        self.assertEqual(events[-1]["event"], "result")
+        self.assertEqual(len(events[-1]["result"]["found"]), 2)
+
+    def test_cancel_does_not_wait_for_nmap_batches(self):
+        # Cancelado, o feeder não inicia lotes novos e a espera pelo Nmap em andamento é limitada
+        cancel = threading.Event()
+        with tempfile.TemporaryDirectory() as tmp, fake_nmap({"startup_latency": 5.0}):
+            wordlist = os.path.join(tmp, "words.txt")
+            with open(wordlist, "w") as f:
+                f.write("www\nmail\nvpn\n")
+            options = (f"-w {wordlist} -c 1 --timeout 1 --nameserver 127.0.0.1:{self.nameserver[1]} "
+                       "--nmap --nmap-batch 1")
+            started = time.monotonic()
+            for event in SubdomainGuardian.stream("good.test", options, cancel_event=cancel):
+                if event["event"] == "partial":
+                    time.sleep(0.2) # O primeiro lote do Nmap já começou
+                    cancel.set()
+            elapsed = time.monotonic() - started
+        self.assertEqual(event["result"]["status"], "cancelled")
+        self.assertLess(elapsed, 4.0) # Antes: um Nmap de 5s por host encontrado
+
+if __name__ == '__main__':
+    unittest.main()
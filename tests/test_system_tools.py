@@ -0,0 +1,70 @@
+# tests/test_system_tools.py
+import os
+import socket
+import tempfile
+import time
+import unittest
+
+from shamann.modules.system_tools import remove_stale_entries
+
+OLD = time.time() - 3 * 86400
+
+
+class TestRemoveStaleEntries(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = self.tmp.name
+
+    def make(self, *parts, old=True, directory=False):
+        path = os.path.join(self.root, *parts)
+        if directory:
+            os.makedirs(path, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write("x")
+        if old:
+            os.utime(path, (OLD, OLD))
+        return path
+
+    def age_dirs(self, *paths):
+        for path in paths: # Criar os filhos atualizou a data dos diretórios
+            os.utime(os.path.join(self.root, path), (OLD, OLD))
+
+    def test_old_directory_with_fresh_file_is_kept(self):
+        fresh = self.make("build", "obj", "live.o", old=False)
+        stale = self.make("build", "obj", "old.o")
+        self.age_dirs("build/obj", "build")
+        self.assertEqual(remove_stale_entries([self.root], 86400), 1)
+        self.assertTrue(os.path.exists(fresh))
+        self.assertFalse(os.path.exists(stale))
+
+    def test_stale_tree_is_pruned_bottom_up(self):
+        self.make("velho", "a", "b.txt")
+        self.make("velho", "c.txt")
+        self.make("vazio", directory=True)
+        self.age_dirs("velho/a", "velho")
+        self.assertEqual(remove_stale_entries([self.root], 86400), 5) # 2 arquivos + 3 diretórios
+        self.assertEqual(os.listdir(self.root), [])
+
+    def test_sockets_and_protected_directories_stay(self):
+        os.makedirs(os.path.join(self.root, "sockets"))
+        sock_path = os.path.join(self.root, "sockets", "agent.sock")
+        server = socket.socket(socket.AF_UNIX)
+        self.addCleanup(server.close)
+        server.bind(sock_path)
+        os.utime(sock_path, (OLD, OLD), follow_symlinks=False)
+        self.make("systemd-private-abc-nginx.service-x", "tmp", "cache")
+        self.make(".X11-unix", "X0")
+        self.age_dirs("sockets", "systemd-private-abc-nginx.service-x/tmp", "systemd-private-abc-nginx.service-x",
+                      ".X11-unix")
+        self.assertEqual(remove_stale_entries([self.root], 86400), 0)
+        self.assertTrue(os.path.exists(sock_path))
+        self.assertEqual(sorted(os.listdir(self.root)),
+                         [".X11-unix", "sockets", "systemd-private-abc-nginx.service-x"])
+
+
+if __name__ == "__main__":
+    unittest.main()
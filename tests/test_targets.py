@@ -0,0 +1,64 @@
+# tests/test_targets.py
+import os
+import tempfile
+import unittest
+
+from shamann.core.targets import IntervalSet, Permutation, TargetError, TargetSet
+
+
+class TestTargetSet(unittest.TestCase):
+
+    def test_forms_are_merged_and_deduplicated(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write("# alvos\n10.0.0.200\n10.0.1.0/25  # comentário\nscanme.example.org\n")
+        self.addCleanup(os.remove, f.name)
+        targets = TargetSet.parse(f"10.0.0.1-20, 10.0.0.5 10.0.0.0/28 10.0.0.21-10.0.0.22 {f.name} "
+                                  "2001:db8::/126 scanme.example.org 10.0.2-3.*")
+        self.assertEqual(targets.summary(), {"addresses": 23 + 1 + 128 + 512 + 4, "ipv4": 664, "ipv6": 4,
+                                             "hostnames": 1, "intervals": 5})
+        self.assertEqual(targets.to_nmap()[:4], ["10.0.0.0/28", "10.0.0.16/30", "10.0.0.20", "10.0.0.21"])
+        self.assertIn("10.0.3.255", targets)
+        self.assertNotIn("10.0.0.23", targets)
+        for invalid in ("10.0.0.300", "10.0.0.20-10.0.0.1", "10.0.0.0/33", "10.0.0.1-2001:db8::1", "*.*.*.*"):
+            with self.assertRaises(TargetError):
+                TargetSet.parse(invalid)
+
+    def test_large_network_with_exclusions(self):
+        exclude = [f"10.{block >> 8}.{block & 255}.0/24" for block in range(0, 65536, 16)] + ["10.255.255.255"]
+        targets = TargetSet.parse("10.0.0.0/8", exclude=exclude + ["10.0.0.0/24"]) # Repetida: sem efeito
+        self.assertEqual(targets.size, 2 ** 24 - 4096 * 256 - 1)
+        self.assertEqual(len(targets.ipv4.starts), 4096) # Memória proporcional às exclusões, não aos endereços
+        self.assertNotIn("10.0.16.7", targets)
+        self.assertEqual(targets.at(0), "10.0.1.0")
+        self.assertEqual(targets.at(targets.size - 1), "10.255.255.254")
+
+    def test_random_order_is_a_reproducible_permutation(self):
+        for size in (1, 2, 5, 1000, 4099):
+            self.assertEqual(sorted(Permutation(size, seed=3)), list(range(size)))
+        targets = TargetSet.parse("10.0.0.0/22,2001:db8::/122", exclude="10.0.1.0/24")
+        first = list(targets.addresses("random", seed=11))
+        self.assertEqual(first, list(targets.addresses("random", seed=11)))
+        self.assertNotEqual(first, list(targets.addresses("random", seed=12)))
+        self.assertEqual(sorted(first), sorted(targets.addresses()))
+        self.assertNotEqual(first, list(targets.addresses()))
+        # Fatias da mesma ordem: disjuntas, cobrem tudo e na mesma sequência
+        shards = [list(targets.addresses("random", seed=11, shard=(i, 3))) for i in range(3)]
+        self.assertEqual(sum(shards, []), first)
+
+    def test_shards_are_balanced(self):
+        targets = TargetSet.parse("10.0.0.0/24,10.0.2.0/30,2001:db8::1,a.test,b.test", exclude="10.0.0.128/27")
+        shards = targets.shards(4)
+        self.assertEqual([shard.size for shard in shards], [57, 57, 57, 58])
+        self.assertEqual(sorted(sum((list(shard.addresses()) for shard in shards), [])), sorted(targets.addresses()))
+        self.assertEqual([shard.names for shard in shards], [("a.test",), ("b.test",), (), ()])
+        self.assertEqual([chunk.size for chunk in targets.chunks(100)], [100, 100, 29])
+
+    def test_interval_subtraction(self):
+        base = IntervalSet([(0, 9), (20, 29), (40, 49)])
+        result = base.subtract(IntervalSet([(5, 24), (26, 26), (45, 100)]))
+        self.assertEqual(list(result.intervals()), [(0, 4), (25, 25), (27, 29), (40, 44)])
+        self.assertEqual(list(base.slice(8, 22).intervals()), [(8, 9), (20, 29), (40, 41)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+# tests/test_tasks.py
+import sys
+import threading
+import time
+import unittest
+
+from shamann.core.tasks import Task, TaskError, run_tasks, with_dependencies
+from shamann.modules.shamann_guardian import ShamannGuardian
+
+
+def _python(code: str) -> list:
+    return [sys.executable, "-c", code]
+
+
+class TestRunTasks(unittest.TestCase):
+
+    def test_independent_tasks_run_concurrently(self):
+        tasks = [Task(f"dorme{i}", _python("import time; time.sleep(0.5)"), timeout=10) for i in range(4)]
+        sweep = run_tasks(tasks)
+        self.assertEqual(sweep["status"], "success")
+        self.assertLess(sweep["elapsed"], 1.5)
+        self.assertGreater(sweep["busy_seconds"], 1.9)
+
+    def test_dependencies_order_and_skip(self):
+        sweep = run_tasks([
+            Task("depois", _python("print('b')"), depends_on=["antes"]),
+            Task("antes", _python("import time; time.sleep(0.2); print('a')")),
+            Task("falha", _python("import sys; sys.exit(3)")),
+            Task("pulada", func=lambda: "nunca", depends_on=["falha"]),
+        ])
+        tasks = sweep["tasks"]
+        self.assertGreaterEqual(tasks["depois"]["started"], tasks["antes"]["started"] + tasks["antes"]["duration"] - 0.01)
+        self.assertEqual(tasks["depois"]["stdout"], "b")
+        self.assertEqual((tasks["falha"]["status"], tasks["falha"]["returncode"]), ("error", 3))
+        self.assertEqual(tasks["pulada"]["status"], "skipped")
+        self.assertEqual((sweep["status"], sorted(sweep["failed"])), ("error", ["falha", "pulada"]))
+
+    def test_timeout_kills_and_output_is_capped(self):
+        sweep = run_tasks([
+            Task("lenta", _python("import time; time.sleep(30)"), timeout=0.3),
+            Task("verbosa", _python("print('x' * 100000)"), max_output=1000),
+            Task("inexistente", ["/nao/existe/shamann"]),
+        ])
+        tasks = sweep["tasks"]
+        self.assertEqual(tasks["lenta"]["status"], "timeout")
+        self.assertLess(tasks["lenta"]["duration"], 5)
+        self.assertEqual(len(tasks["verbosa"]["stdout"]), 1000)
+        self.assertTrue(tasks["verbosa"]["truncated"])
+        self.assertGreater(tasks["verbosa"]["stdout_bytes"], 100000)
+        self.assertEqual(tasks["inexistente"]["status"], "error")
+
+    def test_invalid_graphs(self):
+        with self.assertRaises(TaskError):
+            run_tasks([Task("a", func=int, depends_on=["b"]), Task("b", func=int, depends_on=["a"])])
+        with self.assertRaises(TaskError):
+            run_tasks([Task("a", func=int, depends_on=["c"])])
+        with self.assertRaises(TaskError):
+            Task("shell", "rm -rf /tmp/*")
+        selected = with_dependencies(ShamannGuardian.maintenance_tasks(), ["apt_upgrade"])
+        self.assertEqual([task.name for task in selected], ["apt_update", "apt_upgrade"])
+
+    def test_cancel_event_stops_running_and_pending(self):
+        cancel = threading.Event()
+        threading.Timer(0.3, cancel.set).start()
+        started = time.monotonic()
+        sweep = run_tasks([
+            Task("longa", _python("import time; time.sleep(30)"), timeout=60),
+            Task("seguinte", _python("print('nunca')"), depends_on=["longa"]),
+        ], cancel_event=cancel)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(sweep["status"], "cancelled")
+        self.assertEqual([task["status"] for task in sweep["tasks"].values()], ["cancelled", "cancelled"])
+
+    def test_guardian_options(self):
+        result = ShamannGuardian.scan("", "--tasks check_disk --timeout 20")
+        self.assertEqual(list(result["tasks"]), ["check_disk"])
+        self.assertNotIn("apt_update", result)
+        self.assertEqual(ShamannGuardian.scan("", "--tasks nada")["status"], "error")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+# tests/test_telemetry.py
+import os
+import tempfile
+import time
+import unittest
+
+from shamann.core.metrics import REGISTRY
+from shamann.core.telemetry import RingBuffer, TelemetryCollector, parse_net_dev
+
+NET_DEV = """Inter-|   Receive                                                |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed
+    lo: {lo} 10 0 0 0 0 0 0 {lo} 10 0 0 0 0 0 0
+  eth0: {rx} 20 0 0 0 0 0 0 {tx} 30 0 0 0 0 0 0
+"""
+
+
+class TestRingBuffer(unittest.TestCase):
+
+    def test_wraps_around_and_keeps_missing_values(self):
+        buffer = RingBuffer(("timestamp", "valor"), capacity=3)
+        self.assertIsNone(buffer.latest())
+        for i in range(5):
+            buffer.append({"timestamp": i, "valor": None if i == 3 else i * 10})
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual([row["timestamp"] for row in buffer.rows()], [2, 3, 4])
+        self.assertEqual([row["valor"] for row in buffer.rows()], [20, None, 40])
+        self.assertEqual(buffer.rows(limit=1), [buffer.latest()])
+        self.assertEqual(buffer.nbytes(), 2 * 3 * 8)
+
+
+class TestTelemetryCollector(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        os.mkdir(os.path.join(self.tmp.name, "net"))
+        self.collector = TelemetryCollector(interval=0.02, capacity=10, disks=[self.tmp.name, "/nao/existe"],
+                                            proc_root=self.tmp.name)
+        self.addCleanup(self.collector.stop)
+
+    def write_proc(self, busy, idle, rx, tx):
+        files = {"stat": f"cpu  {busy} 0 0 {idle} 0 0 0 0 0 0\ncpu0 {busy} 0 0 {idle} 0 0 0 0 0 0\n",
+                 "meminfo": "MemTotal:        1000 kB\nMemFree:          100 kB\nMemAvailable:     250 kB\n",
+                 "net/dev": NET_DEV.format(lo=999999, rx=rx, tx=tx)}
+        for name, content in files.items():
+            with open(os.path.join(self.tmp.name, name), "w") as f:
+                f.write(content)
+
+    def test_rates_between_samples(self):
+        self.write_proc(busy=100, idle=300, rx=1000, tx=500)
+        first = self.collector.sample()
+        self.assertEqual((first["cpu_percent"], first["mem_used_percent"]), (25.0, 75.0))
+        self.assertEqual(first["mem_total_bytes"], 1024000)
+        self.assertNotIn("net_rx_bytes_per_s", first)
+        self.assertGreater(first[f"disk_total_bytes:{self.tmp.name}"], 0)
+
+        time.sleep(0.1)
+        self.write_proc(busy=190, idle=310, rx=1000 + 5000, tx=0) # Contador de envio zerado
+        second = self.collector.sample()
+        self.assertEqual(second["cpu_percent"], 90.0)
+        self.assertGreater(second["net_rx_bytes_per_s"], 5000) # ~50 kB/s; lo fica de fora
+        self.assertEqual(second["net_tx_bytes_per_s"], 0)
+        self.assertEqual(REGISTRY.get("shamann_host_cpu_percent").value(), 90.0)
+
+        summary = self.collector.summary()
+        self.assertEqual(summary["samples"], 2)
+        self.assertEqual(summary["stats"]["cpu_percent"], {"min": 25.0, "avg": 57.5, "max": 90.0})
+        self.assertNotIn("disk_used_percent:/nao/existe", summary["stats"])
+        self.assertEqual(self.collector.latest(), summary["latest"])
+
+    def test_background_thread_and_parsing(self):
+        self.assertEqual(parse_net_dev(NET_DEV.format(lo=1, rx=2, tx=3)), {"lo": (1, 1), "eth0": (2, 3)})
+        self.write_proc(busy=1, idle=1, rx=0, tx=0)
+        self.collector.start()
+        for _ in range(250):
+            if len(self.collector.buffer) >= 3:
+                break
+            time.sleep(0.02)
+        self.collector.stop()
+        self.assertGreaterEqual(len(self.collector.history()), 3)
+        self.assertEqual(self.collector.info()["errors"], 0)
+        self.assertFalse(self.collector.info()["running"])
+
+
+if __name__ == "__main__":
+    unittest.main()
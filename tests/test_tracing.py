@@ -0,0 +1,73 @@
+# tests/test_tracing.py
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from shamann.core.tracing import NOOP_SPAN, Tracer, current_span, span, traced
+from shamann.main import run_shamann_orchestrator
+from shamann.persistence.db_manager import DBManager
+
+
+class TestTracing(unittest.TestCase):
+
+    def test_disabled_is_noop(self):
+        self.assertIs(span("x"), NOOP_SPAN)
+        self.assertIs(current_span().count("hosts"), NOOP_SPAN)
+        self.assertEqual(traced("f")(lambda: 42)(), 42)
+
+    def test_nested_spans_and_summary(self):
+        with Tracer("run") as tracer:
+            with span("stage", kind="a") as outer:
+                outer.count("hosts", 2)
+                with span("inner"):
+                    current_span().count("rules_evaluated", 5)
+            traced("stage")(lambda: None)()
+        spans = {s["name"]: s for s in tracer.to_dict()["spans"]}
+        self.assertEqual(spans["inner"]["parent_id"], spans["run"]["id"] + 1)
+        self.assertEqual(spans["inner"]["counts"], {"rules_evaluated": 5})
+        summary = tracer.summary()["stages"]
+        self.assertEqual(summary["stage"]["calls"], 2)
+        self.assertEqual(summary["stage"]["counts"], {"hosts": 2})
+        self.assertIs(span("depois"), NOOP_SPAN)
+
+    def test_exports(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with Tracer("run") as tracer:
+                with span("stage"):
+                    pass
+            tracer.export_chrome_trace(os.path.join(tmp, "t.chrome.json"))
+            with open(os.path.join(tmp, "t.chrome.json")) as f:
+                events = json.load(f)["traceEvents"]
+            self.assertEqual({e["name"] for e in events}, {"run", "stage"})
+            self.assertTrue(all(e["ph"] == "X" and e["dur"] >= 0 for e in events))
+
+            db = DBManager(os.path.join(tmp, "shamann.db"))
+            tracer.log_summary(db)
+            conn = db._connect()
+            source, details = conn.execute("SELECT source, details_json FROM internal_logs").fetchone()
+            conn.close()
+            self.assertEqual(source, "tracing")
+            self.assertIn("stage", json.loads(details)["stages"])
+
+    def test_orchestrator_trace(self):
+        host = {"ip_address": "10.0.0.1", "hostname": "h", "status": "up", "os_match": "Linux",
+                "ports": [{"port_id": 22, "protocol": "tcp", "state": "open", "name": "ssh"}]}
+        with tempfile.TemporaryDirectory() as tmp, mock.patch("shamann.main.NmapGuardian.__init__", return_value=None), \
+                mock.patch("shamann.main.NmapGuardian.run_scan", return_value={"hosts": [host]}):
+            config = {"scan_profile": {"target": "10.0.0.1"},
+                      "alert_rules": [{"condition": "port_id == 22", "level": "LOW", "type": "SSH"}],
+                      "tracing": {"enabled": True, "output_directory": tmp, "formats": ["json"]}}
+            self.assertIsNotNone(run_shamann_orchestrator(config=config, write_reports=False))
+            trace_files = [name for name in os.listdir(tmp) if name.endswith(".json")]
+            self.assertEqual(len(trace_files), 1)
+            with open(os.path.join(tmp, trace_files[0])) as f:
+                spans = {s["name"]: s for s in json.load(f)["spans"]}
+        self.assertIn("load_config", spans)
+        self.assertEqual(spans["nmap.scan"]["counts"], {"hosts": 1, "ports": 1})
+        self.assertEqual(spans["classify_alerts"]["counts"]["rules_evaluated"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+# tests/test_vuln_index.py
+import json
+import os
+import tempfile
+import unittest
+
+from shamann.modules.nmap_guardian import NmapGuardian
+from shamann.modules.vuln_index import VulnIndex, parse_cpe, version_key
+
+NVD_FEED = {
+    "vulnerabilities": [
+        {"cve": {
+            "id": "CVE-2021-41773",
+            "descriptions": [{"lang": "en", "value": "Path traversal in Apache HTTP Server 2.4.49."}],
+            "metrics": {"cvssMetricV31": [{"cvssData": {"baseScore": 7.5, "baseSeverity": "HIGH"}}]},
+            "configurations": [{"nodes": [{"cpeMatch": [
+                {"vulnerable": True, "criteria": "cpe:2.3:a:apache:http_server:2.4.49:*:*:*:*:*:*:*"}]}]}],
+        }},
+        {"cve": {
+            "id": "CVE-2023-38408",
+            "descriptions": [{"lang": "en", "value": "OpenSSH ssh-agent remote code execution."}],
+            "metrics": {"cvssMetricV31": [{"cvssData": {"baseScore": 9.8, "baseSeverity": "CRITICAL"}}]},
+            "configurations": [{"nodes": [{"cpeMatch": [
+                {"vulnerable": True, "criteria": "cpe:2.3:a:openbsd:openssh:*:*:*:*:*:*:*:*",
+                 "versionStartIncluding": "5.5", "versionEndExcluding": "9.3"}]}]}],
+        }},
+    ]
+}
+
+JSONL_FEED = "\n".join(json.dumps(entry) for entry in [
+    {"cve": "CVE-2099-0001", "vendor": "openbsd", "product": "openssh", "version_start": "7.0",
+     "version_end": "7.4", "version_end_incl": True, "severity": "medium", "score": 5.0, "summary": "Teste"},
+])
+
+
+class TestVulnIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_version_key_and_cpe_parsing(self):
+        self.assertLess(version_key("2.4.5"), version_key("2.4.49"))
+        self.assertLess(version_key("1.1.1"), version_key("1.1.1k"))
+        self.assertEqual(parse_cpe("cpe:/a:openbsd:openssh:7.4"), ("openbsd", "openssh", "7.4"))
+        self.assertEqual(parse_cpe("cpe:2.3:a:apache:http_server:2.4.49:*:*:*:*:*:*:*")[:2], ("apache", "http_server"))
+
+    def test_nvd_feed_ranges_and_exact_versions(self):
+        index = VulnIndex.load(self.write("nvd.json", json.dumps(NVD_FEED)))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "nvd.json.shvdb")))
+        self.assertEqual([v["cve"] for v in index.match("apache", "http_server", "2.4.49")], ["CVE-2021-41773"])
+        self.assertEqual(index.match("apache", "http_server", "2.4.50"), [])
+        self.assertEqual(index.match("openbsd", "openssh", "5.5")[0]["severity"], "CRITICAL")
+        self.assertEqual(index.match("openbsd", "openssh", "9.3"), []) # Fim exclusivo
+        self.assertEqual(index.match("openbsd", "openssh", "5.4"), [])
+        # Sem CPE, o produto informado pelo Nmap é usado
+        self.assertEqual(index.match_service(None, "OpenSSH", "8.9p1 Ubuntu")[0]["cve"], "CVE-2023-38408")
+
+    def test_jsonl_feed_inclusive_end(self):
+        index = VulnIndex.load(self.write("feed.jsonl", JSONL_FEED))
+        self.assertEqual([v["cve"] for v in index.match_service("cpe:/a:openbsd:openssh:7.4")], ["CVE-2099-0001"])
+        self.assertEqual(index.match_service("cpe:/a:openbsd:openssh:7.5"), [])
+
+    def test_classify_alerts_adds_cve_alerts(self):
+        index = VulnIndex.load(self.write("nvd.json", json.dumps(NVD_FEED)))
+        port = {"port_id": 22, "protocol": "tcp", "state": "open", "service_name": "ssh", "service_product": "OpenSSH",
+                "service_version": "7.4", "extrainfo": "", "cpe": "cpe:/a:openbsd:openssh:7.4", "scripts": {}}
+        results = {"hosts": [{"ip_address": f"10.0.0.{i}", "hostname": "", "status": "up", "os_match": "Linux",
+                              "os_accuracy": "90", "vendor": "", "ports": [dict(port)]} for i in range(3)]}
+        guardian = NmapGuardian.__new__(NmapGuardian) # Sem scanner: só a classificação é usada
+        guardian.classify_alerts_with_rules(results, [], vuln_index=index)
+        for host in results["hosts"]:
+            self.assertEqual([a["type"] for a in host["alerts"]], ["Vulnerabilidade Conhecida (CVE-2023-38408)"])
+            self.assertEqual(host["alerts"][0]["level"], "CRITICAL")
+
+
+    def test_many_unbounded_ranges(self):
+        # Milhares de faixas "até a versão X" (sem início): a consulta não pode percorrer todas
+        lines = [{"cve": f"CVE-2000-{i:05d}", "vendor": "acme", "product": "server", "version_end": f"1.{i}",
+                  "score": i % 10} for i in range(4000)]
+        lines += [{"cve": f"CVE-2001-{i:05d}", "vendor": "acme", "product": "server", "version_start": f"{i % 7}.0",
+                   "version_end": f"{i % 7}.{i % 50}", "version_end_incl": i % 2 == 0} for i in range(1000)]
+        data = VulnIndex.compile(self.write("many.jsonl", "\n".join(json.dumps(line) for line in lines)))
+        starts, start_incl, ends, end_incl, cve_ids = data["ranges"]["acme:server"]
+
+        def brute_force(version):
+            key_v = version_key(version)
+            return {cve_ids[i] for i in range(len(starts))
+                    if (starts[i] < key_v or (starts[i] == key_v and start_incl[i]))
+                    and (key_v < ends[i] or (key_v == ends[i] and end_incl[i]))}
+
+        class CountingTuple(tuple):
+            reads = 0
+
+            def __getitem__(self, i):
+                CountingTuple.reads += 1
+                return tuple.__getitem__(self, i)
+
+        data["ranges"]["acme:server"] = (starts, start_incl, CountingTuple(ends), end_incl, cve_ids)
+        index = VulnIndex(data)
+        for version in ("0.5", "1.3990", "1.4000", "2.0", "2.10", "3.49", "5.0", "6.48", "9.9"):
+            self.assertEqual({v["cve"] for v in index.match("acme", "server", version)}, brute_force(version), version)
+        CountingTuple.reads = 0
+        self.assertEqual(len(index.match("acme", "server", "1.3998")), 1)
+        self.assertLess(CountingTuple.reads, 200) # Antes: ~4000 faixas examinadas
+
+if __name__ == '__main__':
+    unittest.main()
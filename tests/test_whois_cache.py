@@ -0,0 +1,81 @@
+# tests/test_whois_cache.py
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from shamann.persistence.whois_cache import WhoisCache, normalize_whois_record
+from shamann.modules.whois_guardian import WhoisGuardian
+
+
+class TestWhoisCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "whois.db")
+        self.cache = WhoisCache(self.db_path, ttl_seconds=60)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_normalize_record(self):
+        record = normalize_whois_record({"domain_name": "EXAMPLE.COM", "creation_date": datetime(1995, 8, 14),
+                                         "name_servers": {"b.iana-servers.net", "a.iana-servers.net"}})
+        self.assertEqual(record["creation_date"], "1995-08-14T00:00:00")
+        self.assertEqual(record["name_servers"], ["a.iana-servers.net", "b.iana-servers.net"])
+
+    def test_persists_between_instances(self):
+        self.cache.put("Example.COM.", {"domain_name": "example.com"})
+        other = WhoisCache(self.db_path)
+        try:
+            self.assertEqual(other.get("example.com"), {"domain_name": "example.com"})
+            self.assertEqual(other.stats()["disk_hits"], 1)
+            other.get("example.com")
+            self.assertEqual(other.stats()["memory_hits"], 1)
+        finally:
+            other.close()
+
+    def test_expired_records_are_misses(self):
+        self.cache.put("example.com", {"domain_name": "example.com"}, ttl_seconds=-1)
+        self.assertIsNone(self.cache.get("example.com"))
+        self.assertEqual(self.cache.purge_expired(), 1)
+
+    def test_bulk_lookup_uses_cache_and_rate_limits(self):
+        self.cache.put("cached.com", {"domain_name": "cached.com"})
+        calls = []
+
+        def fake_whois(domain):
+            calls.append((domain, time.monotonic()))
+            return {"domain_name": domain}
+
+        with mock.patch("shamann.modules.whois_guardian.get_whois_cache", return_value=self.cache), \
+             mock.patch("shamann.modules.whois_guardian.whois.whois", side_effect=fake_whois):
+            results = WhoisGuardian.bulk_lookup(["cached.com", "a.com", "b.com", "c.org"],
+                                                max_workers=4, server_interval=0.2)
+            again = WhoisGuardian.bulk_lookup(["a.com", "b.com", "c.org"])
+
+        self.assertTrue(results["cached.com"]["cached"])
+        self.assertEqual(sorted(d for d, _ in calls), ["a.com", "b.com", "c.org"])
+        com_times = sorted(t for d, t in calls if d.endswith(".com"))
+        self.assertGreaterEqual(com_times[1] - com_times[0], 0.19)
+        self.assertTrue(all(r["cached"] for r in again.values()))
+        self.assertEqual(results["c.org"]["whois_data"], {"domain_name": "c.org"})
+
+    def test_rate_limit_is_shared_across_calls(self):
+        calls = []
+
+        def fake_whois(domain):
+            calls.append(time.monotonic())
+            return {"domain_name": domain}
+
+        with mock.patch("shamann.modules.whois_guardian.get_whois_cache", return_value=self.cache), \
+             mock.patch("shamann.modules.whois_guardian.whois.whois", side_effect=fake_whois):
+            WhoisGuardian.bulk_lookup(["x.shared"], server_interval=0.3)
+            WhoisGuardian.bulk_lookup(["y.shared"], server_interval=0.3)
+        self.assertGreaterEqual(calls[1] - calls[0], 0.29) # A segunda chamada respeita o limite da primeira
+
+if __name__ == '__main__':
+    unittest.main()
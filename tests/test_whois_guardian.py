@@ -1,9 +1,19 @@
 # tests/test_whois_guardian.py
+import os
+import tempfile
 import unittest
 from shamann.modules.whois_guardian import WhoisGuardian
+from shamann.persistence.whois_cache import configure_whois_cache
 
 class TestWhoisGuardian(unittest.TestCase):
 
+    def setUp(self):
+        # O cache compartilhado abriria o agent_ia.db do diretório atual
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        configure_whois_cache(os.path.join(tmp.name, "whois.db"))
+        self.addCleanup(configure_whois_cache)
+
     def test_run_query_success(self):
         result = WhoisGuardian.run_query("example.com")
         self.assertIsInstance(result, str)